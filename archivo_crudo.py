@@ -0,0 +1,457 @@
+"""
+archivo_crudo.py - Archivo comprimido y direccionado por contenido de páginas crudas
+
+Cada crawler guarda el payload crudo de cada inmueble (el texto de __NEXT_DATA__,
+o el HTML completo cuando no hay JSON) para poder re-derivar el dataset cuando
+cambia un parser, sin volver a crawlear.
+
+Formato en disco (directorio del archivo):
+    seg_<sesion>_<n>.gz|.zst   Segmentos: cada payload es un frame comprimido independiente
+    indice_<sesion>.jsonl      Índice: cod_fr -> sha256, segmento, offset, longitud, tipo
+
+Cada proceso escritor usa su propia sesión (timestamp + pid), así los lotes en
+paralelo no comparten archivos ni necesitan locks. Los payloads idénticos
+(mismo sha256) se guardan una sola vez; el índice apunta al blob existente.
+
+Uso:
+python archivo_crudo.py stats --archivo resultados/lotes/archivo_crudo
+python archivo_crudo.py reextraer --archivo resultados/lotes/archivo_crudo --salida resultados/reextraido.jsonl
+python archivo_crudo.py reextraer --dumps "debug_json_*.json" --procesos 8
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from glob import glob
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from frontera import BASE_URL, canonicalizar_url, extraer_cod_fr
+
+
+ARCHIVO_DEFAULT = 'resultados/archivo_crudo'
+TAMANO_SEGMENTO = 256 * 1024 * 1024  # Bytes comprimidos antes de rotar de segmento
+
+TIPO_NEXT_DATA = 'next_data'
+TIPO_HTML = 'html'
+
+NEXT_DATA_TEXTO_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.+?)</script>', re.DOTALL)
+
+
+def extraer_next_data_texto(html: str) -> Optional[str]:
+    """Texto crudo del script __NEXT_DATA__ (sin parsear) o None"""
+    match = NEXT_DATA_TEXTO_RE.search(html or '')
+    return match.group(1) if match else None
+
+
+def _comprimir(datos: bytes, compresion: str) -> bytes:
+    if compresion == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(datos)
+    return gzip.compress(datos, compresslevel=6)
+
+
+def _descomprimir(datos: bytes, compresion: str) -> bytes:
+    if compresion == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(datos)
+    return gzip.decompress(datos)
+
+
+def _compresion_de(segmento: str) -> str:
+    return 'zstd' if segmento.endswith('.zst') else 'gzip'
+
+
+class ArchivoCrudo:
+    """
+    Archivo append-only de payloads crudos por cod_fr.
+
+    Uso:
+        archivo = ArchivoCrudo('resultados/lotes/archivo_crudo')
+        archivo.guardar_html(url, html)
+        tipo, texto = archivo.leer('192454261')
+        for entrada, texto in archivo.iterar():
+            ...
+    """
+
+    def __init__(self, directorio: str = ARCHIVO_DEFAULT, compresion: str = None,
+                 tamano_segmento: int = TAMANO_SEGMENTO):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        # zstd si está instalado (más rápido y compacto); gzip siempre disponible
+        self.compresion = compresion or ('zstd' if zstandard else 'gzip')
+        if self.compresion == 'zstd' and zstandard is None:
+            raise ImportError("Compresión zstd requiere: pip install zstandard")
+        self.tamano_segmento = tamano_segmento
+        self.sesion = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.lock = Lock()
+
+        self._entradas: Dict[str, Dict[str, Any]] = {}  # cod_fr -> última entrada
+        self._blobs: Dict[str, Tuple[str, int, int]] = {}  # sha256 -> (segmento, offset, longitud)
+        self._segmento_actual = None
+        self._numero_segmento = 0
+        self._indice = None
+        self.stats = {'guardados': 0, 'deduplicados': 0, 'bytes_crudos': 0, 'bytes_comprimidos': 0}
+        self._cargar_indices()
+
+    # ------------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------------
+    def _cargar_indices(self):
+        """Lee todos los índices (de todas las sesiones) en orden cronológico"""
+        for ruta in sorted(glob(str(self.directorio / 'indice_*.jsonl'))):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue  # Línea truncada por un corte del proceso
+                    self._entradas[entrada['cod_fr']] = entrada
+                    self._blobs.setdefault(entrada['sha256'], (entrada['segmento'], entrada['offset'], entrada['longitud']))
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def __contains__(self, cod_fr) -> bool:
+        return str(cod_fr) in self._entradas
+
+    def entradas(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._entradas)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def _abrir_segmento(self):
+        if self._segmento_actual:
+            self._segmento_actual.close()
+        self._numero_segmento += 1
+        extension = 'zst' if self.compresion == 'zstd' else 'gz'
+        nombre = f"seg_{self.sesion}_{self._numero_segmento:04d}.{extension}"
+        self._segmento_actual = open(self.directorio / nombre, 'ab')
+        self._nombre_segmento = nombre
+
+    def guardar(self, cod_fr: str, url: str, texto: str, tipo: str = TIPO_NEXT_DATA) -> Dict[str, Any]:
+        """Guarda un payload crudo y retorna su entrada de índice"""
+        datos = texto.encode('utf-8')
+        sha = hashlib.sha256(datos).hexdigest()
+        with self.lock:
+            blob = self._blobs.get(sha)
+            if blob is None:
+                comprimido = _comprimir(datos, self.compresion)
+                if self._segmento_actual is None or self._segmento_actual.tell() >= self.tamano_segmento:
+                    self._abrir_segmento()
+                offset = self._segmento_actual.tell()
+                self._segmento_actual.write(comprimido)
+                self._segmento_actual.flush()  # El índice nunca apunta a bytes no escritos
+                blob = (self._nombre_segmento, offset, len(comprimido))
+                self._blobs[sha] = blob
+                self.stats['guardados'] += 1
+                self.stats['bytes_crudos'] += len(datos)
+                self.stats['bytes_comprimidos'] += len(comprimido)
+            else:
+                self.stats['deduplicados'] += 1
+
+            entrada = {
+                'cod_fr': str(cod_fr),
+                'url': url,
+                'tipo': tipo,
+                'sha256': sha,
+                'segmento': blob[0],
+                'offset': blob[1],
+                'longitud': blob[2],
+                'timestamp': time.time(),
+            }
+            if self._indice is None:
+                self._indice = open(self.directorio / f"indice_{self.sesion}.jsonl", 'a', encoding='utf-8')
+            self._indice.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+            self._indice.flush()
+            self._entradas[entrada['cod_fr']] = entrada
+        return entrada
+
+    def guardar_html(self, url: str, html: str, cod_fr: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Guarda el __NEXT_DATA__ de la página (o el HTML si no lo tiene)"""
+        cod_fr = cod_fr or extraer_cod_fr(url)
+        if not cod_fr or not html:
+            return None
+        texto = extraer_next_data_texto(html)
+        if texto is not None:
+            return self.guardar(cod_fr, url, texto, TIPO_NEXT_DATA)
+        return self.guardar(cod_fr, url, html, TIPO_HTML)
+
+    def cerrar(self):
+        with self.lock:
+            for archivo in (self._segmento_actual, self._indice):
+                if archivo:
+                    archivo.close()
+            self._segmento_actual = None
+            self._indice = None
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def leer_entrada(self, entrada: Dict[str, Any], archivo=None) -> str:
+        """Texto del payload de una entrada (archivo: segmento ya abierto, opcional)"""
+        if archivo is None:
+            with open(self.directorio / entrada['segmento'], 'rb') as f:
+                f.seek(entrada['offset'])
+                comprimido = f.read(entrada['longitud'])
+        else:
+            archivo.seek(entrada['offset'])
+            comprimido = archivo.read(entrada['longitud'])
+        return _descomprimir(comprimido, _compresion_de(entrada['segmento'])).decode('utf-8')
+
+    def leer(self, cod_fr) -> Optional[Tuple[str, str]]:
+        """(tipo, texto) de la última versión guardada de un cod_fr"""
+        entrada = self._entradas.get(str(cod_fr))
+        if entrada is None:
+            return None
+        return entrada['tipo'], self.leer_entrada(entrada)
+
+    def iterar(self) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """Recorre la última versión de cada cod_fr en orden de segmento/offset (lectura secuencial)"""
+        if self._segmento_actual:
+            self._segmento_actual.flush()
+        ordenadas = sorted(self._entradas.values(), key=lambda e: (e['segmento'], e['offset']))
+        segmento, archivo = None, None
+        try:
+            for entrada in ordenadas:
+                if entrada['segmento'] != segmento:
+                    if archivo:
+                        archivo.close()
+                    segmento = entrada['segmento']
+                    archivo = open(self.directorio / segmento, 'rb')
+                yield entrada, self.leer_entrada(entrada, archivo)
+        finally:
+            if archivo:
+                archivo.close()
+
+
+# ----------------------------------------------------------------------
+# Re-extracción con los parsers actuales
+# ----------------------------------------------------------------------
+def obtener_parser(nombre: str = 'selenium') -> Callable[[Dict[str, Any], str], Optional[Dict[str, Any]]]:
+    """
+    Retorna fn(entrada, texto) -> registro usando los parsers actuales de un crawler.
+    El registro sale en el esquema final de 50 columnas, igual que en el crawl en vivo
+    (property_crawler_selenium._formatear_salida_final).
+
+    - selenium: PropertyCrawlerSelenium._extraer_de_next_data / _extraer_del_html
+    - v2:       PropertyCrawlerV2._extraer_de_next_data
+    """
+    from property_crawler_selenium import _formatear_salida_final
+
+    if nombre == 'selenium':
+        from property_crawler_selenium import PropertyCrawlerSelenium
+        crawler = PropertyCrawlerSelenium(iniciar_driver=False)
+
+        def parsear(entrada, texto):
+            if entrada['tipo'] == TIPO_HTML:
+                datos = crawler._extraer_del_html(texto, entrada['url'])
+            else:
+                datos = crawler._extraer_de_next_data(json.loads(texto), entrada['url'])
+            return _formatear_salida_final(datos) if datos and datos.get('cod_fr') else None
+        return parsear
+
+    if nombre == 'v2':
+        from property_crawler_v2 import PropertyCrawlerV2
+        crawler = PropertyCrawlerV2()
+
+        def parsear(entrada, texto):
+            if entrada['tipo'] == TIPO_HTML:
+                texto = extraer_next_data_texto(texto)
+                if texto is None:
+                    return None
+            return _formatear_salida_final(crawler._extraer_de_next_data(json.loads(texto), entrada['url']))
+        return parsear
+
+    raise ValueError(f"Parser desconocido: {nombre}")
+
+
+# Estado por proceso del pool: el parser se construye una sola vez por worker
+_parser_worker = None
+
+
+def _iniciar_worker(nombre_parser: str):
+    global _parser_worker
+    _parser_worker = obtener_parser(nombre_parser)
+
+
+def _parsear_a_lineas(parsear, items) -> Tuple[List[str], Dict[str, int]]:
+    """Parsea (entrada, texto) y retorna las líneas JSONL ya serializadas"""
+    lineas = []
+    stats = {'ok': 0, 'vacios': 0, 'errores': 0}
+    for entrada, texto in items:
+        try:
+            registro = parsear(entrada, texto)
+        except Exception:
+            stats['errores'] += 1
+            continue
+        if registro:
+            lineas.append(json.dumps(registro, ensure_ascii=False) + '\n')
+            stats['ok'] += 1
+        else:
+            stats['vacios'] += 1
+    return lineas, stats
+
+
+def _leer_chunk(chunk: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """Payloads de un chunk: entradas de un mismo segmento o rutas de dumps debug_json"""
+    if chunk['fuente'] == 'archivo':
+        ruta = os.path.join(chunk['directorio'], chunk['segmento'])
+        with open(ruta, 'rb') as f:
+            for entrada in chunk['entradas']:
+                f.seek(entrada['offset'])
+                comprimido = f.read(entrada['longitud'])
+                yield entrada, _descomprimir(comprimido, _compresion_de(entrada['segmento'])).decode('utf-8')
+        return
+    for ruta in chunk['rutas']:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            dump = json.load(f)
+        data = dump.get('data') or {}
+        next_data = {'props': {'pageProps': {'data': data, 'technicalSheet': dump.get('technical_sheet') or []}}}
+        # `link` es relativo al sitio: se guarda la URL absoluta, como en el crawl en vivo
+        url = canonicalizar_url(data.get('link') or '') or f"{BASE_URL}/{data.get('id')}"
+        yield {'cod_fr': str(data.get('id')), 'url': url, 'tipo': TIPO_NEXT_DATA}, json.dumps(next_data)
+
+
+def _procesar_chunk(chunk: Dict[str, Any]) -> Tuple[List[str], Dict[str, int]]:
+    """Tarea del pool: lee y parsea un chunk completo dentro del worker"""
+    return _parsear_a_lineas(_parser_worker, _leer_chunk(chunk))
+
+
+def _chunks_archivo(archivo: ArchivoCrudo, tamano_chunk: int) -> List[Dict[str, Any]]:
+    """Agrupa por segmento y corta en chunks (cada worker lee su tramo secuencialmente)"""
+    por_segmento: Dict[str, List[Dict[str, Any]]] = {}
+    for entrada in archivo.entradas().values():
+        por_segmento.setdefault(entrada['segmento'], []).append(entrada)
+    chunks = []
+    for segmento, entradas in sorted(por_segmento.items()):
+        entradas.sort(key=lambda e: e['offset'])
+        for i in range(0, len(entradas), tamano_chunk):
+            chunks.append({
+                'fuente': 'archivo',
+                'directorio': str(archivo.directorio),
+                'segmento': segmento,
+                'entradas': entradas[i:i + tamano_chunk],
+            })
+    return chunks
+
+
+def _resultados_pool(pool: ProcessPoolExecutor, chunks: List[Dict], en_vuelo: int) -> Iterator[Tuple[List[str], Dict[str, int]]]:
+    """
+    Envía los chunks al pool con a lo sumo `en_vuelo` pendientes y rinde cada
+    resultado al terminar. Un futuro se suelta apenas se entrega su resultado,
+    así la memoria no crece con el tamaño del archivo.
+    """
+    pendientes_chunks = iter(chunks)
+    pendientes = set()
+    while True:
+        for chunk in pendientes_chunks:
+            pendientes.add(pool.submit(_procesar_chunk, chunk))
+            if len(pendientes) >= en_vuelo:
+                break
+        if not pendientes:
+            return
+        listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+        while listos:
+            yield listos.pop().result()
+
+
+def reextraer(directorio: str, salida: str, parser: str = 'selenium', procesos: int = None,
+              tamano_chunk: int = 500, dumps: str = None) -> Dict[str, int]:
+    """
+    Re-ejecuta los parsers actuales sobre el archivo (o sobre dumps debug_json_*.json)
+    y escribe JSONL.
+
+    Con procesos > 1 los chunks se reparten en un pool de procesos (el parseo es
+    CPU puro y no escala con threads por el GIL). Se mantienen ~2 chunks en vuelo
+    por proceso y los resultados se escriben a medida que cada chunk termina,
+    sin preservar el orden.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if dumps:
+        rutas = sorted(glob(dumps))
+        chunks = [{'fuente': 'dumps', 'rutas': rutas[i:i + tamano_chunk]} for i in range(0, len(rutas), tamano_chunk)]
+        total = len(rutas)
+    else:
+        archivo = ArchivoCrudo(directorio)
+        chunks = _chunks_archivo(archivo, tamano_chunk)
+        total = len(archivo)
+
+    stats = {'total': total, 'ok': 0, 'vacios': 0, 'errores': 0, 'procesos': procesos, 'chunks': len(chunks)}
+    inicio = time.time()
+    procesados = 0
+
+    os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        if procesos == 1:
+            parsear = obtener_parser(parser)
+            resultados = (_parsear_a_lineas(parsear, _leer_chunk(chunk)) for chunk in chunks)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker, initargs=(parser,))
+            resultados = _resultados_pool(pool, chunks, en_vuelo=2 * procesos)
+        try:
+            for lineas, parcial in resultados:
+                f.writelines(lineas)
+                for clave, valor in parcial.items():
+                    stats[clave] += valor
+                anterior, procesados = procesados, procesados + sum(parcial.values())
+                if procesados // 10000 > anterior // 10000:
+                    print(f"  {procesados:,}/{total:,} ({procesados / (time.time() - inicio):.0f} registros/s)")
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    stats['segundos'] = round(time.time() - inicio, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archivo crudo de páginas de inmuebles')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_stats = sub.add_parser('stats', help='Resumen del archivo')
+    p_stats.add_argument('--archivo', default=ARCHIVO_DEFAULT)
+
+    p_re = sub.add_parser('reextraer', help='Re-ejecutar los parsers actuales sobre el archivo')
+    p_re.add_argument('--archivo', default=ARCHIVO_DEFAULT)
+    p_re.add_argument('--salida', default='resultados/reextraido.jsonl')
+    p_re.add_argument('--parser', default='selenium', choices=['selenium', 'v2'])
+    p_re.add_argument('--procesos', type=int, default=None, help='Procesos del pool (default: núcleos)')
+    p_re.add_argument('--tamano-chunk', type=int, default=500, help='Registros por tarea del pool')
+    p_re.add_argument('--dumps', help="Glob de dumps {data, technical_sheet} en vez del archivo (ej: 'debug_json_*.json')")
+
+    args = parser.parse_args()
+
+    if args.comando == 'stats':
+        archivo = ArchivoCrudo(args.archivo)
+        entradas = archivo.entradas().values()
+        segmentos = glob(str(archivo.directorio / 'seg_*'))
+        print(f"Inmuebles (cod_fr):     {len(archivo):,}")
+        print(f"  con __NEXT_DATA__:    {sum(1 for e in entradas if e['tipo'] == TIPO_NEXT_DATA):,}")
+        print(f"  solo HTML:            {sum(1 for e in entradas if e['tipo'] == TIPO_HTML):,}")
+        print(f"Blobs únicos:           {len(archivo._blobs):,}")
+        print(f"Segmentos:              {len(segmentos)} ({sum(os.path.getsize(s) for s in segmentos) / 1e6:.1f} MB)")
+        return 0
+
+    print(f"Re-extrayendo {args.dumps or args.archivo} con parser '{args.parser}'...")
+    stats = reextraer(args.archivo, args.salida, args.parser, args.procesos, args.tamano_chunk, args.dumps)
+    print(f"\n✓ {stats['ok']:,} registros en {args.salida} ({stats['segundos']}s, "
+          f"{stats['procesos']} procesos, {stats['chunks']} chunks)")
+    print(f"  Vacíos: {stats['vacios']:,} | Errores: {stats['errores']:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+benchmark_crawlers.py - Benchmark offline de throughput de los crawlers
+
+Levanta servidor_simulado.py en un proceso aparte (para no contaminar las
+mediciones de CPU/RAM) y ejecuta contra él:
+- v2:     PropertyCrawlerV2 (requests), uno por worker
+- robust: RobustPropertyCrawler (Selenium + ThreadPool)
+- lote:   el runner por lotes procesar_lote.py (pipeline, formato final y
+          checkpoint) con un crawler que descarga por HTTP en lugar de Chrome
+
+Reporta URLs/s, latencia p50/p99 por URL, extracciones exitosas, CPU y RSS.
+Con --baseline funciona como compuerta de regresión: sale con código 1 si
+algún escenario empeora más allá de la tolerancia, extrae menos registros que
+el baseline o deja de correr (omitido).
+
+Uso:
+python benchmark_crawlers.py --escenarios v2 --urls 200 --workers 4
+python benchmark_crawlers.py --guardar-baseline resultados/benchmark_baseline.json
+python benchmark_crawlers.py --baseline resultados/benchmark_baseline.json --tolerancia 0.10
+"""
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import tempfile
+import argparse
+import subprocess
+import contextlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+
+RESULTS_DIR = 'resultados'
+ESCENARIOS = ['v2', 'v2_cobertura', 'robust', 'lote']
+
+
+def _percentil(valores: List[float], q: float) -> Optional[float]:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, int(round(q * (len(ordenados) - 1)))))
+    return round(ordenados[idx], 4)
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def servidor_en_subproceso(args):
+    """Inicia servidor_simulado.py en otro proceso y espera a que acepte conexiones"""
+    puerto = _puerto_libre()
+    cmd = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'servidor_simulado.py'),
+        '--puerto', str(puerto),
+        '--latencia-ms', str(args.latencia_ms),
+        '--jitter-ms', str(args.jitter_ms),
+        '--tasa-error', str(args.tasa_error),
+        '--tasa-429', str(args.tasa_429),
+        '--tasa-removidos', str(args.tasa_removidos),
+    ]
+    proceso = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        limite = time.time() + 15
+        while time.time() < limite:
+            try:
+                with socket.create_connection(('127.0.0.1', puerto), timeout=0.5):
+                    break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError('El servidor simulado no arrancó')
+        yield f"http://127.0.0.1:{puerto}", proceso.pid
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+class Medidor:
+    """CPU y RSS del proceso actual más sus hijos (navegadores), excluyendo el servidor"""
+
+    def __init__(self, pid_excluido: int):
+        self.pid_excluido = pid_excluido
+        self.rss_pico = 0
+
+    def _procesos(self):
+        if psutil is None:
+            return []
+        yo = psutil.Process()
+        return [yo] + [p for p in yo.children(recursive=True) if p.pid != self.pid_excluido]
+
+    def cpu(self) -> float:
+        if psutil is None:
+            return time.process_time()
+        total = 0.0
+        for p in self._procesos():
+            try:
+                t = p.cpu_times()
+                total += t.user + t.system
+            except psutil.Error:
+                continue
+        return total
+
+    def muestrear_rss(self):
+        if psutil is None:
+            if resource is not None:
+                # ru_maxrss viene en KB en Linux
+                self.rss_pico = max(self.rss_pico, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+            return
+        total = 0
+        for p in self._procesos():
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                continue
+        self.rss_pico = max(self.rss_pico, total)
+
+
+def _medir(nombre: str, urls: List[str], ejecutar: Callable[[List[str], List[float]], int],
+           pid_servidor: int) -> Dict[str, Any]:
+    """Ejecuta un escenario tomando muestras de RSS en segundo plano"""
+    medidor = Medidor(pid_servidor)
+    latencias: List[float] = []
+    muestreando = [True]
+
+    def muestreo():
+        while muestreando[0]:
+            medidor.muestrear_rss()
+            time.sleep(0.25)
+
+    hilo = threading.Thread(target=muestreo, daemon=True)
+    hilo.start()
+    cpu_inicio = medidor.cpu()
+    inicio = time.perf_counter()
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as nulo, contextlib.redirect_stdout(nulo):
+            exitosas = ejecutar(urls, latencias)
+    finally:
+        segundos = time.perf_counter() - inicio
+        cpu_total = medidor.cpu() - cpu_inicio
+        muestreando[0] = False
+        hilo.join()
+    medidor.muestrear_rss()
+
+    return {
+        'escenario': nombre,
+        'urls': len(urls),
+        'exitosas': exitosas,
+        'tasa_exito': round(exitosas / len(urls), 4) if urls else None,
+        'segundos': round(segundos, 3),
+        'urls_s': round(len(urls) / segundos, 3) if segundos else None,
+        'p50_s': _percentil(latencias, 0.50),
+        'p99_s': _percentil(latencias, 0.99),
+        'cpu_s': round(cpu_total, 3),
+        'rss_mb': round(medidor.rss_pico / 1e6, 1),
+    }
+
+
+def _cronometrar(funcion, latencias: List[float]):
+    """Envuelve una función de extracción registrando su latencia"""
+    def envuelta(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            latencias.append(time.perf_counter() - inicio)
+    return envuelta
+
+
+def escenario_v2(workers: int, cobertura: Optional[Dict] = None):
+    from property_crawler_v2 import PropertyCrawlerV2
+
+    def ejecutar(urls, latencias):
+        def trabajar(parte):
+            # Un crawler (Session) por worker; la cobertura y su presupuesto son uno por proceso
+            crawler = PropertyCrawlerV2(cobertura=cobertura)
+            extraer = _cronometrar(crawler.extraer_propiedad, latencias)
+            try:
+                return sum(1 for url in parte if 'error' not in extraer(url))
+            finally:
+                crawler.close()
+        partes = [urls[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return sum(executor.map(trabajar, partes))
+    return ejecutar
+
+
+def escenario_v2_cobertura(workers: int):
+    """v2 con requests cubiertos (cobertura_http) contra la cola de latencia"""
+    return escenario_v2(workers, cobertura={'max_hilos': max(16, 2 * workers)})
+
+
+def escenario_robust(workers: int):
+    from property_crawler_robust import RobustPropertyCrawler
+    from vigilante_driver import cerrar_driver
+
+    def ejecutar(urls, latencias):
+        with tempfile.TemporaryDirectory() as tmp:
+            crawler = RobustPropertyCrawler(output_dir=tmp, config={
+                'max_workers': workers,
+                'batch_size': max(1, len(urls) // workers),
+                'control_tasa': None,
+                'request_delay': 0,
+                'headless': True,
+            })
+            # Sin Chrome/chromedriver el pipeline contaría 0 exitosas: mejor omitir el escenario
+            cerrar_driver(crawler._create_driver())
+            crawler._process_url = _cronometrar(crawler._process_url, latencias)
+            stats = crawler.crawl(urls)
+            return stats['success']
+    return ejecutar
+
+
+def escenario_lote(workers: int):
+    import requests
+    import procesar_lote
+    from control_tasa import CONFIG_TASA
+    from errores_crawl import REMOVIDO, ErrorCrawl
+    from property_crawler_selenium import PropertyCrawlerSelenium
+
+    class CrawlerHTTP(PropertyCrawlerSelenium):
+        """Sin Chrome: el escenario mide el runner, el fetch con navegador lo mide robust"""
+
+        def __init__(self):
+            super().__init__(iniciar_driver=False)
+            self.session = requests.Session()
+
+        def obtener_html(self, url, max_wait=30, reintentos=3, lanzar=False):
+            respuesta = self.session.get(url, timeout=max_wait)
+            if respuesta.status_code in (404, 410):
+                raise ErrorCrawl('Página removida', REMOVIDO)
+            respuesta.raise_for_status()
+            return respuesta.text
+
+    def ejecutar(urls, latencias):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Redirigir todas las rutas del runner al directorio temporal
+            procesar_lote.LOTES_DIR = tmp
+            procesar_lote.INDICE_FILE = os.path.join(tmp, 'indice_cod_fr.txt')
+            procesar_lote.TASA_FILE = os.path.join(tmp, 'tasa_global.json')
+            procesar_lote.BLOQUEOS_FILE = os.path.join(tmp, 'bloqueos.json')
+            procesar_lote.ARCHIVO_CRUDO_DIR = os.path.join(tmp, 'archivo_crudo')
+            with open(os.path.join(tmp, 'lote_01.json'), 'w', encoding='utf-8') as f:
+                json.dump({'urls': urls}, f)
+            # Tasa AIMD ya asentada en el máximo: se mide el runner, no el arranque lento del control
+            with open(procesar_lote.TASA_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'tasa': CONFIG_TASA['tasa_max']}, f)
+            crawler = CrawlerHTTP()
+            crawler.obtener_html = _cronometrar(crawler.obtener_html, latencias)
+            try:
+                procesar_lote.procesar_lote(1, crawler=crawler)
+            finally:
+                crawler.close()
+            checkpoint = os.path.join(tmp, 'lote_01', 'checkpoint_lote_01.jsonl')
+            if not os.path.exists(checkpoint):
+                return 0
+            with open(checkpoint, 'r', encoding='utf-8') as f:
+                return sum(1 for linea in f if json.loads(linea).get('COD FR'))
+    return ejecutar
+
+
+FABRICAS = {
+    'v2': escenario_v2,
+    'v2_cobertura': escenario_v2_cobertura,
+    'robust': escenario_robust,
+    'lote': escenario_lote,
+}
+
+
+def comparar_con_baseline(resultados: Dict[str, Dict], baseline: Dict[str, Dict], tolerancia: float,
+                          tolerancia_exito: float = 0.0) -> List[str]:
+    """
+    Lista de regresiones (vacía si todo está dentro de la tolerancia).
+    
+    Más rápido no sirve si extrae menos: una caída en la tasa de éxito mayor a
+    `tolerancia_exito` (puntos, 0.02 = 2%) es regresión, igual que dejar de
+    correr un escenario que el baseline sí midió.
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = baseline.get(nombre)
+        if not base or base.get('omitido'):
+            continue
+        if actual.get('omitido'):
+            regresiones.append(f"{nombre}: omitido ({actual['omitido'][:80]}), el baseline sí lo midió")
+            continue
+        # Con el mismo número de URLs, menos exitosas ya es menor tasa
+        tasa_base = base.get('exitosas', 0) / base['urls'] if base.get('urls') else None
+        if tasa_base is not None and actual['tasa_exito'] < tasa_base - tolerancia_exito:
+            regresiones.append(f"{nombre}: exitosas {actual['exitosas']}/{actual['urls']} ({actual['tasa_exito']:.1%}) "
+                               f"< {base['exitosas']}/{base['urls']} ({tasa_base:.1%}) del baseline")
+        if base.get('urls_s') and actual['urls_s'] < base['urls_s'] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: URLs/s {actual['urls_s']} < {base['urls_s']} (-{tolerancia:.0%})")
+        if base.get('p99_s') and actual.get('p99_s') and actual['p99_s'] > base['p99_s'] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p99 {actual['p99_s']}s > {base['p99_s']}s (+{tolerancia:.0%})")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline de los crawlers contra un servidor simulado')
+    parser.add_argument('--escenarios', nargs='+', default=ESCENARIOS, choices=ESCENARIOS)
+    parser.add_argument('--urls', type=int, default=100, help='URLs por escenario')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latencia-ms', type=float, default=100)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--tasa-error', type=float, default=0.0)
+    parser.add_argument('--tasa-429', type=float, default=0.0)
+    parser.add_argument('--tasa-removidos', type=float, default=0.0)
+    parser.add_argument('--baseline', help='JSON de un benchmark previo para comparar (compuerta de regresión)')
+    parser.add_argument('--tolerancia', type=float, default=0.10, help='Empeoramiento tolerado (0.10 = 10%%)')
+    parser.add_argument('--tolerancia-exito', type=float, default=0.0,
+                        help='Caída tolerada de la tasa de éxito en puntos (0.02 = 2%%; con --tasa-error > 0)')
+    parser.add_argument('--guardar-baseline', help='Guardar los resultados como nuevo baseline en esta ruta')
+    args = parser.parse_args()
+
+    resultados: Dict[str, Dict] = {}
+    with servidor_en_subproceso(args) as (url_base, pid_servidor):
+        urls = [f"{url_base}/apartamento-en-venta-en-simulado/{190000000 + i}" for i in range(args.urls)]
+        for nombre in args.escenarios:
+            print(f"▶ Escenario {nombre} ({len(urls)} URLs, {args.workers} workers)...")
+            try:
+                ejecutar = FABRICAS[nombre](args.workers)
+                resultados[nombre] = _medir(nombre, urls, ejecutar, pid_servidor)
+            except Exception as e:
+                # Ej: sin Chrome/chromedriver en la máquina o runner no importable
+                resultados[nombre] = {'escenario': nombre, 'omitido': f"{type(e).__name__}: {e}"}
+                print(f"  ⚠ Omitido: {resultados[nombre]['omitido'][:120]}")
+
+    print(f"\n{'='*86}")
+    print(f"{'Escenario':<10} {'URLs':>6} {'OK':>6} {'Seg':>8} {'URLs/s':>8} {'p50 s':>8} {'p99 s':>8} {'CPU s':>8} {'RSS MB':>8}")
+    print('-' * 86)
+    for r in resultados.values():
+        if r.get('omitido'):
+            print(f"{r['escenario']:<10} omitido")
+            continue
+        print(f"{r['escenario']:<10} {r['urls']:>6} {r['exitosas']:>6} {r['segundos']:>8} {r['urls_s']:>8} "
+              f"{r['p50_s']!s:>8} {r['p99_s']!s:>8} {r['cpu_s']:>8} {r['rss_mb']:>8}")
+    print('=' * 86)
+
+    salida = {
+        'timestamp': datetime.now().isoformat(),
+        'parametros': vars(args),
+        'resultados': resultados,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    ruta = os.path.join(RESULTS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, ensure_ascii=False, indent=2)
+    print(f"✓ Resultados: {ruta}")
+
+    if args.guardar_baseline:
+        with open(args.guardar_baseline, 'w', encoding='utf-8') as f:
+            json.dump(salida, f, ensure_ascii=False, indent=2)
+        print(f"✓ Baseline guardado: {args.guardar_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('resultados', {})
+        regresiones = comparar_con_baseline(resultados, baseline, args.tolerancia, args.tolerancia_exito)
+        if regresiones:
+            print("\n✗ REGRESIONES DETECTADAS:")
+            for r in regresiones:
+                print(f"  - {r}")
+            return 1
+        print("\n✓ Sin regresiones respecto al baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+cache_contactos.py - Caché persistente de contactos de inmobiliarias por id de owner
+
+Los registros de inmuebles ya traen `id_inmos`/`inmos` (el `owner` del aviso),
+pero extract_emails_fast.py y recheck_urls.py recorrían listas de URLs de
+perfil sin memoria de lo ya resuelto, pagando cada vez el "Ver teléfono"
+(lento y con login).
+
+CacheContactos:
+- Un registro por id de owner (el id del perfil /inmobiliarias/perfil/<id>)
+  con email, teléfono, fecha del revelado y si el teléfono es válido según
+  `valid_phone` de build_final_excel.py
+- TTL por validez: un teléfono válido no se vuelve a revelar antes de
+  `ttl_valido_dias`; un revelado sin teléfono válido (o fallido) se reintenta
+  recién a los `ttl_invalido_dias`. Así cada inmobiliaria cuesta como mucho un
+  revelado por período
+- Archivo JSONL append-only (la última línea de cada id manda): un corte a
+  mitad de escritura solo pierde esa línea
+- `cola` arma la lista de perfiles a revelar desde los owners de los
+  resultados de inmuebles, dejando solo los sin resolver o vencidos
+
+Uso:
+    python cache_contactos.py sembrar resultados/extraction_emails_*.json
+    python cache_contactos.py cola resultados/lotes --salida resultados/recheck_urls.txt
+    python cache_contactos.py estado
+"""
+import os
+import json
+import time
+import argparse
+from glob import glob
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from build_final_excel import PHONE_NOT_FOUND, normalize_phone, valid_phone
+from merge_contacts_to_excel import extract_id_from_url
+from frontera import BASE_URL, _leer_registros
+
+
+CACHE_DEFAULT = os.path.join('resultados', 'cache_contactos.jsonl')
+URL_PERFIL = BASE_URL + '/inmobiliarias/perfil/{}'
+
+CONFIG_CACHE_CONTACTOS = {
+    'ttl_valido_dias': 30,  # Teléfono válido: no se vuelve a revelar antes de este plazo
+    'ttl_invalido_dias': 7,  # Revelado sin teléfono válido o fallido: se reintenta después de este plazo
+}
+
+# Campos del owner en los distintos formatos de salida de inmuebles
+CAMPOS_ID_OWNER = ('id_inmos', 'ID Inmos', 'ID INMOS', 'Id Inmos')
+CAMPOS_NOMBRE_OWNER = ('inmos', 'INMOS', 'Inmos')
+
+
+def url_perfil(id_owner) -> str:
+    return URL_PERFIL.format(id_owner)
+
+
+class CacheContactos:
+    """Contactos resueltos por id de owner, con TTL según la validez del teléfono"""
+
+    def __init__(self, ruta: str = CACHE_DEFAULT, config: Dict = None):
+        self.ruta = ruta
+        self.config = {**CONFIG_CACHE_CONTACTOS, **(config or {})}
+        self.lock = Lock()
+        self.contactos: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._cargar()
+
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    contacto = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                if contacto.get('id'):
+                    self.contactos[str(contacto['id'])] = contacto
+
+    def __contains__(self, id_owner) -> bool:
+        return id_owner is not None and str(id_owner) in self.contactos
+
+    def __len__(self) -> int:
+        return len(self.contactos)
+
+    def get(self, id_owner) -> Optional[Dict[str, Any]]:
+        return self.contactos.get(str(id_owner)) if id_owner is not None else None
+
+    # ------------------------------------------------------------------
+    # Vigencia
+    # ------------------------------------------------------------------
+    def vence(self, contacto: Dict[str, Any]) -> float:
+        dias = self.config['ttl_valido_dias'] if contacto.get('valido') else self.config['ttl_invalido_dias']
+        return contacto.get('revelado', 0) + dias * 86400
+
+    def vigente(self, id_owner, ahora: Optional[float] = None) -> bool:
+        """True si el owner ya tuvo su revelado en el período actual"""
+        contacto = self.get(id_owner)
+        if contacto is None:
+            return False
+        return (time.time() if ahora is None else ahora) < self.vence(contacto)
+
+    def filtrar_urls(self, urls: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Separa URLs de perfil en (a_revelar, en_cache)
+
+        Una URL por owner: los duplicados del mismo id se descartan
+        """
+        a_revelar, en_cache, vistos = [], [], set()
+        for url in urls:
+            id_owner = extract_id_from_url(url)
+            if id_owner is not None:
+                if id_owner in vistos:
+                    continue
+                vistos.add(id_owner)
+            (en_cache if self.vigente(id_owner) else a_revelar).append(url)
+        return a_revelar, en_cache
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def registrar(self, id_owner, email: Optional[str], telefono: Optional[str], url: Optional[str] = None,
+                  nombre: Optional[str] = None, fuente: str = 'revelado',
+                  revelado: Optional[float] = None) -> Dict[str, Any]:
+        """Guarda el resultado de un revelado (también los fallidos: cuentan para el período)"""
+        id_owner = str(id_owner)
+        telefono = normalize_phone(telefono) if telefono else PHONE_NOT_FOUND
+        with self.lock:
+            anterior = self.contactos.get(id_owner, {})
+            contacto = {
+                'id': id_owner,
+                'nombre': nombre or anterior.get('nombre'),
+                'url': url or anterior.get('url') or url_perfil(id_owner),
+                'email': email if email and '@' in email else None,  # Descarta 'No encontrado'
+                'telefono': telefono,
+                'valido': valid_phone(telefono),
+                'revelado': time.time() if revelado is None else revelado,
+                'revelados': anterior.get('revelados', 0) + 1,
+                'fuente': fuente,
+            }
+            # Un revelado sin teléfono no pisa un teléfono válido anterior (el intento igual cuenta)
+            if not contacto['valido'] and anterior.get('valido'):
+                contacto.update(telefono=anterior['telefono'], valido=True,
+                                email=contacto['email'] or anterior.get('email'))
+            self.contactos[id_owner] = contacto
+            with open(self.ruta, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(contacto, ensure_ascii=False) + '\n')
+        return contacto
+
+    def sembrar_desde_resultados(self, rutas: Iterable[str]) -> int:
+        """
+        Incorpora extracciones previas (extraction_emails_*.json, recheck) con la
+        fecha del archivo como fecha del revelado. Retorna cuántos owners mejoraron
+        """
+        mejorados = 0
+        for ruta in sorted(rutas, key=os.path.getmtime):
+            revelado = os.path.getmtime(ruta)
+            for registro in _leer_registros(ruta):
+                id_owner = extract_id_from_url(registro.get('url') or '')
+                if id_owner is None:
+                    continue
+                telefono = registro.get('telefono') or registro.get('phone')
+                actual = self.get(id_owner)
+                if actual and (actual.get('valido') or not valid_phone(normalize_phone(telefono or ''))):
+                    continue
+                self.registrar(id_owner, registro.get('email'), telefono, url=registro.get('url'),
+                               fuente=os.path.basename(ruta), revelado=revelado)
+                mejorados += 1
+        return mejorados
+
+    def compactar(self):
+        """Reescribe el archivo con una línea por owner"""
+        with self.lock:
+            temporal = self.ruta + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                for contacto in self.contactos.values():
+                    f.write(json.dumps(contacto, ensure_ascii=False) + '\n')
+            os.replace(temporal, self.ruta)
+
+    def resumen(self) -> Dict[str, int]:
+        ahora = time.time()
+        datos = {'owners': len(self.contactos), 'validos': 0, 'vigentes': 0, 'vencidos': 0}
+        for id_owner, contacto in self.contactos.items():
+            datos['validos'] += bool(contacto.get('valido'))
+            datos['vigentes' if ahora < self.vence(contacto) else 'vencidos'] += 1
+        return datos
+
+
+def owners_desde_resultados(rutas: Iterable[str]) -> Dict[str, Optional[str]]:
+    """{id_inmos: inmos} de los resultados de inmuebles (JSON de lote, checkpoints JSONL)"""
+    owners: Dict[str, Optional[str]] = {}
+    for ruta in rutas:
+        for registro in _leer_registros(ruta):
+            id_owner = next((registro[c] for c in CAMPOS_ID_OWNER if registro.get(c)), None)
+            if id_owner is None:
+                continue
+            nombre = next((registro[c] for c in CAMPOS_NOMBRE_OWNER if registro.get(c)), None)
+            owners.setdefault(str(id_owner), nombre)
+    return owners
+
+
+def _archivos(entradas: Iterable[str]) -> List[str]:
+    archivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            archivos += glob(os.path.join(entrada, '**', '*.json'), recursive=True)
+            archivos += glob(os.path.join(entrada, '**', '*.jsonl'), recursive=True)
+        else:
+            archivos += glob(entrada)
+    return archivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Caché de contactos de inmobiliarias por id de owner')
+    parser.add_argument('--cache', default=CACHE_DEFAULT, help='Archivo JSONL de la caché')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_sembrar = sub.add_parser('sembrar', help='Incorporar extracciones previas de contactos')
+    p_sembrar.add_argument('archivos', nargs='+', help='extraction_emails_*.json u otros JSON con url/email/telefono')
+
+    p_cola = sub.add_parser('cola', help='Perfiles a revelar: owners de los inmuebles sin contacto vigente')
+    p_cola.add_argument('resultados', nargs='+', help='Directorios o archivos con resultados de inmuebles')
+    p_cola.add_argument('--salida', default=os.path.join('resultados', 'recheck_urls.txt'),
+                        help='Archivo de URLs de perfil (una por línea)')
+
+    sub.add_parser('estado', help='Resumen de la caché')
+    sub.add_parser('compactar', help='Dejar una línea por owner')
+    args = parser.parse_args()
+
+    cache = CacheContactos(args.cache)
+    if args.comando == 'sembrar':
+        mejorados = cache.sembrar_desde_resultados(_archivos(args.archivos))
+        print(f"✓ {mejorados:,} owners incorporados o mejorados ({len(cache):,} en caché)")
+    elif args.comando == 'cola':
+        owners = owners_desde_resultados(_archivos(args.resultados))
+        pendientes = [id_owner for id_owner in owners if not cache.vigente(id_owner)]
+        os.makedirs(os.path.dirname(args.salida) or '.', exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            for id_owner in pendientes:
+                f.write(url_perfil(id_owner) + '\n')
+        print(f"Owners en resultados: {len(owners):,}")
+        print(f"  Con contacto vigente: {len(owners) - len(pendientes):,}")
+        print(f"  A revelar (sin resolver o vencidos): {len(pendientes):,}")
+        print(f"✓ Cola guardada en: {args.salida}")
+    elif args.comando == 'compactar':
+        cache.compactar()
+        print(f"✓ Caché compactada: {len(cache):,} owners")
+
+    resumen = cache.resumen()
+    print(f"Caché: {resumen['owners']:,} owners | {resumen['validos']:,} con teléfono válido | "
+          f"{resumen['vigentes']:,} vigentes | {resumen['vencidos']:,} vencidos")
+
+
+if __name__ == '__main__':
+    main()
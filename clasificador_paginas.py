@@ -0,0 +1,258 @@
+"""
+clasificador_paginas.py - Detección temprana de páginas de bloqueo, removidas y de error
+
+Cuando Finca Raíz sirve un challenge anti-bot o un shell de error, los crawlers
+esperaban hasta `max_wait` segundos por `__NEXT_DATA__` y luego reintentaban con
+reinicio de navegador. Este módulo:
+- Clasifica la página (normal / challenge / removido / error) apenas hay DOM,
+  con los primeros bytes de la respuesta o una sonda JavaScript mínima
+- Corta la espera en cuanto la clase es definitiva
+- Lleva una ventana de clasificaciones y, si la tasa de bloqueos supera el
+  umbral, activa un enfriamiento (cool-down) para todo el crawler
+- Con pageLoadStrategy 'eager'/'none' la sonda ignora el documento anterior
+  (marcar_documento_anterior) y detener_carga() corta lo que sigue cargando
+"""
+import os
+import re
+import json
+import time
+from collections import deque
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+
+NORMAL = 'normal'
+CHALLENGE = 'challenge'
+REMOVIDO = 'removido'
+ERROR = 'error'
+CARGANDO = 'cargando'  # Aún no hay suficiente DOM para decidir
+
+# Solo se inspecciona el inicio del documento: los marcadores aparecen en <head>/<title>
+BYTES_INSPECCION = 20000
+
+MARCADORES_CHALLENGE = [
+    'cf-chl', 'challenge-platform', 'cf_chl_opt', 'just a moment',
+    'attention required', 'checking your browser', 'px-captcha', 'captcha-delivery',
+    'access denied', 'request unsuccessful', 'incapsula',
+    'verifica que eres humano', 'verificando que eres humano',
+]
+MARCADORES_REMOVIDO = [
+    'ya no está disponible', 'ya no esta disponible', 'inmueble no disponible',
+    'publicación no disponible', 'este aviso ya no existe', 'la página que buscas no existe',
+    'página no encontrada', 'pagina no encontrada',
+]
+MARCADORES_ERROR = [
+    'application error', 'bad gateway', 'service unavailable', 'gateway timeout',
+    'internal server error', 'ha ocurrido un error', 'err_connection', 'err_timed_out',
+]
+
+NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"', re.IGNORECASE)
+NEXT_PAGE_RE = re.compile(r'"page"\s*:\s*"(/[^"]*)"')
+
+# Estrategias de carga de Selenium: 'normal' espera el evento load completo
+ESTRATEGIAS_CARGA = ('normal', 'eager', 'none')
+
+# Sonda que se ejecuta en el navegador: pocos bytes en vez de page_source completo
+SONDA_JS = """
+var nd = document.getElementById('__NEXT_DATA__');
+var pagina = null;
+if (nd) { var m = nd.textContent.match(/"page"\\s*:\\s*"(\\/[^"]*)"/); pagina = m ? m[1] : null; }
+return {
+    anterior: !!window.__pagina_anterior,
+    estado: document.readyState,
+    titulo: document.title || '',
+    next_data: !!nd,
+    pagina: pagina,
+    texto: document.body ? document.body.innerText.slice(0, 3000) : '',
+    head: document.documentElement ? document.documentElement.outerHTML.slice(0, 5000) : ''
+};
+"""
+
+
+class PaginaBloqueada(Exception):
+    """El servidor respondió con un challenge/bloqueo anti-bot"""
+
+
+class PaginaRemovida(Exception):
+    """El inmueble ya no existe (404/410 o aviso removido)"""
+
+
+def _contiene(texto: str, marcadores) -> bool:
+    return any(m in texto for m in marcadores)
+
+
+def _clasificar_texto(texto: str, tiene_next_data: bool, pagina_next: Optional[str]) -> str:
+    """Núcleo común a la clasificación por HTML y por sonda del navegador"""
+    texto = texto.lower()
+    if pagina_next in ('/404', '/_error'):
+        return REMOVIDO if pagina_next == '/404' else ERROR
+    # Con __NEXT_DATA__ de un aviso la página es normal: los marcadores de texto
+    # podrían aparecer en la descripción del inmueble
+    if tiene_next_data:
+        return NORMAL
+    if _contiene(texto, MARCADORES_CHALLENGE):
+        return CHALLENGE
+    if _contiene(texto, MARCADORES_REMOVIDO):
+        return REMOVIDO
+    if _contiene(texto, MARCADORES_ERROR):
+        return ERROR
+    return CARGANDO
+
+
+def clasificar_pagina(html: Optional[str], status: Optional[int] = None) -> str:
+    """
+    Clasifica una respuesta HTTP/HTML.
+
+    Con `status` disponible (requests) se decide sin mirar el cuerpo cuando es
+    posible; si no, se usan los primeros BYTES_INSPECCION caracteres más la
+    presencia del script __NEXT_DATA__.
+    """
+    if status in (403, 429):
+        return CHALLENGE
+    if status in (404, 410):
+        return REMOVIDO
+    if status is not None and status >= 500:
+        return ERROR
+    if not html:
+        return CARGANDO if status is None else ERROR
+
+    match_next = NEXT_DATA_RE.search(html)
+    pagina = None
+    if match_next:
+        match_page = NEXT_PAGE_RE.search(html, match_next.end())
+        pagina = match_page.group(1) if match_page else None
+    clase = _clasificar_texto(html[:BYTES_INSPECCION], bool(match_next), pagina)
+    # Con la respuesta completa en mano, "cargando" significa que nunca llegó el contenido
+    if clase == CARGANDO and status is not None:
+        return ERROR
+    return clase
+
+
+def clasificar_sonda(sonda: Dict) -> str:
+    """Clasifica el resultado de SONDA_JS"""
+    if sonda.get('anterior'):
+        return CARGANDO  # Sigue el documento de la URL anterior: la navegación no empezó
+    texto = ' '.join([sonda.get('titulo') or '', sonda.get('head') or '', sonda.get('texto') or ''])
+    clase = _clasificar_texto(texto, bool(sonda.get('next_data')), sonda.get('pagina'))
+    # Documento completo sin __NEXT_DATA__ ni marcadores conocidos: shell de error
+    if clase == CARGANDO and sonda.get('estado') == 'complete':
+        return ERROR
+    return clase
+
+
+def marcar_documento_anterior(driver):
+    """
+    Marca el documento actual antes de navegar. Con pageLoadStrategy 'none'
+    driver.get retorna antes de que cargue el documento nuevo, y la sonda
+    podría clasificar (y extraer) la página anterior.
+    """
+    try:
+        driver.execute_script('window.__pagina_anterior = true;')
+    except Exception:
+        pass
+
+
+def detener_carga(driver):
+    """window.stop(): con __NEXT_DATA__ en mano, imágenes, mapas y scripts de terceros sobran"""
+    try:
+        driver.execute_script('window.stop();')
+    except Exception:
+        pass
+
+
+def esperar_clasificacion(driver, max_wait: float = 30, intervalo: float = 0.25) -> Tuple[str, float]:
+    """
+    Sondea el DOM hasta que la página tenga una clase definitiva o venza max_wait.
+
+    Returns:
+        (clase, segundos_esperados)
+    """
+    inicio = time.time()
+    clase = CARGANDO
+    while time.time() - inicio < max_wait:
+        try:
+            sonda = driver.execute_script(SONDA_JS)
+            clase = clasificar_sonda(sonda or {})
+        except Exception:
+            clase = CARGANDO
+        if clase != CARGANDO:
+            break
+        time.sleep(intervalo)
+    if clase == CARGANDO:
+        clase = ERROR  # Venció el plazo sin contenido
+    return clase, time.time() - inicio
+
+
+class MonitorBloqueos:
+    """
+    Ventana deslizante de clasificaciones con enfriamiento global.
+
+    Si la proporción de challenges en la ventana supera `umbral`, todo el crawler
+    (todos los threads y, con `ruta_estado`, todos los procesos) espera
+    `enfriamiento` segundos antes del siguiente request, en vez de quemar
+    reintentos URL por URL contra el mismo bloqueo.
+    """
+
+    def __init__(self, ruta_estado: Optional[str] = None, ventana: int = 20,
+                 umbral: float = 0.3, minimo_muestras: int = 5, enfriamiento: float = 300):
+        self.ruta_estado = Path(ruta_estado) if ruta_estado else None
+        if self.ruta_estado:
+            self.ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+        self.ventana = deque(maxlen=ventana)
+        self.umbral = umbral
+        self.minimo_muestras = minimo_muestras
+        self.enfriamiento = enfriamiento
+        self.lock = Lock()
+        self._enfriamiento_hasta = 0.0
+        self.stats = {clase: 0 for clase in (NORMAL, CHALLENGE, REMOVIDO, ERROR)}
+        self.stats['enfriamientos'] = 0
+
+    def _leer_enfriamiento(self) -> float:
+        if self.ruta_estado and self.ruta_estado.exists():
+            try:
+                with open(self.ruta_estado, 'r', encoding='utf-8') as f:
+                    return max(self._enfriamiento_hasta, json.load(f).get('enfriamiento_hasta', 0.0))
+            except (json.JSONDecodeError, OSError):
+                pass
+        return self._enfriamiento_hasta
+
+    def _escribir_enfriamiento(self):
+        if not self.ruta_estado:
+            return
+        tmp = self.ruta_estado.with_suffix(self.ruta_estado.suffix + f'.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'enfriamiento_hasta': self._enfriamiento_hasta}, f)
+        os.replace(tmp, self.ruta_estado)
+
+    def registrar(self, clase: str) -> bool:
+        """Registra una clasificación. Retorna True si activó un enfriamiento"""
+        with self.lock:
+            if clase in self.stats:
+                self.stats[clase] += 1
+            if clase == REMOVIDO:
+                return False  # Un aviso removido no dice nada del bloqueo
+            self.ventana.append(clase == CHALLENGE)
+            if len(self.ventana) < self.minimo_muestras:
+                return False
+            tasa_bloqueo = sum(self.ventana) / len(self.ventana)
+            if tasa_bloqueo < self.umbral or time.time() < self._leer_enfriamiento():
+                return False
+            self._enfriamiento_hasta = time.time() + self.enfriamiento
+            self.stats['enfriamientos'] += 1
+            self.ventana.clear()
+            self._escribir_enfriamiento()
+        print(f"  ⚠ Tasa de bloqueo {tasa_bloqueo:.0%}: enfriamiento global de {self.enfriamiento:.0f}s")
+        return True
+
+    def en_enfriamiento(self) -> bool:
+        return time.time() < self._leer_enfriamiento()
+
+    def esperar_enfriamiento(self) -> float:
+        """Duerme hasta que termine el enfriamiento activo. Retorna los segundos esperados"""
+        restante = self._leer_enfriamiento() - time.time()
+        if restante > 0:
+            print(f"  ⏸ Enfriamiento global activo, esperando {restante:.0f}s...")
+            time.sleep(restante)
+            return restante
+        return 0.0
@@ -0,0 +1,214 @@
+"""
+cobertura_http.py - Requests con cobertura (hedging) para recortar la cola de latencia
+
+En los caminos basados en requests (PropertyCrawlerV2, extract_from_urls) una
+respuesta lenta retiene al worker hasta el timeout (30 s / 12 s), y con un
+número fijo de workers el pequeño porcentaje más lento domina el tiempo total.
+
+SolicitudesCubiertas.get():
+- Lanza el request primario y espera hasta el p95 móvil de latencia
+- Si no respondió, lanza un duplicado (cobertura) y gana la primera respuesta
+  buena (sin excepción y con status < 500); la otra se descarta al terminar
+- Presupuesto global: las coberturas no superan `presupuesto` (5%) de los
+  requests primarios. Para que sea global de verdad, los crawlers de un mismo
+  proceso comparten una instancia (adquirir/liberar): con una por worker, cada
+  uno tendría su propio 5% y su propio p95
+- Stats: coberturas lanzadas, ganadas y segundos de cola ahorrados (cuando la
+  cobertura gana, cuánto antes llegó que el primario)
+
+Uso:
+    http = SolicitudesCubiertas(requests.Session())
+    response = http.get(url, timeout=30)
+    print(http.resumen())
+
+    # Compartida entre workers, cada uno con su Session
+    http = adquirir()
+    response = http.get(url, session=mi_session, timeout=30)
+    liberar(http)
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+from metricas import get_registro
+
+
+CONFIG_COBERTURA = {
+    'percentil': 0.95,  # Se cubre el request que supera este percentil móvil
+    'presupuesto': 0.05,  # Coberturas máximas como fracción de los requests primarios
+    'min_muestras': 20,  # Latencias observadas antes de empezar a cubrir
+    'ventana': 500,  # Latencias recientes para el percentil móvil
+    'recalcular_cada': 20,  # Observaciones entre recálculos del percentil
+    'retraso_min': 0.5,  # Nunca cubrir antes de estos segundos
+    'max_hilos': 16,  # Threads del pool (primarios + coberturas en vuelo; ≥ 2 x workers si es compartida)
+}
+
+# Instancia compartida por proceso y cuántos la usan (se cierra con el último liberar)
+_compartida: Optional['SolicitudesCubiertas'] = None
+_usuarios = 0
+_lock_compartida = threading.Lock()
+
+
+def _respuesta_buena(futuro) -> bool:
+    if futuro.exception() is not None:
+        return False
+    return futuro.result()[0].status_code < 500
+
+
+def _cerrar_al_terminar(futuro):
+    """Libera la conexión del request perdedor cuando termine"""
+    if futuro.exception() is None:
+        try:
+            futuro.result()[0].close()
+        except Exception:
+            pass
+
+
+class SolicitudesCubiertas:
+    """Envoltorio de requests.Session con cobertura de la cola de latencia"""
+
+    def __init__(self, session=None, config: Dict = None):
+        self.session = session
+        self.config = {**CONFIG_COBERTURA, **(config or {})}
+        self.pool = ThreadPoolExecutor(max_workers=self.config['max_hilos'], thread_name_prefix='cobertura')
+        self.lock = threading.Lock()
+        self.latencias: deque = deque(maxlen=self.config['ventana'])
+        self._umbral: Optional[float] = None
+        self._desde_recalculo = 0
+        self.metricas = get_registro()
+        self.stats = {
+            'primarios': 0,
+            'coberturas': 0,
+            'ganadas_cobertura': 0,
+            'sin_presupuesto': 0,  # Requests lentos que no se cubrieron por presupuesto
+            'segundos_ahorrados': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Latencia móvil
+    # ------------------------------------------------------------------
+    def umbral(self) -> Optional[float]:
+        """p95 móvil (None mientras no haya muestras suficientes)"""
+        return self._umbral
+
+    def _observar(self, latencia: float):
+        with self.lock:
+            self.latencias.append(latencia)
+            self._desde_recalculo += 1
+            if len(self.latencias) < self.config['min_muestras']:
+                return
+            if self._umbral is None or self._desde_recalculo >= self.config['recalcular_cada']:
+                ordenadas = sorted(self.latencias)
+                indice = min(len(ordenadas) - 1, int(self.config['percentil'] * len(ordenadas)))
+                self._umbral = max(self.config['retraso_min'], ordenadas[indice])
+                self._desde_recalculo = 0
+
+    def _reservar_cobertura(self) -> bool:
+        with self.lock:
+            if self.stats['coberturas'] + 1 > self.config['presupuesto'] * self.stats['primarios']:
+                self.stats['sin_presupuesto'] += 1
+                return False
+            self.stats['coberturas'] += 1
+        self.metricas.incrementar('coberturas_http')
+        return True
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    def _medido(self, session, url: str, kwargs: Dict[str, Any]):
+        inicio = time.perf_counter()
+        response = session.get(url, **kwargs)
+        return response, time.perf_counter() - inicio, time.perf_counter()
+
+    def get(self, url: str, session=None, **kwargs):
+        """Igual que session.get(url, **kwargs), con cobertura del request lento (session: la del llamador)"""
+        session = session or self.session
+        with self.lock:
+            self.stats['primarios'] += 1
+        primario = self.pool.submit(self._medido, session, url, kwargs)
+        umbral = self._umbral
+
+        # Sin umbral todavía o respuesta a tiempo: camino normal
+        if umbral is None or wait([primario], timeout=umbral).done:
+            return self._resultado(primario)
+        if not self._reservar_cobertura():
+            return self._resultado(primario)
+
+        cobertura = self.pool.submit(self._medido, session, url, kwargs)
+        pendientes = {primario, cobertura}
+        ganador = None
+        while pendientes and ganador is None:
+            terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            # Si ambos terminaron en el mismo instante, preferir el primario
+            for futuro in sorted(terminados, key=lambda f: f is not primario):
+                if _respuesta_buena(futuro):
+                    ganador = futuro
+                    break
+        if ganador is None:
+            ganador = primario  # Ambos fallaron: se propaga el error del primario
+
+        if ganador is cobertura:
+            with self.lock:
+                self.stats['ganadas_cobertura'] += 1
+            fin_cobertura = cobertura.result()[2]
+            primario.add_done_callback(lambda f: self._registrar_ahorro(f, fin_cobertura))
+        perdedor = cobertura if ganador is primario else primario
+        perdedor.add_done_callback(_cerrar_al_terminar)
+        return self._resultado(ganador, observar=ganador is primario)
+
+    def _resultado(self, futuro, observar: bool = True):
+        response, latencia, _ = futuro.result()  # Propaga la excepción del request
+        if observar and response.status_code < 500:
+            self._observar(latencia)
+        return response
+
+    def _registrar_ahorro(self, primario, fin_cobertura: float):
+        """Cuando el primario termina (o vence su timeout): cuánto antes llegó la cobertura"""
+        if primario.exception() is None:
+            response, latencia, fin_primario = primario.result()
+            if response.status_code < 500:
+                self._observar(latencia)  # Sin esto el percentil ignoraría justo los lentos
+        else:
+            fin_primario = time.perf_counter()
+        ahorro = max(0.0, fin_primario - fin_cobertura)
+        with self.lock:
+            self.stats['segundos_ahorrados'] += ahorro
+        self.metricas.observar_latencia('ahorro_cobertura', ahorro)
+
+    def resumen(self) -> Dict[str, Any]:
+        with self.lock:
+            datos = dict(self.stats)
+        datos['segundos_ahorrados'] = round(datos['segundos_ahorrados'], 2)
+        datos['fraccion_extra'] = round(datos['coberturas'] / datos['primarios'], 4) if datos['primarios'] else 0.0
+        datos['umbral_s'] = round(self._umbral, 3) if self._umbral is not None else None
+        return datos
+
+    def cerrar(self):
+        self.pool.shutdown(wait=False)
+
+
+def adquirir(config: Dict = None) -> SolicitudesCubiertas:
+    """
+    Instancia compartida por todo el proceso: un solo presupuesto y un solo p95.
+    La crea el primer llamador (su `config` manda); cada adquirir lleva su liberar.
+    """
+    global _compartida, _usuarios
+    with _lock_compartida:
+        if _compartida is None:
+            _compartida = SolicitudesCubiertas(config=config)
+        _usuarios += 1
+        return _compartida
+
+
+def liberar(instancia: SolicitudesCubiertas):
+    """Devuelve la instancia compartida; el último en liberarla cierra su pool"""
+    global _compartida, _usuarios
+    with _lock_compartida:
+        if instancia is not _compartida:
+            return
+        _usuarios -= 1
+        if _usuarios <= 0:
+            _compartida, _usuarios = None, 0
+            instancia.cerrar()
@@ -24,6 +24,14 @@ WAIT_TIME = 10  # Tiempo de espera para elementos (segundos)
 OUTPUT_DIR = "resultados"
 OUTPUT_FORMAT = "csv"  # 'csv', 'json' o 'excel'
 LOG_FILE = f"{OUTPUT_DIR}/scraper.log"
+# Logging asíncrono estructurado (ver logger_config.py)
+LOG_JSON_FILE = f"{OUTPUT_DIR}/scraper.jsonl"  # Una línea JSON por registro
+LOG_ASINCRONO = os.getenv('LOG_ASINCRONO', '1') != '0'  # QueueHandler + thread listener
+LOG_CONSOLA_NIVEL = os.getenv('LOG_CONSOLA_NIVEL', 'INFO')  # Nivel mínimo en consola
+# Nivel por módulo, ej: "extract_emails_fast=INFO,property_crawler_v2=WARNING"
+LOG_NIVELES = os.getenv('LOG_NIVELES', '')
+# Muestreo de eventos frecuentes: "evento=N" deja pasar 1 de cada N
+LOG_MUESTREO = os.getenv('LOG_MUESTREO', 'boton=20,next_data=50')
 
 # Configuración de proxy (opcional)
 USE_PROXY = False
@@ -39,3 +47,33 @@ CHROME_USER_DATA_DIR = os.getenv('CHROME_USER_DATA_DIR', '')
 CHROME_PROFILE_DIR = os.getenv('CHROME_PROFILE_DIR', '')
 # Puerto para conectar por remote debugging si prefieres iniciar Chrome con --remote-debugging-port
 CHROME_REMOTE_DEBUGGING_PORT = os.getenv('CHROME_REMOTE_DEBUGGING_PORT', '')
+# Pestañas concurrentes por navegador en procesar_lote.py (ver navegador_pestanas.py); 0 o 1 = una pestaña
+CHROME_PESTANAS = int(os.getenv('CHROME_PESTANAS', '0') or 0)
+# Plazo duro por URL (segundos, reintentos incluidos) del vigilante de chromedriver (ver vigilante_driver.py)
+DRIVER_PLAZO_URL = int(os.getenv('DRIVER_PLAZO_URL', '120') or 120)
+# pageLoadStrategy de Chrome: 'normal' (por defecto) | 'eager' | 'none' (no esperar el evento load completo)
+CHROME_ESTRATEGIA_CARGA = os.getenv('CHROME_ESTRATEGIA_CARGA', 'normal') or 'normal'
+
+# Crawl multi-nodo (ver coordinador.py y nodo_crawl.py)
+# URL del coordinador (http://host:8766) o ruta a su base SQLite; vacío = pasar --coordinador
+COORDINADOR_URL = os.getenv('COORDINADOR_URL', '')
+# Segundos de vida de un arriendo sin latidos: al vencer, el rango se re-emite a otro nodo
+COORDINADOR_PLAZO_ARRIENDO = int(os.getenv('COORDINADOR_PLAZO_ARRIENDO', '300') or 300)
+
+# Lotes de procesar_lote.py (ver dividir_lotes.py)
+# Shards por hash del cod_fr al generar lotes nuevos; cambiarlo requiere `dividir_lotes.py --reshard`
+LOTES_NUM_SHARDS = int(os.getenv('LOTES_NUM_SHARDS', '10') or 10)
+
+# Staging local de procesar_lote_limpio.py (ver staging_lotes.py)
+# Carpeta local (disco rápido, fuera de OneDrive) donde se acumulan los resultados de cada lote
+LOTES_STAGING_DIR = os.getenv('LOTES_STAGING_DIR', os.path.join(OUTPUT_DIR, 'staging'))
+# Segundos mínimos entre publicaciones del backup compacto en la carpeta sincronizada
+LOTES_SYNC_CADENCIA = int(os.getenv('LOTES_SYNC_CADENCIA', '600') or 600)
+# Backups publicados que se conservan por lote (los más viejos se borran)
+LOTES_BACKUPS_CONSERVAR = int(os.getenv('LOTES_BACKUPS_CONSERVAR', '2') or 2)
+
+# Métricas por fase de los crawlers (ver metricas.py)
+# Puerto base del endpoint Prometheus local; cada lote usa puerto base + número de lote (0 = desactivado)
+METRICAS_PUERTO = int(os.getenv('METRICAS_PUERTO', '0') or 0)
+# Segundos entre resúmenes JSON de métricas
+METRICAS_INTERVALO = int(os.getenv('METRICAS_INTERVALO', '60') or 60)
@@ -1,22 +1,24 @@
 import os
-import pandas as pd
 from pathlib import Path
 from glob import glob
 
+from instantanea_entradas import leer_urls
+
 # Rutas de los lotes
 base_dir = Path(r"C:/Users/Miguel Martinez SSD/OneDrive - BROWSER TRAVEL SOLUTIONS S.A.S VIAJEMOS/Documentos/PROYECTOS/ARRIENDO DATA SETS/InmueblesFR")
 lote_dirs = [base_dir / f"lote_{i:02d}" for i in range(1, 6)]
 
-# Leer todas las URLs originales de los excels de lote
-urls_totales = set()
+# Leer todas las URLs originales de los excels de lote (desde la instantánea en caché)
+urls_por_lote = {}
 for i, lote_dir in enumerate(lote_dirs, 1):
     excel_path = lote_dir / f"inmuebles_lote_{i:02d}.xlsx"
     if not excel_path.exists():
         continue
-    df = pd.read_excel(excel_path)
-    if 'URL' in df.columns:
-        urls = df['URL'].dropna().tolist()
-        urls_totales.update(urls)
+    try:
+        urls_por_lote[i] = set(leer_urls(str(excel_path), 'URL', adivinar=False))
+    except KeyError:
+        pass
+urls_totales = set().union(*urls_por_lote.values())
 
 # Leer las URLs ya procesadas
 urls_procesadas = set()
@@ -44,9 +46,8 @@ for i, lote_dir in enumerate(lote_dirs, 1):
     if not excel_path.exists():
         print(f"Lote {i}: archivo no encontrado")
         continue
-    df = pd.read_excel(excel_path)
-    if 'URL' in df.columns:
-        urls_lote = set(df['URL'].dropna().tolist())
+    if i in urls_por_lote:
+        urls_lote = urls_por_lote[i]
         faltan_lote = urls_lote - urls_procesadas
         print(f"Lote {i}: {len(faltan_lote)} inmuebles faltantes de {len(urls_lote)}")
 
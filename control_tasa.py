@@ -0,0 +1,278 @@
+"""
+control_tasa.py - Controlador adaptativo (AIMD) de la tasa global de requests
+
+Reemplaza las pausas fijas (`request_delay`, `time.sleep(2)`) por una tasa global
+que se ajusta según las respuestas del servidor:
+- Aumento aditivo mientras la latencia y la tasa de éxito están sanas
+- Reducción multiplicativa ante 429/403, páginas de challenge o picos de latencia
+
+La tasa se comparte entre threads (lock en memoria) y entre procesos (archivo de
+estado + archivo de lock), de modo que los lotes lanzados en paralelo por
+ejecutar_15_lotes.py obedecen el mismo presupuesto de requests/segundo.
+"""
+import os
+import json
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from logger_config import get_logger
+
+
+CONFIG_TASA = {
+    'tasa_inicial': 1.0,  # Requests/segundo globales al arrancar
+    'tasa_min': 0.1,
+    'tasa_max': 10.0,
+    'incremento': 0.1,  # Aumento aditivo por ventana sana (req/s)
+    'factor_reduccion': 0.5,  # Reducción multiplicativa ante señales de throttling
+    'ventana': 20,  # Respuestas evaluadas antes de decidir un aumento
+    'exito_minimo': 0.9,  # Tasa de éxito mínima para considerar la ventana sana
+    'latencia_objetivo': 8.0,  # Latencia media máxima (s) de una ventana sana
+    'factor_pico_latencia': 3.0,  # Latencia > factor * promedio móvil = pico
+    'intervalo_reduccion': 10.0,  # Segundos mínimos entre reducciones (evita cascadas)
+    'lock_timeout': 5.0,  # Segundos antes de considerar abandonado el lock entre procesos
+}
+
+STATUS_THROTTLING = {403, 429}
+
+logger = get_logger(__name__)
+
+
+class _LockArchivo:
+    """Lock entre procesos basado en creación exclusiva de archivo (portable a Windows)"""
+
+    def __init__(self, ruta: Path, timeout: float):
+        self.ruta = ruta
+        self.timeout = timeout
+
+    def __enter__(self):
+        inicio = time.time()
+        while True:
+            try:
+                fd = os.open(str(self.ruta), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                # Lock huérfano de un proceso que murió con el lock tomado
+                try:
+                    if time.time() - self.ruta.stat().st_mtime > self.timeout:
+                        self.ruta.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() - inicio > self.timeout * 2:
+                    raise TimeoutError(f"No se pudo tomar el lock {self.ruta}")
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        try:
+            self.ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ControladorTasa:
+    """
+    Controlador AIMD compartido.
+
+    Uso:
+        controlador = ControladorTasa('resultados/lotes/tasa_global.json')
+        controlador.esperar_turno()
+        ... request ...
+        controlador.reportar(latencia, status=200, exito=True)
+    """
+
+    def __init__(self, ruta_estado: Optional[str] = None, config: Dict = None):
+        self.config = {**CONFIG_TASA, **(config or {})}
+        self.lock = Lock()
+        self.ruta_estado = Path(ruta_estado) if ruta_estado else None
+        self._lock_archivo = None
+        if self.ruta_estado:
+            self.ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+            self._lock_archivo = _LockArchivo(
+                self.ruta_estado.with_suffix(self.ruta_estado.suffix + '.lock'),
+                self.config['lock_timeout'],
+            )
+
+        # Estado compartido (se sincroniza con el archivo si existe)
+        self._estado = {
+            'tasa': self.config['tasa_inicial'],
+            'proximo_slot': 0.0,
+            'ultima_reduccion': 0.0,
+            'aumentos': 0,
+            'reducciones': 0,
+            'decisiones': [],
+        }
+
+        # Ventana local de observaciones (por proceso)
+        self._ventana: deque = deque(maxlen=self.config['ventana'])
+        self._latencia_media: Optional[float] = None
+        self.stats = {
+            'requests': 0,
+            'espera_total': 0.0,
+            'throttling': 0,
+            'challenges': 0,
+            'picos_latencia': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Estado compartido
+    # ------------------------------------------------------------------
+    def _leer_estado(self):
+        if not self.ruta_estado or not self.ruta_estado.exists():
+            return
+        try:
+            with open(self.ruta_estado, 'r', encoding='utf-8') as f:
+                self._estado.update(json.load(f))
+        except (json.JSONDecodeError, OSError):
+            pass
+
+    def _escribir_estado(self):
+        if not self.ruta_estado:
+            return
+        tmp = self.ruta_estado.with_suffix(self.ruta_estado.suffix + f'.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._estado, f, ensure_ascii=False)
+        os.replace(tmp, self.ruta_estado)
+
+    def _transaccion(self, fn, escribir: bool = True):
+        """Ejecuta fn() con el estado sincronizado bajo ambos locks"""
+        with self.lock:
+            if self._lock_archivo:
+                with self._lock_archivo:
+                    self._leer_estado()
+                    resultado = fn()
+                    if escribir:
+                        self._escribir_estado()
+                    return resultado
+            return fn()
+
+    def _registrar_decision(self, accion: str, motivo: str, tasa_anterior: float):
+        decision = {
+            'timestamp': datetime.now().isoformat(),
+            'pid': os.getpid(),
+            'accion': accion,
+            'motivo': motivo,
+            'tasa_anterior': round(tasa_anterior, 4),
+            'tasa_nueva': round(self._estado['tasa'], 4),
+        }
+        self._estado['decisiones'] = (self._estado['decisiones'] + [decision])[-50:]
+        logger.info(f"Tasa {accion}: {tasa_anterior:.2f} -> {self._estado['tasa']:.2f} req/s ({motivo})")
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def esperar_turno(self) -> float:
+        """Reserva el siguiente slot global y duerme hasta él. Retorna los segundos esperados"""
+        def reservar():
+            ahora = time.time()
+            slot = max(ahora, self._estado['proximo_slot'])
+            self._estado['proximo_slot'] = slot + 1.0 / self._estado['tasa']
+            return slot - ahora
+
+        espera = self._transaccion(reservar)
+        if espera > 0:
+            time.sleep(espera)
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['espera_total'] += espera
+        return espera
+
+    def reportar(self, latencia: float, status: Optional[int] = None,
+                 challenge: bool = False, exito: bool = True):
+        """
+        Informa el resultado de un request.
+
+        Args:
+            latencia: Segundos desde el inicio del request hasta la respuesta
+            status: Código HTTP si se conoce (los crawlers Selenium no lo tienen)
+            challenge: True si la respuesta fue una página de bloqueo/challenge
+            exito: True si se obtuvieron datos
+        """
+        motivo = None
+        with self.lock:
+            if status in STATUS_THROTTLING:
+                self.stats['throttling'] += 1
+                motivo = f'status {status}'
+            elif challenge:
+                self.stats['challenges'] += 1
+                motivo = 'challenge'
+            elif (self._latencia_media is not None
+                  and latencia > self.config['factor_pico_latencia'] * self._latencia_media
+                  and latencia > self.config['latencia_objetivo']):
+                self.stats['picos_latencia'] += 1
+                motivo = f'pico de latencia {latencia:.1f}s'
+
+            # Promedio móvil exponencial de la latencia
+            if self._latencia_media is None:
+                self._latencia_media = latencia
+            else:
+                self._latencia_media = 0.8 * self._latencia_media + 0.2 * latencia
+
+            self._ventana.append((latencia, exito and motivo is None))
+            ventana_llena = len(self._ventana) >= self.config['ventana']
+            if ventana_llena and motivo is None:
+                observaciones = list(self._ventana)
+                self._ventana.clear()
+            else:
+                observaciones = None
+
+        if motivo:
+            self._reducir(motivo)
+        elif observaciones:
+            tasa_exito = sum(1 for _, ok in observaciones if ok) / len(observaciones)
+            latencia_prom = sum(l for l, _ in observaciones) / len(observaciones)
+            if tasa_exito >= self.config['exito_minimo'] and latencia_prom <= self.config['latencia_objetivo']:
+                self._aumentar(f'ventana sana (éxito {tasa_exito:.0%}, latencia {latencia_prom:.1f}s)')
+
+    def notificar_bloqueo(self, motivo: str = 'challenge'):
+        """Reducción inmediata cuando el bloqueo se detecta fuera de reportar()"""
+        with self.lock:
+            self.stats['challenges'] += 1
+        self._reducir(motivo)
+
+    def _aumentar(self, motivo: str):
+        def aplicar():
+            anterior = self._estado['tasa']
+            nueva = min(self.config['tasa_max'], anterior + self.config['incremento'])
+            if nueva > anterior:
+                self._estado['tasa'] = nueva
+                self._estado['aumentos'] += 1
+                self._registrar_decision('aumento', motivo, anterior)
+        self._transaccion(aplicar)
+
+    def _reducir(self, motivo: str):
+        def aplicar():
+            ahora = time.time()
+            if ahora - self._estado['ultima_reduccion'] < self.config['intervalo_reduccion']:
+                return
+            anterior = self._estado['tasa']
+            self._estado['tasa'] = max(self.config['tasa_min'], anterior * self.config['factor_reduccion'])
+            self._estado['ultima_reduccion'] = ahora
+            self._estado['reducciones'] += 1
+            self._registrar_decision('reduccion', motivo, anterior)
+        self._transaccion(aplicar)
+        with self.lock:
+            self._ventana.clear()
+
+    @property
+    def tasa_actual(self) -> float:
+        self._transaccion(lambda: None, escribir=False)
+        return self._estado['tasa']
+
+    def metricas(self) -> Dict[str, Any]:
+        """Tasa actual, contadores y últimas decisiones"""
+        self._transaccion(lambda: None, escribir=False)
+        with self.lock:
+            return {
+                'tasa_actual': self._estado['tasa'],
+                'aumentos': self._estado['aumentos'],
+                'reducciones': self._estado['reducciones'],
+                'latencia_media': self._latencia_media,
+                'ultimas_decisiones': list(self._estado['decisiones'][-10:]),
+                **self.stats,
+            }
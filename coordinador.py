@@ -0,0 +1,445 @@
+"""
+coordinador.py - Coordinador de crawl multi-nodo con arriendos (leases)
+
+Las corridas grandes se repartían entre máquinas copiando a mano los Excel de
+cada lote (dividir_en_5_lotes.py, generar_excels_pendientes.py). Aquí un solo
+coordinador (SQLite, servible por HTTP) reparte la frontera en rangos de URLs:
+
+- arrendar(): entrega un rango pendiente al nodo con un plazo (`vence`)
+- latido(): el nodo extiende su arriendo mientras trabaja; si el arriendo ya
+  fue re-emitido a otro nodo, retorna False y el nodo debe soltar el rango
+- reportar(): resultados y fallos (con su clase de errores_crawl) vuelven al
+  coordinador; los fallos reintentables quedan pendientes hasta `max_intentos`
+- liberar(): el nodo terminó el rango; si quedan URLs pendientes el rango
+  vuelve a la cola después de `retraso_rango`
+- Arriendos vencidos (nodo muerto, laptop cerrada) se re-emiten solos en el
+  siguiente arrendar()
+
+Un nodo nuevo (ej: una laptop a mitad de corrida) solo necesita la URL del
+coordinador: nodo_crawl.py pide rangos hasta que no quede trabajo.
+
+Uso:
+    python coordinador.py cargar resultados/lotes/lote_01.json Inmuebles.xlsx --rango 500
+    python coordinador.py servir --puerto 8766
+    python coordinador.py estado
+    python coordinador.py exportar resultados/coordinador.jsonl
+    python nodo_crawl.py --coordinador http://192.168.0.10:8766
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional
+
+from frontera import canonicalizar_url, extraer_cod_fr
+from errores_crawl import es_reintentable
+
+
+DB_DEFAULT = os.path.join('resultados', 'coordinador.db')
+PUERTO_DEFAULT = 8766
+
+CONFIG_COORDINADOR = {
+    'tamano_rango': 500,  # URLs por rango arrendable
+    'plazo_arriendo': 300,  # Segundos de vida de un arriendo sin latidos
+    'max_intentos': 3,  # Reportes con fallo reintentable antes de dar la URL por fallida
+    'retraso_rango': 120,  # Segundos antes de re-arrendar un rango liberado con URLs pendientes
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    clave TEXT NOT NULL UNIQUE,              -- cod_fr (o la URL canónica si no tiene)
+    rango INTEGER NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente', -- pendiente | hecha | fallida
+    clase TEXT,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    nodo TEXT,
+    actualizado REAL
+);
+CREATE INDEX IF NOT EXISTS urls_rango_estado ON urls (rango, estado);
+CREATE TABLE IF NOT EXISTS rangos (
+    id INTEGER PRIMARY KEY,
+    estado TEXT NOT NULL DEFAULT 'pendiente', -- pendiente | arrendado | completo
+    nodo TEXT,
+    token TEXT,
+    vence REAL,                               -- fin del arriendo, o desde cuándo se puede re-arrendar
+    arriendos INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS resultados (
+    url TEXT PRIMARY KEY,
+    registro TEXT NOT NULL,
+    nodo TEXT,
+    fecha REAL
+);
+CREATE TABLE IF NOT EXISTS nodos (
+    nodo TEXT PRIMARY KEY,
+    ultimo_latido REAL,
+    arriendos INTEGER NOT NULL DEFAULT 0,
+    exitosas INTEGER NOT NULL DEFAULT 0,
+    fallidas INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class Coordinador:
+    """Estado de la frontera y de los arriendos en SQLite (varios procesos locales o un servidor HTTP)"""
+
+    def __init__(self, ruta_db: str = DB_DEFAULT, config: Dict = None):
+        self.config = {**CONFIG_COORDINADOR, **(config or {})}
+        os.makedirs(os.path.dirname(os.path.abspath(ruta_db)), exist_ok=True)
+        self.ruta_db = ruta_db
+        self.lock = threading.Lock()
+        self.conexion = sqlite3.connect(ruta_db, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.executescript(ESQUEMA)
+
+    @contextmanager
+    def _transaccion(self):
+        """BEGIN IMMEDIATE: un solo escritor a la vez, también entre procesos"""
+        with self.lock:
+            cursor = self.conexion.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+                cursor.execute('COMMIT')
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+
+    # ------------------------------------------------------------------
+    # Frontera
+    # ------------------------------------------------------------------
+    def cargar_urls(self, urls: Iterable[str], tamano_rango: Optional[int] = None) -> Dict[str, int]:
+        """Agrega URLs nuevas (canónicas, únicas por cod_fr) en rangos nuevos; las ya cargadas se ignoran"""
+        tamano = tamano_rango or self.config['tamano_rango']
+        stats = {'entradas': 0, 'invalidas': 0, 'nuevas': 0, 'rangos': 0}
+        nuevas = []
+        vistas = set()
+        with self._transaccion() as cursor:
+            for url in urls:
+                stats['entradas'] += 1
+                canonica = canonicalizar_url(url)
+                if not canonica:
+                    stats['invalidas'] += 1
+                    continue
+                clave = extraer_cod_fr(canonica) or canonica
+                if clave in vistas or cursor.execute('SELECT 1 FROM urls WHERE clave = ?', (clave,)).fetchone():
+                    continue
+                vistas.add(clave)
+                nuevas.append((canonica, clave))
+            for inicio in range(0, len(nuevas), tamano):
+                cursor.execute("INSERT INTO rangos (estado) VALUES ('pendiente')")
+                rango = cursor.lastrowid
+                cursor.executemany('INSERT INTO urls (url, clave, rango) VALUES (?, ?, ?)',
+                                   [(u, c, rango) for u, c in nuevas[inicio:inicio + tamano]])
+                stats['rangos'] += 1
+        stats['nuevas'] = len(nuevas)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Arriendos
+    # ------------------------------------------------------------------
+    def arrendar(self, nodo: str, plazo: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Entrega el siguiente rango disponible al nodo.
+
+        Returns:
+            {'rango', 'token', 'vence', 'plazo', 'urls'} o None si no hay rangos disponibles ahora
+        """
+        plazo = plazo or self.config['plazo_arriendo']
+        with self._transaccion() as cursor:
+            ahora = time.time()
+            # Arriendos de nodos muertos: vuelven a la cola
+            cursor.execute("UPDATE rangos SET estado = 'pendiente', nodo = NULL, token = NULL "
+                           "WHERE estado = 'arrendado' AND vence < ?", (ahora,))
+            if cursor.rowcount > 0:
+                print(f"  ♻ {cursor.rowcount} arriendo(s) vencido(s) vuelven a la cola")
+            cursor.execute('INSERT INTO nodos (nodo, ultimo_latido) VALUES (?, ?) '
+                           'ON CONFLICT(nodo) DO UPDATE SET ultimo_latido = excluded.ultimo_latido', (nodo, ahora))
+            while True:
+                fila = cursor.execute("SELECT id FROM rangos WHERE estado = 'pendiente' "
+                                      "AND (vence IS NULL OR vence <= ?) ORDER BY id LIMIT 1", (ahora,)).fetchone()
+                if fila is None:
+                    return None
+                rango = fila[0]
+                urls = [u for (u,) in cursor.execute("SELECT url FROM urls WHERE rango = ? AND estado = 'pendiente' "
+                                                     "ORDER BY id", (rango,))]
+                if urls:
+                    break
+                cursor.execute("UPDATE rangos SET estado = 'completo', nodo = NULL, token = NULL WHERE id = ?",
+                               (rango,))
+            token = uuid.uuid4().hex
+            vence = ahora + plazo
+            cursor.execute("UPDATE rangos SET estado = 'arrendado', nodo = ?, token = ?, vence = ?, "
+                           "arriendos = arriendos + 1 WHERE id = ?", (nodo, token, vence, rango))
+            cursor.execute('UPDATE nodos SET arriendos = arriendos + 1 WHERE nodo = ?', (nodo,))
+        return {'rango': rango, 'token': token, 'vence': vence, 'plazo': plazo, 'urls': urls}
+
+    def latido(self, nodo: str, rango: int, token: str, plazo: Optional[float] = None) -> bool:
+        """Extiende el arriendo. False = el arriendo venció y fue re-emitido: soltar el rango"""
+        plazo = plazo or self.config['plazo_arriendo']
+        with self._transaccion() as cursor:
+            ahora = time.time()
+            cursor.execute('UPDATE nodos SET ultimo_latido = ? WHERE nodo = ?', (ahora, nodo))
+            cursor.execute("UPDATE rangos SET vence = ? WHERE id = ? AND token = ? AND estado = 'arrendado'",
+                           (ahora + plazo, rango, token))
+            return cursor.rowcount == 1
+
+    def reportar(self, nodo: str, rango: int, token: str, resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Registra resultados de un rango. Cada item es {'url', 'registro'} (éxito)
+        o {'url', 'clase', 'error'} (fallo). Se aceptan aunque el arriendo ya no
+        sea vigente: el dato es válido igual.
+        """
+        ahora = time.time()
+        exitosas = fallidas = 0
+        with self._transaccion() as cursor:
+            for item in resultados:
+                url = item['url']
+                if item.get('registro') is not None:
+                    cursor.execute('INSERT OR REPLACE INTO resultados (url, registro, nodo, fecha) VALUES (?, ?, ?, ?)',
+                                   (url, json.dumps(item['registro'], ensure_ascii=False), nodo, ahora))
+                    cursor.execute("UPDATE urls SET estado = 'hecha', clase = NULL, nodo = ?, actualizado = ? "
+                                   "WHERE url = ?", (nodo, ahora, url))
+                    exitosas += 1
+                    continue
+                clase = item.get('clase')
+                fila = cursor.execute('SELECT intentos FROM urls WHERE url = ?', (url,)).fetchone()
+                intentos = (fila[0] if fila else 0) + 1
+                definitiva = not es_reintentable(clase) or intentos >= self.config['max_intentos']
+                cursor.execute("UPDATE urls SET estado = ?, clase = ?, intentos = ?, nodo = ?, actualizado = ? "
+                               "WHERE url = ? AND estado != 'hecha'",
+                               ('fallida' if definitiva else 'pendiente', clase, intentos, nodo, ahora, url))
+                fallidas += 1
+            cursor.execute('UPDATE nodos SET exitosas = exitosas + ?, fallidas = fallidas + ?, ultimo_latido = ? '
+                           'WHERE nodo = ?', (exitosas, fallidas, ahora, nodo))
+            vigente = cursor.execute("SELECT 1 FROM rangos WHERE id = ? AND token = ? AND estado = 'arrendado'",
+                                     (rango, token)).fetchone() is not None
+        return {'vigente': vigente, 'exitosas': exitosas, 'fallidas': fallidas}
+
+    def liberar(self, nodo: str, rango: int, token: str) -> str:
+        """Cierra el arriendo. Retorna el nuevo estado del rango ('completo' o 'pendiente')"""
+        with self._transaccion() as cursor:
+            if cursor.execute("SELECT 1 FROM rangos WHERE id = ? AND token = ? AND estado = 'arrendado'",
+                              (rango, token)).fetchone() is None:
+                return 'perdido'
+            pendientes = cursor.execute("SELECT COUNT(*) FROM urls WHERE rango = ? AND estado = 'pendiente'",
+                                        (rango,)).fetchone()[0]
+            if pendientes:
+                # Fallos reintentables: el rango vuelve a la cola más tarde (quizá a otro nodo)
+                cursor.execute("UPDATE rangos SET estado = 'pendiente', nodo = NULL, token = NULL, vence = ? "
+                               "WHERE id = ?", (time.time() + self.config['retraso_rango'], rango))
+                return 'pendiente'
+            cursor.execute("UPDATE rangos SET estado = 'completo', nodo = NULL, token = NULL WHERE id = ?", (rango,))
+            return 'completo'
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def estado(self) -> Dict[str, Any]:
+        with self.lock:
+            cursor = self.conexion.cursor()
+            urls = dict(cursor.execute('SELECT estado, COUNT(*) FROM urls GROUP BY estado').fetchall())
+            rangos = dict(cursor.execute('SELECT estado, COUNT(*) FROM rangos GROUP BY estado').fetchall())
+            clases = dict(cursor.execute("SELECT clase, COUNT(*) FROM urls WHERE estado = 'fallida' "
+                                         "GROUP BY clase").fetchall())
+            vencidos = cursor.execute("SELECT COUNT(*) FROM rangos WHERE estado = 'arrendado' AND vence < ?",
+                                      (time.time(),)).fetchone()[0]
+            nodos = [
+                {'nodo': nodo, 'ultimo_latido_s': round(time.time() - (latido or 0), 1), 'arriendos': arriendos,
+                 'exitosas': exitosas, 'fallidas': fallidas}
+                for nodo, latido, arriendos, exitosas, fallidas in cursor.execute(
+                    'SELECT nodo, ultimo_latido, arriendos, exitosas, fallidas FROM nodos ORDER BY nodo')
+            ]
+        return {
+            'urls': {e: urls.get(e, 0) for e in ('pendiente', 'hecha', 'fallida')},
+            'rangos': {e: rangos.get(e, 0) for e in ('pendiente', 'arrendado', 'completo')},
+            'arriendos_vencidos': vencidos,
+            'fallidas_por_clase': {str(k): v for k, v in clases.items()},
+            'nodos': nodos,
+            'terminado': not urls.get('pendiente'),
+        }
+
+    def exportar(self, ruta: str) -> int:
+        """Escribe los registros recibidos en JSONL; retorna cuántos"""
+        cantidad = 0
+        with self.lock, open(ruta, 'w', encoding='utf-8') as f:
+            for (registro,) in self.conexion.execute('SELECT registro FROM resultados ORDER BY fecha'):
+                f.write(registro + '\n')
+                cantidad += 1
+        return cantidad
+
+    def cerrar(self):
+        with self.lock:
+            self.conexion.close()
+
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+def servir(coordinador: Coordinador, puerto: int = PUERTO_DEFAULT, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """POST /arrendar /latido /reportar /liberar (JSON) y GET /estado, en un thread daemon"""
+    acciones = {
+        '/arrendar': lambda d: coordinador.arrendar(d['nodo'], d.get('plazo')),
+        '/latido': lambda d: coordinador.latido(d['nodo'], d['rango'], d['token'], d.get('plazo')),
+        '/reportar': lambda d: coordinador.reportar(d['nodo'], d['rango'], d['token'], d['resultados']),
+        '/liberar': lambda d: coordinador.liberar(d['nodo'], d['rango'], d['token']),
+    }
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _responder(self, status: int, datos: Any):
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            if self.path.startswith('/estado'):
+                self._responder(200, coordinador.estado())
+            else:
+                self._responder(404, {'error': 'no encontrado'})
+
+        def do_POST(self):
+            accion = acciones.get(self.path)
+            if accion is None:
+                self._responder(404, {'error': 'no encontrado'})
+                return
+            try:
+                largo = int(self.headers.get('Content-Length', 0))
+                datos = json.loads(self.rfile.read(largo) or b'{}')
+                self._responder(200, {'resultado': accion(datos)})
+            except (KeyError, ValueError) as e:
+                self._responder(400, {'error': f"{type(e).__name__}: {e}"})
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, puerto), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name='coordinador-http', daemon=True).start()
+    print(f"  🛰 Coordinador en http://{host}:{httpd.server_address[1]}")
+    return httpd
+
+
+class ClienteCoordinador:
+    """Misma interfaz que Coordinador, contra el servidor HTTP (para nodos remotos)"""
+
+    def __init__(self, url_base: str, timeout: float = 60):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+
+    def _post(self, ruta: str, datos: Dict[str, Any]) -> Any:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        solicitud = urllib.request.Request(self.url_base + ruta, data=cuerpo, method='POST',
+                                           headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(solicitud, timeout=self.timeout) as respuesta:
+            return json.loads(respuesta.read())['resultado']
+
+    def arrendar(self, nodo: str, plazo: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return self._post('/arrendar', {'nodo': nodo, 'plazo': plazo})
+
+    def latido(self, nodo: str, rango: int, token: str, plazo: Optional[float] = None) -> bool:
+        return self._post('/latido', {'nodo': nodo, 'rango': rango, 'token': token, 'plazo': plazo})
+
+    def reportar(self, nodo: str, rango: int, token: str, resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self._post('/reportar', {'nodo': nodo, 'rango': rango, 'token': token, 'resultados': resultados})
+
+    def liberar(self, nodo: str, rango: int, token: str) -> str:
+        return self._post('/liberar', {'nodo': nodo, 'rango': rango, 'token': token})
+
+    def estado(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(self.url_base + '/estado', timeout=self.timeout) as respuesta:
+            return json.loads(respuesta.read())
+
+
+def conectar(destino: str):
+    """'http://host:puerto' -> ClienteCoordinador; ruta a .db -> Coordinador local"""
+    if destino.startswith(('http://', 'https://')):
+        return ClienteCoordinador(destino)
+    return Coordinador(destino)
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def _leer_entrada(ruta: str) -> List[str]:
+    """lote_XX.json ({"urls": [...]}) / lista JSON / Excel, CSV o TXT"""
+    if ruta.endswith('.json'):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        return datos.get('urls', []) if isinstance(datos, dict) else list(datos)
+    from extract_from_urls import read_urls
+    return read_urls(ruta)
+
+
+def imprimir_estado(estado: Dict[str, Any]):
+    urls, rangos = estado['urls'], estado['rangos']
+    print(f"URLs:   pendientes {urls['pendiente']:,} | hechas {urls['hecha']:,} | fallidas {urls['fallida']:,}")
+    print(f"Rangos: pendientes {rangos['pendiente']:,} | arrendados {rangos['arrendado']:,} "
+          f"| completos {rangos['completo']:,} | arriendos vencidos {estado['arriendos_vencidos']:,}")
+    if estado['fallidas_por_clase']:
+        print("Fallidas por clase: " + ', '.join(f"{c} {n:,}" for c, n in sorted(estado['fallidas_por_clase'].items())))
+    for nodo in estado['nodos']:
+        print(f"  {nodo['nodo']:<30} último latido hace {nodo['ultimo_latido_s']:>7.0f}s | "
+              f"arriendos {nodo['arriendos']:>4} | ✓{nodo['exitosas']:>7,} | ✗{nodo['fallidas']:>6,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Coordinador de crawl multi-nodo con arriendos')
+    parser.add_argument('--db', default=DB_DEFAULT, help='Base SQLite del coordinador')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    cargar = sub.add_parser('cargar', help='Agregar URLs a la frontera (se puede repetir a mitad de corrida)')
+    cargar.add_argument('entradas', nargs='+', help='lote_XX.json, Excel, CSV o TXT con URLs')
+    cargar.add_argument('--rango', type=int, default=CONFIG_COORDINADOR['tamano_rango'], help='URLs por rango')
+
+    servir_cmd = sub.add_parser('servir', help='Servir el coordinador por HTTP')
+    servir_cmd.add_argument('--puerto', type=int, default=PUERTO_DEFAULT)
+    servir_cmd.add_argument('--host', default='0.0.0.0')
+    servir_cmd.add_argument('--plazo', type=int, default=CONFIG_COORDINADOR['plazo_arriendo'],
+                            help='Segundos de vida de un arriendo sin latidos')
+
+    sub.add_parser('estado', help='Resumen de URLs, rangos y nodos')
+
+    exportar = sub.add_parser('exportar', help='Registros recibidos a JSONL')
+    exportar.add_argument('salida')
+
+    args = parser.parse_args()
+
+    if args.comando == 'cargar':
+        coordinador = Coordinador(args.db)
+        for ruta in args.entradas:
+            stats = coordinador.cargar_urls(_leer_entrada(ruta), args.rango)
+            print(f"✓ {ruta}: {stats['entradas']:,} URLs, {stats['nuevas']:,} nuevas en {stats['rangos']:,} rangos "
+                  f"({stats['invalidas']:,} inválidas)")
+        imprimir_estado(coordinador.estado())
+    elif args.comando == 'servir':
+        coordinador = Coordinador(args.db, {'plazo_arriendo': args.plazo})
+        servir(coordinador, args.puerto, args.host)
+        try:
+            while True:
+                time.sleep(60)
+                print(f"\n[{time.strftime('%H:%M:%S')}]")
+                imprimir_estado(coordinador.estado())
+        except KeyboardInterrupt:
+            print("\n⚠ Coordinador detenido (el estado queda en la base)")
+    elif args.comando == 'estado':
+        imprimir_estado(Coordinador(args.db).estado())
+    elif args.comando == 'exportar':
+        cantidad = Coordinador(args.db).exportar(args.salida)
+        print(f"✓ {cantidad:,} registros exportados a {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
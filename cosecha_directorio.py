@@ -0,0 +1,340 @@
+"""
+cosecha_directorio.py - Directorio completo de inmobiliarias por HTTP, página por página en paralelo
+
+InmobiliariaExtractor._scroll_to_load_all hacía hasta 10 scrolls con
+SCROLL_PAUSE_TIME (2 s) cada uno y scrape_inmobiliarias_list volvía a parsear
+todo el DOM: las inmobiliarias fuera de la ventana cargada nunca aparecían y
+cada corrida costaba una sesión de navegador.
+
+CosechaDirectorio:
+- Pide la primera página del directorio por HTTP y lee su __NEXT_DATA__: la
+  lista de inmobiliarias, el total de páginas (o el total de inmobiliarias) y
+  el buildId de Next.js
+- Con el buildId, el resto de las páginas se piden al endpoint de datos de
+  Next.js (/_next/data/<buildId>/<ruta>.json): solo el JSON, sin HTML. Si ese
+  endpoint falla se vuelve a la página HTML (`plantilla_pagina`)
+- Las páginas se piden en paralelo (`hilos`); si el total no se conoce se
+  avanza en tandas hasta la primera tanda sin inmobiliarias nuevas
+- Sin __NEXT_DATA__ se parsean los enlaces /inmobiliarias/<id>-slug del HTML
+- Filas {titulo, url, cantidad_inmuebles}, deduplicadas por id, en la forma
+  que espera DataSaver.save_data; también se suman al directorio de
+  directorio_inmobiliarias.py
+
+Uso:
+    python cosecha_directorio.py
+    python cosecha_directorio.py --hilos 16 --plantilla "{base}?pagina={n}"
+    python cosecha_directorio.py --sin-directorio --cobertura
+"""
+import re
+import json
+import math
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from config import BASE_URL as URL_DIRECTORIO
+from frontera import BASE_URL
+from archivo_crudo import extraer_next_data_texto
+from extract_from_urls import HEADERS
+from directorio_inmobiliarias import URL_PERFIL, complementar, id_de_url
+
+
+CONFIG_COSECHA = {
+    'plantilla_pagina': '{base}?pagina={n}',  # URL HTML de la página n (n >= 2) del directorio
+    'hilos': 8,  # Páginas pedidas en paralelo
+    'timeout': 15,  # Segundos por request
+    'reintentos': 2,  # Reintentos por página (con pausa creciente)
+    'max_paginas': 2000,  # Tope cuando el total de páginas no se conoce
+    'datos_next': True,  # Usar /_next/data/<buildId>/... cuando la primera página trae el buildId
+}
+
+# Claves probadas en el JSON de cada inmobiliaria (formatos de __NEXT_DATA__ y de la API)
+CAMPOS_NOMBRE = ('name', 'title', 'nombre', 'razon_social')
+CAMPOS_URL = ('inmoLink', 'url', 'link', 'profileUrl', 'inmoPropsLink')
+CAMPOS_CANTIDAD = ('properties_count', 'propertiesCount', 'total_properties', 'totalProperties',
+                   'count_properties', 'cantidad_inmuebles', 'inmuebles')
+# Paginación en el JSON de la página
+CAMPOS_PAGINAS = ('totalPages', 'total_pages', 'lastPage', 'last_page', 'pages')
+CAMPOS_TOTAL = ('total', 'totalCount', 'total_count', 'totalResults')
+
+CANTIDAD_HTML_RE = re.compile(r'(\d[\d.,]*)\s*(?:inmuebles|propiedades|anuncios)', re.IGNORECASE)
+
+
+def _entero(valor) -> Optional[int]:
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    if isinstance(valor, str) and valor.replace('.', '').replace(',', '').isdigit():
+        return int(valor.replace('.', '').replace(',', ''))
+    return None
+
+
+def _nodos(datos) -> Iterator[Any]:
+    """Recorre el JSON en anchura (los metadatos de paginación suelen estar cerca de la raíz)"""
+    pendientes = deque([datos])
+    while pendientes:
+        nodo = pendientes.popleft()
+        yield nodo
+        if isinstance(nodo, dict):
+            pendientes.extend(nodo.values())
+        elif isinstance(nodo, list):
+            pendientes.extend(nodo)
+
+
+def _buscar_entero(datos, claves: Tuple[str, ...]) -> Optional[int]:
+    for nodo in _nodos(datos):
+        if isinstance(nodo, dict):
+            for clave in claves:
+                valor = _entero(nodo.get(clave))
+                if valor:
+                    return valor
+    return None
+
+
+def descargar(http, url: str, timeout: float, reintentos: int) -> Optional[str]:
+    """Texto de la respuesta, o None si es 404 o fallaron todos los intentos"""
+    for intento in range(reintentos + 1):
+        try:
+            respuesta = http.get(url, headers=HEADERS, timeout=timeout)
+            if respuesta.status_code == 404:
+                return None
+            respuesta.raise_for_status()
+            return respuesta.text
+        except requests.RequestException:
+            if intento < reintentos:
+                time.sleep(1 + intento)
+    return None
+
+
+def _fila_de_json(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    id_owner = _entero(item.get('id'))
+    nombre = next((item[c] for c in CAMPOS_NOMBRE if isinstance(item.get(c), str) and item[c].strip()), None)
+    if not id_owner or nombre is None:
+        return None
+    enlace = next((item[c] for c in CAMPOS_URL if isinstance(item.get(c), str) and item[c]), None)
+    if enlace and enlace.startswith('/'):
+        enlace = BASE_URL + enlace
+    if enlace and enlace.endswith('/propiedades'):
+        enlace = None  # inmoPropsLink apunta al listado, no al perfil
+    cantidad = next((_entero(item[c]) for c in CAMPOS_CANTIDAD if _entero(item.get(c)) is not None), None)
+    return {
+        'titulo': nombre.strip(),
+        'url': enlace if id_de_url(enlace) == str(id_owner) else URL_PERFIL.format(id_owner),
+        'cantidad_inmuebles': cantidad or 0,
+    }
+
+
+def filas_de_json(datos) -> List[Dict[str, Any]]:
+    """Inmobiliarias de un JSON de página: la lista más larga de objetos con id y nombre"""
+    mejor: List[Dict[str, Any]] = []
+    for nodo in _nodos(datos):
+        if isinstance(nodo, list) and len(nodo) > len(mejor) and nodo and isinstance(nodo[0], dict):
+            filas = [fila for fila in (_fila_de_json(item) for item in nodo if isinstance(item, dict)) if fila]
+            if len(filas) > len(mejor):
+                mejor = filas
+    return mejor
+
+
+def filas_de_html(html: str) -> List[Dict[str, Any]]:
+    """Respaldo sin __NEXT_DATA__: enlaces a perfiles de inmobiliarias en el HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
+    filas, vistos = [], set()
+    for enlace in soup.select('a[href*="/inmobiliarias/"]'):
+        href = enlace.get('href', '')
+        id_owner = id_de_url(href)
+        titulo = enlace.get_text(' ', strip=True)
+        if id_owner is None or id_owner in vistos or not titulo:
+            continue
+        vistos.add(id_owner)
+        tarjeta = enlace.find_parent(['article', 'li', 'div']) or enlace
+        cantidad = CANTIDAD_HTML_RE.search(tarjeta.get_text(' ', strip=True))
+        filas.append({
+            'titulo': titulo,
+            'url': BASE_URL + href if href.startswith('/') else href,
+            'cantidad_inmuebles': (_entero(cantidad.group(1)) or 0) if cantidad else 0,
+        })
+    return filas
+
+
+class CosechaDirectorio:
+    """Recorre todas las páginas del directorio de inmobiliarias por HTTP"""
+
+    def __init__(self, url_directorio: str = URL_DIRECTORIO, config: Dict = None, http=None):
+        self.url_directorio = url_directorio
+        self.config = {**CONFIG_COSECHA, **(config or {})}
+        self.http = http or requests.Session()
+        self.build_id: Optional[str] = None
+        self.lock = threading.Lock()
+        self.filas: Dict[str, Dict[str, Any]] = {}  # id -> fila
+        self.stats = {'paginas': 0, 'paginas_vacias': 0, 'paginas_fallidas': 0, 'datos_next': 0, 'html': 0}
+
+    # ------------------------------------------------------------------
+    # Páginas
+    # ------------------------------------------------------------------
+    def url_pagina(self, numero: int) -> str:
+        if numero <= 1:
+            return self.url_directorio
+        return self.config['plantilla_pagina'].format(base=self.url_directorio, n=numero)
+
+    def url_datos_next(self, url_pagina: str) -> str:
+        """/inmobiliarias/?pagina=3 -> /_next/data/<buildId>/inmobiliarias.json?pagina=3"""
+        partes = urlsplit(url_pagina)
+        ruta = partes.path.rstrip('/') or '/index'
+        consulta = f'?{partes.query}' if partes.query else ''
+        return f'{partes.scheme}://{partes.netloc}/_next/data/{self.build_id}{ruta}.json{consulta}'
+
+    def _get(self, url: str) -> Optional[str]:
+        return descargar(self.http, url, self.config['timeout'], self.config['reintentos'])
+
+    def _parsear(self, texto: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """(filas, JSON de la página o None si hubo que ir al HTML)"""
+        crudo = texto if texto.lstrip().startswith('{') else extraer_next_data_texto(texto)
+        if crudo:
+            try:
+                datos = json.loads(crudo)
+            except json.JSONDecodeError:
+                datos = None
+            if datos is not None:
+                filas = filas_de_json(datos)
+                if filas:
+                    return filas, datos
+        return filas_de_html(texto), None
+
+    def pagina(self, numero: int) -> List[Dict[str, Any]]:
+        """Filas de una página: endpoint de datos de Next.js si se conoce el buildId, si no el HTML"""
+        url = self.url_pagina(numero)
+        texto = None
+        if self.build_id and self.config['datos_next'] and numero > 1:
+            texto = self._get(self.url_datos_next(url))
+            if texto:
+                with self.lock:
+                    self.stats['datos_next'] += 1
+        if texto is None:
+            texto = self._get(url)
+            if texto:
+                with self.lock:
+                    self.stats['html'] += 1
+        if texto is None:
+            with self.lock:
+                self.stats['paginas_fallidas'] += 1
+            return []
+        filas, _ = self._parsear(texto)
+        return filas
+
+    def _agregar(self, filas: List[Dict[str, Any]]) -> int:
+        """Suma filas deduplicadas por id; retorna cuántas eran nuevas"""
+        nuevas = 0
+        with self.lock:
+            self.stats['paginas'] += 1
+            self.stats['paginas_vacias'] += not filas
+            for fila in filas:
+                id_owner = id_de_url(fila['url']) or fila['url']
+                if id_owner not in self.filas:
+                    nuevas += 1
+                self.filas[id_owner] = fila
+        return nuevas
+
+    # ------------------------------------------------------------------
+    # Recorrido
+    # ------------------------------------------------------------------
+    def primera_pagina(self) -> Optional[int]:
+        """Pide la página 1; retorna el total de páginas si la página lo informa"""
+        texto = self._get(self.url_directorio)
+        if texto is None:
+            raise RuntimeError(f'No se pudo descargar {self.url_directorio}')
+        filas, datos = self._parsear(texto)
+        self._agregar(filas)
+        self.stats['html'] += 1
+        if datos is None:
+            return None
+        self.build_id = datos.get('buildId')
+        paginas = _buscar_entero(datos, CAMPOS_PAGINAS)
+        if paginas is None and filas:
+            total = _buscar_entero(datos, CAMPOS_TOTAL)
+            # Un 'total' menor que la página no es el total de inmobiliarias
+            if total and total >= len(filas):
+                paginas = math.ceil(total / len(filas))
+        return paginas
+
+    def cosechar(self) -> List[Dict[str, Any]]:
+        """Todas las inmobiliarias del directorio, en el orden de sus páginas"""
+        paginas = self.primera_pagina()
+        hilos = max(1, self.config['hilos'])
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='cosecha') as pool:
+            if paginas:
+                print(f"  Páginas informadas: {paginas:,}")
+                numeros = range(2, min(paginas, self.config['max_paginas']) + 1)
+                for filas in pool.map(self.pagina, numeros):
+                    self._agregar(filas)
+            else:
+                # Total desconocido: tandas de `hilos` páginas hasta una tanda sin nada nuevo
+                siguiente = 2
+                while siguiente <= self.config['max_paginas']:
+                    tanda = range(siguiente, min(siguiente + hilos, self.config['max_paginas'] + 1))
+                    nuevas = sum(self._agregar(filas) for filas in pool.map(self.pagina, tanda))
+                    siguiente = tanda.stop
+                    if not nuevas:
+                        break
+        return list(self.filas.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cosecha el directorio de inmobiliarias por HTTP (sin scroll)')
+    parser.add_argument('--url', default=URL_DIRECTORIO, help='Primera página del directorio')
+    parser.add_argument('--plantilla', default=CONFIG_COSECHA['plantilla_pagina'],
+                        help='URL de la página n: {base} y {n} (default: %(default)s)')
+    parser.add_argument('--hilos', type=int, default=CONFIG_COSECHA['hilos'])
+    parser.add_argument('--sin-datos-next', action='store_true', help='Pedir siempre la página HTML')
+    parser.add_argument('--sin-directorio', action='store_true',
+                        help='No sumar el resultado a directorio_inmobiliarias')
+    parser.add_argument('--cobertura', action='store_true',
+                        help='Duplicar el request que supera el p95 de latencia (máx. 5%% de requests extra)')
+    args = parser.parse_args()
+
+    http = requests.Session()
+    if args.cobertura:
+        from cobertura_http import SolicitudesCubiertas
+        http = SolicitudesCubiertas(http)
+
+    inicio = time.time()
+    print("="*80)
+    print("COSECHA DEL DIRECTORIO DE INMOBILIARIAS (HTTP)")
+    print("="*80)
+    cosecha = CosechaDirectorio(args.url, {
+        'plantilla_pagina': args.plantilla,
+        'hilos': args.hilos,
+        'datos_next': not args.sin_datos_next,
+    }, http=http)
+    try:
+        inmobiliarias = cosecha.cosechar()
+    finally:
+        if args.cobertura:
+            http.cerrar()
+
+    print(f"\nInmobiliarias: {len(inmobiliarias):,} en {cosecha.stats['paginas']:,} páginas "
+          f"({time.time() - inicio:.1f}s)")
+    print(f"  Endpoint de datos: {cosecha.stats['datos_next']:,} | HTML: {cosecha.stats['html']:,} | "
+          f"vacías: {cosecha.stats['paginas_vacias']:,} | fallidas: {cosecha.stats['paginas_fallidas']:,}")
+    if not inmobiliarias:
+        print("⚠ No se encontraron inmobiliarias (revisa --plantilla)")
+        return
+
+    from data_saver import DataSaver  # Requiere pandas solo al guardar
+    saver = DataSaver()
+    print(f"✓ Guardado: {saver.save_data(inmobiliarias)}")
+    if not args.sin_directorio:
+        print(f"✓ {complementar(inmobiliarias):,} inmobiliarias sumadas al directorio")
+
+
+if __name__ == '__main__':
+    from logger_config import configurar_logging
+    configurar_logging()
+    main()
@@ -0,0 +1,311 @@
+"""
+directorio_inmobiliarias.py - Directorio de inmobiliarias armado como subproducto del crawl de inmuebles
+
+scraper_mejorado.py, scraper_simple.py y main.py (InmobiliariaExtractor)
+recorrían /inmobiliarias aparte: un navegador solo para eso, pausas de
+SCROLL_PAUSE_TIME entre scrolls y un tope de 50 inmobiliarias en
+scraper_mejorado.extraer_inmobiliarias. Pero el __NEXT_DATA__ de cada aviso ya
+trae el bloque `owner` de su inmobiliaria (id, name, type, logo, has_whatsapp,
+inmoPropsLink).
+
+DirectorioInmobiliarias:
+- PropertyCrawlerSelenium registra el owner de cada aviso que normaliza
+  (parámetro `directorio`), sin pedidos extra
+- Cada proceso escribe sus observaciones (id de owner + cod_fr) en su propio
+  JSONL de sesión, como archivo_crudo.py: los lotes en paralelo no comparten
+  archivos ni locks. Los metadatos del owner se escriben solo cuando cambian
+- consolidar() une todas las sesiones en una tabla deduplicada por id de owner
+  con la cantidad de avisos distintos (cada cod_fr cuenta solo para su owner
+  más reciente) y guardar_tabla() la deja en inmobiliarias.json / .csv
+- El recorrido de /inmobiliarias queda como complemento opcional: sus filas
+  ({titulo, url, cantidad_inmuebles}) se suman con incorporar_directorio() y
+  los scrapers saltan las inmobiliarias que ya están en la tabla
+
+Uso:
+    python directorio_inmobiliarias.py consolidar
+    python directorio_inmobiliarias.py sembrar resultados/lotes
+    python directorio_inmobiliarias.py complementar resultados/inmobiliarias_*.json
+    python directorio_inmobiliarias.py estado
+"""
+import os
+import re
+import csv
+import json
+import time
+import argparse
+from collections import Counter
+from datetime import datetime
+from glob import glob
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+from frontera import BASE_URL, _cod_fr_de_registro, _leer_registros
+
+
+DIRECTORIO_DEFAULT = os.path.join('resultados', 'directorio_inmobiliarias')
+TABLA_JSON = 'inmobiliarias.json'
+TABLA_CSV = 'inmobiliarias.csv'
+
+# Mismo formato que cache_contactos.URL_PERFIL (aquí sin depender de pandas: lo importa el crawler)
+URL_PERFIL = BASE_URL + '/inmobiliarias/perfil/{}'
+ID_EN_URL_RE = re.compile(r'(\d{5,})')
+
+# Bloque owner de __NEXT_DATA__ -> columna de la tabla
+CAMPOS_OWNER = {
+    'name': 'nombre',
+    'type': 'tipo',
+    'logo': 'logo',
+    'has_whatsapp': 'has_whatsapp',
+    'inmoPropsLink': 'inmo_props_link',
+}
+# Metadatos que puede traer una observación (del crawl o del recorrido del directorio)
+CAMPOS_META = tuple(CAMPOS_OWNER.values()) + ('url_perfil', 'cantidad_inmuebles')
+
+COLUMNAS = ('id', 'nombre', 'tipo', 'avisos', 'cantidad_inmuebles', 'has_whatsapp', 'logo',
+            'url_perfil', 'url_propiedades', 'fuente', 'primera_vez', 'ultima_vez')
+
+# Campos del owner en los formatos de salida de inmuebles (sembrar desde resultados ya crawleados)
+CAMPOS_ID_OWNER = ('id_inmos', 'ID Inmos', 'ID INMOS', 'Id Inmos')
+CAMPOS_NOMBRE_OWNER = ('inmos', 'INMOS', 'Inmos')
+
+
+def id_de_url(url: Optional[str]) -> Optional[str]:
+    """Id del owner en una URL de perfil (/inmobiliarias/perfil/<id>) o de directorio (/inmobiliarias/<id>-slug)"""
+    match = ID_EN_URL_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+class DirectorioInmobiliarias:
+    """
+    Observaciones de owners por sesión (append-only)
+
+    Uso:
+        directorio = DirectorioInmobiliarias('resultados/lotes/directorio_inmobiliarias')
+        directorio.registrar(owner, cod_fr)
+        directorio.cerrar()
+        tabla = consolidar('resultados/lotes/directorio_inmobiliarias')
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_DEFAULT):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.sesion = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.lock = Lock()
+        self._archivo = None
+        self._metadatos: Dict[str, Dict[str, Any]] = {}  # id -> últimos metadatos escritos en esta sesión
+        self.stats = {'observaciones': 0, 'sin_owner': 0, 'del_directorio': 0}
+
+    def _escribir(self, linea: Dict[str, Any]):
+        if self._archivo is None:
+            self._archivo = open(self.directorio / f'obs_{self.sesion}.jsonl', 'a', encoding='utf-8')
+        self._archivo.write(json.dumps(linea, ensure_ascii=False) + '\n')
+        self._archivo.flush()
+
+    def _observar(self, id_owner: str, meta: Dict[str, Any], extra: Dict[str, Any]):
+        linea = {'id': id_owner, **extra}
+        with self.lock:
+            if self._metadatos.get(id_owner) != meta:
+                self._metadatos[id_owner] = meta
+                linea.update(meta)
+            self._escribir(linea)
+
+    def registrar(self, owner: Optional[Dict[str, Any]], cod_fr, visto: Optional[float] = None):
+        """Owner de un aviso (bloque `owner` de __NEXT_DATA__ o {'id', 'name'})"""
+        if not owner or not owner.get('id'):
+            with self.lock:
+                self.stats['sin_owner'] += 1
+            return
+        meta = {columna: owner[campo] for campo, columna in CAMPOS_OWNER.items() if owner.get(campo) is not None}
+        self._observar(str(owner['id']), meta, {
+            'cod_fr': str(cod_fr) if cod_fr else None,
+            'visto': round(time.time() if visto is None else visto),
+        })
+        with self.lock:
+            self.stats['observaciones'] += 1
+
+    def incorporar_directorio(self, filas: Iterable[Dict[str, Any]]) -> int:
+        """
+        Suma filas del recorrido de /inmobiliarias ({titulo, url, cantidad_inmuebles}, como DataSaver)
+
+        Returns:
+            Filas incorporadas (las que no tienen id en la URL se descartan)
+        """
+        incorporadas = 0
+        visto = round(time.time())
+        for fila in filas:
+            id_owner = id_de_url(fila.get('url'))
+            if id_owner is None:
+                continue
+            meta = {'nombre': fila.get('titulo'), 'url_perfil': fila.get('url'),
+                    'cantidad_inmuebles': fila.get('cantidad_inmuebles')}
+            meta = {k: v for k, v in meta.items() if v not in (None, '', 'No disponible')}
+            self._observar(id_owner, meta, {'visto': visto, 'fuente': 'directorio'})
+            incorporadas += 1
+        with self.lock:
+            self.stats['del_directorio'] += incorporadas
+        return incorporadas
+
+    def cerrar(self):
+        with self.lock:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+
+
+def consolidar(directorio: str = DIRECTORIO_DEFAULT) -> Dict[str, Dict[str, Any]]:
+    """
+    Tabla deduplicada por id de owner desde todas las sesiones
+
+    `avisos` cuenta cod_fr distintos; si un aviso cambió de owner entre
+    sesiones cuenta solo para el observado más recientemente
+    """
+    owners: Dict[str, Dict[str, Any]] = {}
+    duenos: Dict[str, tuple] = {}  # cod_fr -> (visto, id)
+    for ruta in sorted(glob(os.path.join(directorio, 'obs_*.jsonl'))):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    obs = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue  # Línea truncada por un corte del proceso
+                id_owner = obs.get('id')
+                if not id_owner:
+                    continue
+                visto = obs.get('visto', 0)
+                fila = owners.get(id_owner)
+                if fila is None:
+                    fila = owners[id_owner] = {'id': id_owner, '_fuentes': set(), '_visto_meta': -1,
+                                               'primera_vez': visto, 'ultima_vez': visto}
+                fila['primera_vez'] = min(fila['primera_vez'], visto)
+                fila['ultima_vez'] = max(fila['ultima_vez'], visto)
+                fila['_fuentes'].add(obs.get('fuente', 'crawl'))
+                # Metadatos: gana la observación más reciente; las anteriores solo completan
+                meta = {c: obs[c] for c in CAMPOS_META if c in obs}
+                if meta and visto >= fila['_visto_meta']:
+                    fila['_visto_meta'] = visto
+                    fila.update(meta)
+                else:
+                    for campo, valor in meta.items():
+                        fila.setdefault(campo, valor)
+                cod_fr = obs.get('cod_fr')
+                if cod_fr and visto >= duenos.get(cod_fr, (-1,))[0]:
+                    duenos[cod_fr] = (visto, id_owner)
+
+    avisos = Counter(id_owner for _, id_owner in duenos.values())
+    tabla = {}
+    for id_owner, fila in owners.items():
+        enlace = fila.get('inmo_props_link')
+        tabla[id_owner] = {
+            'id': id_owner,
+            'nombre': fila.get('nombre'),
+            'tipo': fila.get('tipo'),
+            'avisos': avisos.get(id_owner, 0),
+            'cantidad_inmuebles': fila.get('cantidad_inmuebles'),
+            'has_whatsapp': fila.get('has_whatsapp'),
+            'logo': fila.get('logo'),
+            'url_perfil': fila.get('url_perfil') or URL_PERFIL.format(id_owner),
+            'url_propiedades': BASE_URL + enlace if enlace and enlace.startswith('/') else enlace,
+            'fuente': '+'.join(sorted(fila['_fuentes'])),
+            'primera_vez': datetime.fromtimestamp(fila['primera_vez']).isoformat(timespec='seconds'),
+            'ultima_vez': datetime.fromtimestamp(fila['ultima_vez']).isoformat(timespec='seconds'),
+        }
+    return tabla
+
+
+def guardar_tabla(tabla: Dict[str, Dict[str, Any]], directorio: str = DIRECTORIO_DEFAULT) -> List[str]:
+    """inmobiliarias.json e inmobiliarias.csv, de más a menos avisos"""
+    filas = sorted(tabla.values(), key=lambda fila: (-fila['avisos'], fila['nombre'] or ''))
+    ruta_json = os.path.join(directorio, TABLA_JSON)
+    ruta_csv = os.path.join(directorio, TABLA_CSV)
+    with open(ruta_json + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(filas, f, ensure_ascii=False, indent=1)
+    os.replace(ruta_json + '.tmp', ruta_json)
+    with open(ruta_csv + '.tmp', 'w', encoding='utf-8-sig', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUMNAS)
+        escritor.writeheader()
+        escritor.writerows(filas)
+    os.replace(ruta_csv + '.tmp', ruta_csv)
+    return [ruta_json, ruta_csv]
+
+
+def ids_conocidos(directorio: str = DIRECTORIO_DEFAULT) -> set:
+    """Ids de owners ya en el directorio (para que los scrapers de /inmobiliarias solo completen)"""
+    return set(consolidar(directorio)) if os.path.isdir(directorio) else set()
+
+
+def complementar(filas: List[Dict[str, Any]], directorio: str = DIRECTORIO_DEFAULT) -> int:
+    """Suma al directorio la salida de un scraper de /inmobiliarias (scraper_mejorado, scraper_simple, main.py)"""
+    sesion = DirectorioInmobiliarias(directorio)
+    try:
+        return sesion.incorporar_directorio(filas)
+    finally:
+        sesion.cerrar()
+
+
+def sembrar_desde_resultados(directorio: DirectorioInmobiliarias, rutas: Iterable[str]) -> int:
+    """Observaciones desde resultados ya crawleados (id_inmos/inmos + cod_fr), con la fecha del archivo"""
+    sembrados = 0
+    for ruta in rutas:
+        visto = os.path.getmtime(ruta)
+        for registro in _leer_registros(ruta):
+            id_owner = next((registro[c] for c in CAMPOS_ID_OWNER if registro.get(c)), None)
+            cod_fr = _cod_fr_de_registro(registro)
+            if id_owner is None or cod_fr is None:
+                continue
+            nombre = next((registro[c] for c in CAMPOS_NOMBRE_OWNER if registro.get(c)), None)
+            directorio.registrar({'id': id_owner, 'name': nombre}, cod_fr, visto=visto)
+            sembrados += 1
+    return sembrados
+
+
+def _archivos(entradas: Iterable[str]) -> List[str]:
+    archivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            archivos += glob(os.path.join(entrada, '**', '*.json'), recursive=True)
+            archivos += glob(os.path.join(entrada, '**', '*.jsonl'), recursive=True)
+        else:
+            archivos += glob(entrada)
+    return sorted(archivos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Directorio de inmobiliarias desde los owners de los avisos')
+    parser.add_argument('--directorio', default=DIRECTORIO_DEFAULT, help='Carpeta de observaciones y tabla')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    sub.add_parser('consolidar', help='Generar inmobiliarias.json / .csv desde todas las sesiones')
+    p_sembrar = sub.add_parser('sembrar', help='Incorporar owners de resultados de inmuebles ya crawleados')
+    p_sembrar.add_argument('resultados', nargs='+', help='Directorios o archivos con registros de inmuebles')
+    p_complementar = sub.add_parser('complementar', help='Incorporar salidas del recorrido de /inmobiliarias')
+    p_complementar.add_argument('archivos', nargs='+', help='inmobiliarias_*.json (titulo, url, cantidad_inmuebles)')
+    sub.add_parser('estado', help='Resumen del directorio')
+    args = parser.parse_args()
+
+    if args.comando in ('sembrar', 'complementar'):
+        directorio = DirectorioInmobiliarias(args.directorio)
+        if args.comando == 'sembrar':
+            propios = os.path.abspath(args.directorio)
+            archivos = [a for a in _archivos(args.resultados) if not os.path.abspath(a).startswith(propios)]
+            print(f"✓ {sembrar_desde_resultados(directorio, archivos):,} avisos incorporados "
+                  f"({directorio.stats['sin_owner']:,} sin owner)")
+        else:
+            filas = [fila for ruta in _archivos(args.archivos) for fila in _leer_registros(ruta)]
+            print(f"✓ {directorio.incorporar_directorio(filas):,} de {len(filas):,} filas del directorio incorporadas")
+        directorio.cerrar()
+
+    tabla = consolidar(args.directorio)
+    if args.comando != 'estado':
+        for ruta in guardar_tabla(tabla, args.directorio):
+            print(f"✓ Tabla guardada: {ruta}")
+
+    solo_directorio = sum(1 for fila in tabla.values() if fila['fuente'] == 'directorio')
+    print(f"Inmobiliarias: {len(tabla):,} | avisos: {sum(f['avisos'] for f in tabla.values()):,} | "
+          f"solo vistas en /inmobiliarias: {solo_directorio:,}")
+    for fila in sorted(tabla.values(), key=lambda fila: -fila['avisos'])[:10]:
+        print(f"  {fila['avisos']:6,}  {fila['id']:>10}  {fila['nombre']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,65 +1,151 @@
 """
-Script para procesar 277,953 URLs en 10 lotes usando el crawler robusto
-Cada lote se procesará de forma independiente con checkpoints
+Script para dividir las URLs de Inmuebles.xlsx en lotes para procesar_lote.py
+
+Cada URL va al lote que indica un hash estable de su cod_fr (frontera.shard_de),
+no a una rebanada por posición en el Excel:
+- Reordenar, agregar o quitar filas de la entrada solo cambia los lotes que
+  ganan o pierden esos inmuebles; los demás quedan idénticos
+- El resume de cada lote (checkpoint por URL + índice global de cod_fr) sigue
+  valiendo después de editar la entrada y volver a dividir
+- El número de lotes queda en resultados/lotes/shards.json; cambiarlo exige
+  --reshard, que redistribuye checkpoints y fallidas de los lotes existentes
+  al lote nuevo de cada registro (los archivos anteriores quedan como respaldo)
+
+Uso:
+    python dividir_lotes.py
+    python dividir_lotes.py otra_entrada.xlsx --columna URL
+    python dividir_lotes.py --shards 15 --reshard
 """
-import pandas as pd
 import os
 import sys
+import json
+import argparse
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
+
+from instantanea_entradas import leer_urls
+from frontera import (
+    MANIFIESTO_SHARDS, _cod_fr_de_registro, clave_frontera, construir_frontera, imprimir_resumen,
+    leer_num_shards, repartir_en_shards, shard_de,
+)
+from config import LOTES_NUM_SHARDS
 
 # Archivo de entrada
 INPUT_FILE = r"C:\Users\Miguel Martinez SSD\OneDrive - BROWSER TRAVEL SOLUTIONS S.A.S VIAJEMOS\Documentos\PROYECTOS\ARRIENDO DATA SETS\Inmuebles.xlsx"
 OUTPUT_DIR = "resultados/lotes"
 
-def main():
-    print("="*80)
-    print("DIVISIÓN DE URLS EN 10 LOTES")
-    print("="*80)
-    
-    # Leer archivo de inmuebles
-    print(f"\nLeyendo archivo: {INPUT_FILE}")
-    df = pd.read_excel(INPUT_FILE)
-    
-    total_urls = len(df)
-    print(f"Total URLs encontradas: {total_urls:,}")
-    
-    # Calcular tamaño de cada lote
-    num_lotes = 15
-    urls_por_lote = total_urls // num_lotes
-    print(f"\nDividiendo en {num_lotes} lotes de ~{urls_por_lote:,} URLs cada uno")
-    
-    # Crear directorio de salida
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    # Dividir y guardar lotes
-    urls = df['Inmuebles'].tolist()
-    
-    for i in range(num_lotes):
-        inicio = i * urls_por_lote
-        # Último lote toma todas las URLs restantes
-        fin = (i + 1) * urls_por_lote if i < num_lotes - 1 else total_urls
-        
-        lote_urls = urls[inicio:fin]
-        
-        # Guardar archivo de lote
-        lote_file = os.path.join(OUTPUT_DIR, f'lote_{i+1:02d}_urls.txt')
-        with open(lote_file, 'w', encoding='utf-8') as f:
-            for url in lote_urls:
-                f.write(f"{url}\n")
-        
-        print(f"  Lote {i+1:2d}: {len(lote_urls):6,} URLs -> {lote_file}")
-    
-    # Crear script de ejecución para cada lote
-    print(f"\n{'='*80}")
-    print("CREANDO SCRIPTS DE EJECUCIÓN")
-    print("="*80)
-    
-    for i in range(1, num_lotes + 1):
+# Estado por lote que se redistribuye al cambiar el número de shards: (patrón, campo con la URL)
+ESTADO_POR_LOTE = (
+    ('checkpoint_lote_{:02d}.jsonl', 'URL INMUEBLE'),
+    ('fallidas_lote_{:02d}.jsonl', 'url'),
+)
+
+
+def _leer_urls_lote(ruta: str) -> List[str]:
+    if not os.path.exists(ruta):
+        return []
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f).get('urls', [])
+    except (json.JSONDecodeError, OSError, AttributeError):
+        return []
+
+
+def _escribir_atomico(ruta: str, contenido: str):
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def escribir_lotes(shards: Dict[int, List[str]]) -> Dict[int, Dict[str, int]]:
+    """
+    Escribe lote_XX.json por shard; solo reescribe los que cambiaron
+
+    Returns:
+        {numero: {'urls', 'nuevas', 'quitadas'}}
+    """
+    cambios = {}
+    num_shards = len(shards)
+    for numero, urls in shards.items():
+        lote_file = os.path.join(OUTPUT_DIR, f'lote_{numero:02d}.json')
+        anteriores = _leer_urls_lote(lote_file)
+        previas, actuales = set(anteriores), set(urls)
+        cambios[numero] = {
+            'urls': len(urls),
+            'nuevas': len(actuales - previas),
+            'quitadas': len(previas - actuales),
+        }
+        if anteriores == urls:
+            continue
+        contenido = {'shard': numero, 'shards': num_shards, 'urls': urls}
+        _escribir_atomico(lote_file, json.dumps(contenido, ensure_ascii=False, indent=1))
+    return cambios
+
+
+def _shard_de_linea(linea: str, campo: str, num_shards: int) -> Optional[int]:
+    try:
+        registro = json.loads(linea)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(registro, dict):
+        return None
+    clave = _cod_fr_de_registro(registro) or clave_frontera(registro.get(campo))
+    return shard_de(clave, num_shards) if clave else None
+
+
+def redistribuir_estado(num_shards: int) -> Dict[str, int]:
+    """
+    Reasigna los registros de checkpoint y fallidas de todos los lotes existentes
+    al shard que les corresponde con `num_shards`
+
+    Los archivos anteriores se renombran a *.pre_reshard_<timestamp> (no se borra nada)
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    stats = {'archivos': 0, 'registros': 0, 'movidos': 0}
+    lote_dirs = sorted(Path(OUTPUT_DIR).glob('lote_[0-9][0-9]'))
+
+    for patron, campo in ESTADO_POR_LOTE:
+        destino: Dict[int, List[str]] = {numero: [] for numero in range(1, num_shards + 1)}
+        originales = []
+        for lote_dir in lote_dirs:
+            numero_previo = int(lote_dir.name.split('_')[1])
+            ruta = lote_dir / patron.format(numero_previo)
+            if not ruta.exists():
+                continue
+            originales.append(ruta)
+            with open(ruta, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    if not linea.strip():
+                        continue
+                    numero = _shard_de_linea(linea, campo, num_shards)
+                    # Sin clave reconocible: se queda en su lote (o el equivalente si ya no existe)
+                    if numero is None:
+                        numero = (numero_previo - 1) % num_shards + 1
+                    destino[numero].append(linea if linea.endswith('\n') else linea + '\n')
+                    stats['registros'] += 1
+                    stats['movidos'] += numero != numero_previo
+
+        for ruta in originales:
+            os.replace(ruta, f'{ruta}.pre_reshard_{timestamp}')
+        stats['archivos'] += len(originales)
+        for numero, lineas in destino.items():
+            if not lineas:
+                continue
+            lote_dir = os.path.join(OUTPUT_DIR, f'lote_{numero:02d}')
+            os.makedirs(lote_dir, exist_ok=True)
+            _escribir_atomico(os.path.join(lote_dir, patron.format(numero)), ''.join(lineas))
+    return stats
+
+
+def crear_scripts(num_shards: int):
+    """Un .bat por lote para lanzarlo en su propia consola"""
+    for i in range(1, num_shards + 1):
         script_content = f"""@echo off
-REM Script para ejecutar Lote {i} de 10
+REM Script para ejecutar Lote {i} de {num_shards}
 echo ================================================================================
-echo PROCESANDO LOTE {i}/10
+echo PROCESANDO LOTE {i}/{num_shards}
 echo ================================================================================
 echo.
 
@@ -75,20 +161,82 @@ pause
         script_file = os.path.join(OUTPUT_DIR, f'ejecutar_lote_{i:02d}.bat')
         with open(script_file, 'w', encoding='utf-8') as f:
             f.write(script_content)
-        print(f"  Script creado: {script_file}")
-    
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Divide las URLs en lotes por hash estable del cod_fr')
+    parser.add_argument('entrada', nargs='?', default=INPUT_FILE, help='Excel/CSV/TXT con URLs de inmuebles')
+    parser.add_argument('--columna', default='Inmuebles', help='Columna con las URLs')
+    parser.add_argument('--shards', type=int, help='Número de lotes (default: el vigente o LOTES_NUM_SHARDS)')
+    parser.add_argument('--reshard', action='store_true',
+                        help='Cambiar el número de lotes redistribuyendo checkpoints y fallidas')
+    args = parser.parse_args()
+
+    vigente = leer_num_shards(OUTPUT_DIR, None)
+    num_lotes = args.shards or vigente or LOTES_NUM_SHARDS
+    if num_lotes < 1:
+        print("ERROR: El número de lotes debe ser al menos 1")
+        return 1
+    if vigente and vigente != num_lotes and not args.reshard:
+        print(f"ERROR: Los lotes existentes usan {vigente} shards; para pasar a {num_lotes} "
+              f"usa --reshard (detén antes los lotes en curso)")
+        return 1
+
+    print("="*80)
+    print(f"DIVISIÓN DE URLS EN {num_lotes} LOTES (HASH DE COD_FR)")
+    print("="*80)
+
+    # Leer archivo de inmuebles
+    print(f"\nLeyendo archivo: {args.entrada}")
+    urls = leer_urls(args.entrada, args.columna)  # Instantánea en caché: sin read_excel si no cambió
+    print(f"Total URLs encontradas: {len(urls):,}")
+
+    # Canónicas y únicas por cod_fr; lo ya crawleado se descarta en cada lote al reanudar
+    urls, stats = construir_frontera(urls)
+    imprimir_resumen(stats)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    if vigente and vigente != num_lotes:
+        print(f"\nRedistribuyendo estado de {vigente} a {num_lotes} lotes...")
+        resumen = redistribuir_estado(num_lotes)
+        print(f"  ♻ {resumen['registros']:,} registros en {resumen['archivos']} archivos "
+              f"({resumen['movidos']:,} cambiaron de lote)")
+        for numero in range(num_lotes + 1, vigente + 1):
+            sobrante = os.path.join(OUTPUT_DIR, f'lote_{numero:02d}.json')
+            if os.path.exists(sobrante):
+                os.replace(sobrante, f'{sobrante}.pre_reshard')
+
+    cambios = escribir_lotes(repartir_en_shards(urls, num_lotes))
+    for numero, cambio in cambios.items():
+        detalle = ''
+        if cambio['nuevas'] or cambio['quitadas']:
+            detalle = f" (+{cambio['nuevas']:,} / -{cambio['quitadas']:,})"
+        print(f"  Lote {numero:2d}: {cambio['urls']:6,} URLs{detalle}")
+
+    _escribir_atomico(os.path.join(OUTPUT_DIR, MANIFIESTO_SHARDS), json.dumps({
+        'shards': num_lotes,
+        'entrada': args.entrada,
+        'urls': len(urls),
+        'generado': datetime.now().isoformat(timespec='seconds'),
+    }, ensure_ascii=False, indent=2))
+
+    crear_scripts(num_lotes)
+
     print(f"\n{'='*80}")
     print("RESUMEN")
     print("="*80)
-    print(f"\nTotal URLs: {total_urls:,}")
-    print(f"Lotes creados: {num_lotes}")
-    print(f"Archivos de URLs: {OUTPUT_DIR}/lote_XX_urls.txt")
+    print(f"\nTotal URLs: {len(urls):,}")
+    print(f"Lotes: {num_lotes} (cambiaron: {sum(1 for c in cambios.values() if c['nuevas'] or c['quitadas'])})")
+    print(f"Archivos de URLs: {OUTPUT_DIR}/lote_XX.json")
     print(f"Scripts de ejecución: {OUTPUT_DIR}/ejecutar_lote_XX.bat")
-    print(f"\nPara procesar cada lote, ejecuta:")
-    print(f"  python procesar_lote.py <numero_lote>")
-    print(f"\nO ejecuta todos en paralelo con:")
-    print(f"  python ejecutar_paralelo.py")
+    print("\nPara procesar cada lote, ejecuta:")
+    print("  python procesar_lote.py <numero_lote>")
+    print("\nO ejecuta todos en paralelo con:")
+    print("  python ejecutar_15_lotes.py")
     print()
+    return 0
+
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
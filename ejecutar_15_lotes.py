@@ -1,5 +1,6 @@
 """
-Ejecuta todos los 10 lotes en paralelo con manejo robusto de procesos
+Ejecuta todos los lotes en paralelo con manejo robusto de procesos
+(el número de lotes sale de resultados/lotes/shards.json, ver dividir_lotes.py)
 """
 import subprocess
 import time
@@ -8,7 +9,10 @@ from datetime import datetime
 from pathlib import Path
 import sys
 
-LOTES = list(range(1, 11))  # Cambiado de 1 a 15 a 1 a 10
+from frontera import leer_num_shards
+from config import LOTES_NUM_SHARDS
+
+LOTES = list(range(1, leer_num_shards("resultados/lotes", LOTES_NUM_SHARDS) + 1))
 
 def limpiar_progreso_anterior():
     """Limpia archivos de progreso anterior pero preserva checkpoints"""
@@ -29,7 +33,7 @@ def limpiar_progreso_anterior():
 def ejecutar_lotes():
     """Ejecuta todos los lotes en paralelo"""
     print("="*80)
-    print("EJECUTANDO 10 LOTES EN PARALELO (CON RETRY LOGIC)")  # Actualizado a 10 lotes
+    print(f"EJECUTANDO {len(LOTES)} LOTES EN PARALELO (CON RETRY LOGIC)")
     print("="*80)
     print(f"Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
@@ -63,7 +67,7 @@ def ejecutar_lotes():
             print(f"✗ ERROR iniciando Lote {lote_num:02d}: {e}")
     
     print("-"*80)
-    print(f"Total de lotes iniciados: {len(procesos)}/10\n")  # Actualizado a 10 lotes
+    print(f"Total de lotes iniciados: {len(procesos)}/{len(LOTES)}\n")
     
     if len(procesos) == 0:
         print("ERROR: No se pudieron iniciar los lotes")
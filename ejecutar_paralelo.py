@@ -1,5 +1,5 @@
 """
-Script para ejecutar los 10 lotes en paralelo
+Script para ejecutar todos los lotes en paralelo (número según shards.json)
 Cada lote se ejecuta en su propio proceso de Python
 """
 import subprocess
@@ -7,21 +7,26 @@ import os
 import time
 from datetime import datetime
 
+from frontera import leer_num_shards
+from config import LOTES_NUM_SHARDS
+
+NUM_LOTES = leer_num_shards("resultados/lotes", LOTES_NUM_SHARDS)
+
 def ejecutar_paralelo():
     print("="*80)
-    print("EJECUCIÓN PARALELA DE 10 LOTES")
+    print(f"EJECUCIÓN PARALELA DE {NUM_LOTES} LOTES")
     print("="*80)
     print(f"Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
-    print("Iniciando 10 procesos en paralelo...")
+    print(f"Iniciando {NUM_LOTES} procesos en paralelo...")
     print("Cada lote procesará una parte de las URLs")
     print()
     
     # Lista para almacenar los procesos
     procesos = []
     
-    # Iniciar los 10 lotes en paralelo
-    for i in range(1, 11):
+    # Iniciar todos los lotes en paralelo
+    for i in range(1, NUM_LOTES + 1):
         print(f"Iniciando Lote {i:2d}...", end=" ")
         
         # Crear proceso en segundo plano
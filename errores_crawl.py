@@ -0,0 +1,203 @@
+"""
+errores_crawl.py - Taxonomía de fallos del crawl y cola de reintentos diferidos
+
+Antes cualquier excepción se reintentaba igual: RobustPropertyCrawler dormía
+`retry_delay_base ** intento` dentro del worker y PropertyCrawlerSelenium
+reintentaba 3 veces con 3 s de pausa y reinicio de navegador, incluso para
+avisos que ya no existen. Aquí cada fallo se clasifica en:
+
+    removido       404/410 o aviso retirado         -> nunca reintentar
+    bloqueado      challenge / 403 / 429            -> reintentar más tarde
+    timeout        plazo de carga o error transitorio -> reintentar más tarde
+    driver_caido   sesión/pestaña muerta, navegador terminado -> reintentar con navegador nuevo
+    parseo         la página llegó pero no se pudo extraer -> nunca reintentar
+                   (el payload queda en archivo_crudo para re-extraer offline)
+
+Los reintentos no duermen al worker: ColaReintentos guarda la URL con un
+vencimiento (backoff por clase con jitter) y el worker sigue con la siguiente
+URL; cuando vence, la URL vuelve a la cola de trabajo.
+
+Uso:
+    cola = ColaReintentos()
+    try:
+        html = obtener(url)
+    except Exception as e:
+        clase = clasificar_error(e)
+        if not cola.programar(url, clase):
+            registrar_fallo(url, clase)
+    for reintento in cola.tomar_vencidos():
+        ...
+"""
+import time
+import heapq
+import random
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from clasificador_paginas import CHALLENGE, REMOVIDO as PAGINA_REMOVIDA, PaginaBloqueada, PaginaRemovida
+
+
+# Clases de fallo
+REMOVIDO = 'removido'
+BLOQUEADO = 'bloqueado'
+TIMEOUT = 'timeout'
+DRIVER_CAIDO = 'driver_caido'
+PARSEO = 'parseo'
+CLASES_ERROR = (REMOVIDO, BLOQUEADO, TIMEOUT, DRIVER_CAIDO, PARSEO)
+
+# Políticas de reintento
+NUNCA = 'nunca'
+MAS_TARDE = 'mas_tarde'
+NAVEGADOR_NUEVO = 'navegador_nuevo'
+
+POLITICAS = {
+    REMOVIDO: NUNCA,
+    BLOQUEADO: MAS_TARDE,
+    TIMEOUT: MAS_TARDE,
+    DRIVER_CAIDO: NAVEGADOR_NUEVO,
+    PARSEO: NUNCA,
+}
+CLASES_REINTENTABLES = frozenset(clase for clase, politica in POLITICAS.items() if politica != NUNCA)
+
+CONFIG_REINTENTOS = {
+    # Segundos antes del primer reintento, por clase (luego se multiplica por `factor`)
+    'retraso': {BLOQUEADO: 300, TIMEOUT: 30, DRIVER_CAIDO: 0},
+    'factor': 2,  # Backoff exponencial entre reintentos de la misma URL
+    'retraso_max': 1800,  # Tope del retraso (segundos)
+    'jitter': 0.2,  # Variación aleatoria ±20% para no sincronizar reintentos
+    'max_intentos': {BLOQUEADO: 2, TIMEOUT: 3, DRIVER_CAIDO: 2},  # Reintentos por URL y clase
+}
+
+# Excepciones de Selenium/requests reconocidas por nombre (sin importar las librerías)
+NOMBRES_DRIVER_CAIDO = {'InvalidSessionIdException', 'NoSuchWindowException', 'PestanaCaida', 'ReintentarURL'}
+NOMBRES_TIMEOUT = {'TimeoutException', 'Timeout', 'ReadTimeout', 'ConnectTimeout', 'TimeoutError'}
+NOMBRES_PARSEO = {'JSONDecodeError', 'KeyError', 'AttributeError', 'TypeError', 'IndexError'}
+
+MARCADORES_DRIVER_CAIDO = (
+    'invalid session id', 'chrome not reachable', 'session deleted', 'disconnected:',
+    'no such window', 'target window already closed', 'tab crashed', 'web view not found',
+)
+MARCADORES_TIMEOUT = ('timeout', 'timed out', 'plazo vencido')
+
+
+class ErrorCrawl(Exception):
+    """Fallo de una URL con su clase ya decidida"""
+
+    def __init__(self, mensaje: str, clase: str):
+        super().__init__(mensaje)
+        self.clase = clase
+
+
+def clasificar_error(error: BaseException) -> str:
+    """Clase de fallo de una excepción del fetch o del parseo"""
+    if isinstance(error, ErrorCrawl):
+        return error.clase
+    if isinstance(error, PaginaRemovida):
+        return REMOVIDO
+    if isinstance(error, PaginaBloqueada):
+        return BLOQUEADO
+    nombres = {tipo.__name__ for tipo in type(error).__mro__}
+    mensaje = str(error).lower()
+    if nombres & NOMBRES_DRIVER_CAIDO or any(m in mensaje for m in MARCADORES_DRIVER_CAIDO):
+        return DRIVER_CAIDO
+    if nombres & NOMBRES_TIMEOUT or any(m in mensaje for m in MARCADORES_TIMEOUT):
+        return TIMEOUT
+    if nombres & NOMBRES_PARSEO:
+        return PARSEO
+    return TIMEOUT  # Sin clase conocida: tratarlo como transitorio
+
+
+def clase_de_pagina(clase_pagina: str) -> str:
+    """Clase de fallo para una clasificación de clasificador_paginas distinta de NORMAL"""
+    if clase_pagina == PAGINA_REMOVIDA:
+        return REMOVIDO
+    if clase_pagina == CHALLENGE:
+        return BLOQUEADO
+    return TIMEOUT  # 'error' o 'cargando' al vencer max_wait
+
+
+def es_reintentable(clase: Optional[str]) -> bool:
+    """Sin clase (registros previos a la taxonomía) se considera reintentable"""
+    return clase is None or clase in CLASES_REINTENTABLES
+
+
+class Reintento(NamedTuple):
+    url: str
+    clase: str
+    intento: int  # Número de reintento (1 = primero)
+    vence: float
+
+
+class ColaReintentos:
+    """
+    Cola de reintentos diferidos (min-heap por vencimiento), thread-safe.
+
+    programar() nunca bloquea; tomar_vencidos() entrega lo que ya venció.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = {**CONFIG_REINTENTOS, **(config or {})}
+        self.lock = threading.Lock()
+        self._heap: List[tuple] = []
+        self._secuencia = 0
+        self._intentos: Dict[str, int] = {}
+        self.stats = {
+            'programados': {clase: 0 for clase in CLASES_REINTENTABLES},
+            'agotados': {clase: 0 for clase in CLASES_REINTENTABLES},
+            'liberados': 0,
+        }
+
+    def _retraso(self, clase: str, intento: int) -> float:
+        base = self.config['retraso'].get(clase, 0)
+        retraso = min(self.config['retraso_max'], base * self.config['factor'] ** (intento - 1))
+        return retraso * random.uniform(1 - self.config['jitter'], 1 + self.config['jitter'])
+
+    def programar(self, url: str, clase: str) -> bool:
+        """
+        Agenda la URL según la política de su clase.
+
+        Returns:
+            False si la clase no se reintenta o la URL agotó sus intentos
+        """
+        if POLITICAS.get(clase, NUNCA) == NUNCA:
+            return False
+        with self.lock:
+            intento = self._intentos.get(url, 0) + 1
+            if intento > self.config['max_intentos'].get(clase, 0):
+                self.stats['agotados'][clase] += 1
+                return False
+            self._intentos[url] = intento
+            vence = time.time() + self._retraso(clase, intento)
+            self._secuencia += 1
+            heapq.heappush(self._heap, (vence, self._secuencia, Reintento(url, clase, intento, vence)))
+            self.stats['programados'][clase] += 1
+        return True
+
+    def tomar_vencidos(self, ahora: Optional[float] = None) -> List[Reintento]:
+        """Saca de la cola los reintentos cuyo vencimiento ya pasó"""
+        ahora = time.time() if ahora is None else ahora
+        vencidos = []
+        with self.lock:
+            while self._heap and self._heap[0][0] <= ahora:
+                vencidos.append(heapq.heappop(self._heap)[2])
+            self.stats['liberados'] += len(vencidos)
+        return vencidos
+
+    def proximo(self) -> Optional[float]:
+        """Segundos hasta el próximo vencimiento (None si la cola está vacía)"""
+        with self.lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.time())
+
+    def intentos(self, url: str) -> int:
+        with self.lock:
+            return self._intentos.get(url, 0)
+
+    def pendientes(self) -> List[Reintento]:
+        with self.lock:
+            return [item[2] for item in sorted(self._heap)]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._heap)
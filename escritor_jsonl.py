@@ -0,0 +1,187 @@
+"""
+escritor_jsonl.py - Escritor JSONL con group commit en un thread dedicado
+
+Los workers ya no abren/cierran el archivo por cada registro ni esperan al
+disco: encolan la línea ya serializada y siguen. Un único thread escritor
+mantiene un handle abierto por archivo y escribe por lotes:
+
+- Escribe y hace flush al juntar `max_lote` líneas o cada `intervalo_flush` s
+- fsync según política: 'lote' (cada escritura), 'intervalo' (cada
+  `intervalo_fsync` s) o 'nunca' (lo decide el sistema operativo)
+- sincronizar() es una barrera: retorna cuando todo lo encolado antes de la
+  llamada quedó escrito y con fsync (se usa antes de guardar un checkpoint)
+- cerrar() drena la cola, hace fsync y cierra los archivos
+
+Uso:
+    escritor = EscritorJSONL(fsync='intervalo')
+    escritor.escribir('resultados/properties.jsonl', registro)
+    escritor.sincronizar()
+    escritor.cerrar()
+"""
+import os
+import json
+import time
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from metricas import get_registro
+
+
+POLITICAS_FSYNC = ('lote', 'intervalo', 'nunca')
+
+_FIN = object()
+
+
+class _Barrera:
+    def __init__(self):
+        self.evento = threading.Event()
+
+
+class EscritorJSONL:
+    """Cola + thread escritor con un handle abierto por archivo destino"""
+
+    def __init__(self, max_lote: int = 200, intervalo_flush: float = 1.0,
+                 fsync: str = 'intervalo', intervalo_fsync: float = 5.0, nombre: str = 'escritor-jsonl'):
+        if fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {fsync} (opciones: {POLITICAS_FSYNC})")
+        self.max_lote = max_lote
+        self.intervalo_flush = intervalo_flush
+        self.fsync = fsync
+        self.intervalo_fsync = intervalo_fsync
+        self.nombre = nombre
+        self.cola: 'queue.Queue' = queue.Queue()
+        self.metricas = get_registro()
+        self.lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._archivos: Dict[str, Any] = {}
+        self._sin_fsync: set = set()
+        self._ultimo_fsync = time.time()
+        self.stats = {'encolados': 0, 'escritos': 0, 'lotes': 0, 'fsyncs': 0, 'errores': 0}
+
+    # ------------------------------------------------------------------
+    # API para los workers (no bloquea en disco)
+    # ------------------------------------------------------------------
+    def escribir(self, ruta, registro: Dict[str, Any]):
+        self.escribir_muchos(ruta, [registro])
+
+    def escribir_muchos(self, ruta, registros: Iterable[Dict[str, Any]]):
+        # Se serializa en el thread que llama: el registro puede mutar después
+        lineas = [json.dumps(r, ensure_ascii=False) + '\n' for r in registros]
+        if not lineas:
+            return
+        self._asegurar_hilo()
+        self.cola.put((str(ruta), lineas))
+        with self.lock:
+            self.stats['encolados'] += len(lineas)
+
+    def pendientes(self) -> int:
+        return self.cola.qsize()
+
+    def sincronizar(self, timeout: Optional[float] = None) -> bool:
+        """Barrera de durabilidad: espera a que lo encolado hasta ahora esté en disco"""
+        if self._hilo is None:
+            return True
+        barrera = _Barrera()
+        self.cola.put(barrera)
+        return barrera.evento.wait(timeout)
+
+    def cerrar(self):
+        """Drena la cola, fsync y cierra los archivos (puede volver a usarse después)"""
+        hilo = self._hilo
+        if hilo is None:
+            return
+        self.cola.put(_FIN)
+        hilo.join()
+        with self.lock:
+            if self._hilo is hilo:
+                self._hilo = None
+        # Lo encolado durante el cierre arranca un thread nuevo al próximo uso
+        if not self.cola.empty():
+            self._asegurar_hilo()
+
+    # ------------------------------------------------------------------
+    # Thread escritor
+    # ------------------------------------------------------------------
+    def _asegurar_hilo(self):
+        with self.lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+                self._hilo.start()
+
+    def _escribir_lote(self, pendientes: Dict[str, List[str]], forzar_fsync: bool = False):
+        if pendientes:
+            with self.metricas.fase('persistencia'):
+                for ruta, lineas in pendientes.items():
+                    try:
+                        archivo = self._archivos.get(ruta)
+                        if archivo is None:
+                            archivo = self._archivos[ruta] = open(ruta, 'a', encoding='utf-8')
+                        archivo.writelines(lineas)
+                        archivo.flush()
+                        self._sin_fsync.add(ruta)
+                        self.stats['escritos'] += len(lineas)
+                    except OSError as e:
+                        self.stats['errores'] += 1
+                        print(f"  ✗ Error escribiendo {ruta}: {e}")
+            self.stats['lotes'] += 1
+            pendientes.clear()
+
+        vence_intervalo = self.fsync == 'intervalo' and time.time() - self._ultimo_fsync >= self.intervalo_fsync
+        if self._sin_fsync and (forzar_fsync or self.fsync == 'lote' or vence_intervalo):
+            for ruta in list(self._sin_fsync):
+                try:
+                    os.fsync(self._archivos[ruta].fileno())
+                    self.stats['fsyncs'] += 1
+                except OSError as e:
+                    self.stats['errores'] += 1
+                    print(f"  ✗ Error en fsync de {ruta}: {e}")
+            self._sin_fsync.clear()
+            self._ultimo_fsync = time.time()
+
+    def _cerrar_archivos(self):
+        for archivo in self._archivos.values():
+            try:
+                archivo.close()
+            except OSError:
+                pass
+        self._archivos.clear()
+
+    def _bucle(self):
+        pendientes: Dict[str, List[str]] = {}
+        cantidad = 0
+        ultimo_flush = time.time()
+        while True:
+            espera = max(0.0, self.intervalo_flush - (time.time() - ultimo_flush))
+            try:
+                item = self.cola.get(timeout=espera)
+            except queue.Empty:
+                item = None
+
+            # Juntar todo lo disponible sin bloquear, hasta completar el lote
+            control = None
+            while item is not None:
+                if item is _FIN or isinstance(item, _Barrera):
+                    control = item
+                    break
+                ruta, lineas = item
+                pendientes.setdefault(ruta, []).extend(lineas)
+                cantidad += len(lineas)
+                if cantidad >= self.max_lote:
+                    break
+                try:
+                    item = self.cola.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if control is not None:
+                # Barrera o cierre: todo lo anterior debe quedar escrito y con fsync
+                self._escribir_lote(pendientes, forzar_fsync=True)
+                cantidad, ultimo_flush = 0, time.time()
+                if control is _FIN:
+                    self._cerrar_archivos()
+                    return
+                control.evento.set()
+            elif cantidad >= self.max_lote or time.time() - ultimo_flush >= self.intervalo_flush:
+                self._escribir_lote(pendientes)
+                cantidad, ultimo_flush = 0, time.time()
@@ -3,7 +3,9 @@ extract_emails_fast.py - Extrae emails y teléfonos de perfil de inmobiliarias
 Usa Selenium para interactuar con elementos que requieren click
 """
 import argparse
+import itertools
 import json
+import logging
 import os
 import re
 import time
@@ -19,15 +21,33 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from logger_config import get_logger, ResumenURL
+from instantanea_entradas import Instantanea
+from cache_contactos import CacheContactos
+from merge_contacts_to_excel import extract_id_from_url
+
 RESULTS_DIR = 'resultados'
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-def extract_contact_info(url, driver=None, wait=None):
+# Trazas por paso a DEBUG (archivo/JSON); el volcado de botones es muestreado (evento 'boton')
+log = get_logger('extract_emails_fast')
+
+# El volcado de botones cuesta ~30 llamadas al driver: solo 1 de cada N páginas
+DIAGNOSTICO_CADA = 50
+_paginas_vistas = itertools.count()
+
+
+def muestrear_diagnostico() -> bool:
+    return next(_paginas_vistas) % DIAGNOSTICO_CADA == 0
+
+def extract_contact_info(url, driver=None, wait=None, resumen=None):
     """
     Extrae email y teléfono de una página de perfil de inmobiliaria.
+    Si se pasa `resumen` (dict / ResumenURL) anota la estrategia y la fuente del teléfono.
     """
     email = None
     telefono = None
+    resumen = resumen if resumen is not None else {}
     
     try:
         # Navegar a la URL
@@ -47,85 +67,85 @@ def extract_contact_info(url, driver=None, wait=None):
             pass
         
         # Buscar teléfono - hacer click en botón primero
-        print(f"  Esperando carga completa de la página (1 segundo)...")
+        log.debug("Esperando carga completa de la página (1 segundo)")
         time.sleep(1)
         
         # Scroll hacia el centro para asegurar que los elementos estén visibles
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
         time.sleep(0.5)
         
-        print(f"  Buscando botón 'Ver teléfono'...")
+        log.debug("Buscando botón 'Ver teléfono'")
         button_found = False
         button = None
         
-        # DIAGNÓSTICO: Ver qué hay en la página
-        try:
-            all_buttons = driver.find_elements(By.TAG_NAME, "button")
-            print(f"  [DEBUG] Total botones en página: {len(all_buttons)}")
-            for idx, btn in enumerate(all_buttons[:15]):
-                btn_text = btn.text[:60] if btn.text else "(sin texto)"
-                btn_class = btn.get_attribute('class')
-                print(f"    Button {idx}: class='{btn_class}' | text='{btn_text}'")
-        except:
-            pass
+        # DIAGNÓSTICO: Ver qué hay en la página (muestreado: cada volcado son ~15 llamadas al driver)
+        if log.isEnabledFor(logging.DEBUG) and muestrear_diagnostico():
+            try:
+                all_buttons = driver.find_elements(By.TAG_NAME, "button")
+                botones = [{'class': btn.get_attribute('class'), 'text': (btn.text or '')[:60]}
+                           for btn in all_buttons[:15]]
+                log.debug("Total botones en página: %d", len(all_buttons),
+                          extra={'evento': 'boton_diagnostico', 'url': url, 'botones': botones})
+            except Exception:
+                pass
         
         # ESTRATEGIA 1: CSS Selector directo (más rápido)
         try:
-            print(f"  - Intentando CSS selector 'button.btn-secondary'...")
+            log.debug("Intentando CSS selector 'button.btn-secondary'", extra={'evento': 'boton'})
             button = driver.find_element(By.CSS_SELECTOR, "button.btn-secondary")
-            print(f"    ✓ Encontrado botón: '{button.text}'")
+            log.debug("✓ Encontrado botón: '%s'", button.text, extra={'evento': 'boton'})
             
             # Scroll y click por JavaScript
             driver.execute_script("arguments[0].scrollIntoView(true);", button)
             time.sleep(0.3)
             driver.execute_script("arguments[0].click();", button)
-            print(f"    ✓ Click ejecutado por JavaScript. Esperando 1.6 segundos...")
             time.sleep(1.6)
             button_found = True
+            resumen['boton'] = 'css'
         except Exception as e:
-            print(f"    ✗ Falló: {type(e).__name__}")
+            log.debug("✗ CSS selector falló: %s", type(e).__name__, extra={'evento': 'boton'})
         
         # ESTRATEGIA 2: XPath con 'Ver teléfono'
         if not button_found:
             try:
-                print(f"  - Intentando XPath '//button[contains(., \"Ver teléfono\")]'...")
+                log.debug("Intentando XPath 'Ver teléfono'", extra={'evento': 'boton'})
                 button = driver.find_element(By.XPATH, "//button[contains(., 'Ver teléfono')]")
-                print(f"    ✓ Encontrado botón: '{button.text}'")
+                log.debug("✓ Encontrado botón: '%s'", button.text, extra={'evento': 'boton'})
                 
                 driver.execute_script("arguments[0].scrollIntoView(true);", button)
                 time.sleep(0.3)
                 driver.execute_script("arguments[0].click();", button)
-                print(f"    ✓ Click ejecutado. Esperando 1.6 segundos...")
                 time.sleep(1.6)
                 button_found = True
+                resumen['boton'] = 'xpath'
             except Exception as e:
-                print(f"    ✗ Falló: {type(e).__name__}")
+                log.debug("✗ XPath falló: %s", type(e).__name__, extra={'evento': 'boton'})
         
         # ESTRATEGIA 3: Iterar todos los botones manualmente
         if not button_found:
             try:
-                print(f"  - Buscando manualmente en todos los botones...")
+                log.debug("Buscando manualmente en todos los botones", extra={'evento': 'boton'})
                 buttons = driver.find_elements(By.TAG_NAME, "button")
                 
                 for idx, button in enumerate(buttons):
                     btn_text = button.text.lower()
                     if ("ver" in btn_text or "teléfono" in btn_text or "telefono" in btn_text) and button.is_displayed():
-                        print(f"    ✓ Botón {idx} coincide: '{button.text}'")
+                        log.debug("✓ Botón %d coincide: '%s'", idx, button.text, extra={'evento': 'boton'})
                         
                         driver.execute_script("arguments[0].scrollIntoView(true);", button)
                         time.sleep(0.3)
                         driver.execute_script("arguments[0].click();", button)
-                        print(f"    ✓ Click ejecutado. Esperando 1.6 segundos...")
                         time.sleep(1.6)
                         button_found = True
+                        resumen['boton'] = 'manual'
                         break
             except Exception as e:
-                print(f"    ✗ Falló: {type(e).__name__}: {e}")
+                log.debug("✗ Búsqueda manual falló: %s: %s", type(e).__name__, e, extra={'evento': 'boton'})
         
         # ESTRATEGIA 4: Script JavaScript puro
         if not button_found:
             try:
-                print(f"  - Ejecutando script JavaScript puro...")
+                log.debug("Ejecutando script JavaScript puro", extra={'evento': 'boton'})
                 result = driver.execute_script("""
                     var found = false;
                     var buttons = document.querySelectorAll('button');
@@ -144,13 +164,13 @@ def extract_contact_info(url, driver=None, wait=None):
                     return found;
                 """)
                 if result:
-                    print(f"    ✓ Script encontró y clickeó botón. Esperando 1.6 segundos...")
                     time.sleep(1.6)
                     button_found = True
+                    resumen['boton'] = 'js'
                 else:
-                    print(f"    ✗ Script no encontró botón coincidente")
+                    log.debug("✗ Script no encontró botón coincidente", extra={'evento': 'boton'})
             except Exception as e:
-                print(f"    ✗ Falló: {type(e).__name__}: {e}")
+                log.debug("✗ Script falló: %s: %s", type(e).__name__, e, extra={'evento': 'boton'})
         
         # Si hicimos click en el botón, intentar leer el teléfono del CONTENEDOR cercano
         if button_found and 'button' in locals() and button is not None:
@@ -228,7 +248,7 @@ def extract_contact_info(url, driver=None, wait=None):
                                 numero = '+' + numero
                             else:
                                 numero = '+57' + numero
-                        print(f"  ✓ Teléfono leído desde enlace tel:: {numero}")
+                        resumen['fuente'] = 'tel'
                         return email, numero
 
                 # Recopilar textos cercanos al botón: el propio, hermanos, padre y ancestros
@@ -293,10 +313,10 @@ def extract_contact_info(url, driver=None, wait=None):
                                     telefono_limpio = '+' + telefono_limpio
                                 else:
                                     telefono_limpio = '+57' + telefono_limpio
-                            print(f"  ✓ Teléfono encontrado cerca del botón: {telefono_limpio}")
+                            resumen['fuente'] = 'cerca_boton'
                             return email, telefono_limpio
             except Exception as e:
-                print(f"  Aviso: no fue posible leer teléfono cerca del botón: {type(e).__name__}")
+                log.debug("No fue posible leer teléfono cerca del botón: %s", type(e).__name__)
 
         # Patrones para buscar el teléfono (del más específico al más genérico)
         phone_patterns = [
@@ -310,13 +330,13 @@ def extract_contact_info(url, driver=None, wait=None):
         
         # Buscar en el HTML completo (incluye contenido revelado por JavaScript)
         html = driver.page_source
-        print(f"  Buscando patrones de teléfono en HTML (longitud: {len(html)} caracteres)...")
+        log.debug("Buscando patrones de teléfono en HTML (longitud: %d caracteres)", len(html))
         
         # Conjunto para rastrear números únicos y tomar solo el primero
         for i, pattern in enumerate(phone_patterns):
             matches = re.findall(pattern, html)
             if matches:
-                print(f"  Patrón {i+1}: encontró {len(matches)} coincidencia(s)")
+                log.debug("Patrón %d: encontró %d coincidencia(s)", i + 1, len(matches))
                 # Tomar SOLO el primer número encontrado
                 match = matches[0]
                 telefono = match.strip()
@@ -328,7 +348,7 @@ def extract_contact_info(url, driver=None, wait=None):
                         telefono_limpio = '+' + telefono_limpio
                     else:
                         telefono_limpio = '+57' + telefono_limpio
-                print(f"  ✓ Teléfono encontrado (primer número): {telefono_limpio}")
+                resumen['fuente'] = f'html_patron_{i + 1}'
                 return email, telefono_limpio
         
         # Si no encontramos con HTML, buscar en texto visible
@@ -338,14 +358,15 @@ def extract_contact_info(url, driver=None, wait=None):
             if phone_match:
                 telefono = phone_match.group(0).strip()
                 telefono = re.sub(r'[\s\-()]+', '', telefono)
-                print(f"  ✓ Teléfono encontrado (en texto): {telefono}")
+                resumen['fuente'] = 'texto'
                 return email, telefono
         
         if not telefono:
-            print(f"  ⚠ Teléfono no encontrado en esta página")
+            resumen['fuente'] = None
     
     except Exception as e:
-        print(f"  Error extrayendo de {url}: {type(e).__name__}: {e}")
+        resumen['error'] = f"{type(e).__name__}: {e}"[:200]
+        log.debug("Error extrayendo de %s", url, exc_info=True)
     
     return email, telefono
 def main():
@@ -356,6 +377,8 @@ def main():
     parser.add_argument('--save-every', type=int, default=50, help='Guardar resultados cada N URLs')
     parser.add_argument('--headless', action='store_true', help='Ejecutar navegador en headless mode')
     parser.add_argument('--max-urls', type=int, default=None, help='Máximo número de URLs a procesar')
+    parser.add_argument('--refrescar', action='store_true',
+                        help='Revelar también inmobiliarias con contacto vigente en la caché')
     
     args = parser.parse_args()
     
@@ -365,15 +388,10 @@ def main():
         urls = [args.input]
     else:
         try:
-            if args.input.lower().endswith('.xlsx') or args.input.lower().endswith('.xls'):
-                df = pd.read_excel(args.input)
-            else:
-                df = pd.read_csv(args.input)
-            
-            if args.column in df.columns:
-                urls = df[args.column].dropna().astype(str).tolist()
-            else:
-                urls = df.iloc[:, 0].dropna().astype(str).tolist()
+            # Instantánea en caché del Excel/CSV; sin la columna pedida se usa la primera
+            urls = Instantanea(args.input).columna(args.column, adivinar=False)
+        except KeyError:
+            urls = Instantanea(args.input).columna(None)
         except Exception as e:
             print(f"Error leyendo archivo: {e}")
             return
@@ -384,6 +402,13 @@ def main():
     if args.max_urls:
         urls = urls[:args.max_urls]
     
+    # Solo se revelan inmobiliarias sin contacto vigente (una por id de owner)
+    cache = CacheContactos()
+    en_cache = []
+    if not args.refrescar:
+        urls, en_cache = cache.filtrar_urls(urls)
+        print(f"Caché de contactos: {len(en_cache):,} inmobiliarias vigentes, {len(urls):,} a revelar")
+    
     # Configurar Selenium - USAR PERFIL CON SESIÓN GUARDADA
     profile_dir = os.path.join(os.path.expanduser("~"), ".fincaraiz_profile")
     
@@ -418,14 +443,23 @@ def main():
     driver = webdriver.Chrome(service=service, options=opts)
     wait = WebDriverWait(driver, 10)
     
+    # Las inmobiliarias vigentes salen de la caché, sin abrir el perfil
     results = []
+    for url in en_cache:
+        contacto = cache.get(extract_id_from_url(url))
+        results.append({
+            'url': url,
+            'email': contacto.get('email') or 'No encontrado',
+            'telefono': contacto.get('telefono') or 'No encontrado',
+        })
     
     try:
         for idx, url in enumerate(urls, 1):
             if idx < args.start_index:
                 continue
             
-            print(f"[{idx}/{len(urls)}] {url}")
+            # Una sola línea por URL (ResumenURL) en vez de un print por paso
+            resumen = ResumenURL(log, url, n=f"{idx}/{len(urls)}")
             
             # Manejo de errores robusto con reintentos
             max_retries = 3
@@ -433,14 +467,14 @@ def main():
             
             for retry in range(max_retries):
                 try:
-                    email, phone = extract_contact_info(url, driver, wait)
+                    email, phone = extract_contact_info(url, driver, wait, resumen)
                     break  # Éxito, salir del bucle de reintentos
                 except KeyboardInterrupt:
                     raise  # Permitir Ctrl+C para cancelar
                 except Exception as e:
                     if retry < max_retries - 1:
-                        print(f"  ⚠ Error (intento {retry+1}/{max_retries}): {type(e).__name__}")
-                        print(f"    Reintentando en 1 segundo...")
+                        log.warning("⚠ Error (intento %d/%d) en %s: %s. Reintentando en 1 segundo...",
+                                    retry + 1, max_retries, url, type(e).__name__)
                         time.sleep(1)
                         # Reiniciar driver si es error de conexión
                         if "ConnectionReset" in str(type(e).__name__) or "InvalidSession" in str(type(e).__name__):
@@ -451,9 +485,18 @@ def main():
                             driver = webdriver.Chrome(service=service, options=opts)
                             wait = WebDriverWait(driver, 10)
                     else:
-                        print(f"  ✗ Error final después de {max_retries} intentos: {type(e).__name__}: {e}")
+                        resumen['error'] = f"{type(e).__name__}: {e}"[:200]
                         email, phone = None, None
             
+            resumen.update(intentos=retry + 1, email=email, telefono=phone,
+                           estado='ok' if phone else ('error' if 'error' in resumen else 'sin_telefono'))
+            resumen.emitir()
+            
+            # El intento cuenta aunque no haya teléfono: no se repite hasta que venza
+            id_owner = extract_id_from_url(url)
+            if id_owner is not None:
+                cache.registrar(id_owner, email, phone, url=url, fuente='extract_emails_fast')
+            
             results.append({
                 'url': url,
                 'email': email or 'No encontrado',
@@ -488,4 +531,6 @@ def main():
     print(f"  - Total: {len(results)} registros")
 
 if __name__ == '__main__':
+    from logger_config import configurar_logging
+    configurar_logging()
     main()
@@ -26,6 +26,8 @@ try:
 except Exception:
     pd = None
 
+from instantanea_entradas import leer_urls
+
 # Selenium fallback
 try:
     from selenium import webdriver
@@ -39,6 +41,9 @@ except Exception:
 RESULTS_DIR = 'resultados'
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Cliente HTTP de fetch_requests: requests directo o con cobertura (--cobertura)
+_http = requests
+
 
 def save_results(results, prefix='extraction'):
     """Guarda CSV y JSON en RESULTS_DIR con prefijo y timestamp."""
@@ -209,7 +214,7 @@ def extract_from_html(html):
 
 def fetch_requests(url, timeout=12):
     try:
-        r = requests.get(url, headers=HEADERS, timeout=timeout)
+        r = _http.get(url, headers=HEADERS, timeout=timeout)
         r.raise_for_status()
         return r.text
     except Exception as e:
@@ -245,42 +250,15 @@ def fetch_selenium(url, headless=True, timeout=10):
 
 
 def read_urls(input_path, column_name=None):
-    urls = []
-    if input_path.lower().endswith(('.xls', '.xlsx')):
-        if pd is None:
-            raise RuntimeError('Pandas no está instalado. Instálalo o pasa un CSV con URLs.')
-        df = pd.read_excel(input_path)
-        if column_name and column_name in df.columns:
-            urls = df[column_name].dropna().astype(str).tolist()
-        else:
-            # intentar adivinar columna
-            for col in ['url', 'URL', 'link', 'Link', 'href']:
-                if col in df.columns:
-                    urls = df[col].dropna().astype(str).tolist()
-                    break
-            if not urls:
-                # tomar la primera columna
-                urls = df.iloc[:, 0].dropna().astype(str).tolist()
+    if input_path.lower().endswith(('.xls', '.xlsx')) and pd is None:
+        raise RuntimeError('Pandas no está instalado. Instálalo o pasa un CSV con URLs.')
+    if input_path.lower().endswith('.csv') and pd is None:
+        # plain text file, one url per line
+        with open(input_path, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
     else:
-        # CSV o TXT
-        if pd is not None and input_path.lower().endswith('.csv'):
-            df = pd.read_csv(input_path)
-            if column_name and column_name in df.columns:
-                urls = df[column_name].dropna().astype(str).tolist()
-            else:
-                for col in ['url', 'URL', 'link', 'Link', 'href']:
-                    if col in df.columns:
-                        urls = df[col].dropna().astype(str).tolist()
-                        break
-                if not urls:
-                    urls = df.iloc[:, 0].dropna().astype(str).tolist()
-        else:
-            # plain text file, one url per line
-            with open(input_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        urls.append(line)
+        # Excel/CSV desde la instantánea en caché (columna pedida, luego url/URL/link..., luego la primera)
+        urls = leer_urls(input_path, column_name)
     # Normalizar URLs
     urls = [u if u.startswith('http') else 'https://www.fincaraiz.com.co' + (u if u.startswith('/') else '/' + u) for u in urls]
     return urls
@@ -294,8 +272,15 @@ def main():
     parser.add_argument('--start-index', type=int, default=1, help='Índice (1-based) desde el que empezar/procesar (útil para reanudar)')
     parser.add_argument('--save-every', type=int, default=200, help='Guardar resultados parciales cada N URLs procesadas')
     parser.add_argument('--headless', action='store_true', help='Usar Selenium en modo headless (si se usa)')
+    parser.add_argument('--cobertura', action='store_true',
+                        help='Duplicar el request que supera el p95 de latencia (máx. 5%% de requests extra)')
     args = parser.parse_args()
 
+    global _http
+    if args.cobertura:
+        from cobertura_http import SolicitudesCubiertas
+        _http = SolicitudesCubiertas(requests.Session())
+
     input_path = args.input
 
     # Si el input es una única URL
@@ -384,5 +369,11 @@ def main():
     except Exception as e:
         print('Error guardando JSON:', e)
 
+    if args.cobertura:
+        r = _http.resumen()
+        print(f"Cobertura: {r['coberturas']} requests extra ({r['fraccion_extra']:.1%}), "
+              f"{r['ganadas_cobertura']} ganadas, {r['segundos_ahorrados']}s de cola ahorrados")
+        _http.cerrar()
+
 if __name__ == '__main__':
     main()
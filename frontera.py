@@ -0,0 +1,339 @@
+"""
+frontera.py - Construcción de la frontera de crawling deduplicada por cod_fr
+
+Las URLs de entrada (Inmuebles.xlsx y los Excel por lote) repiten el mismo
+inmueble con slugs distintos, percent-encodings (`catalu%C3%B1a`) o variantes
+finales (`/`, `?utm=...`). La clave real es el id numérico al final del path.
+
+Este módulo:
+- Canonicaliza URLs y extrae el cod_fr
+- Deduplica contra un índice persistente de cod_fr ya crawleados
+- Reporta cuántos fetches se evitaron antes de encolar nada
+- Reparte la frontera en shards por hash estable del cod_fr: el lote de un
+  inmueble no depende del orden ni del largo del archivo de entrada, así que
+  una fila nueva solo agrega trabajo al shard que le toca y el resume de cada
+  lote (checkpoint por URL) sobrevive ediciones de la entrada
+
+Uso:
+python frontera.py Inmuebles.xlsx [otro.xlsx ...] --columna URL
+python frontera.py Inmuebles.xlsx --semilla resultados/lotes --salida resultados/frontera.txt
+"""
+import os
+import re
+import json
+import hashlib
+import argparse
+from glob import glob
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit, quote, unquote
+
+
+BASE_URL = 'https://www.fincaraiz.com.co'
+INDICE_DEFAULT = os.path.join('resultados', 'indice_cod_fr.txt')
+MANIFIESTO_SHARDS = 'shards.json'  # Número de shards vigente, junto a los lote_XX.json
+
+# Id numérico al final del path (mismo criterio de longitud que _extraer_del_html)
+COD_FR_RE = re.compile(r'/(\d{6,})/?$')
+
+# Campos donde los distintos formatos de salida guardan el código y la URL
+CAMPOS_COD_FR = ('cod_fr', 'Cod FR', 'COD FR', 'codigo_fr')
+CAMPOS_URL = ('url_inmueble', 'URL INMUEBLE', 'url', 'URL')
+
+
+def canonicalizar_url(url: str) -> Optional[str]:
+    """
+    Normaliza una URL de inmueble a una forma única
+
+    - Agrega esquema/host si viene relativa
+    - Host en minúsculas, https para fincaraiz.com.co
+    - Path con un único percent-encoding (decodifica y vuelve a codificar)
+    - Sin query, fragmento ni slash final
+    """
+    if not isinstance(url, str):
+        return None
+    url = url.strip()
+    if not url:
+        return None
+    if not url.startswith('http'):
+        url = BASE_URL + (url if url.startswith('/') else '/' + url)
+
+    partes = urlsplit(url)
+    host = partes.netloc.lower()
+    # Finca Raíz siempre en https; otros hosts (ej: servidor_simulado.py) conservan su esquema
+    esquema = 'https' if host.endswith('fincaraiz.com.co') else partes.scheme
+    path = quote(unquote(partes.path), safe='/-_.~')
+    path = re.sub(r'/{2,}', '/', path).rstrip('/') or '/'
+    return urlunsplit((esquema, host, path, '', ''))
+
+
+def extraer_cod_fr(url: str) -> Optional[str]:
+    """Extrae el cod_fr (id numérico final del path) de una URL"""
+    canonica = canonicalizar_url(url)
+    if not canonica:
+        return None
+    match = COD_FR_RE.search(urlsplit(canonica).path)
+    return match.group(1) if match else None
+
+
+def clave_frontera(url: str) -> Optional[str]:
+    """Clave de deduplicación y de shard: el cod_fr, o la URL canónica si no tiene"""
+    canonica = canonicalizar_url(url)
+    if not canonica:
+        return None
+    return extraer_cod_fr(canonica) or canonica
+
+
+def shard_de(clave: str, num_shards: int) -> int:
+    """
+    Shard (1..num_shards) de una clave de frontera
+
+    Usa blake2b y no hash(): el hash de str cambia entre procesos (PYTHONHASHSEED)
+    """
+    digest = hashlib.blake2b(str(clave).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % num_shards + 1
+
+
+def leer_num_shards(lotes_dir: str, default: int) -> int:
+    """Número de shards con que se generaron los lotes (manifiesto de dividir_lotes.py)"""
+    ruta = os.path.join(lotes_dir, MANIFIESTO_SHARDS)
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return int(json.load(f)['shards'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return default
+
+
+class IndiceCodFr:
+    """Índice persistente (append-only, un cod_fr por línea) de inmuebles ya crawleados"""
+
+    def __init__(self, ruta: str = INDICE_DEFAULT):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.ids: Set[str] = set()
+        self.lock = Lock()
+        self._cargar()
+
+    def _cargar(self):
+        if not self.ruta.exists():
+            return
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            for line in f:
+                cod = line.strip()
+                if cod:
+                    self.ids.add(cod)
+
+    def __contains__(self, cod_fr) -> bool:
+        return cod_fr is not None and str(cod_fr) in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def agregar(self, cod_fr) -> bool:
+        """Registra un cod_fr. Retorna False si ya estaba"""
+        return self.agregar_muchos([cod_fr]) == 1
+
+    def agregar_muchos(self, cods: Iterable) -> int:
+        """Registra varios cod_fr con una sola escritura. Retorna cuántos eran nuevos"""
+        with self.lock:
+            nuevos = []
+            for cod in cods:
+                if cod is None:
+                    continue
+                cod = str(cod).strip()
+                if cod and cod not in self.ids:
+                    self.ids.add(cod)
+                    nuevos.append(cod)
+            if nuevos:
+                with open(self.ruta, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(nuevos) + '\n')
+            return len(nuevos)
+
+    def sembrar_desde_resultados(self, rutas: Iterable[str]) -> int:
+        """
+        Agrega al índice los cod_fr presentes en resultados previos
+        (backups JSON de lote, checkpoints JSONL, properties_*.jsonl)
+        """
+        cods = []
+        for ruta in rutas:
+            for registro in _leer_registros(ruta):
+                cod = _cod_fr_de_registro(registro)
+                if cod:
+                    cods.append(cod)
+        return self.agregar_muchos(cods)
+
+
+def _iterar_array_json(f, tamano_bloque: int = 1 << 20) -> Iterable:
+    """
+    Elementos de un array JSON leídos por bloques: la memoria depende del
+    elemento más grande, no del archivo (los backups de lote pesan cientos de MB)
+    """
+    decoder = json.JSONDecoder()
+    separadores = ' \t\r\n,'
+    buffer = f.read(tamano_bloque).lstrip()
+    if not buffer.startswith('['):
+        return  # No es una lista (ej: lote_XX.json con {'urls': [...]})
+    pos, fin_archivo = 1, False
+    while True:
+        while pos < len(buffer) and buffer[pos] in separadores:
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            elemento, corte = decoder.raw_decode(buffer, pos)
+            # Un número justo al final del bloque puede estar cortado: pedir más antes de aceptarlo
+            completo = corte < len(buffer) or fin_archivo
+        except json.JSONDecodeError:
+            if fin_archivo:
+                raise
+            completo = False
+        if completo:
+            yield elemento
+            pos = corte
+            continue
+        bloque = f.read(tamano_bloque)
+        fin_archivo = not bloque
+        buffer = buffer[pos:] + bloque
+        pos = 0
+
+
+def _leer_registros(ruta: str) -> Iterable[Dict]:
+    """Lee registros de un archivo .json (lista) o .jsonl, uno a la vez"""
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            if ruta.endswith('.jsonl'):
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+            else:
+                for item in _iterar_array_json(f):
+                    if isinstance(item, dict):
+                        yield item
+    except Exception as e:
+        print(f"  ⚠️ No se pudo leer {ruta}: {e}")
+
+
+def _cod_fr_de_registro(registro: Dict) -> Optional[str]:
+    for campo in CAMPOS_COD_FR:
+        valor = registro.get(campo)
+        if valor:
+            return str(valor)
+    for campo in CAMPOS_URL:
+        valor = registro.get(campo)
+        if valor:
+            return extraer_cod_fr(valor)
+    return None
+
+
+def construir_frontera(urls: Iterable[str], indice: Optional[IndiceCodFr] = None) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Construye la lista de URLs a encolar: canónicas, únicas por cod_fr
+    y sin los cod_fr que ya están en el índice.
+
+    Returns:
+        (urls_pendientes, estadisticas)
+    """
+    vistos: Set[str] = set()
+    pendientes: List[str] = []
+    stats = {
+        'entradas': 0,
+        'invalidas': 0,
+        'duplicadas_entrada': 0,
+        'ya_crawleadas': 0,
+        'pendientes': 0,
+        'fetches_evitados': 0,
+    }
+
+    for url in urls:
+        stats['entradas'] += 1
+        canonica = canonicalizar_url(url)
+        if not canonica:
+            stats['invalidas'] += 1
+            continue
+        # Sin cod_fr la única clave posible es la URL canónica
+        clave = clave_frontera(canonica)
+        if clave in vistos:
+            stats['duplicadas_entrada'] += 1
+            continue
+        vistos.add(clave)
+        if indice is not None and clave in indice:
+            stats['ya_crawleadas'] += 1
+            continue
+        pendientes.append(canonica)
+
+    stats['pendientes'] = len(pendientes)
+    stats['fetches_evitados'] = stats['duplicadas_entrada'] + stats['ya_crawleadas']
+    return pendientes, stats
+
+
+def repartir_en_shards(urls: Iterable[str], num_shards: int) -> Dict[int, List[str]]:
+    """
+    Reparte URLs canónicas (salida de construir_frontera) en shards 1..num_shards
+
+    Cada shard conserva el orden de entrada de sus URLs
+    """
+    shards: Dict[int, List[str]] = {numero: [] for numero in range(1, num_shards + 1)}
+    for url in urls:
+        shards[shard_de(clave_frontera(url), num_shards)].append(url)
+    return shards
+
+
+def imprimir_resumen(stats: Dict[str, int]):
+    """Muestra el resumen de la frontera"""
+    print(f"  URLs de entrada:        {stats['entradas']:,}")
+    print(f"  Inválidas:              {stats['invalidas']:,}")
+    print(f"  Duplicadas en entrada:  {stats['duplicadas_entrada']:,}")
+    print(f"  Ya crawleadas (índice): {stats['ya_crawleadas']:,}")
+    print(f"  Pendientes a encolar:   {stats['pendientes']:,}")
+    print(f"  Fetches evitados:       {stats['fetches_evitados']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construye la frontera de URLs deduplicada por cod_fr')
+    parser.add_argument('entradas', nargs='+', help='Excel/CSV/TXT con URLs de inmuebles')
+    parser.add_argument('--columna', help='Nombre de la columna con las URLs (opcional)')
+    parser.add_argument('--indice', default=INDICE_DEFAULT, help='Archivo del índice persistente de cod_fr')
+    parser.add_argument('--semilla', nargs='*', default=[],
+                        help='Directorios con resultados previos (*.json / *.jsonl) para sembrar el índice')
+    parser.add_argument('--salida', default=os.path.join('resultados', 'frontera.txt'),
+                        help='Archivo de salida con las URLs pendientes (una por línea)')
+    args = parser.parse_args()
+
+    from extract_from_urls import read_urls
+
+    indice = IndiceCodFr(args.indice)
+    print(f"Índice cargado: {len(indice):,} cod_fr ({args.indice})")
+
+    for directorio in args.semilla:
+        archivos = glob(os.path.join(directorio, '**', '*.json'), recursive=True)
+        archivos += glob(os.path.join(directorio, '**', '*.jsonl'), recursive=True)
+        nuevos = indice.sembrar_desde_resultados(archivos)
+        print(f"  Semilla {directorio}: {len(archivos)} archivos, {nuevos:,} cod_fr nuevos")
+
+    urls = []
+    for entrada in args.entradas:
+        leidas = read_urls(entrada, args.columna)
+        print(f"  {entrada}: {len(leidas):,} URLs")
+        urls.extend(leidas)
+
+    pendientes, stats = construir_frontera(urls, indice)
+
+    os.makedirs(os.path.dirname(args.salida) or '.', exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        for url in pendientes:
+            f.write(f"{url}\n")
+
+    print(f"\n{'='*70}")
+    print("FRONTERA CONSTRUIDA")
+    print(f"{'='*70}")
+    imprimir_resumen(stats)
+    print(f"\n✓ Frontera guardada en: {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
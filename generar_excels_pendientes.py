@@ -1,9 +1,10 @@
 import os
 import json
-import pandas as pd
 from pathlib import Path
 from glob import glob
 
+from instantanea_entradas import leer_tabla
+
 # Rutas de los lotes y backups
 base_dir = Path(r"C:/Users/Miguel Martinez SSD/OneDrive - BROWSER TRAVEL SOLUTIONS S.A.S VIAJEMOS/Documentos/PROYECTOS/ARRIENDO DATA SETS/InmueblesFR")
 lote_dirs = [base_dir / f"lote_{i:02d}" for i in range(1, 6)]
@@ -33,7 +34,7 @@ for i, lote_dir in enumerate(lote_dirs, 1):
     if not excel_path.exists():
         print(f"No existe: {excel_path}")
         continue
-    df = pd.read_excel(excel_path)
+    df = leer_tabla(str(excel_path))  # Instantánea en caché del Excel del lote
     if 'URL' not in df.columns:
         print(f"No hay columna 'URL' en {excel_path}")
         continue
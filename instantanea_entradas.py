@@ -0,0 +1,264 @@
+"""
+instantanea_entradas.py - Instantáneas en caché de los Excel/CSV de entrada
+
+dividir_lotes, procesar_lote_limpio, generar_excels_pendientes,
+contar_inmuebles_faltantes y extract_emails_fast llamaban pd.read_excel al
+arrancar: decenas de segundos y mucha RAM para las ~278k filas de
+Inmuebles.xlsx, repetido en cada proceso de lote.
+
+Aquí cada libro se convierte una sola vez:
+- Tabla completa en Feather (pyarrow) o, sin pyarrow, en pickle de pandas
+- Cada columna de URLs pedida en texto plano (una por línea): se carga en
+  milisegundos y sin pandas
+- La caché se identifica por mtime y tamaño del archivo fuente; si cambiaron
+  se compara el hash del contenido (OneDrive toca el mtime sin cambiar nada)
+  y solo se reconstruye si el hash es distinto
+
+Uso:
+    from instantanea_entradas import leer_urls, leer_tabla
+    urls = leer_urls('Inmuebles.xlsx', 'Inmuebles')
+    df = leer_tabla('inmuebles_lote_01.xlsx')
+
+    python instantanea_entradas.py Inmuebles.xlsx --columna Inmuebles   # precalentar
+"""
+import os
+import json
+import hashlib
+import argparse
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import pandas as pd
+except ImportError:  # Solo hace falta para construir la instantánea o leer la tabla
+    pd = None
+
+try:
+    import pyarrow  # noqa: F401  (Feather)
+    FORMATO_TABLA = 'feather'
+except ImportError:
+    FORMATO_TABLA = 'pickle'
+
+
+CACHE_DIR = os.path.join('resultados', 'cache_entradas')
+
+# Columnas que se prueban cuando la pedida no existe (mismo orden que extract_from_urls.read_urls)
+COLUMNAS_URL = ('url', 'URL', 'link', 'Link', 'href')
+
+_lock = threading.Lock()
+
+
+def _hash_archivo(ruta: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _escribir_atomico(ruta: str, escribir):
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+class Instantanea:
+    """Caché en disco de un archivo de entrada (tabla + columnas en texto)"""
+
+    def __init__(self, origen: str, cache_dir: str = CACHE_DIR):
+        self.origen = os.path.abspath(origen)
+        self.cache_dir = cache_dir
+        nombre = os.path.splitext(os.path.basename(origen))[0]
+        clave = hashlib.blake2b(self.origen.encode('utf-8'), digest_size=5).hexdigest()
+        self.base = os.path.join(cache_dir, f'{nombre}_{clave}')
+        self.meta_file = self.base + '.meta.json'
+
+    # ------------------------------------------------------------------
+    # Metadatos y validez
+    # ------------------------------------------------------------------
+    def _leer_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _guardar_meta(self, meta: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        def escribir(ruta):
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+        _escribir_atomico(self.meta_file, escribir)
+
+    def vigente(self) -> Optional[Dict[str, Any]]:
+        """Metadatos si la caché corresponde al archivo actual; None si hay que reconstruir"""
+        meta = self._leer_meta()
+        if meta is None:
+            return None
+        estado = os.stat(self.origen)
+        if meta.get('mtime_ns') == estado.st_mtime_ns and meta.get('tamano') == estado.st_size:
+            return meta
+        # mtime distinto: solo se invalida si también cambió el contenido
+        if meta.get('tamano') == estado.st_size and meta.get('hash') == _hash_archivo(self.origen):
+            meta['mtime_ns'] = estado.st_mtime_ns
+            self._guardar_meta(meta)
+            return meta
+        return None
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    def _leer_origen(self):
+        if pd is None:
+            raise RuntimeError('Pandas no está instalado: no se puede leer ' + self.origen)
+        if self.origen.lower().endswith(('.xls', '.xlsx')):
+            return pd.read_excel(self.origen)
+        return pd.read_csv(self.origen)
+
+    def _guardar_tabla(self, df) -> str:
+        if FORMATO_TABLA == 'feather':
+            ruta = self.base + '.feather'
+            try:
+                _escribir_atomico(ruta, lambda tmp: df.reset_index(drop=True).to_feather(tmp))
+                return os.path.basename(ruta)
+            except Exception as e:
+                # Columnas con tipos mezclados o nombres no-str: Feather no las acepta
+                print(f"  ⚠ Feather no disponible para {os.path.basename(self.origen)} ({e}), usando pickle")
+        ruta = self.base + '.pkl'
+        _escribir_atomico(ruta, lambda tmp: df.to_pickle(tmp))
+        return os.path.basename(ruta)
+
+    def construir(self):
+        """Lee el archivo fuente una vez y deja la tabla en caché. Retorna el DataFrame"""
+        inicio = time.time()
+        estado = os.stat(self.origen)
+        df = self._leer_origen()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = {
+            'origen': self.origen,
+            'mtime_ns': estado.st_mtime_ns,
+            'tamano': estado.st_size,
+            'hash': _hash_archivo(self.origen),
+            'filas': len(df),
+            'columnas': [str(c) for c in df.columns],
+            'tabla': self._guardar_tabla(df),
+            'textos': {},
+            'creada': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self._guardar_meta(meta)
+        print(f"  ✓ Instantánea de {os.path.basename(self.origen)}: {len(df):,} filas "
+              f"en {time.time() - inicio:.1f}s ({meta['tabla']})")
+        return df
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def tabla(self):
+        """DataFrame completo (desde la caché si está vigente)"""
+        with _lock:
+            meta = self.vigente()
+            if meta is None:
+                return self.construir()
+        if pd is None:
+            raise RuntimeError('Pandas no está instalado: no se puede leer la tabla de ' + self.origen)
+        ruta = os.path.join(self.cache_dir, meta['tabla'])
+        try:
+            if ruta.endswith('.feather'):
+                return pd.read_feather(ruta)
+            return pd.read_pickle(ruta)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ Instantánea ilegible ({e}), reconstruyendo")
+            with _lock:
+                return self.construir()
+
+    def columna(self, columna: Optional[str] = None, adivinar: bool = True) -> List[str]:
+        """
+        Valores no vacíos de una columna como str, desde el texto plano en caché
+
+        Args:
+            columna: columna pedida
+            adivinar: si no existe, probar COLUMNAS_URL y luego la primera columna
+                      (con False se lanza KeyError)
+        """
+        with _lock:
+            meta = self.vigente()
+        if meta is not None:
+            elegida = self._elegir_columna(meta['columnas'], columna, adivinar)
+            texto = meta['textos'].get(elegida)
+            if texto and os.path.exists(os.path.join(self.cache_dir, texto)):
+                with open(os.path.join(self.cache_dir, texto), 'r', encoding='utf-8') as f:
+                    return f.read().splitlines()
+
+        df = self.tabla()
+        columnas = [str(c) for c in df.columns]
+        elegida = self._elegir_columna(columnas, columna, adivinar)
+        valores = df.iloc[:, columnas.index(elegida)].dropna().astype(str).tolist()
+        valores = [v.replace('\r', ' ').replace('\n', ' ') for v in valores]
+
+        with _lock:
+            meta = self._leer_meta()
+            if meta is not None:
+                sufijo = hashlib.blake2b(elegida.encode('utf-8'), digest_size=4).hexdigest()
+                nombre = f'{os.path.basename(self.base)}.{sufijo}.txt'
+
+                def escribir(ruta):
+                    with open(ruta, 'w', encoding='utf-8') as f:
+                        f.write('\n'.join(valores) + ('\n' if valores else ''))
+                _escribir_atomico(os.path.join(self.cache_dir, nombre), escribir)
+                meta['textos'][elegida] = nombre
+                self._guardar_meta(meta)
+        return valores
+
+    def _elegir_columna(self, columnas: List[str], columna: Optional[str], adivinar: bool) -> str:
+        if columna is not None and str(columna) in columnas:
+            return str(columna)
+        if not adivinar:
+            raise KeyError(f"La columna '{columna}' no se encuentra en {os.path.basename(self.origen)}")
+        for candidata in COLUMNAS_URL:
+            if candidata in columnas:
+                return candidata
+        if not columnas:
+            raise KeyError(f"{os.path.basename(self.origen)} no tiene columnas")
+        return columnas[0]
+
+
+def leer_urls(ruta: str, columna: Optional[str] = None, adivinar: bool = True) -> List[str]:
+    """
+    Valores de la columna de URLs de un Excel/CSV (vía instantánea) o de un TXT (una por línea)
+
+    No normaliza: cada script aplica su propio criterio (prefijo de host, canonicalizar_url)
+    """
+    if not ruta.lower().endswith(('.xls', '.xlsx', '.csv')):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return [linea.strip() for linea in f if linea.strip()]
+    return Instantanea(ruta).columna(columna, adivinar)
+
+
+def leer_tabla(ruta: str):
+    """DataFrame completo de un Excel/CSV vía instantánea"""
+    return Instantanea(ruta).tabla()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precalienta la caché de instantáneas de archivos de entrada')
+    parser.add_argument('archivos', nargs='+', help='Excel/CSV de entrada')
+    parser.add_argument('--columna', help='Columna de URLs a dejar también en texto plano')
+    args = parser.parse_args()
+
+    for archivo in args.archivos:
+        inicio = time.time()
+        instantanea = Instantanea(archivo)
+        estado = 'vigente' if instantanea.vigente() else 'nueva'
+        if args.columna:
+            urls = instantanea.columna(args.columna)
+            print(f"{archivo}: {len(urls):,} valores en '{args.columna}' "
+                  f"(caché {estado}, {time.time() - inicio:.2f}s)")
+        else:
+            df = instantanea.tabla()
+            print(f"{archivo}: {len(df):,} filas (caché {estado}, {time.time() - inicio:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,267 @@
 """
 Configuración de logging para el scraper
+
+Importar este módulo no configura nada ni crea archivos: cada script de
+entrada llama a configurar_logging() en su main(). Los handlers van al logger
+del proyecto ('scraper'; los módulos piden get_logger(__name__)). El logger
+raíz queda en WARNING, así el DEBUG de urllib3/selenium no llega a los logs.
+
+El logging es asíncrono: los threads del crawler solo encolan el registro
+(QueueHandler, sin tocar disco ni consola) y un thread listener
+(QueueListener) lo escribe en:
+
+- LOG_FILE: log de texto legible (como antes)
+- LOG_JSON_FILE: una línea JSON por registro, con los campos extra
+- consola: solo desde LOG_CONSOLA_NIVEL (en Windows la consola es lenta y
+  frenaba el crawl cuando cada URL imprimía decenas de líneas)
+
+Además:
+- Nivel por módulo con LOG_NIVELES ("extract_emails_fast=INFO,property_crawler_v2=WARNING")
+- Muestreo de eventos de alta frecuencia con LOG_MUESTREO ("boton=20" deja
+  pasar 1 de cada 20 registros con extra={'evento': 'boton'})
+- ResumenURL: un único registro compacto por URL en vez de un print por paso
+
+Uso:
+    from logger_config import configurar_logging, get_logger, ResumenURL
+    log = get_logger(__name__)
+    configurar_logging()  # Solo en el script que corre (main)
+    log.debug('Botón %s', idx, extra={'evento': 'boton'})   # muestreado
+    with ResumenURL(log, url) as resumen:
+        resumen['telefono'] = telefono
 """
-import logging
 import os
-from config import OUTPUT_DIR, LOG_FILE
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+from typing import Any, Dict, Optional
 
-# Crear directorio de salida si no existe
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+from config import (
+    OUTPUT_DIR, LOG_FILE, LOG_JSON_FILE, LOG_NIVELES, LOG_CONSOLA_NIVEL, LOG_MUESTREO, LOG_ASINCRONO,
+)
 
-# Configurar logger
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+PROYECTO = 'scraper'  # Logger padre de los módulos del proyecto (recibe los handlers)
+NIVEL_TERCEROS = logging.WARNING  # Logger raíz: urllib3, selenium, etc.
 
-# Handler para archivo
-file_handler = logging.FileHandler(LOG_FILE)
-file_handler.setLevel(logging.DEBUG)
+FORMATO_TEXTO = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+FORMATO_FECHA = '%d/%m/%Y %H:%M:%S'
 
-# Handler para consola
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
+# Atributos estándar de LogRecord: el resto son campos `extra` del registro
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
 
-# Formato
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%d/%m/%Y %H:%M:%S'
-)
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
 
-# Agregar handlers
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro: ts, nivel, módulo, mensaje y campos extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'thread': record.threadName,
+            'mensaje': record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar 1 de cada N registros de los eventos configurados
+    (extra={'evento': ...}). WARNING o superior nunca se descarta.
+    """
+
+    def __init__(self, tasas: Dict[str, int]):
+        super().__init__()
+        self.tasas = {evento: max(1, int(n)) for evento, n in tasas.items()}
+        self.vistos: Dict[str, int] = {}
+        self.descartados: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        evento = getattr(record, 'evento', None)
+        n = self.tasas.get(evento)
+        if n is None or n == 1 or record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            visto = self.vistos.get(evento, 0)
+            self.vistos[evento] = visto + 1
+            if visto % n == 0:
+                return True
+            self.descartados[evento] = self.descartados.get(evento, 0) + 1
+        return False
+
+
+def _parsear_pares(texto: str) -> Dict[str, str]:
+    """'a=INFO, b=WARNING' -> {'a': 'INFO', 'b': 'WARNING'}"""
+    pares = {}
+    for parte in (texto or '').split(','):
+        if '=' in parte:
+            clave, valor = parte.split('=', 1)
+            pares[clave.strip()] = valor.strip()
+    return pares
+
+
+# Estado del logging del proceso (configurar_logging es idempotente)
+_estado: Dict[str, Any] = {'listener': None, 'handlers': [], 'muestreo': None, 'archivos': set()}
+_lock_config = threading.Lock()
+
+
+def _handlers_destino(nivel_consola: str):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter(FORMATO_TEXTO, datefmt=FORMATO_FECHA))
+
+    json_handler = logging.FileHandler(LOG_JSON_FILE, encoding='utf-8')
+    json_handler.setLevel(logging.DEBUG)
+    json_handler.setFormatter(FormateadorJSON())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(nivel_consola)
+    console_handler.setFormatter(logging.Formatter(FORMATO_TEXTO, datefmt=FORMATO_FECHA))
+    return [file_handler, json_handler, console_handler]
+
+
+def configurar_logging(asincrono: Optional[bool] = None, niveles: Optional[Dict[str, str]] = None,
+                       nivel_consola: Optional[str] = None, muestreo: Optional[Dict[str, int]] = None):
+    """
+    Configura el logging una sola vez por proceso (desde el script de entrada).
+
+    El logger del proyecto queda en DEBUG con los handlers y sin propagar; el raíz
+    recibe los mismos handlers en NIVEL_TERCEROS (solo warnings de librerías).
+
+    Args:
+        asincrono: QueueHandler + listener (default LOG_ASINCRONO)
+        niveles: nivel por nombre de logger (default LOG_NIVELES)
+        nivel_consola: nivel mínimo en consola (default LOG_CONSOLA_NIVEL)
+        muestreo: {evento: N} deja pasar 1 de cada N (default LOG_MUESTREO)
+    """
+    with _lock_config:
+        if _estado['handlers']:
+            return
+        asincrono = LOG_ASINCRONO if asincrono is None else asincrono
+        niveles = _parsear_pares(LOG_NIVELES) if niveles is None else niveles
+        muestreo = _parsear_pares(LOG_MUESTREO) if muestreo is None else muestreo
+
+        proyecto = logging.getLogger(PROYECTO)
+        proyecto.setLevel(logging.DEBUG)
+        proyecto.propagate = False  # Los handlers del raíz son los mismos: sin duplicados
+        raiz = logging.getLogger()
+        raiz.setLevel(NIVEL_TERCEROS)
+        for nombre, nivel in niveles.items():
+            # 'extract_emails_fast=INFO' es un módulo del proyecto; 'urllib3=DEBUG' una librería
+            get_logger(nombre).setLevel(str(nivel).upper())
+            logging.getLogger(nombre).setLevel(str(nivel).upper())
+
+        filtro = FiltroMuestreo(muestreo)
+        destinos = _handlers_destino((nivel_consola or LOG_CONSOLA_NIVEL).upper())
+        if asincrono:
+            # El thread que loguea solo encola; el listener escribe a disco/consola
+            cola: 'queue.Queue' = queue.Queue(-1)
+            entrada = logging.handlers.QueueHandler(cola)
+            entrada.addFilter(filtro)  # Lo muestreado no llega ni a la cola
+            listener = logging.handlers.QueueListener(cola, *destinos, respect_handler_level=True)
+            listener.start()
+            atexit.register(detener_logging)
+            _estado['listener'] = listener
+            handlers = [entrada]
+        else:
+            for handler in destinos:
+                handler.addFilter(filtro)
+            handlers = destinos
+
+        for handler in handlers:
+            proyecto.addHandler(handler)
+            raiz.addHandler(handler)
+        _estado['handlers'] = handlers
+        _estado['muestreo'] = filtro
+
+
+def agregar_archivo(ruta, nivel: int = logging.INFO, formato: str = FORMATO_TEXTO):
+    """Archivo de texto adicional (ej: log propio de un crawler), escrito por el listener"""
+    configurar_logging()
+    ruta = str(ruta)
+    with _lock_config:
+        if ruta in _estado['archivos']:
+            return
+        _estado['archivos'].add(ruta)
+        handler = logging.FileHandler(ruta, encoding='utf-8')
+        handler.setLevel(nivel)
+        handler.setFormatter(logging.Formatter(formato, datefmt=FORMATO_FECHA))
+        listener = _estado['listener']
+        if listener is not None:
+            listener.handlers = listener.handlers + (handler,)
+        else:
+            handler.addFilter(_estado['muestreo'])
+            logging.getLogger(PROYECTO).addHandler(handler)
+
+
+def detener_logging():
+    """Vacía la cola del listener (se llama sola al salir del proceso)"""
+    listener = _estado['listener']
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def stats_muestreo() -> Dict[str, Dict[str, int]]:
+    filtro = _estado['muestreo']
+    if filtro is None:
+        return {}
+    with filtro.lock:
+        return {'vistos': dict(filtro.vistos), 'descartados': dict(filtro.descartados)}
+
+
+class ResumenURL(dict):
+    """
+    Registro compacto por URL: los pasos de la extracción anotan campos en el
+    dict y emitir() (o la salida del bloque `with`) escribe una sola línea
+    (evento 'resumen_url') con la duración y el estado.
+    """
+
+    def __init__(self, log: logging.Logger, url: str, nivel: int = logging.INFO, **campos):
+        super().__init__(campos)
+        self.log = log
+        self.url = url
+        self.nivel = nivel
+        self.inicio = time.time()
+
+    def emitir(self):
+        duracion = round(time.time() - self.inicio, 3)
+        self.setdefault('estado', 'ok')
+        nivel = logging.WARNING if self['estado'] == 'error' else self.nivel
+        detalle = ' '.join(f"{k}={v}" for k, v in self.items() if v is not None)
+        self.log.log(nivel, f"{self.url} [{duracion:.1f}s] {detalle}",
+                     extra={'evento': 'resumen_url', 'url': self.url, 'duracion_s': duracion, 'campos': dict(self)})
+
+    def __enter__(self) -> 'ResumenURL':
+        self.inicio = time.time()
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        if exc is not None and 'estado' not in self:
+            self['estado'] = 'error'
+            self['error'] = f"{tipo.__name__}: {exc}"[:200]
+        self.emitir()
+        return False
+
+
+# Logger histórico del scraper (main.py, extractor.py, ...): el del proyecto
+logger = logging.getLogger(PROYECTO)
+
 
-def get_logger():
-    return logger
+def get_logger(nombre: Optional[str] = None) -> logging.Logger:
+    """Logger del proyecto o de un módulo bajo él ('scraper.<nombre>')"""
+    if not nombre or nombre == PROYECTO:
+        return logger
+    if nombre.startswith(PROYECTO + '.'):
+        return logging.getLogger(nombre)
+    return logging.getLogger(f'{PROYECTO}.{nombre}')
@@ -1,5 +1,8 @@
 """
 Script principal para ejecutar el scraper de inmobiliarias
+
+Complemento opcional: el directorio principal sale del crawl de inmuebles
+(directorio_inmobiliarias.py); lo extraído aquí se suma a ese directorio
 """
 import time
 from config import BASE_URL
@@ -7,6 +10,7 @@ from logger_config import get_logger
 from browser_manager import BrowserManager
 from extractor import InmobiliariaExtractor
 from data_saver import DataSaver
+from directorio_inmobiliarias import DIRECTORIO_DEFAULT, complementar
 
 logger = get_logger()
 
@@ -42,6 +46,7 @@ def main():
             # Guardar datos
             saver = DataSaver()
             filepath = saver.save_data(inmobiliarias)
+            logger.info(f"{complementar(inmobiliarias)} inmobiliarias sumadas a {DIRECTORIO_DEFAULT}")
             
             # Mostrar resumen
             summary = saver.get_summary(inmobiliarias)
@@ -67,4 +72,6 @@ def main():
         logger.info("Script finalizado")
 
 if __name__ == "__main__":
+    from logger_config import configurar_logging
+    configurar_logging()
     main()
@@ -111,4 +111,6 @@ def main():
         logger.info("Script finalizado")
 
 if __name__ == "__main__":
+    from logger_config import configurar_logging
+    configurar_logging()
     main()
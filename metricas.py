@@ -0,0 +1,286 @@
+"""
+metricas.py - Instrumentación por fase del camino caliente de los crawlers
+
+Mide por separado cada fase del procesamiento de una URL:
+    driver -> navegacion -> espera -> transferencia -> parseo -> normalizacion -> persistencia
+
+Los tiempos se agregan en histogramas por worker (pid + thread) y se exponen:
+- En texto Prometheus vía un endpoint HTTP local (/metrics)
+- Como resumen JSON periódico en disco (y en /resumen.json)
+
+Uso:
+    from metricas import get_registro
+    registro = get_registro()
+    with registro.fase('navegacion'):
+        driver.get(url)
+    registro.iniciar_servidor(9100)
+    registro.iniciar_resumen_periodico('resultados/metricas.json', 60)
+"""
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Límites superiores (segundos) de los buckets de los histogramas
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120]
+
+FASES = ['driver', 'navegacion', 'espera', 'transferencia', 'parseo', 'normalizacion', 'persistencia']
+
+
+class Histograma:
+    """Histograma acumulativo de buckets fijos (compatible con Prometheus)"""
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = buckets or BUCKETS
+        self.conteos = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.suma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, valor: float):
+        self.conteos[bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+        self.maximo = max(self.maximo, valor)
+
+    def fusionar(self, otro: 'Histograma'):
+        for i, c in enumerate(otro.conteos):
+            self.conteos[i] += c
+        self.suma += otro.suma
+        self.total += otro.total
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def cuantil(self, q: float) -> Optional[float]:
+        """Estimación del cuantil por interpolación lineal dentro del bucket"""
+        if not self.total:
+            return None
+        objetivo = q * self.total
+        acumulado = 0
+        for i, c in enumerate(self.conteos):
+            if acumulado + c >= objetivo and c:
+                superior = min(self.buckets[i], self.maximo) if i < len(self.buckets) else self.maximo
+                inferior = min(self.buckets[i - 1], superior) if i > 0 else 0.0
+                return inferior + (superior - inferior) * ((objetivo - acumulado) / c)
+            acumulado += c
+        return self.maximo
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'conteo': self.total,
+            'suma_s': round(self.suma, 4),
+            'promedio_s': round(self.suma / self.total, 4) if self.total else None,
+            'p50_s': _redondear(self.cuantil(0.5)),
+            'p95_s': _redondear(self.cuantil(0.95)),
+            'p99_s': _redondear(self.cuantil(0.99)),
+            'max_s': round(self.maximo, 4),
+        }
+
+
+def _redondear(valor: Optional[float]) -> Optional[float]:
+    return round(valor, 4) if valor is not None else None
+
+
+def _worker_actual() -> str:
+    return f"{os.getpid()}-{threading.current_thread().name}"
+
+
+class RegistroMetricas:
+    """Registro de histogramas por (fase, worker), contadores y gauges"""
+
+    def __init__(self, prefijo: str = 'crawler'):
+        self.prefijo = prefijo
+        self.lock = threading.Lock()
+        self.histogramas: Dict[Tuple[str, str], Histograma] = {}
+        self.contadores: Dict[str, float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        # Latencias de punta a punta (no son fases: no suman al porcentaje de tiempo)
+        self.latencias: Dict[str, Histograma] = {}
+        self.inicio = time.time()
+        self._servidor = None
+
+    # ------------------------------------------------------------------
+    # Registro de observaciones
+    # ------------------------------------------------------------------
+    def observar(self, fase: str, segundos: float, worker: Optional[str] = None):
+        clave = (fase, worker or _worker_actual())
+        with self.lock:
+            hist = self.histogramas.get(clave)
+            if hist is None:
+                hist = self.histogramas[clave] = Histograma()
+            hist.observar(segundos)
+
+    @contextmanager
+    def fase(self, nombre: str, worker: Optional[str] = None):
+        """Mide la duración del bloque como una observación de la fase"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, worker)
+
+    def observar_latencia(self, nombre: str, segundos: float):
+        """Ej: 'hasta_extraccion' = desde el inicio de la navegación hasta tener __NEXT_DATA__"""
+        with self.lock:
+            hist = self.latencias.get(nombre)
+            if hist is None:
+                hist = self.latencias[nombre] = Histograma()
+            hist.observar(segundos)
+
+    def incrementar(self, nombre: str, valor: float = 1):
+        with self.lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+
+    def gauge(self, nombre: str, funcion: Callable[[], float]):
+        """Registra un valor que se lee en el momento de exponer (ej: tasa actual)"""
+        with self.lock:
+            self.gauges[nombre] = funcion
+
+    # ------------------------------------------------------------------
+    # Exposición
+    # ------------------------------------------------------------------
+    def _leer_gauges(self) -> Dict[str, float]:
+        valores = {}
+        for nombre, funcion in list(self.gauges.items()):
+            try:
+                valores[nombre] = float(funcion())
+            except Exception:
+                continue
+        return valores
+
+    def prometheus_texto(self) -> str:
+        """Formato de exposición de texto de Prometheus"""
+        p = self.prefijo
+        lineas = [
+            f'# HELP {p}_fase_segundos Duración de cada fase del procesamiento de una URL',
+            f'# TYPE {p}_fase_segundos histogram',
+        ]
+        with self.lock:
+            items = sorted(self.histogramas.items())
+            latencias = sorted(self.latencias.items())
+            contadores = dict(self.contadores)
+        for (fase, worker), hist in items:
+            etiquetas = f'fase="{fase}",worker="{worker}"'
+            acumulado = 0
+            for limite, c in zip(self.buckets_con_inf(), hist.conteos):
+                acumulado += c
+                lineas.append(f'{p}_fase_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'{p}_fase_segundos_sum{{{etiquetas}}} {hist.suma:.6f}')
+            lineas.append(f'{p}_fase_segundos_count{{{etiquetas}}} {hist.total}')
+        if latencias:
+            lineas.append(f'# TYPE {p}_latencia_segundos histogram')
+        for nombre, hist in latencias:
+            acumulado = 0
+            for limite, c in zip(self.buckets_con_inf(), hist.conteos):
+                acumulado += c
+                lineas.append(f'{p}_latencia_segundos_bucket{{nombre="{nombre}",le="{limite}"}} {acumulado}')
+            lineas.append(f'{p}_latencia_segundos_sum{{nombre="{nombre}"}} {hist.suma:.6f}')
+            lineas.append(f'{p}_latencia_segundos_count{{nombre="{nombre}"}} {hist.total}')
+        for nombre, valor in sorted(contadores.items()):
+            lineas.append(f'# TYPE {p}_{nombre}_total counter')
+            lineas.append(f'{p}_{nombre}_total {valor}')
+        for nombre, valor in sorted(self._leer_gauges().items()):
+            lineas.append(f'# TYPE {p}_{nombre} gauge')
+            lineas.append(f'{p}_{nombre} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+    @staticmethod
+    def buckets_con_inf() -> List[str]:
+        return [str(b) for b in BUCKETS] + ['+Inf']
+
+    def resumen(self) -> Dict[str, Any]:
+        """Resumen JSON: por fase (todos los workers) y por worker"""
+        with self.lock:
+            items = list(self.histogramas.items())
+            latencias = {nombre: hist.resumen() for nombre, hist in self.latencias.items()}
+            contadores = dict(self.contadores)
+        por_fase: Dict[str, Histograma] = {}
+        por_worker: Dict[str, Dict[str, Any]] = {}
+        for (fase, worker), hist in items:
+            por_fase.setdefault(fase, Histograma()).fusionar(hist)
+            por_worker.setdefault(worker, {})[fase] = hist.resumen()
+
+        total_s = sum(h.suma for h in por_fase.values())
+        fases = {}
+        for fase in sorted(por_fase, key=lambda f: FASES.index(f) if f in FASES else len(FASES)):
+            datos = por_fase[fase].resumen()
+            datos['porcentaje_tiempo'] = round(100 * por_fase[fase].suma / total_s, 1) if total_s else 0.0
+            fases[fase] = datos
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'uptime_s': round(time.time() - self.inicio, 1),
+            'fases': fases,
+            'latencias': latencias,
+            'por_worker': por_worker,
+            'contadores': contadores,
+            'gauges': self._leer_gauges(),
+        }
+
+    def guardar_resumen(self, ruta: str):
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, ruta)
+
+    def iniciar_resumen_periodico(self, ruta: str, intervalo: float = 60) -> threading.Thread:
+        """Escribe el resumen JSON cada `intervalo` segundos en un thread daemon"""
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+
+        def bucle():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    self.guardar_resumen(ruta)
+                except Exception as e:
+                    print(f"  ⚠️ Error guardando resumen de métricas: {e}")
+
+        hilo = threading.Thread(target=bucle, name='metricas-resumen', daemon=True)
+        hilo.start()
+        return hilo
+
+    def iniciar_servidor(self, puerto: int, host: str = '127.0.0.1'):
+        """Sirve /metrics (Prometheus) y /resumen.json en un thread daemon"""
+        registro = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics'):
+                    cuerpo = registro.prometheus_texto().encode('utf-8')
+                    tipo = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path.startswith('/resumen'):
+                    cuerpo = json.dumps(registro.resumen(), ensure_ascii=False).encode('utf-8')
+                    tipo = 'application/json; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass  # Sin ruido en consola por cada scrape
+
+        self._servidor = ThreadingHTTPServer((host, puerto), _Handler)
+        threading.Thread(target=self._servidor.serve_forever, name='metricas-http', daemon=True).start()
+        print(f"  📈 Métricas en http://{host}:{puerto}/metrics")
+        return self._servidor
+
+    def detener_servidor(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor = None
+
+
+_registro = RegistroMetricas()
+
+
+def get_registro() -> RegistroMetricas:
+    return _registro
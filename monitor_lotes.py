@@ -1,5 +1,5 @@
 """
-Monitor de progreso en tiempo real para los 15 lotes
+Monitor de progreso en tiempo real de los lotes (número según shards.json)
 """
 import os
 import json
@@ -7,13 +7,17 @@ from pathlib import Path
 from datetime import datetime
 import time
 
+from frontera import leer_num_shards
+from config import LOTES_NUM_SHARDS
+
 LOTES_DIR = "resultados/lotes"
 
 def show_progress():
     """Muestra el progreso actualizado de todos los lotes"""
     print("\n" * 2)
     print("="*100)
-    print("MONITOR DE PROGRESO - LOTES 1-15")
+    num_lotes = leer_num_shards(LOTES_DIR, LOTES_NUM_SHARDS)
+    print(f"MONITOR DE PROGRESO - LOTES 1-{num_lotes}")
     print("="*100)
     print(f"Actualizado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
@@ -22,7 +26,7 @@ def show_progress():
     total_fallidas = 0
     total_procesadas = 0
     
-    for lote_num in range(1, 16):
+    for lote_num in range(1, num_lotes + 1):
         lote_dir = os.path.join(LOTES_DIR, f'lote_{lote_num:02d}')
         
         # Buscar JSON más reciente
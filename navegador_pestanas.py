@@ -0,0 +1,380 @@
+"""
+navegador_pestanas.py - Varias pestañas concurrentes dentro de un solo Chrome
+
+Cada PropertyCrawlerSelenium tiene un Chrome con una sola pestaña y procesa
+URLs en secuencia: diez lotes en paralelo son diez navegadores completos. Aquí
+un único navegador (propio, o uno ya abierto vía CHROME_REMOTE_DEBUGGING_PORT)
+maneja N pestañas a la vez:
+
+- pageLoadStrategy 'none': navegar no bloquea, las N páginas cargan en paralelo
+  dentro del mismo proceso de Chrome
+- Un thread despachador es el único que habla con chromedriver (la sesión
+  WebDriver no es thread-safe): asigna cada URL a la primera pestaña libre y
+  recorre las pestañas ocupadas con la sonda de clasificador_paginas
+- Apenas una pestaña tiene __NEXT_DATA__ se lee solo ese texto (no page_source),
+  se detiene la carga y la pestaña queda libre
+- Una pestaña caída ('tab crashed', ventana cerrada) se cierra y se reabre; su
+  URL se reporta como fallida para que el runner la reintente
+- Si el navegador entero deja de responder se relanza; tras `max_reinicios`
+  intentos fallidos seguidos se fallan las URLs encoladas y el despachador termina
+
+obtener() es bloqueante y thread-safe, así que encaja como etapa de fetch de
+PipelineCrawl con un worker por pestaña.
+
+Uso:
+    navegador = NavegadorPestanas(pestanas=6, opciones=crawler.crear_opciones())
+    clase, texto = navegador.obtener(url)      # texto de __NEXT_DATA__ si clase == NORMAL
+    navegador.cerrar()
+"""
+import time
+import queue
+import threading
+from typing import List, Optional, Tuple
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+
+from clasificador_paginas import (
+    NORMAL, ERROR, CARGANDO, SONDA_JS,
+    clasificar_sonda, marcar_documento_anterior, detener_carga,
+)
+from metricas import get_registro
+from vigilante_driver import URLVencida, cerrar_driver, matar_driver
+
+
+NEXT_DATA_JS = "var nd = document.getElementById('__NEXT_DATA__'); return nd ? nd.textContent : null;"
+
+# Mensajes de chromedriver que indican que la pestaña (no el navegador) murió
+MARCADORES_PESTANA_CAIDA = ('tab crashed', 'no such window', 'target window already closed',
+                            'web view not found', 'target frame detached')
+
+
+class PestanaCaida(Exception):
+    """La pestaña dejó de responder o fue cerrada; se reabre otra en su lugar"""
+
+
+class _Tarea:
+    __slots__ = ('url', 'evento', 'clase', 'texto', 'error', 'inicio')
+
+    def __init__(self, url: str):
+        self.url = url
+        self.evento = threading.Event()
+        self.clase: Optional[str] = None
+        self.texto: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self.inicio = 0.0
+
+
+class _Pestana:
+    __slots__ = ('handle', 'tarea')
+
+    def __init__(self, handle: str):
+        self.handle = handle
+        self.tarea: Optional[_Tarea] = None
+
+
+class NavegadorPestanas:
+    """Un Chrome, N pestañas, un thread despachador"""
+
+    def __init__(self, pestanas: int = 4, opciones: Optional[Options] = None,
+                 puerto_depuracion: Optional[int] = None, max_wait: float = 30,
+                 intervalo_sondeo: float = 0.1, max_reinicios: int = 3, pausa_reinicio: float = 5):
+        """
+        Args:
+            pestanas: pestañas concurrentes
+            opciones: Options de Chrome (ej: PropertyCrawlerSelenium.crear_opciones())
+            puerto_depuracion: conectarse a un Chrome ya abierto con
+                --remote-debugging-port en vez de lanzar uno
+            max_wait: segundos por URL antes de darla por fallida
+            intervalo_sondeo: pausa del despachador cuando ninguna pestaña avanzó
+            max_reinicios: intentos seguidos de relanzar Chrome antes de rendirse
+            pausa_reinicio: segundos entre intentos de relanzar Chrome
+        """
+        self.cantidad = max(1, pestanas)
+        self.opciones = opciones or Options()
+        self.puerto_depuracion = puerto_depuracion
+        self.max_wait = max_wait
+        self.intervalo_sondeo = intervalo_sondeo
+        self.max_reinicios = max(1, max_reinicios)
+        self.pausa_reinicio = pausa_reinicio
+        self._reinicios_fallidos = 0
+        self.metricas = get_registro()
+        self.cola: 'queue.Queue[_Tarea]' = queue.Queue()
+        self.lock = threading.Lock()
+        self.driver = None
+        self.pestanas: List[_Pestana] = []
+        self._cerrado = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._siguiente: Optional[_Tarea] = None  # Tarea ya sacada de la cola, sin pestaña aún
+        self.stats = {'completadas': 0, 'fallidas': 0, 'vencidas': 0, 'pestanas_caidas': 0,
+                      'navegador_reiniciado': 0}
+        self.metricas.gauge('pestanas_ocupadas', self.ocupadas)
+
+    # ------------------------------------------------------------------
+    # API (thread-safe)
+    # ------------------------------------------------------------------
+    def ocupadas(self) -> int:
+        return sum(1 for p in self.pestanas if p.tarea is not None)
+
+    def obtener(self, url: str, timeout: Optional[float] = None) -> Tuple[str, Optional[str]]:
+        """
+        Carga la URL en la próxima pestaña libre.
+
+        Returns:
+            (clase, texto de __NEXT_DATA__ o None). Lanza la excepción de la
+            pestaña si se cayó, para que el runner reintente la URL.
+        """
+        tarea = _Tarea(url)
+        self._encolar(tarea)
+        # Margen sobre max_wait: la URL puede esperar turno detrás de otras pestañas
+        if not tarea.evento.wait(timeout or self.max_wait * 2 + 30):
+            # El despachador está colgado en una llamada a chromedriver: terminar el
+            # navegador lo destraba (falla la llamada y relanza Chrome)
+            driver = self.driver
+            if driver is not None:
+                matar_driver(driver)
+            raise URLVencida(f"Sin respuesta del despachador para {url}")
+        if tarea.error is not None:
+            raise tarea.error
+        return tarea.clase, tarea.texto
+
+    def cerrar(self):
+        self._cerrado.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=30)
+            self._hilo = None
+        self._cerrar_driver()
+
+    # ------------------------------------------------------------------
+    # Navegador y pestañas (solo desde el thread despachador)
+    # ------------------------------------------------------------------
+    def _encolar(self, tarea: _Tarea):
+        # Bajo el lock: una tarea nunca queda en la cola de un despachador que ya terminó
+        with self.lock:
+            if self._hilo is None:
+                self._cerrado.clear()
+                self._hilo = threading.Thread(target=self._despachar, name='pestanas-despachador', daemon=True)
+                self._hilo.start()
+            self.cola.put(tarea)
+
+    def _finalizar_despachador(self, error: Exception):
+        with self.lock:
+            self._hilo = None
+            self._fallar_pendientes(error)
+
+    def _lanzar_chrome(self, opciones: Options):
+        return webdriver.Chrome(options=opciones)
+
+    def _iniciar_driver(self):
+        if self.puerto_depuracion:
+            # Chrome ya lanzado: chromedriver rechaza argumentos/prefs al conectarse
+            opciones = Options()
+            opciones.add_experimental_option('debuggerAddress', f'127.0.0.1:{self.puerto_depuracion}')
+        else:
+            opciones = self.opciones
+        # Sin esperar el evento load: el despachador decide cuándo la página sirve
+        opciones.page_load_strategy = 'none'
+        with self.metricas.fase('driver'):
+            self.driver = self._lanzar_chrome(opciones)
+        # En un Chrome ajeno se usan pestañas nuevas y no se tocan las del usuario
+        base = None if self.puerto_depuracion else self.driver.current_window_handle
+        self.pestanas = [_Pestana(base)] if base else []
+        while len(self.pestanas) < self.cantidad:
+            self.pestanas.append(_Pestana(self._abrir_pestana()))
+
+    def _cerrar_driver(self):
+        if self.driver is None:
+            return
+        try:
+            if self.puerto_depuracion:
+                # Chrome ajeno: cerrar solo nuestras pestañas y desconectarse
+                for pestana in self.pestanas:
+                    try:
+                        self.driver.switch_to.window(pestana.handle)
+                        self.driver.close()
+                    except WebDriverException:
+                        pass
+        except Exception:
+            pass
+        cerrar_driver(self.driver)
+        self.driver = None
+        self.pestanas = []
+
+    def _abrir_pestana(self) -> str:
+        self.driver.switch_to.new_window('tab')
+        handle = self.driver.current_window_handle
+        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return handle
+
+    def _reabrir(self, pestana: _Pestana):
+        """Cierra la pestaña caída y abre otra en su lugar"""
+        self.stats['pestanas_caidas'] += 1
+        self.metricas.incrementar('pestanas_caidas')
+        try:
+            self.driver.switch_to.window(pestana.handle)
+            self.driver.close()
+        except WebDriverException:
+            pass
+        # La pestaña nueva se abre desde una que siga viva (la caída ya no es un contexto válido)
+        try:
+            self.driver.switch_to.window(self.driver.window_handles[0])
+        except (WebDriverException, IndexError):
+            pass
+        pestana.handle = self._abrir_pestana()
+
+    def _reiniciar_navegador(self, error: Exception) -> bool:
+        """
+        El navegador completo dejó de responder: fallan las URLs en curso y se relanza
+
+        Returns:
+            False si se agotaron los intentos de relanzarlo
+        """
+        print(f"  ✗ Navegador sin respuesta ({str(error)[:80]}), reiniciando...")
+        self.stats['navegador_reiniciado'] += 1
+        for pestana in self.pestanas:
+            if pestana.tarea is not None:
+                self._terminar(pestana, error=PestanaCaida(str(error)[:200]))
+        self._cerrar_driver()
+        try:
+            self._iniciar_driver()
+            self._reinicios_fallidos = 0
+            return True
+        except Exception as e:
+            self._reinicios_fallidos += 1
+            print(f"  ✗ No se pudo relanzar Chrome ({self._reinicios_fallidos}/{self.max_reinicios}): {e}")
+            self.driver = None
+            if self._reinicios_fallidos >= self.max_reinicios:
+                return False
+            time.sleep(self.pausa_reinicio)
+            return True
+
+    @staticmethod
+    def _es_caida(error: Exception) -> bool:
+        texto = str(error).lower()
+        return any(m in texto for m in MARCADORES_PESTANA_CAIDA)
+
+    # ------------------------------------------------------------------
+    # Despachador
+    # ------------------------------------------------------------------
+    def _terminar(self, pestana: _Pestana, clase: Optional[str] = None, texto: Optional[str] = None,
+                  error: Optional[Exception] = None):
+        tarea = pestana.tarea
+        pestana.tarea = None
+        tarea.clase, tarea.texto, tarea.error = clase, texto, error
+        self.stats['completadas' if error is None and clase == NORMAL else 'fallidas'] += 1
+        tarea.evento.set()
+
+    def _navegar(self, pestana: _Pestana, tarea: _Tarea):
+        pestana.tarea = tarea
+        tarea.inicio = time.perf_counter()
+        with self.metricas.fase('navegacion'):
+            self.driver.switch_to.window(pestana.handle)
+            # Sin la marca, la sonda podría leer el documento de la URL anterior de la pestaña
+            marcar_documento_anterior(self.driver)
+            self.driver.get(tarea.url)  # Retorna de inmediato con pageLoadStrategy 'none'
+
+    def _sondear(self, pestana: _Pestana) -> bool:
+        """Revisa una pestaña ocupada; True si terminó su URL"""
+        tarea = pestana.tarea
+        try:
+            self.driver.switch_to.window(pestana.handle)
+            clase = clasificar_sonda(self.driver.execute_script(SONDA_JS) or {})
+        except WebDriverException as e:
+            if self._es_caida(e):
+                raise PestanaCaida(str(e)[:200]) from e
+            clase = CARGANDO  # El documento todavía se está reemplazando
+        espera = time.perf_counter() - tarea.inicio
+        if clase == CARGANDO:
+            if espera < self.max_wait:
+                return False
+            self.stats['vencidas'] += 1
+            clase = ERROR
+        self.metricas.observar('espera', espera)
+        self.metricas.incrementar(f'paginas_{clase}')
+
+        texto = None
+        if clase == NORMAL:
+            with self.metricas.fase('transferencia'):
+                texto = self.driver.execute_script(NEXT_DATA_JS)
+            self.metricas.observar_latencia('hasta_extraccion', time.perf_counter() - tarea.inicio)
+        # Lo que sigue cargando (imágenes, mapas, scripts de terceros) ya no sirve
+        detener_carga(self.driver)
+        self._terminar(pestana, clase, texto)
+        return True
+
+    def _tomar(self, timeout: Optional[float] = None) -> Optional[_Tarea]:
+        tarea, self._siguiente = self._siguiente, None
+        if tarea is None:
+            try:
+                tarea = self.cola.get(timeout=timeout) if timeout else self.cola.get_nowait()
+            except queue.Empty:
+                return None
+        return tarea
+
+    def _fallar_pendientes(self, error: Exception):
+        while True:
+            tarea = self._tomar()
+            if tarea is None:
+                return
+            tarea.error = error
+            tarea.evento.set()
+
+    def _despachar(self):
+        try:
+            self._iniciar_driver()
+        except Exception as e:
+            # Sin navegador: fallar todo lo encolado en vez de colgar a los workers
+            print(f"  ✗ No se pudo iniciar Chrome para pestañas: {e}")
+            self._finalizar_despachador(e)
+            return
+
+        while not self._cerrado.is_set() or any(p.tarea for p in self.pestanas):
+            if self.driver is None:
+                if not self._reiniciar_navegador(PestanaCaida('navegador no disponible')):
+                    break
+                continue
+            avanzo = False
+            try:
+                # 1) Asignar URLs a pestañas libres
+                for pestana in self.pestanas:
+                    if pestana.tarea is None:
+                        tarea = self._tomar()
+                        if tarea is None:
+                            break
+                        try:
+                            self._navegar(pestana, tarea)
+                        except WebDriverException as e:
+                            if not self._es_caida(e):
+                                raise
+                            self._terminar(pestana, error=PestanaCaida(str(e)[:200]))
+                            self._reabrir(pestana)
+                        avanzo = True
+
+                # 2) Sondear las ocupadas
+                for pestana in self.pestanas:
+                    if pestana.tarea is None:
+                        continue
+                    try:
+                        avanzo = self._sondear(pestana) or avanzo
+                    except PestanaCaida as e:
+                        self._terminar(pestana, error=e)
+                        self._reabrir(pestana)
+                        avanzo = True
+            except WebDriverException as e:
+                if not self._reiniciar_navegador(e):
+                    break
+                continue
+
+            if not any(p.tarea for p in self.pestanas):
+                # Todo libre: bloquear hasta la próxima URL en vez de girar
+                self._siguiente = self._tomar(timeout=0.5)
+            elif not avanzo:
+                time.sleep(self.intervalo_sondeo)
+
+        if self.driver is None and not self._cerrado.is_set():
+            print(f"  ✗ Chrome no se pudo relanzar tras {self.max_reinicios} intentos, fallando URLs encoladas")
+            self._reinicios_fallidos = 0
+            self._finalizar_despachador(PestanaCaida('no se pudo relanzar el navegador'))
+            return
+        self._fallar_pendientes(PestanaCaida('navegador cerrado'))
@@ -0,0 +1,235 @@
+"""
+nodo_crawl.py - Nodo de crawl que toma rangos de URLs del coordinador
+
+Cada nodo (una PC, una laptop agregada a mitad de corrida) pide un rango al
+coordinador, lo crawlea con el pipeline de procesar_lote.py y devuelve
+resultados y fallos al coordinador; no hay Excel que copiar entre máquinas.
+
+- Un thread de latidos extiende el arriendo cada plazo/3 segundos; si el
+  coordinador ya lo re-emitió (el nodo estuvo colgado o sin red), el nodo
+  corta el rango y pide otro
+- Los resultados se reportan por lote del escritor del pipeline; si el
+  coordinador no responde quedan en un buffer y se reenvían en el siguiente
+  lote. Todo se respalda además en resultados/nodos/<nodo>.jsonl
+- Sin rangos disponibles, el nodo espera y vuelve a preguntar hasta que la
+  frontera esté terminada (rangos de nodos muertos se re-emiten solos)
+
+Uso:
+    python nodo_crawl.py --coordinador http://192.168.0.10:8766
+    python nodo_crawl.py --coordinador resultados/coordinador.db --nodo laptop-1
+"""
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+from datetime import datetime
+from typing import Any, Dict, List
+
+from property_crawler_selenium import PropertyCrawlerSelenium, _formatear_salida_final
+from clasificador_paginas import CHALLENGE, ESTRATEGIAS_CARGA, MonitorBloqueos
+from control_tasa import ControladorTasa
+from pipeline import PipelineCrawl
+from vigilante_driver import VigilanteDriver
+from errores_crawl import DRIVER_CAIDO, ColaReintentos, clasificar_error
+from coordinador import conectar
+from directorio_inmobiliarias import DirectorioInmobiliarias
+from config import COORDINADOR_URL, COORDINADOR_PLAZO_ARRIENDO, DRIVER_PLAZO_URL, CHROME_ESTRATEGIA_CARGA
+
+
+NODOS_DIR = os.path.join('resultados', 'nodos')
+
+CONFIG_NODO = {
+    'plazo_arriendo': COORDINADOR_PLAZO_ARRIENDO,  # Segundos de vida del arriendo sin latidos
+    'espera_sin_trabajo': 30,  # Segundos entre consultas cuando no hay rangos disponibles
+    'headless': True,
+    'estrategia_carga': CHROME_ESTRATEGIA_CARGA,  # 'normal' | 'eager' | 'none' (ver PropertyCrawlerSelenium)
+}
+
+
+class LatidoArriendo:
+    """Thread que mantiene vivo un arriendo; avisa con `al_perder` si fue re-emitido"""
+
+    def __init__(self, coordinador, nodo: str, arriendo: Dict[str, Any], al_perder):
+        self.coordinador = coordinador
+        self.nodo = nodo
+        self.arriendo = arriendo
+        self.al_perder = al_perder
+        self.perdido = False
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name='latido-arriendo', daemon=True)
+
+    def __enter__(self) -> 'LatidoArriendo':
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        return False
+
+    def _bucle(self):
+        intervalo = max(1.0, self.arriendo['plazo'] / 3)
+        while not self._fin.wait(intervalo):
+            try:
+                vigente = self.coordinador.latido(self.nodo, self.arriendo['rango'], self.arriendo['token'],
+                                                  self.arriendo['plazo'])
+            except OSError as e:
+                # Sin red: se reintenta en el próximo latido (el arriendo aguanta `plazo`)
+                print(f"  ⚠ Latido fallido: {e}")
+                continue
+            if not vigente:
+                self.perdido = True
+                print(f"  ⚠ Arriendo del rango {self.arriendo['rango']} re-emitido a otro nodo, cortando")
+                self.al_perder()
+                return
+
+
+def ejecutar_nodo(coordinador, nodo: str, config: Dict = None, crawler=None) -> Dict[str, int]:
+    """
+    Pide rangos al coordinador y los crawlea hasta que no quede trabajo.
+    `crawler` permite inyectar un PropertyCrawlerSelenium ya creado (lo cierra quien lo creó);
+    por defecto el nodo abre su propio Chrome.
+    """
+    config = {**CONFIG_NODO, **(config or {})}
+    os.makedirs(NODOS_DIR, exist_ok=True)
+    respaldo_file = os.path.join(NODOS_DIR, f'{nodo}.jsonl')
+
+    directorio = None
+    propio = crawler is None
+    if propio:
+        directorio = DirectorioInmobiliarias()
+        crawler = PropertyCrawlerSelenium(headless=config['headless'], monitor_bloqueos=MonitorBloqueos(),
+                                          directorio=directorio, estrategia_carga=config['estrategia_carga'])
+    controlador = ControladorTasa(os.path.join(NODOS_DIR, 'tasa_global.json'))
+    vigilante = VigilanteDriver(DRIVER_PLAZO_URL)
+    stats = {'rangos': 0, 'rangos_perdidos': 0, 'exitosas': 0, 'fallidas': 0}
+    sin_reportar: List[Dict[str, Any]] = []  # Items que el coordinador todavía no recibió
+
+    def obtener(url, _recurso):
+        controlador.esperar_turno()
+        inicio_url = time.time()
+        try:
+            html = vigilante.ejecutar(url, lambda: crawler.driver, lambda: crawler.obtener_html(url, lanzar=True))
+        except Exception as e:
+            controlador.reportar(time.time() - inicio_url, challenge=crawler.ultima_clase == CHALLENGE, exito=False)
+            if clasificar_error(e) == DRIVER_CAIDO:
+                crawler.reiniciar_driver()
+            raise
+        controlador.reportar(time.time() - inicio_url, exito=html is not None)
+        return html
+
+    def parsear(url, html):
+        datos_raw = crawler.parsear_html(html, url)
+        return _formatear_salida_final(datos_raw) if datos_raw else None
+
+    def enviar(arriendo):
+        """Reporta lo acumulado; si el coordinador no responde, queda para el próximo intento"""
+        if not sin_reportar:
+            return True
+        try:
+            coordinador.reportar(nodo, arriendo['rango'], arriendo['token'], list(sin_reportar))
+        except OSError as e:
+            print(f"  ⚠ Coordinador sin respuesta ({e}); {len(sin_reportar)} resultados en espera")
+            return False
+        sin_reportar.clear()
+        return True
+
+    try:
+        while True:
+            try:
+                arriendo = coordinador.arrendar(nodo, config['plazo_arriendo'])
+            except OSError as e:
+                print(f"  ⚠ Coordinador sin respuesta ({e}), reintentando en {config['espera_sin_trabajo']}s")
+                time.sleep(config['espera_sin_trabajo'])
+                continue
+            if arriendo is None:
+                try:
+                    estado = coordinador.estado()
+                except OSError:
+                    estado = {'terminado': False, 'rangos': {'arrendado': '?'}}
+                if estado['terminado']:
+                    print("\n✓ Frontera terminada, no queda trabajo")
+                    break
+                print(f"  ⏸ Sin rangos disponibles ({estado['rangos']['arrendado']} arrendados a otros nodos), "
+                      f"esperando {config['espera_sin_trabajo']}s")
+                time.sleep(config['espera_sin_trabajo'])
+                continue
+
+            stats['rangos'] += 1
+            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Rango {arriendo['rango']}: "
+                  f"{len(arriendo['urls']):,} URLs (arriendo {arriendo['plazo']:.0f}s)")
+
+            def persistir(lote, arriendo=arriendo):
+                items = []
+                for url, registro, error in lote:
+                    if error is None:
+                        items.append({'url': url, 'registro': registro})
+                        stats['exitosas'] += 1
+                    else:
+                        items.append({'url': url, 'clase': clasificar_error(error), 'error': str(error)[:200]})
+                        stats['fallidas'] += 1
+                with open(respaldo_file, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(item, ensure_ascii=False) + '\n' for item in items)
+                sin_reportar.extend(items)
+                enviar(arriendo)
+                print(f"  ✓{stats['exitosas']:,} | ✗{stats['fallidas']:,} | sin reportar {len(sin_reportar)}")
+
+            pipeline = PipelineCrawl(obtener, parsear, persistir, workers_fetch=1,
+                                     workers_parseo=2, max_crudos=10, lote_escritura=25,
+                                     cola_reintentos=ColaReintentos(), nombre='nodo')
+            with LatidoArriendo(coordinador, nodo, arriendo, pipeline.detener) as latido:
+                pipeline.procesar(arriendo['urls'])
+
+            for _ in range(5):
+                if enviar(arriendo):
+                    break
+                time.sleep(config['espera_sin_trabajo'])
+            if latido.perdido:
+                stats['rangos_perdidos'] += 1
+                continue
+            try:
+                print(f"  Rango {arriendo['rango']}: {coordinador.liberar(nodo, arriendo['rango'], arriendo['token'])}")
+            except OSError as e:
+                print(f"  ⚠ No se pudo liberar el rango ({e}); se re-emitirá al vencer el arriendo")
+
+    except KeyboardInterrupt:
+        print("\n⚠ Nodo detenido: su arriendo vence solo y el rango vuelve a la cola")
+
+    finally:
+        if propio:
+            crawler.close()
+            directorio.cerrar()
+        if sin_reportar:
+            print(f"⚠ {len(sin_reportar)} resultados sin reportar (respaldo en {respaldo_file})")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nodo de crawl que toma rangos de URLs del coordinador')
+    parser.add_argument('--coordinador', default=COORDINADOR_URL or None, required=not COORDINADOR_URL,
+                        help='http://host:puerto del coordinador o ruta a su base SQLite')
+    parser.add_argument('--nodo', default=f"{socket.gethostname()}-{os.getpid()}", help='Nombre de este nodo')
+    parser.add_argument('--plazo', type=int, default=CONFIG_NODO['plazo_arriendo'],
+                        help='Segundos de vida del arriendo sin latidos')
+    parser.add_argument('--visible', action='store_true', help='Chrome con interfaz (sin headless)')
+    parser.add_argument('--estrategia-carga', choices=ESTRATEGIAS_CARGA, default=CONFIG_NODO['estrategia_carga'],
+                        help="pageLoadStrategy de Chrome ('none' = no esperar el evento load completo)")
+    args = parser.parse_args()
+
+    print("="*80)
+    print(f"NODO {args.nodo} -> {args.coordinador}")
+    print("="*80)
+    inicio = time.time()
+    stats = ejecutar_nodo(conectar(args.coordinador), args.nodo,
+                          {'plazo_arriendo': args.plazo, 'headless': not args.visible,
+                           'estrategia_carga': args.estrategia_carga})
+    print(f"\nRangos: {stats['rangos']} (perdidos: {stats['rangos_perdidos']})")
+    print(f"Exitosas: {stats['exitosas']:,} | Fallidas: {stats['fallidas']:,}")
+    print(f"Tiempo total: {(time.time() - inicio)/60:.1f} minutos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+pipeline.py - Pipeline desacoplado fetch -> parseo -> persistencia con colas acotadas
+
+En los runners un mismo worker navegaba, esperaba, parseaba, formateaba y
+escribía a disco en secuencia: el navegador quedaba ocioso durante el parseo y
+la escritura, y la CPU ociosa durante la navegación. Aquí cada etapa corre en
+sus propios threads:
+
+    workers fetch (1 navegador c/u) --[cola crudos]--> pool de parseo --[cola registros]--> escritor único
+
+Las colas son acotadas: si el parseo o la escritura se atrasan, los workers de
+fetch se bloquean al entregar (backpressure) en vez de acumular páginas en RAM.
+La profundidad de cada cola se expone como gauge en metricas.py
+(`<nombre>_cola_crudos`, `<nombre>_cola_registros`) y en `profundidades()`.
+
+Si `obtener` lanza ReintentarURL (ej: vigilante_driver mató un navegador
+colgado), el worker descarta su recurso, crea uno nuevo y la URL vuelve a la
+cola hasta `max_reintentos` veces.
+
+Con `cola_reintentos` (errores_crawl.ColaReintentos) cada fallo se clasifica
+(removido, bloqueado, timeout, driver caído, parseo) y se aplica la política
+de su clase: las URLs reintentables quedan en la cola diferida y el worker
+toma la siguiente URL sin dormir; driver caído además descarta el recurso.
+Los errores que llegan a `persistir` son ErrorCrawl con su `clase`.
+
+Uso:
+    pipeline = PipelineCrawl(
+        obtener=lambda url, driver: ...,      # -> payload crudo (html) o None
+        parsear=lambda url, html: ...,        # -> registro o None
+        persistir=lambda lote: ...,           # lote: [(url, registro, error), ...]
+        crear_recurso=crear_driver, cerrar_recurso=lambda d: d.quit(),
+        workers_fetch=3, workers_parseo=2, cola_reintentos=ColaReintentos(),
+    )
+    stats = pipeline.procesar(urls)
+"""
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metricas import get_registro
+from errores_crawl import NAVEGADOR_NUEVO, PARSEO, POLITICAS, ColaReintentos, ErrorCrawl, clasificar_error
+
+
+_FIN = object()  # Señal de fin de etapa
+
+
+class ReintentarURL(Exception):
+    """El recurso del worker quedó inutilizable: recrearlo y volver a encolar la URL"""
+
+
+def _clasificado(error: Exception, clase: str) -> ErrorCrawl:
+    if isinstance(error, ErrorCrawl):
+        return error
+    clasificado = ErrorCrawl(str(error) or type(error).__name__, clase)
+    clasificado.__cause__ = error
+    return clasificado
+
+# (url, registro o payload, error)
+Item = Tuple[str, Any, Optional[Exception]]
+
+
+class PipelineCrawl:
+    """Pipeline de tres etapas con colas acotadas y un escritor por lotes"""
+
+    def __init__(self, obtener: Callable[[str, Any], Any], parsear: Callable[[str, Any], Any],
+                 persistir: Callable[[List[Item]], None],
+                 crear_recurso: Optional[Callable[[], Any]] = None,
+                 cerrar_recurso: Optional[Callable[[Any], None]] = None,
+                 workers_fetch: int = 3, workers_parseo: int = 2,
+                 max_crudos: int = 20, max_registros: int = 500,
+                 lote_escritura: int = 50, intervalo_escritura: float = 2.0,
+                 reciclar_cada: Optional[int] = None, max_reintentos: int = 1,
+                 cola_reintentos: Optional[ColaReintentos] = None, nombre: str = 'pipeline'):
+        """
+        Args:
+            obtener: fn(url, recurso) -> payload crudo; None o excepción = fallo
+            parsear: fn(url, payload) -> registro; None o excepción = fallo
+            persistir: fn(lote) llamada solo desde el thread escritor
+            crear_recurso / cerrar_recurso: recurso por worker de fetch (ej: driver)
+            max_crudos / max_registros: capacidad de cada cola (backpressure)
+            lote_escritura / intervalo_escritura: el escritor persiste al juntar
+                `lote_escritura` items o cada `intervalo_escritura` segundos
+            reciclar_cada: recrear el recurso cada N URLs (None = nunca)
+            max_reintentos: veces que una URL vuelve a la cola tras ReintentarURL
+                (solo sin cola_reintentos)
+            cola_reintentos: reintentos diferidos por clase de error (None = sin taxonomía)
+        """
+        self.obtener = obtener
+        self.parsear = parsear
+        self.persistir = persistir
+        self.crear_recurso = crear_recurso
+        self.cerrar_recurso = cerrar_recurso
+        self.workers_fetch = workers_fetch
+        self.workers_parseo = workers_parseo
+        self.lote_escritura = lote_escritura
+        self.intervalo_escritura = intervalo_escritura
+        self.reciclar_cada = reciclar_cada
+        self.max_reintentos = max_reintentos
+        self.cola_reintentos = cola_reintentos
+        self.nombre = nombre
+        self._reintentos: Dict[str, int] = {}
+        self._en_vuelo = 0  # URLs tomadas por un worker de fetch y aún sin resolver
+        self._detenido = False
+
+        self.cola_urls: 'queue.Queue[str]' = queue.Queue()
+        self.cola_crudos: 'queue.Queue' = queue.Queue(maxsize=max_crudos)
+        self.cola_registros: 'queue.Queue' = queue.Queue(maxsize=max_registros)
+        self.lock = threading.Lock()
+        self.stats = {
+            'urls': 0,
+            'fetch_ok': 0,
+            'fetch_fallidos': 0,
+            'parseo_ok': 0,
+            'parseo_fallidos': 0,
+            'persistidos': 0,
+            'lotes_escritos': 0,
+            'bloqueos_backpressure': 0,  # Veces que fetch esperó por la cola de crudos llena
+            'reencoladas': 0,  # URLs devueltas a la cola tras ReintentarURL
+            'diferidas': 0,  # Fallos enviados a la cola de reintentos diferidos
+            'fallos_por_clase': {},
+        }
+
+        metricas = get_registro()
+        metricas.gauge(f'{nombre}_cola_crudos', self.cola_crudos.qsize)
+        metricas.gauge(f'{nombre}_cola_registros', self.cola_registros.qsize)
+
+    def profundidades(self) -> Dict[str, int]:
+        return {
+            'urls': self.cola_urls.qsize(),
+            'reintentos': len(self.cola_reintentos) if self.cola_reintentos is not None else 0,
+            'crudos': self.cola_crudos.qsize(),
+            'registros': self.cola_registros.qsize(),
+        }
+
+    def detener(self):
+        """Corta el trabajo pendiente: cada worker de fetch termina su URL actual y sale"""
+        with self.lock:
+            self._detenido = True  # Los reintentos diferidos pendientes se abandonan
+        while True:
+            try:
+                self.cola_urls.get_nowait()
+            except queue.Empty:
+                break
+
+    def _contar(self, clave: str, valor: int = 1):
+        with self.lock:
+            self.stats[clave] += valor
+
+    # ------------------------------------------------------------------
+    # Etapas
+    # ------------------------------------------------------------------
+    def _entregar(self, cola: queue.Queue, item):
+        """put() bloqueante que registra cuando la etapa siguiente frena a esta"""
+        try:
+            cola.put_nowait(item)
+        except queue.Full:
+            self._contar('bloqueos_backpressure')
+            cola.put(item)
+
+    def _siguiente_url(self) -> Optional[str]:
+        """
+        Próxima URL para un worker de fetch. Con reintentos diferidos pendientes
+        (o URLs en vuelo que aún pueden agendar uno) el worker espera en vez de
+        terminar; None = no queda trabajo.
+        """
+        while True:
+            if self.cola_reintentos is not None:
+                for reintento in self.cola_reintentos.tomar_vencidos():
+                    self.cola_urls.put(reintento.url)
+            try:
+                url = self.cola_urls.get_nowait()
+            except queue.Empty:
+                url = None
+            with self.lock:
+                if url is not None:
+                    self._en_vuelo += 1
+                    return url
+                pendientes = self.cola_reintentos is not None and len(self.cola_reintentos) > 0
+                if self._detenido or self.cola_reintentos is None or not (pendientes or self._en_vuelo):
+                    return None
+            proximo = self.cola_reintentos.proximo()
+            time.sleep(0.2 if proximo is None else min(1.0, max(0.05, proximo)))
+
+    def _diferir(self, url: str, error: Exception) -> Tuple[Optional[ErrorCrawl], bool]:
+        """
+        Aplica la política de la clase del error.
+
+        Returns:
+            (error clasificado o None si quedó diferido, descartar el recurso)
+        """
+        clase = clasificar_error(error)
+        descartar = POLITICAS.get(clase) == NAVEGADOR_NUEVO
+        if self.cola_reintentos.programar(url, clase):
+            self._contar('diferidas')
+            return None, descartar
+        if not isinstance(error, ErrorCrawl):
+            error = _clasificado(error, clase)
+        return error, descartar
+
+    def _worker_fetch(self):
+        recurso = None
+        usadas = 0
+        try:
+            while True:
+                url = self._siguiente_url()
+                if url is None:
+                    return
+                try:
+                    recurso, usadas = self._fetch(url, recurso, usadas)
+                finally:
+                    with self.lock:
+                        self._en_vuelo -= 1
+        finally:
+            self._descartar_recurso(recurso)
+
+    def _descartar_recurso(self, recurso):
+        if recurso is not None and self.cerrar_recurso:
+            try:
+                self.cerrar_recurso(recurso)
+            except Exception:
+                pass
+
+    def _fetch(self, url: str, recurso, usadas: int) -> Tuple[Any, int]:
+        """Una URL: fetch, política de reintento y entrega al parseo. Retorna (recurso, usadas)"""
+        if recurso is None or (self.reciclar_cada and usadas >= self.reciclar_cada):
+            self._descartar_recurso(recurso)
+            recurso = self.crear_recurso() if self.crear_recurso else None
+            usadas = 0
+        usadas += 1
+        try:
+            payload = self.obtener(url, recurso)
+            error = None if payload is not None else ValueError('Sin contenido')
+        except Exception as e:
+            payload, error = None, e
+
+        if error is not None and self.cola_reintentos is not None:
+            error, descartar = self._diferir(url, error)
+            if descartar:
+                self._descartar_recurso(recurso)
+                recurso = None
+            if error is None:
+                return recurso, usadas  # Diferida: el worker sigue con la siguiente URL
+            clase = error.clase
+            with self.lock:
+                self.stats['fallos_por_clase'][clase] = self.stats['fallos_por_clase'].get(clase, 0) + 1
+        elif isinstance(error, ReintentarURL):
+            # Recurso inutilizable (ej: navegador terminado): el próximo ciclo crea otro
+            self._descartar_recurso(recurso)
+            recurso = None
+            with self.lock:
+                intentos = self._reintentos.get(url, 0)
+                if intentos < self.max_reintentos:
+                    self._reintentos[url] = intentos + 1
+                    self.stats['reencoladas'] += 1
+                    self.cola_urls.put(url)
+                    return recurso, usadas
+        self._contar('fetch_ok' if error is None else 'fetch_fallidos')
+        self._entregar(self.cola_crudos, (url, payload, error))
+        return recurso, usadas
+
+    def _worker_parseo(self):
+        while True:
+            item = self.cola_crudos.get()
+            if item is _FIN:
+                return
+            url, payload, error = item
+            registro = None
+            if error is None:
+                try:
+                    registro = self.parsear(url, payload)
+                    if registro is None:
+                        error = ValueError('Sin datos extraídos')
+                except Exception as e:
+                    error = e
+                self._contar('parseo_ok' if error is None else 'parseo_fallidos')
+                if error is not None and self.cola_reintentos is not None:
+                    # Reintentar no cambia el payload: queda en archivo_crudo para re-extraer
+                    error = _clasificado(error, PARSEO)
+                    with self.lock:
+                        self.stats['fallos_por_clase'][PARSEO] = self.stats['fallos_por_clase'].get(PARSEO, 0) + 1
+            self._entregar(self.cola_registros, (url, registro, error))
+
+    def _escritor(self):
+        lote: List[Item] = []
+        ultimo = time.time()
+        fin = False
+        while not fin:
+            try:
+                item = self.cola_registros.get(timeout=self.intervalo_escritura)
+                if item is _FIN:
+                    fin = True
+                else:
+                    lote.append(item)
+            except queue.Empty:
+                pass
+            vencido = time.time() - ultimo >= self.intervalo_escritura
+            if lote and (fin or len(lote) >= self.lote_escritura or vencido):
+                try:
+                    self.persistir(lote)
+                except Exception as e:
+                    print(f"  ✗ Error persistiendo lote de {len(lote)}: {e}")
+                self._contar('persistidos', len(lote))
+                self._contar('lotes_escritos')
+                lote = []
+                ultimo = time.time()
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+    def procesar(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Procesa todas las URLs y retorna cuando el último lote quedó persistido"""
+        for url in urls:
+            self.cola_urls.put(url)
+            self.stats['urls'] += 1
+
+        fetchers = [threading.Thread(target=self._worker_fetch, name=f'{self.nombre}-fetch-{i + 1}', daemon=True)
+                    for i in range(self.workers_fetch)]
+        parsers = [threading.Thread(target=self._worker_parseo, name=f'{self.nombre}-parseo-{i + 1}', daemon=True)
+                   for i in range(self.workers_parseo)]
+        escritor = threading.Thread(target=self._escritor, name=f'{self.nombre}-escritor', daemon=True)
+        for hilo in fetchers + parsers + [escritor]:
+            hilo.start()
+
+        try:
+            for hilo in fetchers:
+                while hilo.is_alive():
+                    hilo.join(timeout=1)  # join con timeout: deja pasar Ctrl+C
+        finally:
+            # Drenar: sin URLs nuevas, cerrar etapas en orden para no perder lo ya obtenido
+            self.detener()
+            for hilo in fetchers:
+                hilo.join()
+            for _ in parsers:
+                self.cola_crudos.put(_FIN)
+            for hilo in parsers:
+                hilo.join()
+            self.cola_registros.put(_FIN)
+            escritor.join()
+
+        return dict(self.stats)
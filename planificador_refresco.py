@@ -0,0 +1,319 @@
+"""
+planificador_refresco.py - Refresco diario dirigido por cambios a nivel de inmobiliaria
+
+Volver a crawlear los ~278k inmuebles para enterarse de qué cambió es caro,
+cuando la mayoría de las inmobiliarias no publicó ni retiró nada.
+extract_from_urls.py ya lee el "Mostrando N" de cada perfil; aquí se usa eso
+para decidir qué mirar.
+
+PlanificadorRefresco:
+- Por cada inmobiliaria del directorio (directorio_inmobiliarias.py) pide
+  por HTTP la primera página de su listado (inmoPropsLink o el perfil) y lee
+  la cantidad de avisos y sus cod_fr (__NEXT_DATA__, o los enlaces del HTML)
+- Si la cantidad es la misma de la instantánea anterior y los avisos de la
+  primera página ya eran conocidos (el listado muestra primero lo más nuevo),
+  la inmobiliaria no cambió: se conserva su conjunto anterior sin pedir más
+- Si es nueva o cambió, se recorren todas sus páginas para tener el conjunto
+  completo de cod_fr
+- Diff contra la instantánea anterior:
+    * cod_fr nuevos (ni en la instantánea anterior ni en el índice de
+      crawleados) -> cola de URLs para el crawl de detalle
+    * inmobiliarias cambiadas -> lista de perfiles (extract_from_urls / recheck)
+    * cod_fr que ya no aparecen en ninguna inmobiliaria escaneada completa
+      -> retirados.jsonl (append, con fecha)
+- Una inmobiliaria que no respondió conserva su entrada anterior (nunca
+  produce retirados)
+
+Uso:
+    python planificador_refresco.py
+    python planificador_refresco.py --hilos 16 --agencias resultados/inmobiliarias_*.json
+    python dividir_lotes.py resultados/refresco/cola_inmuebles_<ts>.txt
+"""
+import os
+import json
+import gzip
+import math
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from glob import glob
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup
+
+from archivo_crudo import extraer_next_data_texto
+from cosecha_directorio import CAMPOS_TOTAL, _buscar_entero, _nodos, descargar
+from directorio_inmobiliarias import DIRECTORIO_DEFAULT, URL_PERFIL, consolidar, id_de_url
+from extract_from_urls import extract_from_html
+from frontera import IndiceCodFr, _leer_registros, canonicalizar_url, extraer_cod_fr
+
+
+REFRESCO_DIR = os.path.join('resultados', 'refresco')
+INDICE_CRAWLEADOS = os.path.join('resultados', 'lotes', 'indice_cod_fr.txt')  # El de procesar_lote.py
+RETIRADOS_FILE = 'retirados.jsonl'
+
+CONFIG_REFRESCO = {
+    'plantilla_pagina': '{base}?pagina={n}',  # URL de la página n (n >= 2) del listado de una inmobiliaria
+    'hilos': 8,  # Inmobiliarias escaneadas en paralelo
+    'timeout': 15,  # Segundos por request
+    'reintentos': 2,
+    'max_paginas_agencia': 200,  # Tope de páginas por inmobiliaria
+}
+
+# Claves con el enlace del aviso en los objetos del listado
+CAMPOS_ENLACE_AVISO = ('link', 'url', 'href', 'permalink', 'slug')
+
+SIN_CAMBIOS = 'sin_cambios'
+CAMBIADA = 'cambiada'
+NUEVA = 'nueva'
+ERROR = 'error'
+
+
+def avisos_de_json(datos) -> Dict[str, str]:
+    """{cod_fr: url} de la lista más larga de avisos con enlace en el JSON de la página"""
+    mejor: Dict[str, str] = {}
+    for nodo in _nodos(datos):
+        if not (isinstance(nodo, list) and len(nodo) > len(mejor) and nodo and isinstance(nodo[0], dict)):
+            continue
+        avisos = {}
+        for item in nodo:
+            if not isinstance(item, dict):
+                continue
+            enlace = next((item[c] for c in CAMPOS_ENLACE_AVISO if isinstance(item.get(c), str) and item[c]), None)
+            cod_fr = extraer_cod_fr(enlace) if enlace else None
+            if cod_fr:
+                avisos[cod_fr] = canonicalizar_url(enlace)
+        if len(avisos) > len(mejor):
+            mejor = avisos
+    return mejor
+
+
+def avisos_de_html(html: str) -> Dict[str, str]:
+    """Respaldo sin __NEXT_DATA__: enlaces a inmuebles (terminan en el cod_fr)"""
+    avisos = {}
+    for enlace in BeautifulSoup(html, 'html.parser').select('a[href]'):
+        href = enlace.get('href', '')
+        if '/inmobiliarias/' in href:
+            continue
+        cod_fr = extraer_cod_fr(href)
+        if cod_fr:
+            avisos.setdefault(cod_fr, canonicalizar_url(href))
+    return avisos
+
+
+def parsear_listado(html: str) -> Tuple[Dict[str, str], Optional[int]]:
+    """(avisos {cod_fr: url}, cantidad total informada o None) de una página del listado"""
+    avisos, cantidad = {}, None
+    crudo = extraer_next_data_texto(html)
+    if crudo:
+        try:
+            datos = json.loads(crudo)
+        except json.JSONDecodeError:
+            datos = None
+        if datos is not None:
+            avisos = avisos_de_json(datos)
+            cantidad = _buscar_entero(datos, CAMPOS_TOTAL)
+    if not avisos:
+        avisos = avisos_de_html(html)
+    if cantidad is None or cantidad < len(avisos):
+        # "Mostrando 1-20 de N" (extract_from_urls); 0 significa que no lo encontró
+        cantidad = extract_from_html(html)[1] or None
+    return avisos, cantidad
+
+
+def url_listado(agencia: Dict[str, Any]) -> str:
+    return agencia.get('url_propiedades') or agencia.get('url_perfil') or URL_PERFIL.format(agencia['id'])
+
+
+def leer_instantanea(ruta: str) -> Dict[str, Any]:
+    with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ultima_instantanea(refresco_dir: str = REFRESCO_DIR) -> Optional[str]:
+    instantaneas = sorted(glob(os.path.join(refresco_dir, 'instantanea_*.json.gz')))
+    return instantaneas[-1] if instantaneas else None
+
+
+class PlanificadorRefresco:
+    """Escanea los listados por inmobiliaria y arma el plan de re-crawl contra la instantánea anterior"""
+
+    def __init__(self, anterior: Optional[Dict[str, Any]] = None, config: Dict = None, http=None):
+        self.config = {**CONFIG_REFRESCO, **(config or {})}
+        self.http = http or requests.Session()
+        self.anterior: Dict[str, Dict[str, Any]] = (anterior or {}).get('agencias', {})
+        self.stats = {SIN_CAMBIOS: 0, CAMBIADA: 0, NUEVA: 0, ERROR: 0, 'paginas': 0}
+
+    def _get(self, url: str) -> Optional[str]:
+        return descargar(self.http, url, self.config['timeout'], self.config['reintentos'])
+
+    def escanear(self, agencia: Dict[str, Any]) -> Dict[str, Any]:
+        """Entrada de la instantánea para una inmobiliaria: cantidad, cod_fr, estado y URLs de avisos nuevos"""
+        previa = self.anterior.get(agencia['id'])
+        base = url_listado(agencia)
+        html = self._get(base)
+        if html is None:
+            return {**(previa or {'cantidad': None, 'ids': [], 'completa': False}), 'estado': ERROR, 'paginas': 1}
+
+        avisos, cantidad = parsear_listado(html)
+        conocidos = set(previa['ids']) if previa else set()
+        if (previa and previa.get('completa') and cantidad is not None and cantidad == previa.get('cantidad')
+                and set(avisos) <= conocidos):
+            return {**previa, 'estado': SIN_CAMBIOS, 'paginas': 1}
+
+        paginas = 1
+        if cantidad and avisos:
+            total_paginas = min(math.ceil(cantidad / len(avisos)), self.config['max_paginas_agencia'])
+            for numero in range(2, total_paginas + 1):
+                html = self._get(self.config['plantilla_pagina'].format(base=base, n=numero))
+                paginas += 1
+                nuevos = parsear_listado(html)[0] if html else {}
+                if not nuevos or set(nuevos) <= set(avisos):
+                    break  # Página vacía o repetida: la plantilla no pagina más allá
+                avisos.update(nuevos)
+        return {
+            'cantidad': cantidad,
+            'ids': sorted(avisos),
+            'urls': avisos,  # Solo para armar la cola; no se guarda en la instantánea
+            # Sin cantidad informada no se sabe si están todos: no genera retirados
+            'completa': cantidad is not None and len(avisos) >= cantidad,
+            'estado': CAMBIADA if previa else NUEVA,
+            'paginas': paginas,
+        }
+
+    def planificar(self, agencias: Iterable[Dict[str, Any]], crawleados=None) -> Dict[str, Any]:
+        """
+        Escanea todas las inmobiliarias y calcula el diff
+
+        Returns:
+            {'agencias': instantánea nueva, 'nuevos': {cod_fr: url}, 'cambiadas': [ids],
+             'retirados': [{cod_fr, id}]}
+        """
+        agencias = list(agencias)
+        with ThreadPoolExecutor(max_workers=max(1, self.config['hilos']), thread_name_prefix='refresco') as pool:
+            escaneos = list(pool.map(self.escanear, agencias))
+
+        actual: Dict[str, Dict[str, Any]] = {}
+        urls: Dict[str, str] = {}
+        for agencia, escaneo in zip(agencias, escaneos):
+            self.stats[escaneo['estado']] += 1
+            self.stats['paginas'] += escaneo['paginas']
+            urls.update(escaneo.pop('urls', {}))
+            escaneo.pop('paginas')
+            if escaneo['estado'] != ERROR:
+                escaneo['escaneada'] = datetime.now().isoformat(timespec='seconds')
+            actual[agencia['id']] = escaneo
+        # Inmobiliarias que ya no están en el directorio: se conservan hasta que se puedan escanear
+        for id_owner, previa in self.anterior.items():
+            actual.setdefault(id_owner, {**previa, 'estado': ERROR})
+
+        vistos_antes = {cod for previa in self.anterior.values() for cod in previa.get('ids', [])}
+        vistos_ahora = {cod for entrada in actual.values() for cod in entrada['ids']}
+        nuevos = {cod: url for cod, url in urls.items()
+                  if cod not in vistos_antes and (crawleados is None or cod not in crawleados)}
+        retirados = []
+        for id_owner, entrada in actual.items():
+            previa = self.anterior.get(id_owner)
+            if entrada['estado'] != CAMBIADA or not entrada['completa'] or not previa or not previa.get('completa'):
+                continue
+            for cod in set(previa['ids']) - vistos_ahora:
+                retirados.append({'cod_fr': cod, 'id': id_owner})
+        cambiadas = [id_owner for id_owner, entrada in actual.items() if entrada['estado'] in (CAMBIADA, NUEVA)]
+        return {'agencias': actual, 'nuevos': nuevos, 'cambiadas': cambiadas, 'retirados': retirados}
+
+
+def agencias_desde(directorio: str, archivos: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """Directorio consolidado más filas {titulo, url, cantidad_inmuebles} de cosecha_directorio / scrapers"""
+    agencias = {id_owner: fila for id_owner, fila in consolidar(directorio).items()}
+    for ruta in archivos:
+        for fila in _leer_registros(ruta):
+            id_owner = id_de_url(fila.get('url'))
+            if id_owner and id_owner not in agencias:
+                agencias[id_owner] = {'id': id_owner, 'nombre': fila.get('titulo'), 'url_perfil': fila.get('url')}
+    return list(agencias.values())
+
+
+def guardar_plan(plan: Dict[str, Any], agencias: Dict[str, Dict[str, Any]], refresco_dir: str = REFRESCO_DIR) -> Dict[str, str]:
+    """Instantánea (gzip), cola de inmuebles, perfiles cambiados y retirados; retorna las rutas"""
+    os.makedirs(refresco_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    rutas = {
+        'instantanea': os.path.join(refresco_dir, f'instantanea_{timestamp}.json.gz'),
+        'cola': os.path.join(refresco_dir, f'cola_inmuebles_{timestamp}.txt'),
+        'cambiadas': os.path.join(refresco_dir, f'agencias_cambiadas_{timestamp}.txt'),
+        'retirados': os.path.join(refresco_dir, RETIRADOS_FILE),
+    }
+    temporal = rutas['instantanea'] + '.tmp'
+    with gzip.open(temporal, 'wt', encoding='utf-8') as f:
+        json.dump({'fecha': datetime.now().isoformat(timespec='seconds'), 'agencias': plan['agencias']}, f,
+                  ensure_ascii=False)
+    os.replace(temporal, rutas['instantanea'])
+    with open(rutas['cola'], 'w', encoding='utf-8') as f:
+        for url in plan['nuevos'].values():
+            f.write(url + '\n')
+    with open(rutas['cambiadas'], 'w', encoding='utf-8') as f:
+        for id_owner in plan['cambiadas']:
+            agencia = agencias.get(id_owner, {})
+            f.write((agencia.get('url_perfil') or URL_PERFIL.format(id_owner)) + '\n')
+    retirado = datetime.now().isoformat(timespec='seconds')
+    with open(rutas['retirados'], 'a', encoding='utf-8') as f:
+        for entrada in plan['retirados']:
+            f.write(json.dumps({**entrada, 'retirado': retirado}, ensure_ascii=False) + '\n')
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Planifica el re-crawl según los cambios por inmobiliaria')
+    parser.add_argument('--directorio', default=DIRECTORIO_DEFAULT, help='Directorio de inmobiliarias')
+    parser.add_argument('--agencias', nargs='*', default=[],
+                        help='JSON/JSONL extra con {titulo, url} (cosecha_directorio, scrapers)')
+    parser.add_argument('--indice', default=INDICE_CRAWLEADOS, help='Índice de cod_fr ya crawleados')
+    parser.add_argument('--salida', default=REFRESCO_DIR, help='Carpeta de instantáneas y colas')
+    parser.add_argument('--plantilla', default=CONFIG_REFRESCO['plantilla_pagina'],
+                        help='URL de la página n del listado: {base} y {n} (default: %(default)s)')
+    parser.add_argument('--hilos', type=int, default=CONFIG_REFRESCO['hilos'])
+    args = parser.parse_args()
+
+    inicio = time.time()
+    print("="*80)
+    print("PLAN DE REFRESCO POR INMOBILIARIA")
+    print("="*80)
+
+    archivos = sorted({ruta for patron in args.agencias for ruta in glob(patron)})
+    agencias = agencias_desde(args.directorio, archivos)
+    if not agencias:
+        print("⚠ No hay inmobiliarias: corre antes el crawl (directorio_inmobiliarias.py) o cosecha_directorio.py")
+        return
+    previa = ultima_instantanea(args.salida)
+    print(f"Inmobiliarias: {len(agencias):,}")
+    print(f"Instantánea anterior: {previa or 'ninguna (primer escaneo completo)'}")
+    crawleados = IndiceCodFr(args.indice) if os.path.exists(args.indice) else None
+
+    planificador = PlanificadorRefresco(leer_instantanea(previa) if previa else None, {
+        'plantilla_pagina': args.plantilla,
+        'hilos': args.hilos,
+    })
+    plan = planificador.planificar(agencias, crawleados)
+    rutas = guardar_plan(plan, {agencia['id']: agencia for agencia in agencias}, args.salida)
+
+    stats = planificador.stats
+    print(f"\n{'='*80}")
+    print("RESUMEN")
+    print("="*80)
+    print(f"Páginas pedidas:         {stats['paginas']:,} ({time.time() - inicio:.1f}s)")
+    print(f"  Sin cambios:           {stats[SIN_CAMBIOS]:,}")
+    print(f"  Cambiadas:             {stats[CAMBIADA]:,}")
+    print(f"  Nuevas:                {stats[NUEVA]:,}")
+    print(f"  Sin respuesta:         {stats[ERROR]:,} (conservan la entrada anterior)")
+    print(f"Inmuebles nuevos a crawlear: {len(plan['nuevos']):,}")
+    print(f"Inmuebles retirados:         {len(plan['retirados']):,}")
+    print(f"\n✓ Instantánea: {rutas['instantanea']}")
+    print(f"✓ Cola de inmuebles: {rutas['cola']}")
+    print(f"✓ Perfiles cambiados: {rutas['cambiadas']}")
+    print(f"✓ Retirados: {rutas['retirados']}")
+
+
+if __name__ == '__main__':
+    main()
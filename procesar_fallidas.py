@@ -1,119 +1,199 @@
 """
 Script para procesar URLs fallidas desde archivos JSON existentes
 Extrae las URLs fallidas y las reintenta
+
+Solo se retoman las clases de error reintentables (bloqueado, timeout, driver
+caído; ver errores_crawl.py): los inmuebles removidos y los errores de parseo
+no se vuelven a pedir. Las URLs salen de fallidas_lote_XX.jsonl (escrito por
+procesar_lote.py con la clase de cada fallo); para lotes anteriores a ese
+archivo se usan los registros sin COD FR del último JSON del lote.
+
+Los reintentos de esta pasada tampoco duermen: van a una cola diferida y se
+sigue con la siguiente URL. El ritmo lo pone la tasa AIMD global compartida con
+procesar_lote.py (control_tasa.py), así esta pasada no se suma a los lotes en curso
+por encima de la tasa.
 """
 import json
 import os
 import sys
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from property_crawler_selenium import PropertyCrawlerSelenium, _formatear_salida_final
+from errores_crawl import PARSEO, ColaReintentos, clasificar_error, es_reintentable
+from control_tasa import ControladorTasa
+from clasificador_paginas import CHALLENGE
+from frontera import leer_num_shards
+from config import LOTES_NUM_SHARDS
 import time
 
 LOTES_DIR = "resultados/lotes"
+TASA_FILE = os.path.join(LOTES_DIR, 'tasa_global.json')  # Tasa AIMD compartida con procesar_lote.py
+
+
+def _leer_jsonl(ruta):
+    if not os.path.exists(ruta):
+        return
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                pass
+
 
-def procesar_fallidas(numero_lote: int):
+def _urls_exitosas(lote_dir, numero_lote):
+    """URLs ya extraídas: checkpoint del lote y reprocesos anteriores"""
+    exitosas = {item.get('URL INMUEBLE') for item in
+                _leer_jsonl(os.path.join(lote_dir, f'checkpoint_lote_{numero_lote:02d}.jsonl'))}
+    for ruta in Path(lote_dir).glob('fallidas_reprocessadas_*.json'):
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                exitosas.update(item.get('URL INMUEBLE') for item in json.load(f))
+        except (json.JSONDecodeError, OSError):
+            pass
+    exitosas.discard(None)
+    return exitosas
+
+
+def _urls_sin_cod_fr(lote_dir):
+    """Formato anterior: registros sin COD FR en el último JSON del lote (sin clase de error)"""
+    json_files = sorted(Path(lote_dir).glob('lote_*.json'))
+    if not json_files:
+        return []
+    latest_json = json_files[-1]
+    print(f"Leyendo: {latest_json}")
+    with open(latest_json, 'r', encoding='utf-8') as f:
+        propiedades = json.load(f)
+    print(f"Total de propiedades en JSON: {len(propiedades):,}")
+    return [prop.get('URL INMUEBLE') for prop in propiedades
+            if not prop.get('COD FR') and prop.get('URL INMUEBLE')]
+
+
+def procesar_fallidas(numero_lote: int, crawler=None):
     """
-    Procesa solo las URLs que fallaron en un lote anterior
+    Procesa solo las URLs que fallaron en un lote anterior con una clase de error reintentable.
+    `crawler` permite inyectar un PropertyCrawlerSelenium ya creado (lo cierra quien lo creó).
     """
     print("="*80)
-    print(f"REPROCESANDO FALLIDAS - LOTE {numero_lote}/15")
+    print(f"REPROCESANDO FALLIDAS - LOTE {numero_lote}/{leer_num_shards(LOTES_DIR, LOTES_NUM_SHARDS)}")
     print("="*80)
     print(f"Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
-    
-    # Buscar archivos JSON del lote
+
     lote_dir = os.path.join(LOTES_DIR, f'lote_{numero_lote:02d}')
-    
+
     if not os.path.exists(lote_dir):
         print(f"ERROR: No se encontró el directorio {lote_dir}")
         return
-    
-    # Buscar todos los JSON del lote
-    json_files = sorted(Path(lote_dir).glob('lote_*.json'))
-    
-    if not json_files:
-        print(f"No se encontraron archivos JSON en {lote_dir}")
-        return
-    
-    latest_json = json_files[-1]
-    print(f"Leyendo: {latest_json}")
-    
-    with open(latest_json, 'r', encoding='utf-8') as f:
-        propiedades = json.load(f)
-    
-    print(f"Total de propiedades en JSON: {len(propiedades):,}")
-    
-    # Identificar fallidas (sin código FR o sin datos esenciales)
-    fallidas = []
-    para_reintentar = []
-    
-    for prop in propiedades:
-        if not prop.get('COD FR'):
-            # Fallida - sin datos
-            url = prop.get('URL INMUEBLE')
-            if url:
-                para_reintentar.append(url)
-                fallidas.append(prop)
-    
+
+    fallidas_file = os.path.join(lote_dir, f'fallidas_lote_{numero_lote:02d}.jsonl')
+    exitosas = _urls_exitosas(lote_dir, numero_lote)
+
+    # Última clase de error por URL (el archivo es append-only entre corridas)
+    ultima_clase = {}
+    for item in _leer_jsonl(fallidas_file):
+        if item.get('url'):
+            ultima_clase[item['url']] = item.get('clase')
+    if ultima_clase:
+        print(f"Leyendo: {fallidas_file}")
+    else:
+        ultima_clase = {url: None for url in _urls_sin_cod_fr(lote_dir)}
+
+    por_clase = {}
+    for clase in ultima_clase.values():
+        por_clase[clase or 'sin_clase'] = por_clase.get(clase or 'sin_clase', 0) + 1
+    para_reintentar = [url for url, clase in ultima_clase.items()
+                       if es_reintentable(clase) and url not in exitosas]
+
+    if por_clase:
+        print("Fallidas por clase: " + ', '.join(f"{clase} {n:,}" for clase, n in sorted(por_clase.items())))
     print(f"URLs para reintentar: {len(para_reintentar):,}")
-    
+
     if not para_reintentar:
         print("\n✓ No hay URLs fallidas para reintentar")
         return
-    
+
     # Procesar URLs fallidas
-    print(f"\nIniciando reintento de URLs fallidas...")
-    
-    crawler = PropertyCrawlerSelenium()
+    print("\nIniciando reintento de URLs fallidas...")
+
+    propio = crawler is None
+    if propio:
+        crawler = PropertyCrawlerSelenium()
+    controlador = ControladorTasa(TASA_FILE)
+    reintentos = ColaReintentos()
+    pendientes = deque(para_reintentar)
     resultados_exitosos = []
     resultados_fallidos = []
-    
+
     inicio_tiempo = time.time()
-    
+    i = 0
+
     try:
-        for i, url in enumerate(para_reintentar, 1):
+        while pendientes or len(reintentos):
+            pendientes.extend(r.url for r in reintentos.tomar_vencidos())
+            if not pendientes:
+                espera = reintentos.proximo() or 0
+                print(f"\n  ⏳ {len(reintentos)} reintentos diferidos, próximo en {espera:.0f}s")
+                time.sleep(espera)
+                continue
+            url = pendientes.popleft()
+            i += 1
+
             if i % 50 == 0 or i == 1:
                 transcurrido = time.time() - inicio_tiempo
                 velocidad = i / transcurrido if transcurrido > 0 else 0
-                restantes = len(para_reintentar) - i
+                restantes = len(pendientes) + len(reintentos)
                 tiempo_estimado = restantes / velocidad if velocidad > 0 else 0
-                
-                print(f"\n[{i}/{len(para_reintentar)}] Progreso: {i/len(para_reintentar)*100:.1f}%")
+
+                print(f"\n[{i}] Pendientes: {len(pendientes):,} | Diferidas: {len(reintentos):,}")
                 print(f"  Exitosas: {len(resultados_exitosos)} | Fallidas: {len(resultados_fallidos)}")
                 print(f"  Velocidad: {velocidad:.2f} URLs/seg")
                 print(f"  Tiempo estimado: {tiempo_estimado/60:.1f} minutos")
-            
+
+            controlador.esperar_turno()
+            inicio_url = time.time()
             try:
                 datos_raw = crawler.extraer_propiedad(url)
-                
-                if datos_raw and datos_raw.get('codigo_fr'):
+                # Para la tasa cuenta el fetch: una página que no parsea igual llegó
+                controlador.reportar(time.time() - inicio_url, challenge=crawler.ultima_clase == CHALLENGE,
+                                     exito=crawler.ultimo_error in (None, PARSEO))
+                clase = None
+
+                if datos_raw and datos_raw.get('cod_fr'):
                     datos_final = _formatear_salida_final(datos_raw)
                     resultados_exitosos.append(datos_final)
-                    print(f"  ✓ URL exitosa")
+                    print("  ✓ URL exitosa")
                 else:
-                    resultados_fallidos.append(url)
-                    print(f"  ✗ URL sin datos")
-                    
+                    clase = crawler.ultimo_error or PARSEO
+
             except Exception as e:
-                resultados_fallidos.append(url)
+                controlador.reportar(time.time() - inicio_url, challenge=crawler.ultima_clase == CHALLENGE, exito=False)
+                clase = clasificar_error(e)
                 print(f"  ✗ Error: {type(e).__name__}")
-            
-            time.sleep(2)
-            
+
+            if clase is not None:
+                if reintentos.programar(url, clase):
+                    print(f"  ↻ Diferida ({clase}), intento {reintentos.intentos(url)}")
+                else:
+                    resultados_fallidos.append({'url': url, 'clase': clase,
+                                                'fecha': datetime.now().isoformat(timespec='seconds')})
+                    print(f"  ✗ URL sin datos ({clase})")
+
     except KeyboardInterrupt:
         print("\n\n⚠ Proceso interrumpido")
-    
+
     finally:
-        crawler.close()
-        
+        if propio:
+            crawler.close()
+
         # Guardar resultados
         print(f"\n{'='*80}")
         print("GUARDANDO RESULTADOS")
         print("="*80)
-        
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
+
         # Guardar exitosas
         if resultados_exitosos:
             exitosas_json = os.path.join(lote_dir, f'fallidas_reprocessadas_{timestamp}.json')
@@ -121,16 +201,19 @@ def procesar_fallidas(numero_lote: int):
                 json.dump(resultados_exitosos, f, ensure_ascii=False, indent=2)
             print(f"✓ Exitosas guardadas: {exitosas_json}")
             print(f"  Total: {len(resultados_exitosos):,}")
-        
-        # Guardar fallidas para siguiente intento
+
+        # Guardar fallidas para siguiente intento (la clase decide si se retoman)
         if resultados_fallidos:
+            with open(fallidas_file, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(d, ensure_ascii=False) + '\n' for d in resultados_fallidos)
             fallidas_txt = os.path.join(lote_dir, f'fallidas_{timestamp}.txt')
             with open(fallidas_txt, 'w', encoding='utf-8') as f:
-                for url in resultados_fallidos:
-                    f.write(f"{url}\n")
+                for item in resultados_fallidos:
+                    if es_reintentable(item['clase']):
+                        f.write(f"{item['url']}\n")
             print(f"✓ Fallidas guardadas para reintentar: {fallidas_txt}")
-            print(f"  Total: {len(resultados_fallidos):,}")
-        
+            print(f"  Total: {len(resultados_fallidos):,} (clases en {fallidas_file})")
+
         # Resumen
         print(f"\n{'='*80}")
         print("RESUMEN")
@@ -138,6 +221,8 @@ def procesar_fallidas(numero_lote: int):
         print(f"URLs procesadas: {len(resultados_exitosos) + len(resultados_fallidos):,}")
         print(f"Exitosas: {len(resultados_exitosos):,}")
         print(f"Fallidas: {len(resultados_fallidos):,}")
+        if len(reintentos):
+            print(f"Diferidas sin completar: {len(reintentos):,}")
         if len(resultados_exitosos) + len(resultados_fallidos) > 0:
             tasa = (len(resultados_exitosos) / (len(resultados_exitosos) + len(resultados_fallidos))) * 100
             print(f"Tasa de éxito: {tasa:.2f}%")
@@ -147,17 +232,18 @@ def main():
     if len(sys.argv) < 2:
         print("Uso: python procesar_fallidas.py <numero_lote>")
         print("Ejemplo: python procesar_fallidas.py 1")
-        print("\nReprocesa solo las URLs que fallaron en un lote anterior")
+        print("\nReprocesa solo las URLs que fallaron en un lote anterior con error reintentable")
         sys.exit(1)
-    
+
     try:
         numero_lote = int(sys.argv[1])
-        if numero_lote < 1 or numero_lote > 15:
-            print("ERROR: El número de lote debe estar entre 1 y 15")
+        num_lotes = leer_num_shards(LOTES_DIR, LOTES_NUM_SHARDS)
+        if numero_lote < 1 or numero_lote > num_lotes:
+            print(f"ERROR: El número de lote debe estar entre 1 y {num_lotes}")
             sys.exit(1)
-        
+
         procesar_fallidas(numero_lote)
-        
+
     except ValueError:
         print("ERROR: El número de lote debe ser un entero")
         sys.exit(1)
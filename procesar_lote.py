@@ -8,26 +8,58 @@ import os
 from datetime import datetime
 from pathlib import Path
 from property_crawler_selenium import PropertyCrawlerSelenium, _formatear_salida_final
+from frontera import IndiceCodFr, construir_frontera, extraer_cod_fr, imprimir_resumen, leer_num_shards
+from control_tasa import ControladorTasa
+from clasificador_paginas import CHALLENGE, MonitorBloqueos
+from metricas import get_registro
+from archivo_crudo import ArchivoCrudo
+from directorio_inmobiliarias import DirectorioInmobiliarias
+from pipeline import PipelineCrawl
+from registro_inmueble import escribir_json_streaming
+from vigilante_driver import VigilanteDriver
+from errores_crawl import DRIVER_CAIDO, ColaReintentos, ErrorCrawl, clase_de_pagina, clasificar_error, es_reintentable
+from config import (
+    METRICAS_PUERTO, METRICAS_INTERVALO, CHROME_PESTANAS, CHROME_REMOTE_DEBUGGING_PORT, DRIVER_PLAZO_URL,
+    LOTES_NUM_SHARDS, CHROME_ESTRATEGIA_CARGA,
+)
 import json
 import time
 
 LOTES_DIR = "resultados/lotes"
+INDICE_FILE = os.path.join(LOTES_DIR, 'indice_cod_fr.txt')  # Compartido entre lotes
+TASA_FILE = os.path.join(LOTES_DIR, 'tasa_global.json')  # Tasa AIMD compartida entre lotes
+BLOQUEOS_FILE = os.path.join(LOTES_DIR, 'bloqueos.json')  # Enfriamiento global compartido entre lotes
+ARCHIVO_CRUDO_DIR = os.path.join(LOTES_DIR, 'archivo_crudo')  # Payloads crudos (segmentos por proceso)
 
-def procesar_lote(numero_lote: int):
+def _leer_checkpoint(ruta):
+    """Registros del checkpoint JSONL, uno a la vez (ignora líneas corruptas)"""
+    if not os.path.exists(ruta):
+        return
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line.strip())
+            except:
+                pass
+
+def procesar_lote(numero_lote: int, crawler=None):
     """
-    Procesa un lote específico con checkpoint automático cada 100 URLs
+    Procesa un lote específico con checkpoint incremental (cada lote del escritor).
+    `crawler` permite inyectar un PropertyCrawlerSelenium ya creado (se usa en lugar
+    del Chrome propio y de las pestañas; lo cierra quien lo creó).
     """
     print("="*80)
-    print(f"PROCESANDO LOTE {numero_lote}/10")  # Cambiado de 15 a 10
+    print(f"PROCESANDO LOTE {numero_lote}/{leer_num_shards(LOTES_DIR, LOTES_NUM_SHARDS)}")
     print("="*80)
     print(f"Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
     # Cargar URLs del lote desde archivo JSON
-    urls_file = os.path.join(LOTES_DIR, f'lote_{numero_lote:02d}.json')  # Cambiado a .json
+    # Generado por dividir_lotes.py (shard por hash del cod_fr: el resume por URL sobrevive ediciones de la entrada)
+    urls_file = os.path.join(LOTES_DIR, f'lote_{numero_lote:02d}.json')
     if not os.path.exists(urls_file):
         print(f"ERROR: No se encontró el archivo {urls_file}")
-        print("Ejecuta primero: python dividir_urls_en_lotes.py")
+        print("Ejecuta primero: python dividir_lotes.py")
         return
     
     with open(urls_file, 'r', encoding='utf-8') as f:
@@ -45,107 +77,219 @@ def procesar_lote(numero_lote: int):
     final_json = os.path.join(output_dir, f'lote_{numero_lote:02d}_{timestamp}.json')
     final_excel = os.path.join(output_dir, f'lote_{numero_lote:02d}_{timestamp}.xlsx')
     progress_file = os.path.join(output_dir, 'progreso.txt')
+    fallidas_file = os.path.join(output_dir, f'fallidas_lote_{numero_lote:02d}.jsonl')  # url + clase de error
+    metricas_file = os.path.join(output_dir, 'metricas.json')
     
-    # Verificar si existe checkpoint previo
+    # Verificar si existe checkpoint previo. Los registros no se retienen en memoria:
+    # el checkpoint JSONL es la fuente del JSON final (solo se guardan las URLs)
     procesadas = set()
-    resultados = []
     
     if os.path.exists(checkpoint_file):
         print(f"\n¡Checkpoint encontrado! Cargando progreso previo...")
-        with open(checkpoint_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    item = json.loads(line.strip())
-                    resultados.append(item)
-                    procesadas.add(item.get('URL INMUEBLE'))
-                except:
-                    pass
+        for item in _leer_checkpoint(checkpoint_file):
+            procesadas.add(item.get('URL INMUEBLE'))
         print(f"URLs ya procesadas: {len(procesadas):,}")
         urls = [url for url in urls if url not in procesadas]
         print(f"URLs pendientes: {len(urls):,}")
     
+    # Fallos definitivos de corridas anteriores (removido, parseo): no se vuelven a pedir
+    ultima_clase = {}
+    for item in _leer_checkpoint(fallidas_file):
+        ultima_clase[item.get('url')] = item.get('clase')
+    descartadas = {url for url, clase in ultima_clase.items() if not es_reintentable(clase)}
+    if descartadas:
+        urls = [url for url in urls if url not in descartadas]
+        print(f"URLs descartadas (removidas / sin datos en corridas anteriores): {len(descartadas):,}")
+    
+    # Deduplicar por cod_fr contra el índice de inmuebles ya crawleados (todos los lotes)
+    indice = IndiceCodFr(INDICE_FILE)
+    indice.agregar_muchos(extraer_cod_fr(url) for url in procesadas)
+    urls, frontera_stats = construir_frontera(urls, indice)
+    print(f"\nFrontera (índice: {len(indice):,} cod_fr):")
+    imprimir_resumen(frontera_stats)
+    
     if not urls:
         print("\n¡Lote ya completado!")
         return
     
     # Inicializar crawler
     print(f"\nIniciando crawler...")
-    crawler = PropertyCrawlerSelenium()
+    archivo_crudo = ArchivoCrudo(ARCHIVO_CRUDO_DIR)
+    directorio = DirectorioInmobiliarias()  # Owners de los avisos: un archivo de sesión por proceso
+    navegador = None
+    propio = crawler is None
+    if not propio:
+        print("Crawler inyectado por el llamador")
+    elif CHROME_PESTANAS > 1:
+        # Un Chrome con N pestañas; el crawler queda solo para parsear
+        from navegador_pestanas import NavegadorPestanas
+        crawler = PropertyCrawlerSelenium(monitor_bloqueos=MonitorBloqueos(BLOQUEOS_FILE), iniciar_driver=False,
+                                          directorio=directorio)
+        navegador = NavegadorPestanas(CHROME_PESTANAS, crawler.crear_opciones(),
+                                      puerto_depuracion=int(CHROME_REMOTE_DEBUGGING_PORT or 0) or None)
+        print(f"Modo pestañas: {CHROME_PESTANAS} pestañas en un solo navegador")
+    else:
+        crawler = PropertyCrawlerSelenium(monitor_bloqueos=MonitorBloqueos(BLOQUEOS_FILE), archivo_crudo=archivo_crudo,
+                                          directorio=directorio, estrategia_carga=CHROME_ESTRATEGIA_CARGA)
+    controlador = ControladorTasa(TASA_FILE)
+    # Plazo duro por URL aplicado desde otro thread: un chromedriver colgado ya no congela el lote
+    vigilante = VigilanteDriver(DRIVER_PLAZO_URL)
+    # Bloqueos y timeouts vuelven más tarde sin frenar al worker
+    reintentos = ColaReintentos()
+    
+    # Métricas por fase: resumen JSON periódico y endpoint Prometheus opcional
+    metricas = get_registro()
+    metricas.gauge('tasa_global_req_s', lambda: controlador.tasa_actual)
+    metricas.iniciar_resumen_periodico(metricas_file, METRICAS_INTERVALO)
+    if METRICAS_PUERTO:
+        metricas.iniciar_servidor(METRICAS_PUERTO + numero_lote)
     
-    # Contadores
-    exitosas = len(procesadas)
-    fallidas = 0
+    # Contadores (solo los actualiza el thread escritor del pipeline)
+    contadores = {'exitosas': len(procesadas), 'fallidas': 0, 'por_clase': {}}
+    total = len(urls) + len(procesadas)
     inicio_tiempo = time.time()
     
+    def obtener(url, _recurso):
+        # Un solo navegador por lote: el fetch espera turno en la tasa global compartida
+        controlador.esperar_turno()
+        inicio_url = time.time()
+        try:
+            html = vigilante.ejecutar(url, lambda: crawler.driver, lambda: crawler.obtener_html(url, lanzar=True))
+        except Exception as e:
+            # El pipeline decide por la clase: diferir, fallo definitivo o (URLVencida) reencolar
+            controlador.reportar(time.time() - inicio_url, challenge=crawler.ultima_clase == CHALLENGE, exito=False)
+            if clasificar_error(e) == DRIVER_CAIDO:
+                crawler.reiniciar_driver()
+            raise
+        controlador.reportar(time.time() - inicio_url, challenge=crawler.ultima_clase == CHALLENGE,
+                             exito=html is not None)
+        return html
+    
+    def obtener_pestana(url, _recurso):
+        # Cada worker de fetch ocupa una pestaña; la tasa global sigue siendo una sola
+        crawler.monitor_bloqueos.esperar_enfriamiento()
+        controlador.esperar_turno()
+        inicio_url = time.time()
+        try:
+            clase, texto = navegador.obtener(url)
+        except Exception:
+            controlador.reportar(time.time() - inicio_url, exito=False)
+            raise
+        crawler.monitor_bloqueos.registrar(clase)
+        controlador.reportar(time.time() - inicio_url, challenge=clase == CHALLENGE, exito=texto is not None)
+        if texto is None:
+            raise ErrorCrawl(f"Página {clase}", clase_de_pagina(clase))
+        cod_fr = extraer_cod_fr(url)
+        if texto and cod_fr:
+            with metricas.fase('persistencia'):
+                archivo_crudo.guardar(cod_fr, url, texto)
+        return texto
+    
+    def parsear(url, payload):
+        if navegador:
+            datos_raw = crawler.parsear_next_data(payload, url)
+        else:
+            datos_raw = crawler.parsear_html(payload, url)
+        if not datos_raw:
+            return None
+        # Convertir a formato final
+        with metricas.fase('normalizacion'):
+            return _formatear_salida_final(datos_raw)
+    
+    def persistir(lote):
+        nuevos = []
+        fallos = []
+        for url, datos_final, error in lote:
+            if error is None:
+                nuevos.append(datos_final)
+            else:
+                clase = clasificar_error(error)
+                contadores['por_clase'][clase] = contadores['por_clase'].get(clase, 0) + 1
+                fallos.append({'url': url, 'clase': clase, 'error': str(error)[:200],
+                               'fecha': datetime.now().isoformat(timespec='seconds')})
+                print(f"  ✗ Error ({clase}) en {url}: {str(error)[:100]}")
+        contadores['exitosas'] += len(nuevos)
+        contadores['fallidas'] += len(lote) - len(nuevos)
+        exitosas, fallidas = contadores['exitosas'], contadores['fallidas']
+        
+        # Fallos definitivos con su clase: procesar_fallidas.py retoma solo los reintentables
+        if fallos:
+            with open(fallidas_file, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(d, ensure_ascii=False) + '\n' for d in fallos)
+        
+        # Checkpoint: se agrega el lote completo en una sola escritura
+        if nuevos:
+            with metricas.fase('persistencia'), open(checkpoint_file, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(d, ensure_ascii=False) + '\n' for d in nuevos)
+        
+        # Actualizar archivo de progreso
+        with open(progress_file, 'w', encoding='utf-8') as f:
+            f.write(f"Lote: {numero_lote}\n")
+            f.write(f"Última actualización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Procesadas: {exitosas}\n")
+            f.write(f"Fallidas: {fallidas}\n")
+            f.write(f"Total: {total}\n")
+            f.write(f"Progreso: {exitosas/total*100:.1f}%\n")
+        
+        idx_total = exitosas + fallidas
+        transcurrido = time.time() - inicio_tiempo
+        velocidad = (idx_total - len(procesadas)) / transcurrido if transcurrido > 0 else 0
+        tiempo_estimado = (total - idx_total) / velocidad if velocidad > 0 else 0
+        colas = pipeline.profundidades()
+        print(f"\n[{idx_total}/{total}] Progreso: {idx_total/total*100:.1f}%")
+        print(f"  Exitosas: {exitosas} | Fallidas: {fallidas}")
+        print(f"  Velocidad: {velocidad:.2f} URLs/seg")
+        print(f"  Tasa global: {controlador.tasa_actual:.2f} req/s")
+        print(f"  Colas: crudos {colas['crudos']} | registros {colas['registros']} | reintentos {colas['reintentos']}")
+        if vigilante.stats['atascos']:
+            print(f"  ⚠ URLs atascadas (navegador terminado): {vigilante.stats['atascos']}")
+        print(f"  Tiempo estimado restante: {tiempo_estimado/60:.1f} minutos")
+    
+    # Fetch (navegador) -> parseo/formato -> checkpoint, desacoplados con colas acotadas
+    if navegador:
+        pipeline = PipelineCrawl(obtener_pestana, parsear, persistir, workers_fetch=CHROME_PESTANAS,
+                                 workers_parseo=2, max_crudos=max(10, 2 * CHROME_PESTANAS),
+                                 lote_escritura=25, cola_reintentos=reintentos, nombre='lote')
+    else:
+        pipeline = PipelineCrawl(obtener, parsear, persistir, workers_fetch=1, workers_parseo=2,
+                                 max_crudos=10, lote_escritura=25, cola_reintentos=reintentos, nombre='lote')
+    
     try:
-        for i, url in enumerate(urls, 1):
-            idx_total = exitosas + fallidas + i
-            
-            # Mostrar progreso cada 10 URLs
-            if i % 10 == 0 or i == 1:
-                transcurrido = time.time() - inicio_tiempo
-                velocidad = idx_total / transcurrido if transcurrido > 0 else 0
-                restantes = len(urls) - i
-                tiempo_estimado = restantes / velocidad if velocidad > 0 else 0
-                
-                print(f"\n[{idx_total}/{len(urls)+len(procesadas)}] Progreso: {idx_total/(len(urls)+len(procesadas))*100:.1f}%")
-                print(f"  Exitosas: {exitosas} | Fallidas: {fallidas}")
-                print(f"  Velocidad: {velocidad:.2f} URLs/seg")
-                print(f"  Tiempo estimado restante: {tiempo_estimado/60:.1f} minutos")
-            
-            try:
-                # Extraer datos raw
-                datos_raw = crawler.extraer_propiedad(url)
-                
-                if datos_raw and datos_raw.get('codigo_fr'):
-                    # Convertir a formato final
-                    datos_final = _formatear_salida_final(datos_raw)
-                    resultados.append(datos_final)
-                    exitosas += 1
-                    
-                    # Guardar checkpoint cada 100 URLs
-                    if exitosas % 100 == 0:
-                        with open(checkpoint_file, 'a', encoding='utf-8') as f:
-                            f.write(json.dumps(datos_final, ensure_ascii=False) + '\n')
-                        
-                        # Actualizar archivo de progreso
-                        with open(progress_file, 'w', encoding='utf-8') as f:
-                            f.write(f"Lote: {numero_lote}\n")
-                            f.write(f"Última actualización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                            f.write(f"Procesadas: {exitosas}\n")
-                            f.write(f"Fallidas: {fallidas}\n")
-                            f.write(f"Total: {len(urls)+len(procesadas)}\n")
-                            f.write(f"Progreso: {exitosas/(len(urls)+len(procesadas))*100:.1f}%\n")
-                        
-                        print(f"  ✓ Checkpoint guardado ({exitosas} propiedades)")
-                else:
-                    fallidas += 1
-                    
-            except Exception as e:
-                fallidas += 1
-                print(f"  ✗ Error en {url}: {str(e)[:100]}")
-            
-            # Pausa entre requests (2 segundos)
-            time.sleep(2)
-            
+        pipeline.procesar(urls)
+    
     except KeyboardInterrupt:
         print("\n\n⚠ Proceso interrumpido por el usuario")
         print("El progreso ha sido guardado en el checkpoint")
     
     finally:
         # Cerrar crawler
-        crawler.close()
+        if propio:
+            crawler.close()
+        if navegador:
+            navegador.cerrar()
+            print(f"Pestañas: {navegador.stats}")
+        archivo_crudo.cerrar()
+        directorio.cerrar()
         
         # Guardar resultados finales
         print(f"\n{'='*80}")
         print("GUARDANDO RESULTADOS FINALES")
         print("="*80)
         
-        # Guardar JSON
-        with open(final_json, 'w', encoding='utf-8') as f:
-            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        # Guardar JSON en streaming desde el checkpoint
+        urls_guardadas = []
+        
+        def registros_checkpoint():
+            for item in _leer_checkpoint(checkpoint_file):
+                urls_guardadas.append(item.get('URL INMUEBLE'))
+                yield item
+        
+        cantidad = escribir_json_streaming(final_json, registros_checkpoint())
         print(f"✓ JSON guardado: {final_json}")
-        print(f"  Propiedades: {len(resultados):,}")
+        print(f"  Propiedades: {cantidad:,}")
+        
+        # Registrar en el índice solo lo que ya quedó persistido
+        indice.agregar_muchos(extraer_cod_fr(url) for url in urls_guardadas)
         
         # Generar Excel
         try:
@@ -156,6 +300,7 @@ def procesar_lote(numero_lote: int):
             print(f"✗ Error al generar Excel: {e}")
         
         # Resumen final
+        exitosas, fallidas = contadores['exitosas'], contadores['fallidas']
         tiempo_total = time.time() - inicio_tiempo
         print(f"\n{'='*80}")
         print(f"LOTE {numero_lote} COMPLETADO")
@@ -164,24 +309,37 @@ def procesar_lote(numero_lote: int):
         print(f"URLs procesadas: {exitosas + fallidas:,}")
         print(f"Exitosas: {exitosas:,} ({exitosas/(exitosas+fallidas)*100:.1f}%)")
         print(f"Fallidas: {fallidas:,} ({fallidas/(exitosas+fallidas)*100:.1f}%)")
+        if contadores['por_clase']:
+            print("  Por clase: " + ', '.join(f"{clase} {n:,}" for clase, n in sorted(contadores['por_clase'].items())))
+        if len(reintentos):
+            print(f"  ⚠ Reintentos diferidos abandonados por la interrupción: {len(reintentos):,}")
         print(f"Velocidad promedio: {(exitosas+fallidas)/tiempo_total:.2f} URLs/seg")
+        metricas.guardar_resumen(metricas_file)
+        print("\nTiempo por fase:")
+        for fase, datos in metricas.resumen()['fases'].items():
+            print(f"  {fase:<14} {datos['porcentaje_tiempo']:5.1f}%  p50 {datos['p50_s']}s  p99 {datos['p99_s']}s")
+        metricas_tasa = controlador.metricas()
+        print(f"Tasa global final: {metricas_tasa['tasa_actual']:.2f} req/s "
+              f"(aumentos: {metricas_tasa['aumentos']}, reducciones: {metricas_tasa['reducciones']})")
         print(f"\nArchivos generados:")
         print(f"  - JSON: {final_json}")
         print(f"  - Excel: {final_excel}")
         print(f"  - Checkpoint: {checkpoint_file}")
+        print(f"  - Fallidas (con clase): {fallidas_file}")
         print()
 
 def main():
     if len(sys.argv) < 2:
         print("Uso: python procesar_lote.py <numero_lote>")
         print("Ejemplo: python procesar_lote.py 1")
-        print("\nLotes disponibles: 1-10")
+        print(f"\nLotes disponibles: 1-{leer_num_shards(LOTES_DIR, LOTES_NUM_SHARDS)}")
         return 1
     
     try:
         numero_lote = int(sys.argv[1])
-        if numero_lote < 1 or numero_lote > 10:
-            print("ERROR: El número de lote debe estar entre 1 y 10")
+        num_lotes = leer_num_shards(LOTES_DIR, LOTES_NUM_SHARDS)
+        if numero_lote < 1 or numero_lote > num_lotes:
+            print(f"ERROR: El número de lote debe estar entre 1 y {num_lotes}")
             return 1
         
         procesar_lote(numero_lote)
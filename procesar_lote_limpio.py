@@ -1,10 +1,13 @@
 # Procesar lotes
 
 import sys
-import json
 from pathlib import Path
 from datetime import datetime
 from property_crawler_selenium import PropertyCrawlerSelenium
+from pipeline import PipelineCrawl
+from registro_inmueble import CAMPOS
+from instantanea_entradas import leer_urls
+from staging_lotes import StagingLote
 import pandas as pd  
 
 def procesar_lote(numero_lote):
@@ -27,39 +30,24 @@ def procesar_lote(numero_lote):
         print(f"❌ Archivo Excel no encontrado: {excel_file}")
         return
 
-    # Excel
+    # Excel (instantánea en caché: cada proceso de lote ya no repite el read_excel)
     try:
-        import pandas as pd 
-        df = pd.read_excel(excel_file)
-        if 'URL' not in df.columns:
-            print("❌ La columna 'URL' no se encuentra en el archivo Excel.")
-            return
-        urls = df['URL'].dropna().tolist()
+        urls = leer_urls(str(excel_file), 'URL', adivinar=False)
+    except KeyError:
+        print("❌ La columna 'URL' no se encuentra en el archivo Excel.")
+        return
     except Exception as e:
         print(f"❌ Error al leer el archivo Excel: {str(e)}")
         return
 
-    # Reanudación automática desde backup 
-    import re
-    backup_files = list(lote_dir.glob(f"lote_{lote_str}_backup_*.json"))
-    latest_backup = None
-    latest_index = 0
-    if backup_files:
-        # Buscar el backup
-        def extract_index(f):
-            m = re.search(r"backup_(\d+)_", f.name)
-            return int(m.group(1)) if m else 0
-        backup_files.sort(key=extract_index, reverse=True)
-        latest_backup = backup_files[0]
-        latest_index = extract_index(latest_backup)
-    resultados = []
-    exitosas = 0
+    # Resultados en disco local; a OneDrive solo va un backup compacto cada LOTES_SYNC_CADENCIA s
+    staging = StagingLote(numero_lote, lote_dir)
+
+    # Reanudación automática: staging local o último backup publicado, el más avanzado
+    resultados, latest_index = staging.reanudar()  # Registros compactos (__slots__, strings internados)
+    exitosas = len(resultados)
     fallidas = 0
-    if latest_backup:
-        print(f"🔄 Reanudando desde backup: {latest_backup}")
-        with open(latest_backup, 'r', encoding='utf-8') as f:
-            resultados = json.load(f)
-        exitosas = len(resultados)
+    if latest_index:
         # Solo procesar las URLs que faltan
         urls = urls[latest_index:]
     else:
@@ -74,45 +62,58 @@ def procesar_lote(numero_lote):
 
     log_file = lote_dir / f"lote_{lote_str}_errores.log"
 
+    # Posición en la lista completa de URLs: el backup la usa para reanudar
+    total = len(urls) + latest_index
+    estado = {'posicion': latest_index, 'exitosas': exitosas, 'fallidas': fallidas}
+
+    def persistir(lote):
+        errores = []
+        nuevos = []
+        for url, datos_raw, error in lote:
+            if error is None:
+                nuevos.append(datos_raw)
+                estado['exitosas'] += 1
+            else:
+                estado['fallidas'] += 1
+                errores.append(f"URL sin datos válidos: {url} ({error})\n")
+        if errores:
+            with open(log_file, 'a', encoding='utf-8') as log:
+                log.writelines(errores)
+
+        anterior = estado['posicion']
+        estado['posicion'] += len(lote)
+        posicion = estado['posicion']
+        # Cada lote del escritor queda en el staging local (append, sin reescribir nada)
+        staging.agregar(nuevos, posicion)
+
+        if posicion // 200 > anterior // 200 or posicion == total:
+            print(f"[{posicion:5d}/{total}] ✓{estado['exitosas']:5d} | ✗{estado['fallidas']:5d}")
+        # Backup compacto a la carpeta sincronizada según la cadencia (poda los viejos)
+        backup_file = staging.sincronizar()
+        if backup_file:
+            print(f"Backup publicado: {backup_file}")
+
+    # Navegador, parseo y escritura en etapas separadas. Un solo worker por etapa
+    # conserva el orden de las URLs, del que depende la reanudación por posición.
+    pipeline = PipelineCrawl(
+        obtener=lambda url, _: crawler.obtener_html(url),
+        parsear=lambda url, html: crawler.parsear_html(html, url),
+        persistir=persistir,
+        workers_fetch=1, workers_parseo=1, max_crudos=10, lote_escritura=20,
+        nombre='lote_limpio',
+    )
+
     try:
-        for i, url in enumerate(urls, 1):
-            global_index = exitosas + i  # Ya procesados en LOG
-            if global_index % 200 == 0:
-                print(f"[{global_index:5d}/{len(urls) + exitosas}] ✓{exitosas:5d} | ✗{fallidas:5d}")
-
-            try:
-                # Extraer propiedad con reintentos (3 reintentos)
-                datos_raw = crawler.extraer_propiedad(url)
-
-                if datos_raw and datos_raw.get('cod_fr'):
-                    resultados.append(datos_raw)
-                    exitosas += 1
-                else:
-                    fallidas += 1
-                    with open(log_file, 'a', encoding='utf-8') as log:
-                        log.write(f"URL sin datos válidos: {url}\n")
-
-            except Exception as e:
-                fallidas += 1
-                with open(log_file, 'a', encoding='utf-8') as log:
-                    log.write(f"Error en URL {url}: {str(e)}\n")
-
-            # Guardar backup cada 200 inmuebles
-            if global_index % 200 == 0 or i == len(urls):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_file = lote_dir / f"lote_{lote_str}_backup_{global_index}_{timestamp}.json"
-                with open(backup_file, 'w', encoding='utf-8') as f:
-                    json.dump(resultados, f, ensure_ascii=False, indent=2)
-                print(f"Backup guardado: {backup_file}")
+        pipeline.procesar(urls)
+        exitosas, fallidas = estado['exitosas'], estado['fallidas']
 
         # Guardar resultados finales
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_json = lote_dir / f"lote_{lote_str}_{timestamp}.json"
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        staging.guardar_final(output_json)
 
         # Guardar JSON, CSV y el Eczel
-        df_result = pd.DataFrame(resultados)
+        df_result = pd.DataFrame.from_records(resultados.dicts(), columns=CAMPOS)
         output_csv = lote_dir / f"lote_{lote_str}_{timestamp}.csv"
         output_xlsx = lote_dir / f"lote_{lote_str}_{timestamp}.xlsx"
         df_result.to_csv(output_csv, index=False, encoding='utf-8-sig')
@@ -134,6 +135,11 @@ def procesar_lote(numero_lote):
             crawler.close()
         except:
             pass
+        # Interrumpido o con error: lo avanzado queda publicado (no-op si ya está al día)
+        try:
+            staging.sincronizar(forzar=True)
+        except OSError as e:
+            print(f"⚠ No se pudo publicar el backup final: {e} (queda en {staging.jsonl})")
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Uso: python procesar_lote_limpio.py <numero_lote> [ruta_excel]")
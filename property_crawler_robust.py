@@ -3,16 +3,16 @@ property_crawler_robust.py - Crawler robusto para grandes volúmenes (300k+ inmu
 
 Características:
 - Checkpoints incrementales (reanudar sin repetir trabajo)
-- Reintentos automáticos con backoff exponencial
+- Reintentos por clase de error en una cola diferida (errores_crawl): el worker no duerme
 - Paralelización controlada (ThreadPool)
 - Validación de datos y detección de duplicados
 - Logging detallado con métricas de progreso
 - Gestión eficiente de memoria en batches
 """
 import re
+import copy
 import json
 import time
-import logging
 from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
 from pathlib import Path
@@ -20,25 +20,54 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 import hashlib
 
+from frontera import IndiceCodFr, construir_frontera, extraer_cod_fr
+from control_tasa import ControladorTasa
+from clasificador_paginas import (
+    NORMAL, CHALLENGE, REMOVIDO,
+    MonitorBloqueos, PaginaBloqueada, PaginaRemovida, esperar_clasificacion,
+    marcar_documento_anterior, detener_carga,
+)
+from metricas import get_registro
+from pipeline import PipelineCrawl
+from escritor_jsonl import EscritorJSONL
+from archivo_crudo import ArchivoCrudo
+from logger_config import configurar_logging, agregar_archivo, get_logger
+from vigilante_driver import VigilanteDriver, URLVencida, cerrar_driver
+from errores_crawl import (
+    BLOQUEADO, NAVEGADOR_NUEVO, PARSEO, POLITICAS, REMOVIDO as ERROR_REMOVIDO, TIMEOUT,
+    CLASES_REINTENTABLES, ColaReintentos, ErrorCrawl, clase_de_pagina, clasificar_error,
+)
+
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
 
 # Configuración global
 CONFIG = {
     'checkpoint_interval': 10,  # Guardar cada N URLs
-    'max_retries': 3,  # Reintentos por URL
-    'retry_delay_base': 2,  # Segundos base para backoff exponencial
+    'max_retries': 3,  # Intentos por URL (el primero + reintentos diferidos) para clases reintentables
+    'reintentos': {},  # Config de la cola diferida (ver errores_crawl.CONFIG_REINTENTOS)
     'batch_size': 100,  # Procesar en lotes de N URLs
     'max_workers': 3,  # Threads concurrentes (ajustar según CPU/RAM)
-    'request_delay': 0.5,  # Pausa entre requests (segundos)
+    'request_delay': 0.5,  # Pausa fija entre requests (solo si control_tasa es None)
+    'control_tasa': {},  # Config AIMD (ver control_tasa.CONFIG_TASA); None = pausa fija
     'headless': True,
     'page_timeout': 20,  # Timeout por página (segundos)
+    'plazo_url': 120,  # Plazo duro por URL (reintentos incluidos); al vencer se mata el navegador
+    'estrategia_carga': 'normal',  # 'normal' | 'eager' | 'none' (no esperar el evento load completo)
+    'metricas_puerto': None,  # Puerto local para /metrics (Prometheus); None = desactivado
+    'metricas_intervalo': 60,  # Segundos entre resúmenes JSON de métricas por fase
+    'pipeline': True,  # fetch -> parseo -> escritura desacoplados (False = un worker hace todo por batch)
+    'workers_parseo': 2,  # Threads de parseo/normalización del pipeline
+    'cola_crudos': 20,  # Páginas crudas en espera de parseo (backpressure sobre los navegadores)
+    'lote_escritura': 50,  # Registros por escritura del escritor único
+    'escritor_lote': 200,  # Líneas por escritura del escritor JSONL (group commit)
+    'escritor_intervalo': 1.0,  # Segundos máximos antes de escribir un lote incompleto
+    'escritor_fsync': 'intervalo',  # 'lote' | 'intervalo' | 'nunca'
+    'escritor_fsync_intervalo': 5.0,  # Segundos entre fsync con política 'intervalo'
+    'archivo_crudo': True,  # Guardar __NEXT_DATA__ crudo en <output_dir>/archivo_crudo (re-extracción offline)
 }
 
 
@@ -61,12 +90,38 @@ class RobustPropertyCrawler:
         # Estado interno
         self.processed_urls: Set[str] = set()
         self.failed_urls: Dict[str, int] = {}
+        self.indice = IndiceCodFr(self.output_dir / 'indice_cod_fr.txt')
+        self.controlador = None
+        if self.config['control_tasa'] is not None:
+            self.controlador = ControladorTasa(self.output_dir / 'tasa_global.json', self.config['control_tasa'])
+        self.monitor_bloqueos = MonitorBloqueos(self.output_dir / 'bloqueos.json')
+        self.metricas = get_registro()
+        self.vigilante = VigilanteDriver(self.config['plazo_url'])
+        # Reintentos diferidos por clase de error: el worker sigue con la siguiente URL
+        self.reintentos = ColaReintentos({
+            'max_intentos': {clase: self.config['max_retries'] - 1 for clase in CLASES_REINTENTABLES},
+            **self.config['reintentos'],
+        })
+        self.metrics_file = self.output_dir / f'metricas_{self.session_id}.json'
+        self.archivo_crudo = ArchivoCrudo(self.output_dir / 'archivo_crudo') if self.config['archivo_crudo'] else None
         self.lock = Lock()
+        self.lock_checkpoint = Lock()  # Serializa las escrituras del checkpoint (fuera de self.lock)
+        # Resultados y errores los escribe un thread dedicado: los workers solo encolan
+        self.escritor = EscritorJSONL(
+            max_lote=self.config['escritor_lote'],
+            intervalo_flush=self.config['escritor_intervalo'],
+            fsync=self.config['escritor_fsync'],
+            intervalo_fsync=self.config['escritor_fsync_intervalo'],
+        )
         self.stats = {
             'total': 0,
             'success': 0,
             'failed': 0,
             'skipped': 0,
+            'fetches_evitados': 0,
+            'removed': 0,
+            'blocked': 0,
+            'fallos_por_clase': {},  # Fallos definitivos por clase (errores_crawl)
             'start_time': None,
         }
         
@@ -77,16 +132,10 @@ class RobustPropertyCrawler:
         self._load_checkpoint()
     
     def _setup_logging(self):
-        """Configura sistema de logging robusto"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s [%(levelname)s] %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        """Logging asíncrono (logger_config): los workers solo encolan, el listener escribe"""
+        configurar_logging()
+        agregar_archivo(self.log_file, formato='%(asctime)s [%(levelname)s] %(message)s')
+        self.logger = get_logger(__name__)
     
     def _load_checkpoint(self):
         """Carga checkpoint previo para reanudar"""
@@ -101,24 +150,36 @@ class RobustPropertyCrawler:
             except Exception as e:
                 self.logger.warning(f"No se pudo cargar checkpoint: {e}")
     
-    def _save_checkpoint(self):
-        """Guarda checkpoint actual"""
-        checkpoint = {
+    def _estado_checkpoint(self) -> Dict[str, Any]:
+        """Copia del estado actual para el checkpoint; llamar con self.lock"""
+        return {
             'session_id': self.session_id,
             'timestamp': datetime.now().isoformat(),
             'processed_urls': list(self.processed_urls),
-            'failed_urls': self.failed_urls,
-            'stats': self.stats,
+            'failed_urls': dict(self.failed_urls),
+            'stats': copy.deepcopy(self.stats),
         }
-        with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    
+    def _save_checkpoint(self, checkpoint: Dict[str, Any] = None):
+        """Guarda checkpoint (la copia del estado o la actual); llamar sin self.lock"""
+        if checkpoint is None:
+            with self.lock:
+                checkpoint = self._estado_checkpoint()
+        with self.lock_checkpoint:
+            # Las URLs del checkpoint cuentan como hechas: sus registros deben estar en disco antes.
+            # Sincronizar espera al disco, por eso no se hace con self.lock tomado
+            self.escritor.sincronizar()
+            with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, ensure_ascii=False, indent=2)
     
     def _append_result(self, data: Dict[str, Any], is_error: bool = False):
         """Guarda resultado en JSONL (append-only para evitar corrupción)"""
+        self._append_results([data], is_error)
+    
+    def _append_results(self, items: List[Dict[str, Any]], is_error: bool = False):
+        """Encola resultados para el escritor JSONL (no bloquea en disco)"""
         target_file = self.error_file if is_error else self.data_file
-        with self.lock:
-            with open(target_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(data, ensure_ascii=False) + '\n')
+        self.escritor.escribir_muchos(target_file, items)
     
     def _create_driver(self):
         """Crea instancia de Selenium WebDriver"""
@@ -151,8 +212,10 @@ class RobustPropertyCrawler:
         chrome_options.add_experimental_option('prefs', prefs)
         chrome_options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.page_load_strategy = self.config['estrategia_carga']
         
-        driver = webdriver.Chrome(options=chrome_options)
+        with self.metricas.fase('driver'):
+            driver = webdriver.Chrome(options=chrome_options)
         driver.set_page_load_timeout(self.config['page_timeout'])
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
@@ -160,22 +223,57 @@ class RobustPropertyCrawler:
     
     def _extract_property_data(self, driver, url: str) -> Optional[Dict[str, Any]]:
         """Extrae datos de una propiedad usando el driver"""
+        return self._parse_html(url, self._fetch_html(driver, url))
+    
+    def _fetch_html(self, driver, url: str) -> str:
+        """Navega y retorna el HTML de una página normal (etapa de fetch)"""
         try:
-            driver.get(url)
+            carga_temprana = self.config['estrategia_carga'] != 'normal'
+            if carga_temprana:
+                marcar_documento_anterior(driver)
+            inicio_navegacion = time.perf_counter()
+            with self.metricas.fase('navegacion'):
+                driver.get(url)
             
-            # Esperar __NEXT_DATA__
-            wait = WebDriverWait(driver, self.config['page_timeout'])
-            wait.until(EC.presence_of_element_located((By.ID, '__NEXT_DATA__')))
-            time.sleep(0.5)
+            # Clasificar la página apenas hay DOM (corta la espera en challenge/removido/error)
+            with self.metricas.fase('espera'):
+                clase, _ = esperar_clasificacion(driver, self.config['page_timeout'])
+                self.monitor_bloqueos.registrar(clase)
+                self.metricas.incrementar(f'paginas_{clase}')
+                if clase == CHALLENGE:
+                    raise PaginaBloqueada(url)
+                if clase == REMOVIDO:
+                    raise PaginaRemovida(url)
+                if clase != NORMAL:
+                    raise ErrorCrawl(f"Página de error ({clase})", clase_de_pagina(clase))
+                if carga_temprana:
+                    detener_carga(driver)
             
-            html = driver.page_source
+            with self.metricas.fase('transferencia'):
+                html = driver.page_source
+            self.metricas.observar_latencia('hasta_extraccion', time.perf_counter() - inicio_navegacion)
+            if self.archivo_crudo:
+                with self.metricas.fase('persistencia'):
+                    self.archivo_crudo.guardar_html(url, html)
+            return html
             
+        except TimeoutException as e:
+            raise ErrorCrawl("Timeout cargando página", TIMEOUT) from e
+        except (PaginaBloqueada, PaginaRemovida, ErrorCrawl):
+            raise
+        except Exception as e:
+            raise ErrorCrawl(f"Error extrayendo datos: {str(e)}", clasificar_error(e)) from e
+    
+    def _parse_html(self, url: str, html: str) -> Dict[str, Any]:
+        """Extrae el registro de un HTML ya descargado (etapa de parseo, sin driver)"""
+        try:
             # Extraer JSON
-            match = re.search(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.+?)</script>', html, re.DOTALL)
-            if not match:
-                raise ValueError("__NEXT_DATA__ no encontrado")
+            with self.metricas.fase('parseo'):
+                match = re.search(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.+?)</script>', html, re.DOTALL)
+                if not match:
+                    raise ValueError("__NEXT_DATA__ no encontrado")
+                json_data = json.loads(match.group(1))
             
-            json_data = json.loads(match.group(1))
             page_props = json_data.get('props', {}).get('pageProps', {})
             data = page_props.get('data', {})
             technical_sheet = page_props.get('technicalSheet', {})
@@ -184,13 +282,12 @@ class RobustPropertyCrawler:
                 raise ValueError("No hay datos de propiedad")
             
             # Extraer campos (reutilizar lógica anterior)
-            resultado = self._parse_property_data(url, data, technical_sheet, html)
+            with self.metricas.fase('normalizacion'):
+                resultado = self._parse_property_data(url, data, technical_sheet, html)
             return resultado
             
-        except TimeoutException:
-            raise Exception("Timeout cargando página")
         except Exception as e:
-            raise Exception(f"Error extrayendo datos: {str(e)}")
+            raise ErrorCrawl(f"Error extrayendo datos: {str(e)}", PARSEO) from e
     
     def _parse_property_data(self, url: str, data: Dict, technical_sheet: Any, html: str) -> Dict[str, Any]:
         """Parsea datos extraídos y genera estructura final"""
@@ -384,21 +481,42 @@ class RobustPropertyCrawler:
             'nombre': owner.get('name'),
         }
     
-    def _process_url_with_retry(self, url: str, driver) -> Optional[Dict[str, Any]]:
-        """Procesa una URL con reintentos automáticos"""
-        for attempt in range(1, self.config['max_retries'] + 1):
-            try:
-                data = self._extract_property_data(driver, url)
-                return data
-            except Exception as e:
-                if attempt < self.config['max_retries']:
-                    delay = self.config['retry_delay_base'] ** attempt
-                    self.logger.warning(f"Intento {attempt} falló para {url}: {e}. Reintentando en {delay}s...")
-                    time.sleep(delay)
-                else:
-                    self.logger.error(f"Falló definitivamente {url}: {e}")
-                    return None
-        return None
+    def _process_url(self, url: str, driver, extraer=None) -> Any:
+        """
+        Un intento por URL (extraer: por defecto fetch + parseo). Los fallos salen
+        como ErrorCrawl con su clase; reintentar es trabajo de la cola diferida.
+        """
+        extraer = extraer or self._extract_property_data
+        self.monitor_bloqueos.esperar_enfriamiento()
+        try:
+            return extraer(driver, url)
+        except Exception as e:
+            if self.vigilante.vencida():
+                # El vigilante ya mató este navegador: driver nuevo y reintento
+                raise URLVencida(f"Plazo vencido para {url}") from e
+            clase = clasificar_error(e)
+            if clase == ERROR_REMOVIDO:
+                self.logger.info(f"Inmueble removido (sin reintentos): {url}")
+                with self.lock:
+                    self.stats['removed'] += 1
+            elif clase == BLOQUEADO:
+                # El enfriamiento global frena a todos; la URL vuelve más tarde
+                self.logger.warning(f"Página de bloqueo: {url}")
+                with self.lock:
+                    self.stats['blocked'] += 1
+                if self.controlador:
+                    self.controlador.notificar_bloqueo()
+            if isinstance(e, ErrorCrawl):
+                raise
+            raise ErrorCrawl(str(e) or type(e).__name__, clase) from e
+    
+    def _registrar_fallo(self, url: str, error: Exception):
+        """Fallo definitivo (clase sin reintentos o intentos agotados); llamar con self.lock"""
+        clase = clasificar_error(error)
+        self._append_result({'url': url, 'error': str(error) or 'Extraction failed', 'clase': clase}, is_error=True)
+        self.stats['failed'] += 1
+        self.stats['fallos_por_clase'][clase] = self.stats['fallos_por_clase'].get(clase, 0) + 1
+        self.failed_urls[url] = self.failed_urls.get(url, 0) + 1
     
     def _process_batch(self, urls: List[str], batch_num: int, total_batches: int):
         """Procesa un batch de URLs con un worker"""
@@ -414,52 +532,144 @@ class RobustPropertyCrawler:
                         self.stats['skipped'] += 1
                     continue
                 
-                # Procesar con reintentos
-                result = self._process_url_with_retry(url, driver)
+                # Un intento por URL (respetando la tasa global); los fallos reintentables se difieren
+                if self.controlador:
+                    self.controlador.esperar_turno()
+                inicio = time.time()
+                try:
+                    # Con plazo del vigilante: una URL atascada mata el driver y sale como driver caído
+                    result, error = self.vigilante.ejecutar(
+                        url, lambda: driver, lambda: self._process_url(url, driver)), None
+                except Exception as e:
+                    result, error = None, e
+                if self.controlador:
+                    self.controlador.reportar(time.time() - inicio, exito=bool(result))
+                
+                diferida = False
+                if error is not None:
+                    clase = clasificar_error(error)
+                    if POLITICAS.get(clase) == NAVEGADOR_NUEVO:
+                        cerrar_driver(driver)
+                        driver = None
+                        driver = self._create_driver()
+                    diferida = self.reintentos.programar(url, clase)
+                    if diferida:
+                        self.logger.info(f"  [{idx}/{len(urls)}] Diferida ({clase}): {url}")
                 
+                checkpoint = None
                 with self.lock:
                     if result:
                         self._append_result(result)
                         self.stats['success'] += 1
                         self.processed_urls.add(url)
-                        self.logger.info(f"  [{idx}/{len(urls)}] OK: {url} (Cod FR: {result.get('Cod FR')})")
-                    else:
-                        self._append_result({'url': url, 'error': 'Extraction failed'}, is_error=True)
-                        self.stats['failed'] += 1
-                        self.failed_urls[url] = self.failed_urls.get(url, 0) + 1
+                        self.indice.agregar(extraer_cod_fr(url))
+                        self.logger.debug(f"  [{idx}/{len(urls)}] OK: {url} (Cod FR: {result.get('Cod FR')})",
+                                          extra={'evento': 'url_ok', 'url': url})
+                    elif not diferida:
+                        self._registrar_fallo(url, error or ErrorCrawl('Extraction failed', PARSEO))
                         self.logger.error(f"  [{idx}/{len(urls)}] FALLO: {url}")
                     
-                    # Checkpoint periódico
-                    if (self.stats['success'] + self.stats['failed']) % self.config['checkpoint_interval'] == 0:
-                        self._save_checkpoint()
+                    # Checkpoint periódico (copia bajo el lock, escritura fuera)
+                    if not diferida and (self.stats['success'] + self.stats['failed']) % self.config['checkpoint_interval'] == 0:
+                        checkpoint = self._estado_checkpoint()
+                if checkpoint:
+                    self._save_checkpoint(checkpoint)
                 
-                # Pausa entre requests
-                time.sleep(self.config['request_delay'])
+                # Pausa fija entre requests si no hay control adaptativo
+                if not self.controlador:
+                    time.sleep(self.config['request_delay'])
         
         finally:
-            if driver:
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
+            cerrar_driver(driver)
     
-    def crawl(self, urls: List[str]) -> Dict[str, Any]:
-        """Crawlea lista de URLs en modo robusto y paralelo"""
-        self.stats['total'] = len(urls)
-        self.stats['start_time'] = datetime.now().isoformat()
-        
-        self.logger.info(f"{'='*70}")
-        self.logger.info(f"Iniciando crawling robusto")
-        self.logger.info(f"Total URLs: {len(urls)}")
-        self.logger.info(f"Batch size: {self.config['batch_size']}")
-        self.logger.info(f"Max workers: {self.config['max_workers']}")
-        self.logger.info(f"Checkpoint cada: {self.config['checkpoint_interval']} URLs")
-        self.logger.info(f"{'='*70}")
-        
-        # Filtrar URLs ya procesadas
-        urls_pendientes = [u for u in urls if u not in self.processed_urls]
-        self.logger.info(f"URLs pendientes: {len(urls_pendientes)} (ya procesadas: {len(self.processed_urls)})")
+    def _fetch_pipeline(self, url: str, driver) -> Optional[str]:
+        """Etapa de fetch del pipeline: turno en la tasa global + un intento de navegación"""
+        if self.controlador:
+            self.controlador.esperar_turno()
+        inicio = time.time()
+        try:
+            # El pipeline clasifica el error: diferido, driver nuevo (URLVencida) o fallo definitivo
+            html = self.vigilante.ejecutar(
+                url, lambda: driver, lambda: self._process_url(url, driver, extraer=self._fetch_html))
+        except Exception:
+            if self.controlador:
+                self.controlador.reportar(time.time() - inicio, exito=False)
+            else:
+                time.sleep(self.config['request_delay'])
+            raise
+        if self.controlador:
+            self.controlador.reportar(time.time() - inicio, exito=html is not None)
+        else:
+            time.sleep(self.config['request_delay'])
+        return html
+    
+    def _persistir_lote(self, lote: List[Any]):
+        """Etapa de escritura del pipeline (un solo thread): resultados, estado y checkpoint"""
+        exitos = [(url, result) for url, result, error in lote if error is None]
+        fallos = [(url, error) for url, result, error in lote if error is not None]
+        self._append_results([result for _, result in exitos])
+        self._append_results([{'url': url, 'error': str(error) or 'Extraction failed', 'clase': clasificar_error(error)}
+                              for url, error in fallos], is_error=True)
         
+        checkpoint = None
+        with self.lock:
+            antes = self.stats['success'] + self.stats['failed']
+            for url, result in exitos:
+                self.stats['success'] += 1
+                self.processed_urls.add(url)
+                self.indice.agregar(extraer_cod_fr(url))
+                self.logger.debug(f"  OK: {url} (Cod FR: {result.get('Cod FR')})",
+                                  extra={'evento': 'url_ok', 'url': url})
+            for url, error in fallos:
+                self.stats['failed'] += 1
+                clase = clasificar_error(error)
+                self.stats['fallos_por_clase'][clase] = self.stats['fallos_por_clase'].get(clase, 0) + 1
+                self.failed_urls[url] = self.failed_urls.get(url, 0) + 1
+                self.logger.error(f"  FALLO: {url} ({str(error)[:80]})")
+            despues = self.stats['success'] + self.stats['failed']
+            
+            # Checkpoint periódico (copia bajo el lock, escritura fuera)
+            if despues // self.config['checkpoint_interval'] > antes // self.config['checkpoint_interval']:
+                checkpoint = self._estado_checkpoint()
+        if checkpoint:
+            self._save_checkpoint(checkpoint)
+    
+    def _crawl_pipeline(self, urls: List[str]):
+        """Navegadores, parseo y escritura en etapas separadas con colas acotadas"""
+        pipeline = PipelineCrawl(
+            obtener=self._fetch_pipeline,
+            parsear=self._parse_html,
+            persistir=self._persistir_lote,
+            crear_recurso=self._create_driver,
+            cerrar_recurso=cerrar_driver,
+            workers_fetch=self.config['max_workers'],
+            workers_parseo=self.config['workers_parseo'],
+            max_crudos=self.config['cola_crudos'],
+            lote_escritura=self.config['lote_escritura'],
+            reciclar_cada=self.config['batch_size'],  # Driver nuevo cada batch_size URLs, como en modo batch
+            cola_reintentos=self.reintentos,
+            nombre='robust',
+        )
+        stats = pipeline.procesar(urls)
+        self.stats['pipeline'] = stats
+        self.logger.info(f"Pipeline: fetch OK {stats['fetch_ok']}, parseo OK {stats['parseo_ok']}, "
+                         f"lotes escritos {stats['lotes_escritos']}, "
+                         f"esperas por backpressure {stats['bloqueos_backpressure']}, "
+                         f"diferidas {stats['diferidas']}")
+    
+    def _crawl_batches(self, urls_pendientes: List[str]):
+        """Modo batch: una pasada por las URLs y luego rondas con los reintentos diferidos que vencen"""
+        self._ejecutar_batches(urls_pendientes)
+        while len(self.reintentos):
+            espera = self.reintentos.proximo() or 0
+            if espera > 0:
+                self.logger.info(f"Reintentos diferidos: {len(self.reintentos)} pendientes, "
+                                 f"próximo en {espera:.0f}s")
+                time.sleep(espera)
+            self._ejecutar_batches([r.url for r in self.reintentos.tomar_vencidos()])
+    
+    def _ejecutar_batches(self, urls_pendientes: List[str]):
+        """Cada worker navega, parsea y escribe su batch en secuencia"""
         # Dividir en batches
         batches = [
             urls_pendientes[i:i + self.config['batch_size']]
@@ -481,12 +691,65 @@ class RobustPropertyCrawler:
                     future.result()
                 except Exception as e:
                     self.logger.error(f"Batch {batch_idx + 1} falló: {e}")
+    
+    def crawl(self, urls: List[str]) -> Dict[str, Any]:
+        """Crawlea lista de URLs en modo robusto y paralelo"""
+        self.stats['total'] = len(urls)
+        self.stats['start_time'] = datetime.now().isoformat()
+        
+        self.logger.info(f"{'='*70}")
+        self.logger.info(f"Iniciando crawling robusto")
+        self.logger.info(f"Total URLs: {len(urls)}")
+        self.logger.info(f"Batch size: {self.config['batch_size']}")
+        self.logger.info(f"Max workers: {self.config['max_workers']}")
+        self.logger.info(f"Checkpoint cada: {self.config['checkpoint_interval']} URLs")
+        self.logger.info(f"{'='*70}")
+        
+        # Métricas por fase: resumen JSON periódico y endpoint Prometheus opcional
+        if self.controlador:
+            self.metricas.gauge('tasa_global_req_s', lambda: self.controlador.tasa_actual)
+        self.metricas.iniciar_resumen_periodico(str(self.metrics_file), self.config['metricas_intervalo'])
+        if self.config['metricas_puerto']:
+            self.metricas.iniciar_servidor(self.config['metricas_puerto'])
+        
+        # Canonicalizar, deduplicar por cod_fr y filtrar URLs ya procesadas
+        urls_frontera, frontera_stats = construir_frontera(urls, self.indice)
+        urls_pendientes = [u for u in urls_frontera if u not in self.processed_urls]
+        self.stats['fetches_evitados'] = frontera_stats['fetches_evitados'] + len(urls_frontera) - len(urls_pendientes)
+        self.logger.info(f"URLs pendientes: {len(urls_pendientes)} (ya procesadas: {len(self.processed_urls)}, "
+                         f"fetches evitados: {self.stats['fetches_evitados']})")
+        
+        try:
+            if self.config['pipeline']:
+                self._crawl_pipeline(urls_pendientes)
+            else:
+                self._crawl_batches(urls_pendientes)
+        finally:
+            # Drenar el escritor: todo lo encolado queda en disco (con fsync) aunque se interrumpa
+            self.escritor.cerrar()
+        self.stats['escritor'] = dict(self.escritor.stats)
+        self.stats['vigilante'] = dict(self.vigilante.stats)
+        self.stats['reintentos'] = dict(self.reintentos.stats)
+        if self.vigilante.stats['atascos']:
+            self.logger.warning(f"URLs atascadas (navegador terminado por el vigilante): "
+                                f"{self.vigilante.stats['atascos']}")
+        self.logger.info(f"Escritor JSONL: {self.stats['escritor']['escritos']} líneas en "
+                         f"{self.stats['escritor']['lotes']} lotes, {self.stats['escritor']['fsyncs']} fsync")
         
         # Guardar checkpoint final
         self._save_checkpoint()
         
         # Consolidar resultados en JSON único
         self._consolidate_results()
+        if self.archivo_crudo:
+            self.archivo_crudo.cerrar()
+            self.logger.info(f"Archivo crudo: {len(self.archivo_crudo)} inmuebles en {self.archivo_crudo.directorio}")
+        
+        # Resumen final de métricas por fase
+        self.metricas.guardar_resumen(str(self.metrics_file))
+        for fase, datos in self.metricas.resumen()['fases'].items():
+            self.logger.info(f"  Fase {fase:<14} {datos['porcentaje_tiempo']:5.1f}% "
+                             f"(p50 {datos['p50_s']}s, p99 {datos['p99_s']}s, n={datos['conteo']})")
         
         # Estadísticas finales
         elapsed = (datetime.now() - datetime.fromisoformat(self.stats['start_time'])).total_seconds()
@@ -499,8 +762,23 @@ class RobustPropertyCrawler:
         self.logger.info(f"  Exitosas: {self.stats['success']}")
         self.logger.info(f"  Fallidas: {self.stats['failed']}")
         self.logger.info(f"  Saltadas (duplicadas): {self.stats['skipped']}")
+        self.logger.info(f"  Fetches evitados (frontera): {self.stats['fetches_evitados']}")
+        self.logger.info(f"  Removidas: {self.stats['removed']} | Bloqueadas: {self.stats['blocked']} "
+                         f"| Enfriamientos: {self.monitor_bloqueos.stats['enfriamientos']}")
+        if self.stats['fallos_por_clase']:
+            detalle = ', '.join(f"{clase} {n}" for clase, n in sorted(self.stats['fallos_por_clase'].items()))
+            self.logger.info(f"  Fallos por clase: {detalle}")
+        programados = sum(self.reintentos.stats['programados'].values())
+        if programados:
+            self.logger.info(f"  Reintentos diferidos: {programados} "
+                             f"(agotados: {sum(self.reintentos.stats['agotados'].values())})")
         self.logger.info(f"  Duración: {elapsed:.1f}s")
         self.logger.info(f"  Tasa: {self.stats['rate_per_second']:.2f} props/seg")
+        if self.controlador:
+            self.stats['control_tasa'] = self.controlador.metricas()
+            self.logger.info(f"  Tasa global final: {self.stats['control_tasa']['tasa_actual']:.2f} req/s "
+                             f"(aumentos: {self.stats['control_tasa']['aumentos']}, "
+                             f"reducciones: {self.stats['control_tasa']['reducciones']})")
         self.logger.info(f"{'='*70}\n")
         
         return self.stats
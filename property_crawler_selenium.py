@@ -10,22 +10,131 @@ import time
 from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+from clasificador_paginas import (
+    NORMAL, CHALLENGE, REMOVIDO, ESTRATEGIAS_CARGA,
+    MonitorBloqueos, esperar_clasificacion, marcar_documento_anterior, detener_carga,
+)
+from metricas import get_registro
+from archivo_crudo import ArchivoCrudo
+from directorio_inmobiliarias import DirectorioInmobiliarias
+from vigilante_driver import cerrar_driver
+from errores_crawl import NAVEGADOR_NUEVO, PARSEO, POLITICAS, ErrorCrawl, clase_de_pagina, clasificar_error
+
+# Columnas del JSON/Excel final (mismo orden que json_to_excel_properties)
+COLUMNAS_SALIDA = [
+    'ID Inmos', 'Inmos', 'URL INMUEBLE', 'COD FR', 'COD FR LEGACY', 'TITULO', 'DESCRIPCION',
+    'PRECIO', 'PRECIO ADMIN', 'UBICACION', 'Tipo de inmueble', 'Tipo de oferta', 'Estado',
+    'Habitaciones', 'Baños', 'Parqueaderos', 'Estrato', 'Antigüedad', 'Metros',
+    'Area', 'Area privada', 'Area del terreno', 'Area lote', 'Piso No.', 'Cantidad de pisos',
+    'Cantidad de ambientes', 'Apto para oficina', 'Acepta permuta', 'Remodelado', 'Penthouse',
+    'Contrato minimo', 'Documentacion requerida', 'Acepta mascotas', 'M² de terraza', 'Comodidades'
+] + [f'Imagen {i}' for i in range(1, 16)]
+
+# Campo del registro crudo (_diccionario_vacio) -> columna final
+_CAMPO_A_COLUMNA = {
+    'id_inmos': 'ID Inmos', 'inmos': 'Inmos', 'url_inmueble': 'URL INMUEBLE', 'cod_fr': 'COD FR',
+    'cod_fr_legacy': 'COD FR LEGACY', 'titulo': 'TITULO', 'descripcion': 'DESCRIPCION',
+    'precio': 'PRECIO', 'precio_admin': 'PRECIO ADMIN', 'ubicacion': 'UBICACION',
+    'tipo_inmueble': 'Tipo de inmueble', 'tipo_oferta': 'Tipo de oferta', 'estado': 'Estado',
+    'habitaciones': 'Habitaciones', 'banos': 'Baños', 'parqueaderos': 'Parqueaderos',
+    'estrato': 'Estrato', 'antiguedad': 'Antigüedad', 'metros': 'Metros', 'area': 'Area',
+    'area_privada': 'Area privada', 'area_terreno': 'Area del terreno', 'area_lote': 'Area lote',
+    'piso_no': 'Piso No.', 'cantidad_pisos': 'Cantidad de pisos', 'cantidad_ambientes': 'Cantidad de ambientes',
+    'apto_oficina': 'Apto para oficina', 'acepta_permuta': 'Acepta permuta', 'remodelado': 'Remodelado',
+    'penthouse': 'Penthouse', 'contrato_minimo': 'Contrato minimo',
+    'documentacion_requerida': 'Documentacion requerida', 'acepta_mascotas': 'Acepta mascotas',
+    'm2_terraza': 'M² de terraza',
+}
+_CAMPOS_SI_NO = ('apto_oficina', 'acepta_permuta', 'remodelado', 'penthouse', 'acepta_mascotas')
+
+
+def _si_no_normalizado(valor):
+    """'true' / 'Admite' / 'no acepta'... -> 'Sí' / 'No' (None si no se reconoce)"""
+    if valor is None:
+        return None
+    v = str(valor).strip().lower()
+    negativos = ['no', 'false', '0', 'no admite', 'no acepta', 'prohibido']
+    positivos = ['si', 'sí', 'true', '1', 'admite', 'acepta', 'permitidas', 'permitido']
+    # Los negativos primero: 'no acepta' contiene 'acepta'
+    if any(n == v or (' ' in n and n in v) for n in negativos):
+        return 'No'
+    if any(p == v or p in v for p in positivos):
+        return 'Sí'
+    return None
+
+
+def _inferir_tipo_oferta(url, tipo_propiedad=None):
+    """'venta' / 'arriendo' según el slug de la URL (None si no aparece)"""
+    u = (url or '').lower()
+    if '-en-venta-' in u:
+        return 'venta'
+    if '-en-arriendo-' in u:
+        return 'arriendo'
+    return None
+
+
+def _formatear_salida_final(datos_raw):
+    """
+    Convierte el registro del crawler al esquema final de 50 columnas
+    (35 campos + Imagen 1..15) que consumen el checkpoint, el JSON y el Excel.
+    
+    Acepta el registro de PropertyCrawlerSelenium (cod_fr, url_inmueble, ...),
+    el esquema intermedio antiguo (codigo_fr, h1, caracteristicas...) y
+    registros ya finales, que se devuelven con las columnas en orden.
+    """
+    if 'URL INMUEBLE' in datos_raw:
+        return {col: datos_raw.get(col) for col in COLUMNAS_SALIDA}
+    if 'cod_fr' not in datos_raw and 'codigo_fr' in datos_raw:
+        from convert_properties_json_to_final import _formatear
+        return _formatear(datos_raw)
+    
+    salida = {columna: datos_raw.get(campo) for campo, columna in _CAMPO_A_COLUMNA.items()}
+    for campo in _CAMPOS_SI_NO:
+        valor = datos_raw.get(campo)
+        salida[_CAMPO_A_COLUMNA[campo]] = _si_no_normalizado(valor) or valor
+    if not salida['Tipo de oferta']:
+        salida['Tipo de oferta'] = _inferir_tipo_oferta(datos_raw.get('url_inmueble'))
+    
+    comodidades = datos_raw.get('comodidades')
+    if isinstance(comodidades, list):
+        comodidades = '|'.join(c for c in comodidades if c)
+    salida['Comodidades'] = comodidades or ''
+    
+    imagenes = datos_raw.get('imagenes') or []
+    for i in range(15):
+        salida[f'Imagen {i+1}'] = imagenes[i] if i < len(imagenes) else ''
+    return salida
 
 
 class PropertyCrawlerSelenium:
     """Crawler simple que extrae datos directos de Finca Raíz"""
     
-    def __init__(self, headless=False, user_data_dir=None):
+    def __init__(self, headless=False, user_data_dir=None, monitor_bloqueos=None,
+                 archivo_crudo: ArchivoCrudo = None, iniciar_driver=True, estrategia_carga='normal',
+                 directorio: DirectorioInmobiliarias = None):
+        if estrategia_carga not in ESTRATEGIAS_CARGA:
+            raise ValueError(f"Estrategia de carga inválida: {estrategia_carga} (opciones: {ESTRATEGIAS_CARGA})")
         self.headless = headless
+        # 'none'/'eager': no esperar el evento load; la sonda decide cuándo hay __NEXT_DATA__
+        self.estrategia_carga = estrategia_carga
         self.user_data_dir = user_data_dir
         self.driver = None
-        self._init_driver()
-    
-    def _init_driver(self):
-        """Inicializa el Chrome driver"""
+        # Compartir el mismo monitor entre crawlers para un enfriamiento global
+        self.monitor_bloqueos = monitor_bloqueos or MonitorBloqueos()
+        self.ultima_clase = None
+        self.ultimo_error = None  # Clase de fallo (errores_crawl) de la última URL, None si fue exitosa
+        self.metricas = get_registro()
+        # Payloads crudos para re-extraer sin volver a crawlear
+        self.archivo_crudo = archivo_crudo
+        # Owner de cada aviso normalizado -> directorio de inmobiliarias (sin recorrer /inmobiliarias)
+        self.directorio = directorio
+        # Sin driver: solo parsers (re-extracción offline desde el archivo crudo)
+        if iniciar_driver:
+            self._init_driver()
+    
+    def crear_opciones(self):
+        """Opciones de Chrome del crawler (también las usa NavegadorPestanas)"""
         chrome_options = Options()
         
         if self.headless:
@@ -50,129 +159,211 @@ class PropertyCrawlerSelenium:
         chrome_options.add_experimental_option('prefs', prefs)
         chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
         chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+        chrome_options.page_load_strategy = self.estrategia_carga
+        return chrome_options
+    
+    def _init_driver(self):
+        """Inicializa el Chrome driver"""
+        chrome_options = self.crear_opciones()
+        with self.metricas.fase('driver'):
+            self.driver = webdriver.Chrome(options=chrome_options)
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
+    def reiniciar_driver(self):
+        """Driver nuevo; el quit() del anterior tiene plazo (un quit colgado congelaba el lote)"""
+        driver, self.driver = self.driver, None
+        cerrar_driver(driver)
+        self._init_driver()
+    
     def extraer_propiedad(self, url, max_wait=30, reintentos=3):
-        """Extrae datos de una propiedad con reintentos"""
+        """Extrae datos de una propiedad (la clase del fallo queda en self.ultimo_error)"""
         print(f"  URL: {url}")
         
+        html = self.obtener_html(url, max_wait, reintentos)
+        datos = self.parsear_html(html, url) if html else None
+        if datos:
+            print(f"    ✓ Extraído: {datos['cod_fr']}")
+            return datos
+        if html:
+            self.ultimo_error = PARSEO
+        
+        # Retorna diccionario vacío si falla
+        return self._diccionario_vacio(url)
+    
+    def obtener_html(self, url, max_wait=30, reintentos=3, lanzar=False):
+        """
+        Navega y retorna el HTML de una página normal.
+
+        Cada fallo se clasifica (errores_crawl) y queda en self.ultimo_error. En
+        el lugar solo se reintenta un driver caído, con navegador nuevo y sin
+        pausa; removido/parseo no se reintentan y bloqueado/timeout quedan para
+        una pasada posterior (cola diferida o procesar_fallidas.py).
+
+        Con lanzar=True el primer fallo sale como ErrorCrawl y quien llama decide
+        el reintento (y reinicia el driver si la clase lo pide); si no, retorna None.
+        """
+        self.ultimo_error = None
         for intento in range(1, reintentos + 1):
             try:
+                # No golpear el sitio mientras hay un enfriamiento global activo
+                self.monitor_bloqueos.esperar_enfriamiento()
+                
                 # Cargar la página
                 self.driver.set_page_load_timeout(45)
-                self.driver.get(url)
-                
-                # Esperar a que cargue el contenido principal
-                wait = WebDriverWait(self.driver, max_wait)
-                
-                # Esperar por cualquiera de estos elementos
-                try:
-                    wait.until(EC.presence_of_element_located((By.ID, '__NEXT_DATA__')))
-                except:
-                    # Si no encuentra __NEXT_DATA__, espera al título o descripción
-                    try:
-                        wait.until(EC.presence_of_element_located((By.TAG_NAME, 'h1')))
-                    except:
-                        pass
+                carga_temprana = self.estrategia_carga != 'normal'
+                if carga_temprana:
+                    marcar_documento_anterior(self.driver)
+                inicio_navegacion = time.perf_counter()
+                with self.metricas.fase('navegacion'):
+                    self.driver.get(url)
                 
-                time.sleep(1)
+                # Clasificar apenas hay DOM en vez de esperar max_wait completo
+                inicio_espera = time.perf_counter()
+                clase, _ = esperar_clasificacion(self.driver, max_wait)
+                self.metricas.incrementar(f'paginas_{clase}')
+                self.ultima_clase = clase
+                self.monitor_bloqueos.registrar(clase)
                 
-                html = self.driver.page_source
+                if clase != NORMAL:
+                    self.metricas.observar('espera', time.perf_counter() - inicio_espera)
+                if clase == REMOVIDO:
+                    print("    ⊘ Inmueble removido, sin reintentos")
+                elif clase == CHALLENGE:
+                    # Reintentar contra el mismo bloqueo no sirve: el enfriamiento global se encarga
+                    print("    ⛔ Página de bloqueo/challenge, se reintenta más tarde")
+                if clase != NORMAL:
+                    raise ErrorCrawl(f"Página {clase}", clase_de_pagina(clase))
                 
-                # Intenta extraer del JSON __NEXT_DATA__
-                datos = self._extraer_de_json(html, url)
+                if carga_temprana:
+                    detener_carga(self.driver)
+                self.metricas.observar('espera', time.perf_counter() - inicio_espera)
                 
-                # Si no encuentra JSON, extrae directamente del HTML
-                if not datos or not datos.get('cod_fr'):
-                    datos = self._extraer_del_html(html, url)
-                
-                if datos and datos.get('cod_fr'):
-                    print(f"    ✓ Extraído: {datos['cod_fr']}")
-                    return datos
-                else:
-                    print(f"    ⚠ Sin datos extraídos (intento {intento}/{reintentos})")
+                with self.metricas.fase('transferencia'):
+                    html = self.driver.page_source
+                self.metricas.observar_latencia('hasta_extraccion', time.perf_counter() - inicio_navegacion)
+                if self.archivo_crudo:
+                    with self.metricas.fase('persistencia'):
+                        self.archivo_crudo.guardar_html(url, html)
+                return html
                     
             except Exception as e:
-                print(f"    ✗ Error: {str(e)[:60]} (intento {intento}/{reintentos})")
-                
-                if intento < reintentos:
-                    time.sleep(3)
-                    try:
-                        self.driver.quit()
-                        self._init_driver()
-                    except:
-                        self._init_driver()
+                self.ultimo_error = clasificar_error(e)
+                self.metricas.incrementar(f'fallos_{self.ultimo_error}')
+                if lanzar:
+                    if isinstance(e, ErrorCrawl):
+                        raise
+                    raise ErrorCrawl(str(e)[:200] or type(e).__name__, self.ultimo_error) from e
+                if not isinstance(e, ErrorCrawl):
+                    print(f"    ✗ Error ({self.ultimo_error}): {str(e)[:60]} (intento {intento}/{reintentos})")
+                if POLITICAS.get(self.ultimo_error) != NAVEGADOR_NUEVO:
+                    break
+                self.reiniciar_driver()  # También tras el último intento: la próxima URL lo necesita
         
-        # Retorna diccionario vacío si falla
-        return self._diccionario_vacio(url)
+        return None
+    
+    def parsear_html(self, html, url):
+        """Extrae el registro de un HTML ya descargado (sin tocar el navegador)"""
+        # Intenta extraer del JSON __NEXT_DATA__
+        datos = self._extraer_de_json(html, url)
+        
+        # Si no encuentra JSON, extrae directamente del HTML
+        if not datos or not datos.get('cod_fr'):
+            datos = self._extraer_del_html(html, url)
+        
+        if datos and datos.get('cod_fr'):
+            return datos
+        print("    ⚠ Sin datos extraídos")
+        return None
+    
+    def parsear_next_data(self, texto, url):
+        """Extrae el registro del texto de __NEXT_DATA__ (modo pestañas: sin page_source)"""
+        try:
+            with self.metricas.fase('parseo'):
+                json_data = json.loads(texto)
+            with self.metricas.fase('normalizacion'):
+                datos = self._extraer_de_next_data(json_data, url)
+        except Exception as e:
+            print(f"    Error en JSON: {e}")
+            return None
+        if datos and datos.get('cod_fr'):
+            return datos
+        print("    ⚠ Sin datos extraídos")
+        return None
     
     def _extraer_de_json(self, html, url):
         """Extrae del JSON __NEXT_DATA__"""
         try:
-            match = re.search(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.+?)</script>', html, re.DOTALL)
-            if not match:
-                return None
-            
-            json_data = json.loads(match.group(1))
-            props = json_data.get('props', {}).get('pageProps', {})
-            data = props.get('data', {})
-            technical_sheet = props.get('technicalSheet', []) or []
-            
-            if not data or not data.get('id'):
-                return None
-            
-            # Extraer inmobiliaria
-            owner = data.get('owner', {})
-            id_inmos = owner.get('id') if owner else None
-            inmos = owner.get('name') if owner else None
+            with self.metricas.fase('parseo'):
+                match = re.search(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.+?)</script>', html, re.DOTALL)
+                if not match:
+                    return None
+                json_data = json.loads(match.group(1))
             
-            # Extraer todos los campos en el orden especificado
-            resultado = {
-                'id_inmos': id_inmos,
-                'inmos': inmos,
-                'url_inmueble': url,
-                'cod_fr': str(data.get('id', '')),
-                'cod_fr_legacy': data.get('idFincaLegacy') or data.get('legacy_propID'),
-                'titulo': data.get('title', ''),
-                'descripcion': data.get('description', ''),
-                'precio': self._parse_precio(data.get('price', {}).get('amount')),
-                'precio_admin': self._parse_precio(data.get('commonExpenses', {}).get('amount')),
-                'ubicacion': self._parse_ubicacion_completa(data.get('locations', {})),
-                'tipo_inmueble': self._parse_tipo_inmueble_directo(data),
-                'tipo_oferta': self._parse_tipo_oferta_directo(data),
-                'estado': self._parse_estado_directo(technical_sheet),
-                'habitaciones': self._parse_habitaciones_directo(data, technical_sheet),
-                'banos': self._parse_banos_directo(data, technical_sheet),
-                'parqueaderos': self._parse_parqueaderos_directo(data, technical_sheet),
-                'estrato': self._parse_estrato_directo(data, technical_sheet),
-                'antiguedad': self._parse_antiguedad(technical_sheet),
-                'metros': data.get('m2'),
-                'area': data.get('m2Built'),
-                'area_privada': data.get('m2apto'),
-                'area_terreno': data.get('m2Terrain'),
-                'area_lote': data.get('m2'),
-                'piso_no': data.get('floor'),
-                'cantidad_pisos': data.get('floorsCount'),
-                'cantidad_ambientes': data.get('rooms'),
-                'apto_oficina': 'Sí' if data.get('office') else None,
-                'acepta_permuta': 'Sí' if data.get('barter') else ('No' if data.get('barter') == False else None),
-                'remodelado': self._parse_remodelado(technical_sheet),
-                'penthouse': 'Sí' if data.get('penthouse') else None,
-                'contrato_minimo': self._parse_contrato_minimo(technical_sheet),
-                'documentacion_requerida': self._parse_documentacion(technical_sheet),
-                'acepta_mascotas': self._parse_acepta_mascotas(technical_sheet),
-                'm2_terraza': data.get('m2Terrace'),
-                'comodidades': self._parse_comodidades(data),
-                'imagenes': self._parse_imagenes_completas(data),
-            }
-            
-            return resultado
+            with self.metricas.fase('normalizacion'):
+                return self._extraer_de_next_data(json_data, url)
         except Exception as e:
             print(f"    Error en JSON: {e}")
             return None
     
+    def _extraer_de_next_data(self, json_data, url):
+        """Normaliza el JSON __NEXT_DATA__ ya parseado al esquema de salida"""
+        props = json_data.get('props', {}).get('pageProps', {})
+        data = props.get('data', {})
+        technical_sheet = props.get('technicalSheet', []) or []
+        
+        if not data or not data.get('id'):
+            return None
+        
+        # Extraer inmobiliaria
+        owner = data.get('owner', {})
+        id_inmos = owner.get('id') if owner else None
+        inmos = owner.get('name') if owner else None
+        
+        # Extraer todos los campos en el orden especificado
+        resultado = {
+            'id_inmos': id_inmos,
+            'inmos': inmos,
+            'url_inmueble': url,
+            'cod_fr': str(data.get('id', '')),
+            'cod_fr_legacy': data.get('idFincaLegacy') or data.get('legacy_propID'),
+            'titulo': data.get('title', ''),
+            'descripcion': data.get('description', ''),
+            'precio': self._parse_precio(data.get('price', {}).get('amount')),
+            'precio_admin': self._parse_precio(data.get('commonExpenses', {}).get('amount')),
+            'ubicacion': self._parse_ubicacion_completa(data.get('locations', {})),
+            'tipo_inmueble': self._parse_tipo_inmueble_directo(data),
+            'tipo_oferta': self._parse_tipo_oferta_directo(data),
+            'estado': self._parse_estado_directo(technical_sheet),
+            'habitaciones': self._parse_habitaciones_directo(data, technical_sheet),
+            'banos': self._parse_banos_directo(data, technical_sheet),
+            'parqueaderos': self._parse_parqueaderos_directo(data, technical_sheet),
+            'estrato': self._parse_estrato_directo(data, technical_sheet),
+            'antiguedad': self._parse_antiguedad(technical_sheet),
+            'metros': data.get('m2'),
+            'area': data.get('m2Built'),
+            'area_privada': data.get('m2apto'),
+            'area_terreno': data.get('m2Terrain'),
+            'area_lote': data.get('m2'),
+            'piso_no': data.get('floor'),
+            'cantidad_pisos': data.get('floorsCount'),
+            'cantidad_ambientes': data.get('rooms'),
+            'apto_oficina': 'Sí' if data.get('office') else None,
+            'acepta_permuta': 'Sí' if data.get('barter') else ('No' if data.get('barter') == False else None),
+            'remodelado': self._parse_remodelado(technical_sheet),
+            'penthouse': 'Sí' if data.get('penthouse') else None,
+            'contrato_minimo': self._parse_contrato_minimo(technical_sheet),
+            'documentacion_requerida': self._parse_documentacion(technical_sheet),
+            'acepta_mascotas': self._parse_acepta_mascotas(technical_sheet),
+            'm2_terraza': data.get('m2Terrace'),
+            'comodidades': self._parse_comodidades(data),
+            'imagenes': self._parse_imagenes_completas(data),
+        }
+        
+        if self.directorio:
+            self.directorio.registrar(owner, resultado['cod_fr'])
+        
+        return resultado
+    
     def _extraer_del_html(self, html, url):
         """Extrae datos directamente del HTML si el JSON no está disponible"""
         try:
@@ -685,8 +876,5 @@ class PropertyCrawlerSelenium:
     
     def close(self):
         """Cierra el driver"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
+        driver, self.driver = self.driver, None
+        cerrar_driver(driver)
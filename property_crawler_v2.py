@@ -4,15 +4,34 @@ Extrae datos del JSON embebido en las páginas Next.js
 """
 import re
 import json
+import time
 import requests
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from control_tasa import ControladorTasa
+from archivo_crudo import ArchivoCrudo
+import cobertura_http
+from cobertura_http import SolicitudesCubiertas
+from logger_config import get_logger
+
+# Trazas por URL a DEBUG y un resumen por URL a INFO; el destino (archivo,
+# JSON, consola) lo decide logger_config.configurar_logging en el script que corre
+logger = get_logger(__name__)
+
 
 class PropertyCrawlerV2:
     """Crawler que extrae datos del JSON de Next.js en Finca Raíz"""
     
-    def __init__(self):
+    def __init__(self, controlador: Optional[ControladorTasa] = None, archivo: Optional[ArchivoCrudo] = None,
+                 cobertura=None):
+        """
+        cobertura: config de cobertura_http.CONFIG_COBERTURA ({} = valores por defecto, None = sin
+        cobertura) para la instancia compartida del proceso, o una SolicitudesCubiertas ya creada
+        (la cierra quien la creó)
+        """
+        self.controlador = controlador
+        self.archivo = archivo
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -29,6 +48,10 @@ class PropertyCrawlerV2:
             'sec-ch-ua-mobile': '?0',
             'sec-ch-ua-platform': '"Windows"',
         })
+        # Duplica el request que supera el p95 móvil (presupuesto ≤5% de requests extra, compartido
+        # por todos los crawlers del proceso: uno por worker no multiplica el presupuesto)
+        self._cobertura_propia = cobertura is not None and not isinstance(cobertura, SolicitudesCubiertas)
+        self.cobertura = cobertura_http.adquirir(cobertura) if self._cobertura_propia else cobertura
     
     def extraer_propiedad(self, url: str) -> Dict[str, Any]:
         """
@@ -40,14 +63,25 @@ class PropertyCrawlerV2:
         Returns:
             Diccionario con todos los datos extraídos
         """
-        print(f"Crawleando: {url}")
-        
+        inicio_url = time.time()
         try:
-            response = self.session.get(url, timeout=30)
+            if self.controlador:
+                self.controlador.esperar_turno()
+            inicio = time.time()
+            if self.cobertura:
+                response = self.cobertura.get(url, session=self.session, timeout=30)
+            else:
+                response = self.session.get(url, timeout=30)
+            if self.controlador:
+                self.controlador.reportar(time.time() - inicio, status=response.status_code,
+                                          exito=response.ok)
             response.raise_for_status()
             
-            print(f"    DEBUG: Status {response.status_code}, Content-Length: {len(response.text)}")
-            print(f"    DEBUG: Content-Type: {response.headers.get('content-type')}")
+            logger.debug("Status %s, Content-Length: %d, Content-Type: %s", response.status_code,
+                         len(response.text), response.headers.get('content-type'), extra={'evento': 'respuesta'})
+            
+            if self.archivo:
+                self.archivo.guardar_html(url, response.text)
             
             # Extraer el JSON de __NEXT_DATA__
             json_data = self._extraer_next_data(response.text)
@@ -55,65 +89,78 @@ class PropertyCrawlerV2:
             if not json_data:
                 raise ValueError("No se encontro __NEXT_DATA__ en la pagina")
             
-            # Extraer datos de la estructura Next.js
-            page_props = json_data.get('props', {}).get('pageProps', {})
-            data = page_props.get('data', {})
-            technical_sheet = page_props.get('technicalSheet', {})
-            
-            if not data:
-                raise ValueError("No se encontraron datos de propiedad en pageProps")
-            
-            # Extraer todos los campos
-            resultado = {
-                'url': url,
-                'codigo_fr': str(data.get('id')),
-                'codigo_fr_legacy': data.get('code'),
-                'meta_titulo': data.get('title'),
-                'meta_descripcion': self._extraer_meta_descripcion(data),
-                'h1': data.get('title'),  # El title es el h1 en estas páginas
-                'descripcion': data.get('description'),
-                'ubicacion': self._extraer_ubicacion(data),
-                'habitaciones': self._extraer_habitaciones(technical_sheet),
-                'banos': self._extraer_banos(technical_sheet),
-                'metros': self._extraer_metros(technical_sheet),
-                'precio': self._extraer_precio(data),
-                'precio_administracion': self._extraer_precio_admin(data),
-                'comodidades': self._extraer_comodidades(technical_sheet),
-                'caracteristicas': self._extraer_caracteristicas(technical_sheet),
-                'imagenes': self._extraer_imagenes(data, page_props),
-                'tipo_propiedad': self._extraer_tipo_propiedad(data),
-                'inmobiliaria': self._extraer_inmobiliaria(data),
-            }
+            resultado = self._extraer_de_next_data(json_data, url)
             
-            print(f"  OK Codigo FR: {resultado['codigo_fr']}")
-            print(f"  OK Precio: ${resultado['precio']:,}" if resultado['precio'] else "  OK Precio: None")
-            print(f"  OK Imagenes: {len(resultado['imagenes'])}")
+            duracion = round(time.time() - inicio_url, 3)
+            logger.info("OK %s cod_fr=%s precio=%s imagenes=%d [%.1fs]", url, resultado['codigo_fr'],
+                        resultado['precio'], len(resultado['imagenes']), duracion,
+                        extra={'evento': 'resumen_url', 'url': url, 'duracion_s': duracion, 'estado': 'ok'})
             
             return resultado
             
         except Exception as e:
-            print(f"  ERROR: {type(e).__name__}: {e}")
+            duracion = round(time.time() - inicio_url, 3)
+            logger.warning("ERROR %s %s: %s [%.1fs]", url, type(e).__name__, e, duracion,
+                           extra={'evento': 'resumen_url', 'url': url, 'duracion_s': duracion, 'estado': 'error'})
             return {
                 'url': url,
                 'error': str(e),
                 'tipo_error': type(e).__name__
             }
     
+    def close(self):
+        """Cierra la sesión HTTP y libera la cobertura compartida"""
+        if self._cobertura_propia:
+            cobertura_http.liberar(self.cobertura)
+            self._cobertura_propia = False
+        self.session.close()
+    
+    def _extraer_de_next_data(self, json_data: Dict, url: str) -> Dict[str, Any]:
+        """Construye el registro desde el JSON __NEXT_DATA__ ya parseado"""
+        # Extraer datos de la estructura Next.js
+        page_props = json_data.get('props', {}).get('pageProps', {})
+        data = page_props.get('data', {})
+        technical_sheet = page_props.get('technicalSheet') or []
+        
+        if not data:
+            raise ValueError("No se encontraron datos de propiedad en pageProps")
+        
+        # Extraer todos los campos
+        resultado = {
+            'url': url,
+            'codigo_fr': str(data.get('id')),
+            'codigo_fr_legacy': data.get('code'),
+            'meta_titulo': data.get('title'),
+            'meta_descripcion': self._extraer_meta_descripcion(data),
+            'h1': data.get('title'),  # El title es el h1 en estas páginas
+            'descripcion': data.get('description'),
+            'ubicacion': self._extraer_ubicacion(data),
+            'habitaciones': self._extraer_habitaciones(technical_sheet),
+            'banos': self._extraer_banos(technical_sheet),
+            'metros': self._extraer_metros(technical_sheet),
+            'precio': self._extraer_precio(data),
+            'precio_administracion': self._extraer_precio_admin(data),
+            'comodidades': self._extraer_comodidades(data, technical_sheet),
+            'caracteristicas': self._extraer_caracteristicas(technical_sheet),
+            'imagenes': self._extraer_imagenes(data, page_props),
+            'tipo_propiedad': self._extraer_tipo_propiedad(data),
+            'inmobiliaria': self._extraer_inmobiliaria(data),
+        }
+        
+        return resultado
+    
     def _extraer_next_data(self, html: str) -> Optional[Dict]:
         """Extrae y parsea el JSON de __NEXT_DATA__"""
-        # Debug: verificar si está en el HTML
-        has_next_data = '__NEXT_DATA__' in html
-        print(f"    DEBUG: __NEXT_DATA__ en HTML: {has_next_data}, longitud: {len(html)}")
-        
         # Patrón flexible que acepta atributos adicionales como crossorigin
         match = re.search(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.+?)</script>', html, re.DOTALL)
-        print(f"    DEBUG: Match encontrado: {match is not None}")
+        logger.debug("__NEXT_DATA__ encontrado: %s, longitud HTML: %d", match is not None, len(html),
+                     extra={'evento': 'next_data'})
         
         if match:
             try:
                 return json.loads(match.group(1))
             except json.JSONDecodeError as e:
-                print(f"    DEBUG: Error JSON: {e}")
+                logger.debug("Error JSON en __NEXT_DATA__: %s", e)
                 return None
         return None
     
@@ -153,39 +200,49 @@ class PropertyCrawlerV2:
         
         return ', '.join(p for p in parts if p)
     
-    def _extraer_habitaciones(self, technical_sheet: Dict) -> Optional[int]:
-        """Extrae número de habitaciones"""
-        general_features = technical_sheet.get('general_features', [])
-        for feature in general_features:
-            if feature.get('code') == 'bedrooms':
-                value = feature.get('value')
+    def _items_ficha(self, technical_sheet) -> List[Dict]:
+        """
+        Items de la ficha técnica como lista de {field, value, text}.
+        
+        Finca Raíz entrega technicalSheet como lista; el formato anterior era un
+        dict con general_features / property_characteristics / details (code, name).
+        """
+        if isinstance(technical_sheet, list):
+            return [item for item in technical_sheet if isinstance(item, dict)]
+        items = []
+        if isinstance(technical_sheet, dict):
+            for seccion in ('general_features', 'property_characteristics', 'details'):
+                for feature in technical_sheet.get(seccion, []) or []:
+                    items.append({
+                        'field': feature.get('field') or feature.get('code'),
+                        'value': feature.get('value'),
+                        'text': feature.get('text') or feature.get('name') or feature.get('label'),
+                    })
+        return items
+    
+    def _extraer_entero(self, technical_sheet, campo: str) -> Optional[int]:
+        for item in self._items_ficha(technical_sheet):
+            if item.get('field') == campo:
+                value = item.get('value')
                 if value:
-                    try:
-                        return int(value)
-                    except (ValueError, TypeError):
-                        pass
+                    num_str = re.sub(r'[^\d]', '', str(value))
+                    if num_str:
+                        return int(num_str)
         return None
     
-    def _extraer_banos(self, technical_sheet: Dict) -> Optional[int]:
+    def _extraer_habitaciones(self, technical_sheet) -> Optional[int]:
+        """Extrae número de habitaciones"""
+        return self._extraer_entero(technical_sheet, 'bedrooms')
+    
+    def _extraer_banos(self, technical_sheet) -> Optional[int]:
         """Extrae número de baños"""
-        general_features = technical_sheet.get('general_features', [])
-        for feature in general_features:
-            if feature.get('code') == 'bathrooms':
-                value = feature.get('value')
-                if value:
-                    try:
-                        return int(value)
-                    except (ValueError, TypeError):
-                        pass
-        return None
+        return self._extraer_entero(technical_sheet, 'bathrooms')
     
-    def _extraer_metros(self, technical_sheet: Dict) -> Optional[float]:
+    def _extraer_metros(self, technical_sheet) -> Optional[float]:
         """Extrae metros cuadrados (área construida o total)"""
-        general_features = technical_sheet.get('general_features', [])
-        
         # Priorizar área construida
-        for feature in general_features:
-            if feature.get('code') in ['built_area', 'area']:
+        for feature in self._items_ficha(technical_sheet):
+            if feature.get('field') in ['built_area', 'm2Built', 'area', 'm2apto']:
                 value = feature.get('value')
                 if value:
                     try:
@@ -227,12 +284,14 @@ class PropertyCrawlerV2:
         
         return None
     
-    def _extraer_comodidades(self, technical_sheet: Dict) -> List[str]:
+    def _extraer_comodidades(self, data: Dict, technical_sheet) -> List[str]:
         """Extrae lista de comodidades"""
         comodidades = []
         
-        # Buscar en amenities o features
-        amenities = technical_sheet.get('amenities', [])
+        # data.facilities (formato actual) o amenities de la ficha (formato anterior)
+        amenities = list(data.get('facilities') or [])
+        if isinstance(technical_sheet, dict):
+            amenities += technical_sheet.get('amenities', []) or []
         for amenity in amenities:
             name = amenity.get('name') or amenity.get('label')
             if name and name not in comodidades:
@@ -240,34 +299,14 @@ class PropertyCrawlerV2:
         
         return comodidades
     
-    def _extraer_caracteristicas(self, technical_sheet: Dict) -> Dict[str, Any]:
-        """Extrae características técnicas de la propiedad"""
+    def _extraer_caracteristicas(self, technical_sheet) -> Dict[str, Any]:
+        """Extrae características técnicas de la propiedad (texto de la ficha -> valor)"""
         caracteristicas = {}
-        
-        # General features
-        general_features = technical_sheet.get('general_features', [])
-        for feature in general_features:
-            name = feature.get('name') or feature.get('label')
-            value = feature.get('value')
-            if name and value:
-                caracteristicas[name] = value
-        
-        # Property characteristics
-        prop_chars = technical_sheet.get('property_characteristics', [])
-        for char in prop_chars:
-            name = char.get('name') or char.get('label')
-            value = char.get('value')
+        for item in self._items_ficha(technical_sheet):
+            name = item.get('text')
+            value = item.get('value')
             if name and value:
                 caracteristicas[name] = value
-        
-        # Additional details
-        details = technical_sheet.get('details', [])
-        for detail in details:
-            name = detail.get('name') or detail.get('label')
-            value = detail.get('value')
-            if name and value:
-                caracteristicas[name] = value
-        
         return caracteristicas
     
     def _extraer_imagenes(self, data: Dict, page_props: Dict) -> List[str]:
@@ -348,34 +387,37 @@ class PropertyCrawlerV2:
         }
 
 
-def crawlear_propiedades(urls: List[str], output_file: str = None) -> List[Dict]:
+def crawlear_propiedades(urls: List[str], output_file: str = None, cobertura: Optional[Dict] = None) -> List[Dict]:
     """
     Crawlea una lista de URLs de propiedades
     
     Args:
         urls: Lista de URLs a procesar
         output_file: Ruta del archivo de salida JSON (opcional)
+        cobertura: config de SolicitudesCubiertas ({} = defaults; None = sin cobertura)
         
     Returns:
         Lista de diccionarios con los datos extraídos
     """
-    crawler = PropertyCrawlerV2()
+    crawler = PropertyCrawlerV2(cobertura=cobertura)
     resultados = []
     
     print(f"\n{'='*70}")
     print(f"Iniciando crawling de {len(urls)} propiedades")
     print(f"{'='*70}\n")
     
-    for idx, url in enumerate(urls, 1):
-        print(f"\n[{idx}/{len(urls)}]")
-        datos = crawler.extraer_propiedad(url)
-        resultados.append(datos)
-        
-        # Guardar progreso cada 5 URLs
-        if output_file and idx % 5 == 0:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(resultados, f, ensure_ascii=False, indent=2)
-            print(f"  [GUARDADO] Progreso guardado ({idx} URLs procesadas)")
+    try:
+        for idx, url in enumerate(urls, 1):
+            datos = crawler.extraer_propiedad(url)
+            resultados.append(datos)
+            
+            # Guardar progreso cada 5 URLs
+            if output_file and idx % 5 == 0:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(resultados, f, ensure_ascii=False, indent=2)
+                print(f"  [GUARDADO] Progreso guardado ({idx} URLs procesadas)")
+    finally:
+        crawler.close()
     
     # Guardar resultados finales
     if output_file:
@@ -396,6 +438,9 @@ def crawlear_propiedades(urls: List[str], output_file: str = None) -> List[Dict]
 
 
 if __name__ == '__main__':
+    from logger_config import configurar_logging
+    configurar_logging()
+    
     # URLs de prueba
     urls_prueba = [
         "https://www.fincaraiz.com.co/apartamento-en-venta-en-comuna-12-cabecera-del-llano-bucaramanga/192454261",
@@ -11,6 +11,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 # Reusar la lógica de extracción ya probada
 from extract_emails_fast import extract_contact_info
+from cache_contactos import CacheContactos
+from merge_contacts_to_excel import extract_id_from_url
 
 RESULTS_DIR = os.path.join(os.path.dirname(__file__), "resultados")
 RECHECK_LIST = os.path.join(RESULTS_DIR, "recheck_urls.txt")
@@ -39,6 +41,10 @@ def run_recheck():
     with open(RECHECK_LIST, "r", encoding="utf-8") as f:
         urls = [l.strip() for l in f if l.strip()]
 
+    # Solo inmobiliarias sin contacto vigente: cada una cuesta como mucho un revelado por período
+    cache = CacheContactos()
+    urls, en_cache = cache.filtrar_urls(urls)
+    print(f"Con contacto vigente en caché (omitidas): {len(en_cache)}")
     print(f"Total URLs a revalidar: {len(urls)}")
     os.makedirs(RESULTS_DIR, exist_ok=True)
 
@@ -71,6 +77,9 @@ def run_recheck():
                     time.sleep(2)
                     driver = create_driver()
                     wait = WebDriverWait(driver, 20)
+            id_owner = extract_id_from_url(url)
+            if id_owner is not None:
+                cache.registrar(id_owner, email, phone, url=url, fuente='recheck_urls')
             results.append({"url": url, "email": email, "telefono": phone})
 
     finally:
@@ -95,5 +104,7 @@ def run_recheck():
 
 
 if __name__ == "__main__":
+    from logger_config import configurar_logging
+    configurar_logging()
     print("Usando perfil con sesión guardada:", PROFILE_DIR)
     run_recheck()
@@ -0,0 +1,267 @@
+"""
+registro_inmueble.py - Representación compacta de registros de inmuebles en memoria
+
+Los runners guardaban cada resultado del lote como un dict de ~36 claves, con la
+descripción larga y hasta 15 URLs de imágenes como strings independientes. Con
+decenas de miles de registros por lote eso son gigabytes de overhead.
+
+RegistroInmueble:
+- Usa __slots__ con los campos de PropertyCrawlerSelenium._diccionario_vacio
+  (sin __dict__ por instancia)
+- Interna los strings categóricos repetidos (inmos, tipo_inmueble, tipo_oferta,
+  ubicacion, estado...) para que todos los registros compartan una sola copia
+- Guarda las imágenes como un único string de sufijos con prefijo compartido
+  (`https://cdn2.infocasas.com.uy/repo/img/` se guarda una vez por proceso)
+
+LoteRegistros es la lista de resultados: acepta y entrega dicts, así el resto del
+código (json.dump, DataFrame) no cambia, y escribe el JSON en streaming.
+
+Medición:
+python registro_inmueble.py --registros 10000
+"""
+import sys
+import json
+import argparse
+import tracemalloc
+from glob import glob
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+# Orden y nombres de PropertyCrawlerSelenium._diccionario_vacio
+CAMPOS = (
+    'id_inmos', 'inmos', 'url_inmueble', 'cod_fr', 'cod_fr_legacy', 'titulo', 'descripcion',
+    'precio', 'precio_admin', 'ubicacion', 'tipo_inmueble', 'tipo_oferta', 'estado',
+    'habitaciones', 'banos', 'parqueaderos', 'estrato', 'antiguedad', 'metros', 'area',
+    'area_privada', 'area_terreno', 'area_lote', 'piso_no', 'cantidad_pisos', 'cantidad_ambientes',
+    'apto_oficina', 'acepta_permuta', 'remodelado', 'penthouse', 'contrato_minimo',
+    'documentacion_requerida', 'acepta_mascotas', 'm2_terraza', 'comodidades', 'imagenes',
+)
+
+# Valores con pocas variantes que se repiten en miles de registros
+CAMPOS_CATEGORICOS = (
+    'inmos', 'ubicacion', 'tipo_inmueble', 'tipo_oferta', 'estado', 'antiguedad',
+    'apto_oficina', 'acepta_permuta', 'remodelado', 'penthouse', 'contrato_minimo',
+    'documentacion_requerida', 'acepta_mascotas', 'comodidades',
+)
+
+_CAMPOS_ESCALARES = tuple(c for c in CAMPOS if c != 'imagenes')
+_SEPARADOR_IMAGENES = '\n'
+
+# Tabla de prefijos de URL de imágenes compartida por todo el proceso
+_prefijos: List[str] = []
+_id_prefijo: Dict[str, int] = {}
+
+
+def _codificar_imagenes(imagenes: Optional[Iterable[str]]) -> Optional[str]:
+    """['https://cdn/.../a.jpg', ...] -> '0:a.jpg\\n0:b.jpg' (prefijo por id)"""
+    if not imagenes:
+        return None
+    partes = []
+    for url in imagenes:
+        corte = url.rfind('/') + 1
+        prefijo = url[:corte]
+        pid = _id_prefijo.get(prefijo)
+        if pid is None:
+            pid = _id_prefijo[prefijo] = len(_prefijos)
+            _prefijos.append(sys.intern(prefijo))
+        partes.append(f"{pid}:{url[corte:]}")
+    return _SEPARADOR_IMAGENES.join(partes)
+
+
+def _decodificar_imagenes(codificadas: Optional[str]) -> List[str]:
+    if not codificadas:
+        return []
+    imagenes = []
+    for parte in codificadas.split(_SEPARADOR_IMAGENES):
+        pid, sufijo = parte.split(':', 1)
+        imagenes.append(_prefijos[int(pid)] + sufijo)
+    return imagenes
+
+
+def _internar(valor):
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+class RegistroInmueble:
+    """Registro de inmueble con __slots__; `a_dict()` reproduce el dict original"""
+
+    __slots__ = _CAMPOS_ESCALARES + ('_imagenes',)
+
+    def __init__(self, **campos):
+        for campo in _CAMPOS_ESCALARES:
+            valor = campos.get(campo)
+            if campo in CAMPOS_CATEGORICOS:
+                valor = _internar(valor)
+            setattr(self, campo, valor)
+        self._imagenes = _codificar_imagenes(campos.get('imagenes'))
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'RegistroInmueble':
+        return cls(**datos)
+
+    @property
+    def imagenes(self) -> List[str]:
+        return _decodificar_imagenes(self._imagenes)
+
+    def get(self, campo: str, default=None):
+        """Acceso estilo dict (los runners usan datos.get('cod_fr'))"""
+        if campo == 'imagenes':
+            return self.imagenes
+        return getattr(self, campo, default) if campo in _CAMPOS_ESCALARES else default
+
+    def __getitem__(self, campo: str):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        return self.get(campo)
+
+    def a_dict(self) -> Dict[str, Any]:
+        datos = {campo: getattr(self, campo) for campo in _CAMPOS_ESCALARES}
+        datos['imagenes'] = self.imagenes
+        return {campo: datos[campo] for campo in CAMPOS}
+
+    def __repr__(self):
+        return f"RegistroInmueble(cod_fr={self.cod_fr!r}, titulo={self.titulo!r})"
+
+
+def escribir_json_streaming(ruta, registros: Iterable[Dict[str, Any]], indent: Optional[int] = 2) -> int:
+    """
+    Escribe un array JSON registro por registro, con el mismo formato que
+    json.dump(lista, indent=indent), sin tener la lista completa en memoria.
+    Con indent=None cada registro va compacto en una sola línea.
+    Retorna la cantidad de registros escritos.
+    """
+    cantidad = 0
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for datos in registros:
+            texto = json.dumps(datos, ensure_ascii=False, indent=indent)
+            f.write((',\n' if cantidad else '\n') + '\n'.join(' ' * (indent or 0) + linea for linea in texto.split('\n')))
+            cantidad += 1
+        f.write('\n]' if cantidad else ']')
+    return cantidad
+
+
+class LoteRegistros:
+    """
+    Lista compacta de resultados de un lote.
+
+    Uso:
+        resultados = LoteRegistros()
+        resultados.append(datos_raw)          # dict de _diccionario_vacio
+        resultados.guardar_json(ruta)         # mismo formato que json.dump(lista, indent=2)
+        pd.DataFrame.from_records(resultados.dicts(), columns=CAMPOS)
+    """
+
+    def __init__(self, registros: Iterable[Dict[str, Any]] = ()):
+        self._registros: List[RegistroInmueble] = []
+        self.extend(registros)
+
+    def append(self, datos):
+        if not isinstance(datos, RegistroInmueble):
+            datos = RegistroInmueble.desde_dict(datos)
+        self._registros.append(datos)
+
+    def extend(self, registros: Iterable[Dict[str, Any]]):
+        for datos in registros:
+            self.append(datos)
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    def __iter__(self) -> Iterator[RegistroInmueble]:
+        return iter(self._registros)
+
+    def dicts(self) -> Iterator[Dict[str, Any]]:
+        """Registros como dicts, uno a la vez (no materializa la lista completa)"""
+        for registro in self._registros:
+            yield registro.a_dict()
+
+    def guardar_json(self, ruta, indent: Optional[int] = 2) -> int:
+        return escribir_json_streaming(ruta, self.dicts(), indent)
+
+
+# ----------------------------------------------------------------------
+# Medición de memoria
+# ----------------------------------------------------------------------
+def _plantillas_desde_fixtures(patron: str = 'debug_json_*.json') -> List[str]:
+    """Registros de ejemplo (formato _diccionario_vacio) armados con los dumps grabados"""
+    plantillas = []
+    for ruta in sorted(glob(patron)):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            data = json.load(f).get('data') or {}
+        owner = data.get('owner') or {}
+        locations = data.get('locations') or {}
+        ciudad = (locations.get('city') or [{}])[0].get('name')
+        barrio = (locations.get('location_main') or {}).get('name')
+        imagenes = [img.get('image') if isinstance(img, dict) else img for img in (data.get('images') or [])[:15]]
+        registro = {campo: None for campo in CAMPOS}
+        registro.update({
+            'id_inmos': owner.get('id'),
+            'inmos': owner.get('name'),
+            'url_inmueble': f"https://www.fincaraiz.com.co/inmueble/{data.get('id')}",
+            'cod_fr': str(data.get('id')),
+            'titulo': data.get('title'),
+            'descripcion': data.get('description'),
+            'precio': (data.get('price') or {}).get('amount'),
+            'ubicacion': ', '.join(p for p in (barrio, ciudad) if p) or None,
+            'tipo_inmueble': (data.get('property_type') or {}).get('name'),
+            'tipo_oferta': 'Venta',
+            'metros': data.get('m2'),
+            'comodidades': '|'.join(f.get('name') for f in (data.get('facilities') or []) if f.get('name')) or None,
+            'imagenes': [i for i in imagenes if i],
+        })
+        plantillas.append(json.dumps(registro, ensure_ascii=False))
+    return plantillas
+
+
+def _registros_frescos(plantillas: List[str], cantidad: int) -> Iterator[Dict[str, Any]]:
+    """Cada registro con strings propios, como los devuelve json.loads al parsear páginas"""
+    for i in range(cantidad):
+        datos = json.loads(plantillas[i % len(plantillas)])
+        datos['cod_fr'] = str(190000000 + i)
+        datos['url_inmueble'] = f"https://www.fincaraiz.com.co/inmueble/{190000000 + i}"
+        yield datos
+
+
+def medir_memoria(cantidad: int = 10000, patron: str = 'debug_json_*.json') -> Dict[str, float]:
+    """MB retenidos por `cantidad` registros como lista de dicts vs LoteRegistros"""
+    plantillas = _plantillas_desde_fixtures(patron)
+    if not plantillas:
+        raise FileNotFoundError(f"No hay fixtures con patrón {patron}")
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    como_dicts = list(_registros_frescos(plantillas, cantidad))
+    mb_dicts = (tracemalloc.get_traced_memory()[0] - base) / 1e6
+    del como_dicts
+
+    base = tracemalloc.get_traced_memory()[0]
+    compactos = LoteRegistros(_registros_frescos(plantillas, cantidad))
+    mb_compactos = (tracemalloc.get_traced_memory()[0] - base) / 1e6
+    tracemalloc.stop()
+    del compactos
+
+    return {
+        'registros': cantidad,
+        'mb_dicts': round(mb_dicts, 2),
+        'mb_compacto': round(mb_compactos, 2),
+        'reduccion': round(1 - mb_compactos / mb_dicts, 3) if mb_dicts else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memoria de registros: dicts vs RegistroInmueble')
+    parser.add_argument('--registros', type=int, default=10000)
+    parser.add_argument('--fixtures', default='debug_json_*.json')
+    args = parser.parse_args()
+
+    r = medir_memoria(args.registros, args.fixtures)
+    print(f"Registros:           {r['registros']:,}")
+    print(f"Lista de dicts:      {r['mb_dicts']:.2f} MB")
+    print(f"LoteRegistros:       {r['mb_compacto']:.2f} MB")
+    print(f"Reducción:           {r['reduccion']:.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
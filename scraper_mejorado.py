@@ -1,6 +1,14 @@
 """
 Scraper mejorado para fincaraiz.com.co/inmobiliarias
 Extrae: título, correo, teléfono, cantidad de inmuebles
+
+Complemento opcional del directorio que arma el crawl de inmuebles
+(directorio_inmobiliarias.py): salta los perfiles cuyo id ya está en el
+directorio y suma los nuevos al terminar. Con --todas visita todos.
+
+Uso:
+    python scraper_mejorado.py
+    python scraper_mejorado.py --todas --limite 50
 """
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -15,6 +23,9 @@ import json
 import csv
 from datetime import datetime
 import os
+import argparse
+
+from directorio_inmobiliarias import DIRECTORIO_DEFAULT, complementar, id_de_url, ids_conocidos
 
 os.makedirs('resultados', exist_ok=True)
 
@@ -42,8 +53,14 @@ def inicializar_navegador():
     log_msg("✓ Navegador inicializado")
     return driver
 
-def extraer_inmobiliarias(driver):
-    """Extrae todas las inmobiliarias de la página"""
+def extraer_inmobiliarias(driver, conocidos=None, limite=None):
+    """
+    Extrae las inmobiliarias de la página
+
+    Args:
+        conocidos: ids ya presentes en el directorio (no se visitan)
+        limite: máximo de perfiles a visitar (None: todos)
+    """
     log_msg("Accediendo a fincaraiz.com.co/inmobiliarias...")
     
     url = "https://www.fincaraiz.com.co/inmobiliarias"
@@ -72,8 +89,12 @@ def extraer_inmobiliarias(driver):
         
         log_msg(f"Total de URLs únicas: {len(urls)}")
         
+        pendientes = [u for u in sorted(urls) if id_de_url(u) not in (conocidos or ())]
+        if len(pendientes) < len(urls):
+            log_msg(f"Ya en el directorio (se saltan): {len(urls) - len(pendientes)}")
+        
         # Procesar cada URL
-        for idx, url_inmobiliaria in enumerate(list(urls)[:50], 1):  # Limitar a 50 para test
+        for idx, url_inmobiliaria in enumerate(pendientes[:limite], 1):
             try:
                 log_msg(f"\n[{idx}] Accediendo a: {url_inmobiliaria[:60]}...")
                 driver.get(url_inmobiliaria)
@@ -276,6 +297,10 @@ def guardar_resultados(inmobiliarias):
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Complementa el directorio de inmobiliarias desde /inmobiliarias')
+    parser.add_argument('--todas', action='store_true', help='Visitar también las que ya están en el directorio')
+    parser.add_argument('--limite', type=int, help='Máximo de perfiles a visitar')
+    args = parser.parse_args()
     driver = None
     
     try:
@@ -283,11 +308,14 @@ def main():
         log_msg("SCRAPER DE INMOBILIARIAS - FINCARAIZ.COM.CO")
         log_msg("="*70)
         
+        conocidos = set() if args.todas else ids_conocidos()
+        log_msg(f"Inmobiliarias ya en el directorio: {len(conocidos)}")
         driver = inicializar_navegador()
-        inmobiliarias = extraer_inmobiliarias(driver)
+        inmobiliarias = extraer_inmobiliarias(driver, conocidos, args.limite)
         
         if inmobiliarias:
             guardar_resultados(inmobiliarias)
+            log_msg(f"✓ {complementar(inmobiliarias)} inmobiliarias sumadas a {DIRECTORIO_DEFAULT}")
         else:
             log_msg("⚠️ No se extrajeron inmobiliarias")
         
@@ -1,6 +1,9 @@
 """
 Script simplificado para scraping de inmobiliarias fincaraiz.com.co
 Versión sin dependencias problemáticas
+
+Complemento opcional: el directorio principal sale del crawl de inmuebles
+(directorio_inmobiliarias.py); lo extraído aquí se suma a ese directorio
 """
 import time
 import os
@@ -16,6 +19,8 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 from bs4 import BeautifulSoup
 
+from directorio_inmobiliarias import DIRECTORIO_DEFAULT, complementar
+
 # Crear carpeta de resultados
 os.makedirs('resultados', exist_ok=True)
 
@@ -231,6 +236,7 @@ def main():
         # Guardar resultados
         if inmobiliarias:
             guardar_resultados(inmobiliarias)
+            log_msg(f"✓ {complementar(inmobiliarias)} inmobiliarias sumadas a {DIRECTORIO_DEFAULT}")
         else:
             log_msg("⚠️ No se extrajeron inmobiliarias")
         
@@ -145,4 +145,6 @@ def main():
             browser_manager.close_browser()
 
 if __name__ == "__main__":
+    from logger_config import configurar_logging
+    configurar_logging()
     main()
@@ -208,5 +208,7 @@ def main():
             print("❌ Opción no válida")
 
 if __name__ == "__main__":
+    from logger_config import configurar_logging
+    configurar_logging()
     from datetime import datetime
     main()
@@ -0,0 +1,201 @@
+"""
+servidor_simulado.py - Servidor HTTP local que imita las páginas de Finca Raíz
+
+Sirve páginas de inmuebles construidas a partir de los fixtures grabados
+(`debug_json_*.json`) y perfiles de inmobiliaria (`html_after_click.html`), sin
+tocar el sitio real. Permite inyectar latencia, errores 500, respuestas 429 con
+página de challenge e inmuebles removidos (404).
+
+Rutas:
+    /<slug>/<cod_fr>              Página de inmueble (__NEXT_DATA__ con ese id)
+    /inmobiliarias/<id>-<slug>    Perfil de inmobiliaria
+    /__stats                      Contadores del servidor (JSON)
+
+Uso:
+python servidor_simulado.py --puerto 8765 --latencia-ms 150 --tasa-429 0.02
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from glob import glob
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+ROOT = Path(__file__).parent
+PLACEHOLDER_ID = '__COD_FR__'
+
+CONFIG_SERVIDOR = {
+    'latencia_ms': 100,  # Latencia base por respuesta
+    'jitter_ms': 50,  # Media de la cola exponencial agregada a la latencia base
+    'tasa_error': 0.0,  # Proporción de respuestas 500
+    'tasa_429': 0.0,  # Proporción de respuestas 429 con página de challenge
+    'tasa_removidos': 0.0,  # Proporción de inmuebles que responden 404
+    'relleno_kb': 120,  # Relleno HTML para imitar el peso de una página real
+    'semilla': 42,
+}
+
+PAGINA_CHALLENGE = (
+    '<!DOCTYPE html><html><head><title>Just a moment...</title></head>'
+    '<body><div id="challenge-platform">Checking your browser before accessing.</div></body></html>'
+)
+PAGINA_ERROR = '<html><head><title>500 Internal Server Error</title></head><body>Internal Server Error</body></html>'
+PAGINA_REMOVIDO = (
+    '<html><head><title>Fincaraiz</title></head><body>'
+    '<h1>Este inmueble ya no está disponible</h1></body></html>'
+)
+
+
+def cargar_plantillas(patron: str = str(ROOT / 'debug_json_*.json'), relleno_kb: int = 120) -> List[str]:
+    """Convierte cada fixture {data, technical_sheet} en una página HTML con id sustituible"""
+    plantillas = []
+    relleno = '<div class="relleno">' + ('x' * 1023 + '\n') * relleno_kb + '</div>'
+    for ruta in sorted(glob(patron)):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            fixture = json.load(f)
+        data = dict(fixture.get('data') or {})
+        if not data:
+            continue
+        data['id'] = PLACEHOLDER_ID
+        next_data = {
+            'props': {'pageProps': {'data': data, 'technicalSheet': fixture.get('technical_sheet') or []}},
+            'page': '/[...slug]',
+            'query': {},
+        }
+        html = (
+            '<!DOCTYPE html><html lang="es-CO"><head><meta charset="utf-8">'
+            f'<title>{data.get("title", "")}</title></head><body>'
+            f'<h1>{data.get("title", "")}</h1>{relleno}'
+            '<script id="__NEXT_DATA__" type="application/json">'
+            f'{json.dumps(next_data, ensure_ascii=False)}</script></body></html>'
+        )
+        plantillas.append(html)
+    if not plantillas:
+        raise FileNotFoundError(f"No hay fixtures con patrón {patron}")
+    return plantillas
+
+
+class ServidorSimulado:
+    """Servidor de páginas simuladas en un thread propio"""
+
+    def __init__(self, puerto: int = 0, config: Dict = None, host: str = '127.0.0.1'):
+        self.config = {**CONFIG_SERVIDOR, **(config or {})}
+        self.host = host
+        self.puerto = puerto
+        self.plantillas = cargar_plantillas(relleno_kb=self.config['relleno_kb'])
+        perfil = ROOT / 'html_after_click.html'
+        self.perfil_html = perfil.read_text(encoding='utf-8') if perfil.exists() else '<html><h1>Perfil</h1></html>'
+        self.random = random.Random(self.config['semilla'])
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, '200': 0, '404': 0, '429': 0, '500': 0}
+        self._httpd = None
+
+    @property
+    def url_base(self) -> str:
+        return f"http://{self.host}:{self.puerto}"
+
+    def urls_inmuebles(self, cantidad: int, id_inicial: int = 190000000) -> List[str]:
+        """URLs de inmuebles con ids consecutivos servidas por este servidor"""
+        return [f"{self.url_base}/apartamento-en-venta-en-simulado/{id_inicial + i}" for i in range(cantidad)]
+
+    def _sortear(self) -> float:
+        with self.lock:
+            return self.random.random()
+
+    def responder(self, path: str) -> (int, str):
+        """Decide estado y cuerpo para una ruta (incluye la inyección de fallas)"""
+        with self.lock:
+            self.stats['requests'] += 1
+            latencia = self.config['latencia_ms'] / 1000.0
+            if self.config['jitter_ms']:
+                latencia += self.random.expovariate(1000.0 / self.config['jitter_ms'])
+        time.sleep(latencia)
+
+        if path.startswith('/__stats'):
+            return 200, json.dumps(self.stats)
+
+        sorteo = self._sortear()
+        if sorteo < self.config['tasa_429']:
+            return 429, PAGINA_CHALLENGE
+        sorteo -= self.config['tasa_429']
+        if sorteo < self.config['tasa_error']:
+            return 500, PAGINA_ERROR
+
+        if path.startswith('/inmobiliarias/'):
+            return 200, self.perfil_html
+
+        match = re.search(r'/(\d{6,})/?$', path.split('?')[0])
+        if not match:
+            return 404, PAGINA_REMOVIDO
+        cod_fr = match.group(1)
+        # Los removidos dependen del id (no del sorteo) para que sean estables entre reintentos
+        if self.config['tasa_removidos'] and (int(cod_fr) % 1000) / 1000.0 < self.config['tasa_removidos']:
+            return 404, PAGINA_REMOVIDO
+        plantilla = self.plantillas[int(cod_fr) % len(self.plantillas)]
+        return 200, plantilla.replace(f'"{PLACEHOLDER_ID}"', cod_fr)
+
+    def iniciar(self) -> 'ServidorSimulado':
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, cuerpo = servidor.responder(self.path)
+                datos = cuerpo.encode('utf-8')
+                with servidor.lock:
+                    servidor.stats[str(status)] = servidor.stats.get(str(status), 0) + 1
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.puerto), _Handler)
+        self._httpd.daemon_threads = True
+        self.puerto = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name='servidor-simulado', daemon=True).start()
+        return self
+
+    def detener(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita páginas de Finca Raíz')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--latencia-ms', type=float, default=CONFIG_SERVIDOR['latencia_ms'])
+    parser.add_argument('--jitter-ms', type=float, default=CONFIG_SERVIDOR['jitter_ms'])
+    parser.add_argument('--tasa-error', type=float, default=CONFIG_SERVIDOR['tasa_error'])
+    parser.add_argument('--tasa-429', type=float, default=CONFIG_SERVIDOR['tasa_429'])
+    parser.add_argument('--tasa-removidos', type=float, default=CONFIG_SERVIDOR['tasa_removidos'])
+    args = parser.parse_args()
+
+    servidor = ServidorSimulado(args.puerto, {
+        'latencia_ms': args.latencia_ms,
+        'jitter_ms': args.jitter_ms,
+        'tasa_error': args.tasa_error,
+        'tasa_429': args.tasa_429,
+        'tasa_removidos': args.tasa_removidos,
+    }).iniciar()
+    print(f"Servidor simulado en {servidor.url_base} ({len(servidor.plantillas)} plantillas)")
+    print(f"Ejemplo: {servidor.urls_inmuebles(1)[0]}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+staging_lotes.py - Staging local de resultados con publicación compacta a la carpeta sincronizada
+
+procesar_lote_limpio.py escribía un backup JSON indentado completo cada 200
+URLs directo en la carpeta de OneDrive (InmueblesFR/lote_XX): cada reescritura
+subía a la nube un archivo cada vez más grande, compitiendo con el crawler por
+red y disco, y los backups se acumulaban.
+
+StagingLote:
+- agregar() anexa cada lote del escritor a un JSONL en disco local
+  (una línea por lote con la posición alcanzada y sus registros); una línea
+  cortada por un corte de luz se ignora al reanudar
+- sincronizar() publica, como mucho cada `cadencia` segundos, una única
+  instantánea compacta (un registro por línea, sin indentar) con el mismo
+  nombre de siempre, lote_XX_backup_<posicion>_<ts>.json: se escribe a un
+  temporal dentro de la carpeta destino y se mueve con os.replace (atómico)
+- Después de publicar borra los backups viejos del lote, dejando `conservar`
+- reanudar() toma lo que esté más adelante: el staging local o el último
+  backup publicado (útil al continuar el lote en otra máquina)
+
+Uso:
+    staging = StagingLote(1, Path('InmueblesFR/lote_01'))
+    resultados, posicion = staging.reanudar()
+    staging.agregar(registros, posicion)
+    staging.sincronizar()             # respeta la cadencia
+    staging.sincronizar(forzar=True)  # al terminar o interrumpir
+"""
+import os
+import re
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from registro_inmueble import LoteRegistros, RegistroInmueble
+from config import LOTES_STAGING_DIR, LOTES_SYNC_CADENCIA, LOTES_BACKUPS_CONSERVAR
+
+
+BACKUP_RE = re.compile(r'backup_(\d+)_')
+
+
+def _posicion_backup(ruta: Path) -> int:
+    match = BACKUP_RE.search(ruta.name)
+    return int(match.group(1)) if match else 0
+
+
+class StagingLote:
+    """Resultados de un lote en disco local, publicados compactos a la carpeta sincronizada"""
+
+    def __init__(self, numero_lote: int, destino_dir: Path, staging_dir: str = LOTES_STAGING_DIR,
+                 cadencia: float = LOTES_SYNC_CADENCIA, conservar: int = LOTES_BACKUPS_CONSERVAR):
+        self.lote_str = f"{numero_lote:02d}"
+        self.destino_dir = Path(destino_dir)
+        self.local_dir = Path(staging_dir) / f"lote_{self.lote_str}"
+        self.local_dir.mkdir(parents=True, exist_ok=True)
+        self.jsonl = self.local_dir / f"lote_{self.lote_str}.jsonl"
+        self.cadencia = cadencia
+        self.conservar = max(1, conservar)
+        self.resultados = LoteRegistros()
+        self.posicion = 0
+        self._publicada = 0  # Posición de la última instantánea publicada
+        self._ultima_publicacion = time.time()
+        self.stats = {'publicaciones': 0, 'bytes_publicados': 0, 'backups_borrados': 0}
+
+    # ------------------------------------------------------------------
+    # Reanudación
+    # ------------------------------------------------------------------
+    def _leer_local(self) -> Tuple[List[Dict[str, Any]], int]:
+        registros, posicion = [], 0
+        if not self.jsonl.exists():
+            return registros, posicion
+        with open(self.jsonl, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue  # Última línea a medio escribir
+                registros.extend(entrada.get('registros', []))
+                posicion = entrada.get('posicion', posicion)
+        return registros, posicion
+
+    def backups_publicados(self) -> List[Path]:
+        """Backups del lote en la carpeta destino, del más avanzado al más viejo"""
+        backups = list(self.destino_dir.glob(f"lote_{self.lote_str}_backup_*.json"))
+        return sorted(backups, key=lambda ruta: (_posicion_backup(ruta), ruta.name), reverse=True)
+
+    def reanudar(self) -> Tuple[LoteRegistros, int]:
+        """Resultados y posición desde donde seguir (staging local o último backup publicado)"""
+        registros, posicion = self._leer_local()
+        publicados = self.backups_publicados()
+        if publicados and _posicion_backup(publicados[0]) > posicion:
+            print(f"🔄 Reanudando desde backup publicado: {publicados[0]}")
+            with open(publicados[0], 'r', encoding='utf-8') as f:
+                registros = json.load(f)
+            posicion = _posicion_backup(publicados[0])
+            # El staging local queda alineado con el backup (una sola línea)
+            self._reescribir_local(registros, posicion)
+            self._publicada = posicion
+        elif posicion:
+            print(f"🔄 Reanudando desde staging local: {self.jsonl} (posición {posicion})")
+            self._publicada = _posicion_backup(publicados[0]) if publicados else 0
+        self.resultados = LoteRegistros(registros)
+        self.posicion = posicion
+        return self.resultados, posicion
+
+    def _reescribir_local(self, registros: List[Dict[str, Any]], posicion: int):
+        temporal = self.jsonl.with_suffix('.jsonl.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'posicion': posicion, 'registros': registros}, ensure_ascii=False) + '\n')
+        os.replace(temporal, self.jsonl)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def agregar(self, registros: Iterable[Dict[str, Any]], posicion: int):
+        """Anexa los registros de un lote del escritor y la posición alcanzada (disco local)"""
+        compactos = [datos if isinstance(datos, RegistroInmueble) else RegistroInmueble.desde_dict(datos)
+                     for datos in registros]
+        linea = {'posicion': posicion, 'registros': [registro.a_dict() for registro in compactos]}
+        with open(self.jsonl, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(linea, ensure_ascii=False) + '\n')
+        self.resultados.extend(compactos)
+        self.posicion = posicion
+
+    def sincronizar(self, forzar: bool = False) -> Optional[Path]:
+        """
+        Publica la instantánea compacta en la carpeta destino si venció la cadencia
+
+        Returns:
+            Ruta publicada, o None si no tocaba o no había nada nuevo
+        """
+        if self.posicion == self._publicada:
+            return None
+        if not forzar and time.time() - self._ultima_publicacion < self.cadencia:
+            return None
+        self.destino_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        destino = self.destino_dir / f"lote_{self.lote_str}_backup_{self.posicion}_{timestamp}.json"
+        # El temporal va en la misma carpeta: os.replace es atómico dentro de un mismo volumen,
+        # así OneDrive nunca sube (ni otro script lee) un backup a medio escribir
+        temporal = self.destino_dir / f".{destino.name}.tmp"
+        self.resultados.guardar_json(temporal, indent=None)
+        os.replace(temporal, destino)
+
+        self._publicada = self.posicion
+        self._ultima_publicacion = time.time()
+        self.stats['publicaciones'] += 1
+        self.stats['bytes_publicados'] += destino.stat().st_size
+        self._podar(destino)
+        return destino
+
+    def _podar(self, recien_publicado: Path):
+        """Borra backups viejos del lote, dejando los `conservar` más avanzados"""
+        for ruta in self.backups_publicados()[self.conservar:]:
+            if ruta == recien_publicado:
+                continue
+            try:
+                ruta.unlink()
+                self.stats['backups_borrados'] += 1
+            except OSError as e:
+                print(f"  ⚠ No se pudo borrar {ruta.name}: {e}")
+
+    def guardar_final(self, ruta: Path):
+        """Resultado final del lote (indentado, como antes), publicado de una sola vez"""
+        ruta = Path(ruta)
+        temporal = ruta.with_name(f".{ruta.name}.tmp")
+        self.resultados.guardar_json(temporal)
+        os.replace(temporal, ruta)
@@ -0,0 +1,60 @@
+"""
+Fixtures compartidas: la raíz del repo en sys.path (módulos planos), un sitio
+simulado local y un crawler que descarga por HTTP en lugar de Chrome.
+"""
+import os
+import sys
+import urllib.request
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from frontera import BASE_URL  # noqa: E402
+from property_crawler_selenium import PropertyCrawlerSelenium  # noqa: E402
+from servidor_simulado import ServidorSimulado  # noqa: E402
+
+
+@pytest.fixture
+def en_tmp(tmp_path, monkeypatch):
+    """Corre el test con cwd en un directorio temporal (los módulos escriben en resultados/)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(scope='session')
+def servidor():
+    """Sitio simulado con las fichas de debug_json_*.json, sin latencia"""
+    return ServidorSimulado(0, {'latencia_ms': 0, 'jitter_ms': 0}).iniciar()
+
+
+@pytest.fixture
+def urls_sitio(servidor):
+    """Genera `n` URLs canónicas de fincaraiz que el crawler HTTP resuelve contra el sitio simulado"""
+    def generar(n, id_inicial=190000000):
+        return [url.replace(servidor.url_base, BASE_URL) for url in servidor.urls_inmuebles(n, id_inicial)]
+    return generar
+
+
+class CrawlerHTTP(PropertyCrawlerSelenium):
+    """PropertyCrawlerSelenium sin Chrome: obtener_html descarga del sitio simulado"""
+
+    def __init__(self, url_base, **kwargs):
+        super().__init__(iniciar_driver=False, **kwargs)
+        self.url_base = url_base
+        self.pedidas = []
+
+    def obtener_html(self, url, max_wait=30, reintentos=3, lanzar=False):
+        self.pedidas.append(url)
+        local = url.replace(BASE_URL, self.url_base)
+        with urllib.request.urlopen(local, timeout=10) as respuesta:
+            return respuesta.read().decode('utf-8')
+
+
+@pytest.fixture
+def crawler_http(servidor):
+    crawler = CrawlerHTTP(servidor.url_base)
+    yield crawler
+    crawler.close()
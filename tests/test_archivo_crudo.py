@@ -0,0 +1,47 @@
+import json
+import os
+from glob import glob
+
+import pytest
+
+from archivo_crudo import ArchivoCrudo, extraer_next_data_texto, reextraer
+from conftest import RAIZ
+from property_crawler_selenium import COLUMNAS_SALIDA, _formatear_salida_final
+
+DUMPS = os.path.join(RAIZ, 'debug_json_*.json')
+
+
+def _leer_jsonl(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+@pytest.mark.parametrize('parser', ['selenium', 'v2'])
+def test_reextraer_dumps_al_esquema_final(tmp_path, parser):
+    salida = tmp_path / 'reextraido.jsonl'
+    stats = reextraer(None, str(salida), parser=parser, procesos=1, dumps=DUMPS)
+
+    cantidad = len(glob(DUMPS))
+    assert stats['ok'] == cantidad and stats['errores'] == 0 and stats['vacios'] == 0
+    registros = _leer_jsonl(salida)
+    assert all(list(r) == COLUMNAS_SALIDA for r in registros)
+    for registro in registros:
+        assert registro['URL INMUEBLE'].startswith('https://www.fincaraiz.com.co/')
+        assert registro['URL INMUEBLE'].endswith('/' + registro['COD FR'])
+
+
+def test_reextraer_archivo_igual_al_crawl_en_vivo(tmp_path, crawler_http, urls_sitio):
+    archivo = ArchivoCrudo(str(tmp_path / 'archivo'))
+    en_vivo = {}
+    for url in urls_sitio(6):
+        html = crawler_http.obtener_html(url)
+        en_vivo[url] = _formatear_salida_final(crawler_http.parsear_html(html, url))
+        archivo.guardar(url.rsplit('/', 1)[1], url, extraer_next_data_texto(html))
+    archivo.cerrar()
+
+    salida = tmp_path / 'reextraido.jsonl'
+    # 6 chunks con 4 en vuelo: el pool se rellena a medida que terminan
+    stats = reextraer(str(tmp_path / 'archivo'), str(salida), procesos=2, tamano_chunk=1)
+
+    assert stats['ok'] == 6 and stats['chunks'] == 6
+    assert {r['URL INMUEBLE']: r for r in _leer_jsonl(salida)} == en_vivo
@@ -0,0 +1,59 @@
+import urllib.request
+
+from benchmark_crawlers import comparar_con_baseline
+from property_crawler_robust import RobustPropertyCrawler
+from property_crawler_selenium import _formatear_salida_final
+from property_crawler_v2 import PropertyCrawlerV2
+
+
+def _resultado(exitosas, urls=20, urls_s=10.0, p99_s=0.1):
+    return {'urls': urls, 'exitosas': exitosas, 'tasa_exito': exitosas / urls, 'urls_s': urls_s, 'p99_s': p99_s}
+
+
+def test_baseline_sin_regresiones():
+    baseline = {'v2': _resultado(20)}
+    assert comparar_con_baseline({'v2': _resultado(20, urls_s=9.5)}, baseline, 0.10) == []
+
+
+def test_baseline_detecta_throughput_y_p99():
+    baseline = {'v2': _resultado(20)}
+    regresiones = comparar_con_baseline({'v2': _resultado(20, urls_s=5.0, p99_s=0.5)}, baseline, 0.10)
+    assert len(regresiones) == 2
+
+
+def test_baseline_detecta_caida_de_exitosas_aunque_sea_mas_rapido():
+    baseline = {'v2': _resultado(20)}
+    regresiones = comparar_con_baseline({'v2': _resultado(0, urls_s=100.0)}, baseline, 0.10)
+    assert regresiones and 'exitosas 0/20' in regresiones[0]
+    # Con otro número de URLs se compara la tasa
+    assert comparar_con_baseline({'v2': _resultado(38, urls=40)}, baseline, 0.10)
+    assert comparar_con_baseline({'v2': _resultado(38, urls=40)}, baseline, 0.10, tolerancia_exito=0.05) == []
+
+
+def test_baseline_escenario_omitido_es_regresion():
+    baseline = {'lote': _resultado(20), 'robust': {'escenario': 'robust', 'omitido': 'sin Chrome'}}
+    actual = {'lote': {'escenario': 'lote', 'omitido': 'ImportError: x'},
+              'robust': {'escenario': 'robust', 'omitido': 'sin Chrome'}}
+    regresiones = comparar_con_baseline(actual, baseline, 0.10)
+    assert len(regresiones) == 1 and regresiones[0].startswith('lote: omitido')
+
+
+def test_v2_extrae_las_fichas_con_technical_sheet_en_lista(servidor):
+    crawler = PropertyCrawlerV2()
+    for url in servidor.urls_inmuebles(4):
+        resultado = crawler.extraer_propiedad(url)
+        assert 'error' not in resultado, resultado
+        assert resultado['codigo_fr'] == url.rsplit('/', 1)[1]
+        assert resultado['caracteristicas']
+        assert _formatear_salida_final(resultado)['COD FR'] == resultado['codigo_fr']
+
+
+def test_robust_parsea_al_esquema_final(en_tmp, servidor):
+    crawler = RobustPropertyCrawler(output_dir=str(en_tmp))
+    url = servidor.urls_inmuebles(1, 190000003)[0]
+    with urllib.request.urlopen(url) as respuesta:
+        html = respuesta.read().decode('utf-8')
+    registro = crawler._parse_html(url, html)
+    assert registro['COD FR'] == '190000003'
+    assert registro['URL INMUEBLE'] == url
+    assert len(registro) == 50
@@ -0,0 +1,52 @@
+import time
+
+from cache_contactos import CacheContactos, owners_desde_resultados, url_perfil
+
+DIA = 86400
+
+
+def _cache(tmp_path):
+    return CacheContactos(str(tmp_path / 'cache.jsonl'), {'ttl_valido_dias': 30, 'ttl_invalido_dias': 7})
+
+
+def test_ttl_segun_validez_del_telefono(tmp_path):
+    cache = _cache(tmp_path)
+    ahora = time.time()
+    cache.registrar('100', 'ventas@inmo.co', '300 123 4567', revelado=ahora - 10 * DIA)
+    cache.registrar('200', None, None, revelado=ahora - 10 * DIA)
+    assert cache.get('100')['valido'] and cache.get('100')['telefono'] == '+573001234567'
+    assert cache.vigente('100')  # Válido: 30 días
+    assert not cache.vigente('200')  # Sin teléfono: se reintenta a los 7 días
+    assert not cache.vigente('300')
+
+
+def test_revelado_fallido_no_pisa_un_telefono_valido(tmp_path):
+    cache = _cache(tmp_path)
+    cache.registrar('100', 'ventas@inmo.co', '3001234567')
+    contacto = cache.registrar('100', 'No encontrado', None)
+    assert contacto['valido'] and contacto['telefono'] == '+573001234567'
+    assert contacto['email'] == 'ventas@inmo.co'
+    assert contacto['revelados'] == 2
+
+
+def test_persistencia_y_compactacion(tmp_path):
+    cache = _cache(tmp_path)
+    cache.registrar('100', None, '123')
+    cache.registrar('100', None, '3001234567')
+    recargada = _cache(tmp_path)
+    assert recargada.get('100')['valido']  # La última línea de cada id manda
+    recargada.compactar()
+    assert len((tmp_path / 'cache.jsonl').read_text(encoding='utf-8').splitlines()) == 1
+
+
+def test_filtrar_urls_y_owners(tmp_path):
+    cache = _cache(tmp_path)
+    cache.registrar('100', None, '3001234567')
+    a_revelar, en_cache = cache.filtrar_urls([url_perfil(100), url_perfil(200), url_perfil(200)])
+    assert a_revelar == [url_perfil(200)]
+    assert en_cache == [url_perfil(100)]
+
+    lote = tmp_path / 'lote.jsonl'
+    lote.write_text('{"ID Inmos": 100, "INMOS": "Inmo A"}\n{"id_inmos": "200"}\n{"COD FR": "1"}\n',
+                    encoding='utf-8')
+    assert owners_desde_resultados([str(lote)]) == {'100': 'Inmo A', '200': None}
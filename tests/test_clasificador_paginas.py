@@ -0,0 +1,42 @@
+from clasificador_paginas import (
+    CARGANDO, CHALLENGE, ERROR, NORMAL, REMOVIDO, MonitorBloqueos, clasificar_pagina, clasificar_sonda,
+)
+
+NEXT_DATA = '<script id="__NEXT_DATA__" type="application/json">{"page":"%s","props":{}}</script>'
+
+
+def test_clasificar_pagina_por_status():
+    assert clasificar_pagina('', status=429) == CHALLENGE
+    assert clasificar_pagina('', status=410) == REMOVIDO
+    assert clasificar_pagina('', status=502) == ERROR
+    assert clasificar_pagina('', status=200) == ERROR
+
+
+def test_clasificar_pagina_por_contenido():
+    assert clasificar_pagina('<html>' + NEXT_DATA % '/[...slug]' + '</html>', 200) == NORMAL
+    assert clasificar_pagina('<html>' + NEXT_DATA % '/404' + '</html>', 200) == REMOVIDO
+    assert clasificar_pagina('<title>Just a moment...</title>') == CHALLENGE
+    assert clasificar_pagina('<p>Este inmueble ya no está disponible</p>') == REMOVIDO
+    # Con __NEXT_DATA__ de un aviso los marcadores de texto no cuentan (pueden estar en la descripción)
+    assert clasificar_pagina('<p>Este inmueble ya no está disponible</p>' + NEXT_DATA % '/x') == NORMAL
+    assert clasificar_pagina('<p>Portería 24h, access denied a visitantes</p>' + NEXT_DATA % '/x') == NORMAL
+    assert clasificar_pagina('<html><head></head>') == CARGANDO
+
+
+def test_clasificar_sonda():
+    assert clasificar_sonda({'next_data': True, 'pagina': '/[...slug]', 'estado': 'interactive'}) == NORMAL
+    assert clasificar_sonda({'titulo': 'Attention Required! | Cloudflare'}) == CHALLENGE
+    assert clasificar_sonda({'estado': 'loading'}) == CARGANDO
+    assert clasificar_sonda({'estado': 'complete'}) == ERROR
+
+
+def test_monitor_bloqueos_enfria_sobre_el_umbral(tmp_path):
+    ruta = tmp_path / 'bloqueos.json'
+    monitor = MonitorBloqueos(ruta, ventana=10, umbral=0.5, minimo_muestras=4, enfriamiento=60)
+    for clase in (NORMAL, REMOVIDO, REMOVIDO, CHALLENGE, NORMAL):
+        assert not monitor.registrar(clase)
+    assert monitor.registrar(CHALLENGE)  # 2 de 4 (los removidos no cuentan)
+    assert monitor.en_enfriamiento()
+    # El enfriamiento se comparte entre procesos por el archivo de estado
+    assert MonitorBloqueos(ruta).en_enfriamiento()
+    assert monitor.stats['enfriamientos'] == 1
@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cobertura_http
+from cobertura_http import SolicitudesCubiertas, adquirir, liberar
+from property_crawler_v2 import PropertyCrawlerV2
+
+
+class Respuesta:
+    status_code = 200
+
+    def close(self):
+        pass
+
+
+class SesionLenta:
+    """Session falsa: las URLs que contienen 'lenta' tardan `demora` segundos"""
+
+    def __init__(self, demora=0.05):
+        self.demora = demora
+        self.pedidas = 0
+
+    def get(self, url, **kwargs):
+        self.pedidas += 1
+        if 'lenta' in url:
+            time.sleep(self.demora)
+        return Respuesta()
+
+
+def test_adquirir_comparte_y_el_ultimo_liberar_cierra():
+    a = adquirir({'max_hilos': 4})
+    b = adquirir()
+    assert a is b
+    liberar(a)
+    assert not a.pool._shutdown
+    liberar(b)
+    assert a.pool._shutdown
+    assert adquirir() is not a
+    liberar(cobertura_http._compartida)
+
+
+def test_crawlers_v2_comparten_la_cobertura_y_la_cierran():
+    c1, c2 = PropertyCrawlerV2(cobertura={}), PropertyCrawlerV2(cobertura={})
+    assert c1.cobertura is c2.cobertura
+    compartida = c1.cobertura
+    c1.close()
+    c2.close()
+    assert compartida.pool._shutdown
+    assert cobertura_http._compartida is None
+
+
+def test_cobertura_inyectada_no_se_cierra_con_el_crawler():
+    propia = SolicitudesCubiertas(config={'max_hilos': 2})
+    crawler = PropertyCrawlerV2(cobertura=propia)
+    crawler.close()
+    assert not propia.pool._shutdown
+    propia.cerrar()
+
+
+def test_presupuesto_es_global_entre_workers():
+    http = SolicitudesCubiertas(config={'min_muestras': 5, 'retraso_min': 0.001, 'presupuesto': 0.1,
+                                        'recalcular_cada': 1, 'max_hilos': 16})
+    sesiones = [SesionLenta() for _ in range(4)]
+    for sesion in sesiones:
+        for _ in range(5):
+            http.get('https://x/rapida', session=sesion)
+
+    def trabajar(sesion):
+        for _ in range(10):
+            http.get('https://x/lenta', session=sesion)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(trabajar, sesiones))
+    resumen = http.resumen()
+    http.cerrar()
+
+    assert resumen['primarios'] == 60
+    assert 0 < resumen['coberturas'] <= 0.1 * 60
+    assert resumen['sin_presupuesto'] > 0
+    assert 60 <= sum(s.pedidas for s in sesiones) <= 60 + resumen['coberturas']
@@ -0,0 +1,46 @@
+from control_tasa import ControladorTasa
+
+
+def _controlador(ruta=None, **config):
+    return ControladorTasa(ruta, {'tasa_inicial': 1.0, 'ventana': 5, 'incremento': 0.5,
+                                  'intervalo_reduccion': 0.0, **config})
+
+
+def test_aumento_aditivo_por_ventana_sana():
+    controlador = _controlador()
+    for _ in range(10):
+        controlador.reportar(0.2, status=200)
+    assert controlador.tasa_actual == 2.0
+    assert controlador.metricas()['aumentos'] == 2
+
+
+def test_reduccion_multiplicativa_ante_throttling_y_challenge():
+    controlador = _controlador(tasa_min=0.2)
+    controlador.reportar(0.2, status=429)
+    assert controlador.tasa_actual == 0.5
+    controlador.reportar(0.2, challenge=True)
+    assert controlador.tasa_actual == 0.25
+    controlador.notificar_bloqueo()
+    assert controlador.tasa_actual == 0.2  # No baja de tasa_min
+    assert controlador.metricas()['throttling'] == 1
+
+
+def test_ventana_con_fallos_no_aumenta():
+    controlador = _controlador()
+    for i in range(5):
+        controlador.reportar(0.2, status=200, exito=i % 2 == 0)
+    assert controlador.tasa_actual == 1.0
+
+
+def test_intervalo_entre_reducciones_evita_cascadas():
+    controlador = _controlador(intervalo_reduccion=60.0)
+    controlador.reportar(0.2, status=403)
+    controlador.reportar(0.2, status=403)
+    assert controlador.tasa_actual == 0.5
+
+
+def test_tasa_compartida_entre_procesos_por_archivo(tmp_path):
+    ruta = tmp_path / 'tasa.json'
+    primero, segundo = _controlador(ruta), _controlador(ruta)
+    primero.reportar(0.2, status=429)
+    assert segundo.tasa_actual == 0.5
@@ -0,0 +1,58 @@
+import time
+
+from coordinador import Coordinador
+from errores_crawl import REMOVIDO, TIMEOUT
+
+URL = 'https://www.fincaraiz.com.co/casa-en-venta/{}'
+
+
+def _coordinador(tmp_path, n=4, **config):
+    coordinador = Coordinador(str(tmp_path / 'coordinador.db'), {'tamano_rango': 2, **config})
+    coordinador.cargar_urls([URL.format(190000000 + i) for i in range(n)])
+    return coordinador
+
+
+def test_cargar_urls_deduplica_por_cod_fr(tmp_path):
+    coordinador = _coordinador(tmp_path)
+    stats = coordinador.cargar_urls([URL.format(190000000) + '/?utm=1', URL.format(190000009), ''])
+    assert stats == {'entradas': 3, 'invalidas': 1, 'nuevas': 1, 'rangos': 1}
+    assert coordinador.estado()['urls']['pendiente'] == 5
+
+
+def test_arriendo_vencido_se_reemite_y_el_token_viejo_pierde_el_rango(tmp_path):
+    coordinador = _coordinador(tmp_path, n=2)
+    arriendo = coordinador.arrendar('a', plazo=0.05)
+    assert arriendo['urls'] == [URL.format(190000000), URL.format(190000001)]
+    assert coordinador.latido('a', arriendo['rango'], arriendo['token'], plazo=0.05)
+    assert coordinador.arrendar('b') is None  # Vigente: nadie más lo toma
+
+    time.sleep(0.1)
+    reemitido = coordinador.arrendar('b')
+    assert reemitido['rango'] == arriendo['rango'] and reemitido['token'] != arriendo['token']
+    assert not coordinador.latido('a', arriendo['rango'], arriendo['token'])
+    assert coordinador.liberar('a', arriendo['rango'], arriendo['token']) == 'perdido'
+
+
+def test_reportar_y_liberar(tmp_path):
+    coordinador = _coordinador(tmp_path, n=2, max_intentos=2, retraso_rango=60)
+    arriendo = coordinador.arrendar('a')
+    uno, dos = arriendo['urls']
+    resultado = coordinador.reportar('a', arriendo['rango'], arriendo['token'],
+                                     [{'url': uno, 'registro': {'COD FR': '190000000'}},
+                                      {'url': dos, 'clase': TIMEOUT, 'error': 'timeout'}])
+    assert resultado == {'vigente': True, 'exitosas': 1, 'fallidas': 1}
+    # Fallo reintentable: el rango vuelve a la cola, pero no antes de retraso_rango
+    assert coordinador.liberar('a', arriendo['rango'], arriendo['token']) == 'pendiente'
+    assert coordinador.arrendar('b') is None
+
+    coordinador.conexion.execute('UPDATE rangos SET vence = 0')  # Pasó el retraso
+    otro = coordinador.arrendar('b')
+    assert otro['urls'] == [dos]
+    coordinador.reportar('b', otro['rango'], otro['token'], [{'url': dos, 'clase': REMOVIDO, 'error': '404'}])
+    assert coordinador.liberar('b', otro['rango'], otro['token']) == 'completo'
+
+    estado = coordinador.estado()
+    assert estado['urls'] == {'pendiente': 0, 'hecha': 1, 'fallida': 1}
+    assert estado['fallidas_por_clase'] == {REMOVIDO: 1}
+    assert estado['terminado']
+    coordinador.cerrar()
@@ -0,0 +1,71 @@
+import json
+
+from cosecha_directorio import CosechaDirectorio, filas_de_html, filas_de_json
+
+DIRECTORIO = 'https://www.fincaraiz.com.co/inmobiliarias'
+
+
+def _inmobiliarias(desde, hasta):
+    return [{'id': 10000 + i, 'name': f'Inmo {i}', 'inmoLink': f'/inmobiliarias/{10000 + i}-inmo-{i}',
+             'properties_count': i} for i in range(desde, hasta)]
+
+
+def _html(datos):
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(datos)}</script></html>'
+
+
+class _Respuesta:
+    def __init__(self, texto):
+        self.status_code = 200 if texto is not None else 404
+        self.text = texto
+
+    def raise_for_status(self):
+        pass
+
+
+class _HTTP:
+    def __init__(self, paginas):
+        self.paginas = paginas
+        self.pedidas = []
+
+    def get(self, url, **_kw):
+        self.pedidas.append(url)
+        return _Respuesta(self.paginas.get(url))
+
+
+def test_filas_de_json_y_html():
+    filas = filas_de_json({'props': {'meta': [{'id': 1}], 'agencies': _inmobiliarias(1, 3)}})
+    assert filas == [
+        {'titulo': 'Inmo 1', 'url': 'https://www.fincaraiz.com.co/inmobiliarias/10001-inmo-1', 'cantidad_inmuebles': 1},
+        {'titulo': 'Inmo 2', 'url': 'https://www.fincaraiz.com.co/inmobiliarias/10002-inmo-2', 'cantidad_inmuebles': 2},
+    ]
+    html = ('<article><a href="/inmobiliarias/20001-uno">Uno</a><span>1.234 inmuebles</span></article>'
+            '<article><a href="/inmobiliarias/20001-uno">Uno</a></article>')
+    assert filas_de_html(html) == [{'titulo': 'Uno', 'url': 'https://www.fincaraiz.com.co/inmobiliarias/20001-uno',
+                                    'cantidad_inmuebles': 1234}]
+
+
+def test_paginas_informadas_por_el_endpoint_de_datos_de_next():
+    datos = '/_next/data/abc123/inmobiliarias.json?pagina={}'
+    http = _HTTP({
+        DIRECTORIO: _html({'buildId': 'abc123', 'props': {'totalPages': 3, 'agencies': _inmobiliarias(0, 2)}}),
+        'https://www.fincaraiz.com.co' + datos.format(2): json.dumps({'pageProps': {'agencies': _inmobiliarias(2, 4)}}),
+        # Página 3: el endpoint de datos falla y se usa el HTML
+        DIRECTORIO + '?pagina=3': _html({'props': {'agencies': _inmobiliarias(4, 5)}}),
+    })
+    cosecha = CosechaDirectorio(DIRECTORIO, {'hilos': 2, 'reintentos': 0}, http=http)
+    filas = cosecha.cosechar()
+    assert [f['titulo'] for f in filas] == [f'Inmo {i}' for i in range(5)]
+    assert cosecha.stats['datos_next'] == 1 and cosecha.stats['html'] == 2
+
+
+def test_total_desconocido_avanza_por_tandas_hasta_no_ver_nada_nuevo():
+    paginas = {DIRECTORIO: _html({'props': {'agencies': _inmobiliarias(0, 2)}})}
+    for n in range(2, 5):
+        paginas[DIRECTORIO + f'?pagina={n}'] = _html({'props': {'agencies': _inmobiliarias(2 * n - 2, 2 * n)}})
+    for n in range(5, 30):
+        paginas[DIRECTORIO + f'?pagina={n}'] = _html({'props': {'agencies': _inmobiliarias(0, 2)}})  # Repite la 1
+    http = _HTTP(paginas)
+    cosecha = CosechaDirectorio(DIRECTORIO, {'hilos': 3, 'reintentos': 0, 'datos_next': False}, http=http)
+    assert len(cosecha.cosechar()) == 8
+    assert len(http.pedidas) == 7  # Página 1 + tandas 2-4 y 5-7
@@ -0,0 +1,73 @@
+import csv
+
+from directorio_inmobiliarias import (
+    COLUMNAS, DirectorioInmobiliarias, complementar, consolidar, guardar_tabla, id_de_url,
+)
+
+OWNER = {'id': 12345, 'name': 'Inmobiliaria Uno', 'type': 'inmobiliaria', 'has_whatsapp': True,
+         'inmoPropsLink': '/inmobiliarias/12345-uno/propiedades'}
+
+
+def _sesion(directorio, nombre):
+    sesion = DirectorioInmobiliarias(str(directorio))
+    sesion.sesion = nombre  # Dos procesos distintos
+    return sesion
+
+
+def test_id_de_url():
+    assert id_de_url('https://www.fincaraiz.com.co/inmobiliarias/perfil/12345') == '12345'
+    assert id_de_url('/inmobiliarias/67890-inmo-dos') == '67890'
+    assert id_de_url(None) is None
+
+
+def test_consolidar_cuenta_avisos_por_owner_mas_reciente(tmp_path):
+    uno = _sesion(tmp_path, 'a')
+    uno.registrar(OWNER, '190000001', visto=100)
+    uno.registrar(OWNER, '190000002', visto=101)
+    uno.registrar(OWNER, '190000002', visto=102)  # Mismo aviso: cuenta una vez
+    uno.registrar(None, '190000009')
+    uno.cerrar()
+    assert uno.stats['sin_owner'] == 1
+
+    dos = _sesion(tmp_path, 'b')
+    dos.registrar({**OWNER, 'name': 'Inmobiliaria Uno SAS'}, '190000003', visto=200)
+    dos.registrar({'id': 777, 'name': 'Otra'}, '190000002', visto=300)  # El aviso cambió de owner
+    dos.cerrar()
+    with open(tmp_path / 'obs_b.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"id": "12345", "cod_')
+
+    tabla = consolidar(str(tmp_path))
+    assert tabla['12345']['avisos'] == 2
+    assert tabla['777']['avisos'] == 1
+    assert tabla['12345']['nombre'] == 'Inmobiliaria Uno SAS'  # Metadatos más recientes
+    assert tabla['12345']['url_propiedades'] == 'https://www.fincaraiz.com.co/inmobiliarias/12345-uno/propiedades'
+    assert tabla['12345']['url_perfil'].endswith('/inmobiliarias/perfil/12345')
+
+
+def test_metadatos_solo_se_escriben_cuando_cambian(tmp_path):
+    sesion = _sesion(tmp_path, 'a')
+    for i in range(3):
+        sesion.registrar(OWNER, f'19000000{i}', visto=100)
+    sesion.cerrar()
+    lineas = (tmp_path / 'obs_a.jsonl').read_text(encoding='utf-8').splitlines()
+    assert ['nombre' in linea for linea in lineas] == [True, False, False]
+
+
+def test_complementar_con_el_recorrido_del_directorio(tmp_path):
+    sesion = _sesion(tmp_path, 'a')
+    sesion.registrar(OWNER, '190000001', visto=100)
+    sesion.cerrar()
+    filas = [{'titulo': 'Inmo Dos', 'url': 'https://www.fincaraiz.com.co/inmobiliarias/67890-inmo-dos',
+              'cantidad_inmuebles': 40},
+             {'titulo': 'Sin id', 'url': 'https://www.fincaraiz.com.co/inmobiliarias'}]
+    assert complementar(filas, str(tmp_path)) == 1
+
+    tabla = consolidar(str(tmp_path))
+    assert tabla['67890']['fuente'] == 'directorio' and tabla['67890']['cantidad_inmuebles'] == 40
+    assert tabla['12345']['fuente'] == 'crawl'
+
+    _, ruta_csv = guardar_tabla(tabla, str(tmp_path))
+    with open(ruta_csv, encoding='utf-8-sig', newline='') as f:
+        filas_csv = list(csv.DictReader(f))
+    assert list(filas_csv[0]) == list(COLUMNAS)
+    assert filas_csv[0]['id'] == '12345'  # De más a menos avisos
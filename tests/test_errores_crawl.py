@@ -0,0 +1,54 @@
+import json
+import time
+
+from clasificador_paginas import CHALLENGE, ERROR, PaginaRemovida
+from errores_crawl import (
+    BLOQUEADO, DRIVER_CAIDO, PARSEO, REMOVIDO, TIMEOUT,
+    ColaReintentos, ErrorCrawl, clase_de_pagina, clasificar_error, es_reintentable,
+)
+
+
+class InvalidSessionIdException(Exception):
+    pass
+
+
+def test_clasificar_error():
+    assert clasificar_error(ErrorCrawl('x', BLOQUEADO)) == BLOQUEADO
+    assert clasificar_error(PaginaRemovida('404')) == REMOVIDO
+    assert clasificar_error(InvalidSessionIdException('sin sesión')) == DRIVER_CAIDO
+    assert clasificar_error(RuntimeError('chrome not reachable')) == DRIVER_CAIDO
+    assert clasificar_error(RuntimeError('Read timed out')) == TIMEOUT
+    assert clasificar_error(json.JSONDecodeError('x', '', 0)) == PARSEO
+    assert clasificar_error(RuntimeError('desconocido')) == TIMEOUT
+
+
+def test_clase_de_pagina_y_politicas():
+    assert clase_de_pagina(CHALLENGE) == BLOQUEADO
+    assert clase_de_pagina(ERROR) == TIMEOUT
+    assert not es_reintentable(REMOVIDO)
+    assert not es_reintentable(PARSEO)
+    assert es_reintentable(BLOQUEADO)
+    assert es_reintentable(None)
+
+
+def test_cola_entrega_por_vencimiento_con_backoff():
+    cola = ColaReintentos({'retraso': {TIMEOUT: 10, BLOQUEADO: 100}, 'jitter': 0.0})
+    assert cola.programar('a', BLOQUEADO)
+    assert cola.programar('b', TIMEOUT)
+    assert cola.programar('b', TIMEOUT)  # Segundo intento: 20s
+    assert [r.url for r in cola.pendientes()] == ['b', 'b', 'a']
+    assert cola.tomar_vencidos() == []
+
+    ahora = time.time()
+    assert [(r.url, r.intento) for r in cola.tomar_vencidos(ahora + 15)] == [('b', 1)]
+    assert [(r.url, r.intento) for r in cola.tomar_vencidos(ahora + 200)] == [('b', 2), ('a', 1)]
+    assert len(cola) == 0 and cola.proximo() is None
+
+
+def test_cola_no_reintenta_clases_finales_ni_intentos_agotados():
+    cola = ColaReintentos({'max_intentos': {DRIVER_CAIDO: 1}})
+    assert not cola.programar('a', REMOVIDO)
+    assert cola.programar('a', DRIVER_CAIDO)
+    assert not cola.programar('a', DRIVER_CAIDO)
+    assert cola.intentos('a') == 1
+    assert cola.stats['agotados'][DRIVER_CAIDO] == 1
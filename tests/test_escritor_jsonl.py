@@ -0,0 +1,52 @@
+import json
+import threading
+
+import pytest
+
+from escritor_jsonl import EscritorJSONL
+
+
+def _leer(ruta):
+    return [json.loads(linea) for linea in ruta.read_text(encoding='utf-8').splitlines()]
+
+
+def test_sincronizar_es_barrera_de_durabilidad(tmp_path):
+    escritor = EscritorJSONL(max_lote=1000, intervalo_flush=60, fsync='nunca')
+    ruta = tmp_path / 'properties.jsonl'
+    registro = {'cod_fr': '1', 'titulo': 'Casa ñ'}
+    escritor.escribir(ruta, registro)
+    registro['titulo'] = 'mutado'  # Se serializó al encolar
+    assert escritor.sincronizar(timeout=5)
+    assert _leer(ruta) == [{'cod_fr': '1', 'titulo': 'Casa ñ'}]
+    assert escritor.stats['fsyncs'] == 1  # La barrera fuerza fsync aun con 'nunca'
+    escritor.cerrar()
+
+
+def test_varios_threads_y_archivos_por_lotes(tmp_path):
+    escritor = EscritorJSONL(max_lote=50, intervalo_flush=0.05, fsync='lote')
+    rutas = [tmp_path / 'a.jsonl', tmp_path / 'b.jsonl']
+
+    def worker(n):
+        for i in range(100):
+            escritor.escribir(rutas[i % 2], {'worker': n, 'i': i})
+
+    hilos = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    escritor.cerrar()
+
+    assert len(_leer(rutas[0])) == len(_leer(rutas[1])) == 200
+    assert escritor.stats['encolados'] == escritor.stats['escritos'] == 400
+    assert escritor.stats['lotes'] < 400
+
+    # Reutilizable después de cerrar
+    escritor.escribir(rutas[0], {'worker': 9})
+    escritor.cerrar()
+    assert len(_leer(rutas[0])) == 201
+
+
+def test_politica_de_fsync_invalida():
+    with pytest.raises(ValueError):
+        EscritorJSONL(fsync='siempre')
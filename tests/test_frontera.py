@@ -0,0 +1,71 @@
+from frontera import IndiceCodFr, canonicalizar_url, construir_frontera, extraer_cod_fr, repartir_en_shards, shard_de
+
+URL = 'https://www.fincaraiz.com.co/casa-en-venta-en-venecia-bogota/{}'
+
+
+def test_canonicalizar_url_unifica_variantes():
+    canonica = 'https://www.fincaraiz.com.co/apartamento-en-venta-en-catalu%C3%B1a/192006621'
+    for variante in (
+        'http://WWW.fincaraiz.com.co/apartamento-en-venta-en-cataluña/192006621/',
+        'https://www.fincaraiz.com.co/apartamento-en-venta-en-catalu%C3%B1a/192006621?utm_source=x#fotos',
+        '/apartamento-en-venta-en-catalu%C3%B1a//192006621',
+    ):
+        assert canonicalizar_url(variante) == canonica
+    assert canonicalizar_url('') is None
+    assert canonicalizar_url(None) is None
+
+
+def test_extraer_cod_fr():
+    assert extraer_cod_fr(URL.format('192350837') + '/?utm=1') == '192350837'
+    assert extraer_cod_fr('https://www.fincaraiz.com.co/venta/bogota') is None
+
+
+def test_construir_frontera_deduplica_por_cod_fr_y_contra_el_indice(tmp_path):
+    indice = IndiceCodFr(tmp_path / 'indice.txt')
+    assert indice.agregar('190000002')
+    assert not indice.agregar('190000002')
+
+    urls = [
+        URL.format(190000001),
+        'https://www.fincaraiz.com.co/otro-slug/190000001/',
+        URL.format(190000002),
+        '',
+        URL.format(190000003),
+    ]
+    pendientes, stats = construir_frontera(urls, indice)
+    assert pendientes == [URL.format(190000001), URL.format(190000003)]
+    assert stats['invalidas'] == 1
+    assert stats['duplicadas_entrada'] == 1
+    assert stats['ya_crawleadas'] == 1
+    assert stats['fetches_evitados'] == 2
+
+    # El índice persiste entre procesos
+    assert '190000002' in IndiceCodFr(tmp_path / 'indice.txt')
+
+
+def test_shard_de_es_estable_y_en_rango():
+    # blake2b: el mismo valor en cualquier proceso (no depende de PYTHONHASHSEED)
+    assert shard_de('192350837', 15) == shard_de('192350837', 15)
+    assert {shard_de(str(c), 15) for c in range(190000000, 190000500)} == set(range(1, 16))
+
+
+def test_repartir_en_shards_no_depende_del_orden_ni_del_slug():
+    urls = [URL.format(c) for c in range(190000000, 190000040)]
+    shards = repartir_en_shards(urls, 4)
+    assert sorted(u for lote in shards.values() for u in lote) == sorted(urls)
+
+    invertidas = repartir_en_shards(list(reversed(urls)), 4)
+    assert {n: sorted(lote) for n, lote in invertidas.items()} == {n: sorted(lote) for n, lote in shards.items()}
+
+    # Otro slug con el mismo cod_fr cae en el mismo lote
+    otro_slug = 'https://www.fincaraiz.com.co/apartamento-en-arriendo/190000007'
+    lote, = [n for n, lote in repartir_en_shards([otro_slug], 4).items() if lote]
+    assert URL.format(190000007) in shards[lote]
+
+
+def test_una_url_nueva_solo_agrega_a_su_shard():
+    urls = [URL.format(c) for c in range(190000000, 190000040)]
+    antes = repartir_en_shards(urls, 4)
+    despues = repartir_en_shards(urls[:20] + [URL.format(191000000)] + urls[20:], 4)
+    cambiados = [n for n in antes if antes[n] != despues[n]]
+    assert cambiados == [shard_de('191000000', 4)]
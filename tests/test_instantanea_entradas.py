@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+import instantanea_entradas
+from instantanea_entradas import Instantanea, leer_tabla, leer_urls
+
+
+def _libro(ruta, urls):
+    pd.DataFrame({'Inmuebles': urls, 'Otra': range(len(urls))}).to_excel(ruta, index=False)
+
+
+def _sin_read_excel(monkeypatch):
+    def falla(*_a, **_kw):
+        raise AssertionError('leyó el Excel en vez de la instantánea')
+    monkeypatch.setattr(instantanea_entradas.pd, 'read_excel', falla)
+
+
+def test_columna_y_tabla_desde_la_cache(en_tmp, monkeypatch):
+    _libro('Inmuebles.xlsx', ['https://a/1', None, 'https://a/2'])
+    assert leer_urls('Inmuebles.xlsx', 'Inmuebles') == ['https://a/1', 'https://a/2']
+
+    _sin_read_excel(monkeypatch)
+    assert leer_urls('Inmuebles.xlsx', 'Inmuebles') == ['https://a/1', 'https://a/2']
+    assert list(leer_tabla('Inmuebles.xlsx').columns) == ['Inmuebles', 'Otra']
+    # Columna inexistente: se adivina (primera columna)
+    assert leer_urls('Inmuebles.xlsx', 'No existe') == ['https://a/1', 'https://a/2']
+
+
+def test_mtime_sin_cambio_de_contenido_no_reconstruye(en_tmp, monkeypatch):
+    _libro('Inmuebles.xlsx', ['https://a/1'])
+    Instantanea('Inmuebles.xlsx').columna('Inmuebles')
+    estado = os.stat('Inmuebles.xlsx')
+    os.utime('Inmuebles.xlsx', ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))  # Ej: OneDrive
+    _sin_read_excel(monkeypatch)
+    assert Instantanea('Inmuebles.xlsx').vigente() is not None
+
+
+def test_contenido_nuevo_invalida_la_cache(en_tmp):
+    _libro('Inmuebles.xlsx', ['https://a/1'])
+    assert leer_urls('Inmuebles.xlsx', 'Inmuebles') == ['https://a/1']
+    _libro('Inmuebles.xlsx', ['https://a/1', 'https://a/3'])
+    assert leer_urls('Inmuebles.xlsx', 'Inmuebles') == ['https://a/1', 'https://a/3']
+
+
+def test_txt_una_url_por_linea(en_tmp):
+    with open('urls.txt', 'w', encoding='utf-8') as f:
+        f.write('https://a/1\n\n  https://a/2  \n')
+    assert leer_urls('urls.txt') == ['https://a/1', 'https://a/2']
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import RAIZ
+
+
+def _correr(codigo, cwd):
+    """Corre `codigo` en un proceso nuevo: la configuración de logging es global al proceso"""
+    entorno = {**os.environ, 'PYTHONPATH': RAIZ, 'LOG_CONSOLA_NIVEL': 'CRITICAL'}
+    return subprocess.run([sys.executable, '-c', codigo], cwd=cwd, env=entorno, capture_output=True,
+                          text=True, timeout=60, check=True)
+
+
+def test_importar_no_configura_ni_crea_archivos(tmp_path):
+    salida = _correr(
+        "import logging, logger_config, property_crawler_v2, control_tasa\n"
+        "print(len(logging.getLogger().handlers), len(logging.getLogger('scraper').handlers))\n",
+        tmp_path)
+    assert salida.stdout.split() == ['0', '0']
+    assert not (tmp_path / 'resultados').exists()
+
+
+def test_configurar_deja_fuera_el_debug_de_librerias(tmp_path):
+    _correr(
+        "import logging\n"
+        "from logger_config import configurar_logging, get_logger, detener_logging\n"
+        "configurar_logging(muestreo={})\n"
+        "get_logger('property_crawler_v2').debug('traza del proyecto')\n"
+        "logging.getLogger('urllib3.connectionpool').debug('ruido de urllib3')\n"
+        "logging.getLogger('selenium.webdriver').warning('aviso de selenium')\n"
+        "detener_logging()\n",
+        tmp_path)
+    registros = [json.loads(l) for l in (tmp_path / 'resultados' / 'scraper.jsonl').read_text(encoding='utf-8').splitlines()]
+    mensajes = {r['mensaje']: r['modulo'] for r in registros}
+    assert mensajes == {'traza del proyecto': 'scraper.property_crawler_v2', 'aviso de selenium': 'selenium.webdriver'}
+    texto = (tmp_path / 'resultados' / 'scraper.log').read_text(encoding='utf-8')
+    assert 'ruido de urllib3' not in texto and texto.count('traza del proyecto') == 1
@@ -0,0 +1,50 @@
+import pytest
+
+from metricas import Histograma, RegistroMetricas
+
+
+def test_histograma_cuantiles_y_fusion():
+    hist = Histograma([1, 2, 4])
+    for valor in (0.5, 1.5, 1.5, 3.0):
+        hist.observar(valor)
+    assert hist.cuantil(0.25) == pytest.approx(1.0)
+    assert hist.cuantil(0.5) == pytest.approx(1.5)
+    assert hist.cuantil(1.0) == pytest.approx(3.0)  # Acotado por el máximo observado
+    assert Histograma().cuantil(0.5) is None
+
+    otro = Histograma([1, 2, 4])
+    otro.observar(10.0)  # +Inf
+    hist.fusionar(otro)
+    assert hist.conteos == [1, 2, 1, 1] and hist.total == 5 and hist.maximo == 10.0
+
+
+def test_resumen_por_fase_y_porcentaje_de_tiempo():
+    registro = RegistroMetricas()
+    registro.observar('navegacion', 3.0, worker='w1')
+    registro.observar('navegacion', 1.0, worker='w2')
+    registro.observar('parseo', 1.0, worker='w1')
+    registro.observar_latencia('hasta_extraccion', 4.0)
+    registro.incrementar('exitosas', 2)
+    registro.gauge('tasa', lambda: 1.5)
+    registro.gauge('rota', lambda: 1 / 0)
+
+    resumen = registro.resumen()
+    assert list(resumen['fases']) == ['navegacion', 'parseo']  # Orden del camino caliente
+    assert resumen['fases']['navegacion']['conteo'] == 2
+    assert resumen['fases']['navegacion']['porcentaje_tiempo'] == 80.0
+    assert set(resumen['por_worker']) == {'w1', 'w2'}
+    # Las latencias de punta a punta no cuentan como fase
+    assert resumen['latencias']['hasta_extraccion']['conteo'] == 1
+    assert resumen['contadores'] == {'exitosas': 2}
+    assert resumen['gauges'] == {'tasa': 1.5}
+
+
+def test_prometheus_texto():
+    registro = RegistroMetricas('crawler')
+    with registro.fase('parseo', worker='w1'):
+        pass
+    registro.incrementar('fallidas')
+    texto = registro.prometheus_texto()
+    assert 'crawler_fase_segundos_bucket{fase="parseo",worker="w1",le="+Inf"} 1' in texto
+    assert 'crawler_fase_segundos_count{fase="parseo",worker="w1"} 1' in texto
+    assert 'crawler_fallidas_total 1' in texto
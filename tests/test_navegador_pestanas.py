@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pytest
+from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+
+from clasificador_paginas import ERROR, NORMAL, SONDA_JS
+from navegador_pestanas import NEXT_DATA_JS, NavegadorPestanas, PestanaCaida
+from vigilante_driver import URLVencida
+
+
+class _Ventanas:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        if handle not in self.driver.urls:
+            raise NoSuchWindowException('no such window: target window already closed')
+        self.driver.actual = handle
+
+    def new_window(self, _tipo):
+        self.driver.abiertas += 1
+        handle = f'tab-{self.driver.abiertas}'
+        self.driver.urls[handle] = None
+        self.driver.actual = handle
+
+
+class _DriverFalso:
+    """
+    Chrome falso con pestañas. Según la URL:
+    'normal...' tiene __NEXT_DATA__ al segundo sondeo, 'lenta' nunca termina de cargar,
+    'cerrada' cierra su pestaña, 'colgada' bloquea get() y 'caido' tira el navegador
+    """
+
+    def __init__(self):
+        self.urls = {'tab-0': None}
+        self.actual = 'tab-0'
+        self.abiertas = 0
+        self.sondeos = {}
+        self.ocupadas_max = 0
+        self.soltar = threading.Event()
+        self.switch_to = _Ventanas(self)
+        self.cerrado = False
+        self.antes_de_caer = lambda: None
+
+    @property
+    def current_window_handle(self):
+        return self.actual
+
+    @property
+    def window_handles(self):
+        return list(self.urls)
+
+    def get(self, url):
+        if url.startswith('caido'):
+            self.antes_de_caer()
+            raise WebDriverException('chrome not reachable')
+        if url == 'colgada':
+            self.soltar.wait(10)
+        self.urls[self.actual] = url
+        self.sondeos[self.actual] = 0
+        if url == 'cerrada':
+            del self.urls[self.actual]
+
+    def execute_script(self, js):
+        url = self.urls.get(self.actual)
+        if js == SONDA_JS:
+            self.ocupadas_max = max(self.ocupadas_max, sum(1 for u in self.urls.values() if u))
+            self.sondeos[self.actual] += 1
+            if url.startswith('normal') and self.sondeos[self.actual] >= 2:
+                return {'estado': 'interactive', 'next_data': True, 'pagina': '/[...slug]'}
+            return {'estado': 'loading'}
+        if js == NEXT_DATA_JS:
+            return '{"url": "%s"}' % url
+        if js == 'window.stop();':
+            self.urls[self.actual] = None
+        return None
+
+    def close(self):
+        del self.urls[self.actual]
+
+    def quit(self):
+        self.cerrado = True
+
+
+class _Navegador(NavegadorPestanas):
+    def __init__(self, drivers, **kw):
+        super().__init__(**{'max_wait': 5, 'intervalo_sondeo': 0.01, **kw})
+        self.drivers = drivers
+        self.lanzados = 0
+
+    def _lanzar_chrome(self, _opciones):
+        self.lanzados += 1
+        driver = self.drivers()
+        if driver is None:
+            raise WebDriverException('no se pudo iniciar chrome')
+        return driver
+
+
+def _en_paralelo(navegador, urls):
+    resultados = {}
+
+    def worker(url):
+        try:
+            resultados[url] = navegador.obtener(url, timeout=10)
+        except Exception as e:
+            resultados[url] = e
+    hilos = [threading.Thread(target=worker, args=(url,)) for url in urls]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def test_reparte_urls_entre_pestanas_libres():
+    driver = _DriverFalso()
+    navegador = _Navegador(lambda: driver, pestanas=3)
+    urls = [f'normal-{i}' for i in range(9)]
+    resultados = _en_paralelo(navegador, urls)
+    navegador.cerrar()
+
+    assert resultados == {url: (NORMAL, '{"url": "%s"}' % url) for url in urls}
+    assert len(driver.urls) == 3 and driver.ocupadas_max <= 3
+    assert navegador.stats['completadas'] == 9
+    assert driver.cerrado
+
+
+def test_pestana_cerrada_se_reabre_sin_reiniciar_el_navegador():
+    driver = _DriverFalso()
+    navegador = _Navegador(lambda: driver, pestanas=2)
+    with pytest.raises(PestanaCaida):
+        navegador.obtener('cerrada', timeout=10)
+    assert navegador.obtener('normal-1', timeout=10)[0] == NORMAL
+    navegador.cerrar()
+
+    assert navegador.stats['pestanas_caidas'] == 1
+    assert navegador.stats['navegador_reiniciado'] == 0
+    assert navegador.lanzados == 1 and len(driver.urls) == 2
+
+
+def test_url_que_no_carga_vence_en_max_wait():
+    navegador = _Navegador(_DriverFalso, pestanas=1, max_wait=0.2)
+    assert navegador.obtener('lenta', timeout=10) == (ERROR, None)
+    assert navegador.stats['vencidas'] == 1
+    navegador.cerrar()
+
+
+def test_obtener_vence_si_el_despachador_esta_colgado():
+    driver = _DriverFalso()
+    navegador = _Navegador(lambda: driver, pestanas=1, max_wait=0.2)
+    inicio = time.time()
+    with pytest.raises(URLVencida):
+        navegador.obtener('colgada', timeout=0.3)
+    assert time.time() - inicio < 5
+    driver.soltar.set()
+    navegador.cerrar()
+
+
+def _esperar(condicion, plazo=5):
+    limite = time.time() + plazo
+    while not condicion() and time.time() < limite:
+        time.sleep(0.01)
+
+
+def test_chrome_que_no_se_relanza_falla_las_urls_encoladas():
+    driver = _DriverFalso()
+    drivers = iter([driver])
+    navegador = _Navegador(lambda: next(drivers, None), pestanas=1, max_reinicios=2, pausa_reinicio=0)
+    # El navegador cae recién con las otras cuatro URLs ya en la cola
+    driver.antes_de_caer = lambda: _esperar(lambda: navegador.cola.qsize() >= 4)
+    inicio = time.time()
+    resultados = _en_paralelo(navegador, [f'caido-{i}' for i in range(5)])
+    assert time.time() - inicio < 5
+    assert all(isinstance(r, (PestanaCaida, WebDriverException)) for r in resultados.values())
+    assert navegador.lanzados == 3  # El inicial y los dos intentos de relanzarlo
+    navegador.cerrar()
@@ -0,0 +1,45 @@
+import json
+
+from coordinador import Coordinador
+from nodo_crawl import ejecutar_nodo
+from property_crawler_selenium import COLUMNAS_SALIDA, _formatear_salida_final, _si_no_normalizado
+
+
+def test_formatear_salida_final_esquema_de_50_columnas(crawler_http, urls_sitio):
+    url = urls_sitio(1)[0]
+    registro = _formatear_salida_final(crawler_http.parsear_html(crawler_http.obtener_html(url), url))
+    assert list(registro) == COLUMNAS_SALIDA
+    assert len(registro) == 50
+    assert registro['COD FR'] == '190000000'
+    assert registro['URL INMUEBLE'] == url
+    assert registro['Imagen 1'].startswith('https://')
+    # Un registro ya final pasa tal cual
+    assert _formatear_salida_final(registro) == registro
+
+
+def test_si_no_normalizado():
+    assert _si_no_normalizado('true') == 'Sí'
+    assert _si_no_normalizado('Admite mascotas') == 'Sí'
+    assert _si_no_normalizado('No acepta') == 'No'
+    assert _si_no_normalizado('no') == 'No'
+    assert _si_no_normalizado('quizás') is None
+    assert _si_no_normalizado(None) is None
+
+
+def test_nodo_crawlea_la_frontera_del_coordinador_sqlite(en_tmp, crawler_http, urls_sitio):
+    urls = urls_sitio(6)
+    coordinador = Coordinador(str(en_tmp / 'coordinador.db'), {'tamano_rango': 3})
+    assert coordinador.cargar_urls(urls + urls[:2])['nuevas'] == 6
+
+    stats = ejecutar_nodo(coordinador, 'nodo-test', {'espera_sin_trabajo': 0.1}, crawler=crawler_http)
+
+    assert stats == {'rangos': 2, 'rangos_perdidos': 0, 'exitosas': 6, 'fallidas': 0}
+    estado = coordinador.estado()
+    assert estado['terminado']
+    assert estado['urls']['hecha'] == 6
+    registros = [json.loads(r) for r, in coordinador.conexion.execute('SELECT registro FROM resultados')]
+    assert sorted(r['COD FR'] for r in registros) == [str(190000000 + i) for i in range(6)]
+    assert all(len(r) == 50 for r in registros)
+    # Respaldo local del nodo
+    assert len((en_tmp / 'resultados' / 'nodos' / 'nodo-test.jsonl').read_text(encoding='utf-8').splitlines()) == 6
+    coordinador.cerrar()
@@ -0,0 +1,79 @@
+import threading
+
+from errores_crawl import BLOQUEADO, DRIVER_CAIDO, PARSEO, REMOVIDO, ColaReintentos, ErrorCrawl
+from pipeline import PipelineCrawl, ReintentarURL
+
+
+def _pipeline(obtener, parsear=lambda url, html: {'url': url, 'html': html}, **kw):
+    persistidos = []
+    recursos = {'creados': 0, 'cerrados': 0}
+    lock = threading.Lock()
+
+    def crear():
+        with lock:
+            recursos['creados'] += 1
+        return object()
+
+    def cerrar(_recurso):
+        with lock:
+            recursos['cerrados'] += 1
+
+    pipeline = PipelineCrawl(obtener, parsear, persistidos.extend, crear_recurso=crear, cerrar_recurso=cerrar,
+                             workers_fetch=2, workers_parseo=2, max_crudos=2, lote_escritura=3,
+                             intervalo_escritura=0.05, nombre='test', **kw)
+    return pipeline, persistidos, recursos
+
+
+def test_todas_las_urls_llegan_al_escritor():
+    urls = [f'u{i}' for i in range(20)]
+    pipeline, persistidos, recursos = _pipeline(lambda url, _recurso: f'<{url}>')
+    stats = pipeline.procesar(urls)
+    assert sorted(url for url, _, _ in persistidos) == sorted(urls)
+    assert all(error is None and registro['html'] == f'<{url}>' for url, registro, error in persistidos)
+    assert stats['persistidos'] == 20 and stats['fetch_ok'] == 20 and stats['parseo_ok'] == 20
+    assert recursos['creados'] == recursos['cerrados'] == 2
+
+
+def test_reintentar_url_recrea_el_recurso_y_reencola():
+    fallas = {'u1': 1}
+
+    def obtener(url, _recurso):
+        if fallas.get(url):
+            fallas[url] -= 1
+            raise ReintentarURL('navegador colgado')
+        return 'ok'
+
+    pipeline, persistidos, recursos = _pipeline(obtener)
+    stats = pipeline.procesar(['u1', 'u2'])
+    assert stats['reencoladas'] == 1
+    assert all(error is None for _, _, error in persistidos)
+    assert recursos['creados'] == recursos['cerrados']
+
+
+def test_fallos_clasificados_con_cola_de_reintentos():
+    cola = ColaReintentos({'retraso': {BLOQUEADO: 0.05, DRIVER_CAIDO: 0}, 'jitter': 0.0,
+                           'max_intentos': {BLOQUEADO: 1, DRIVER_CAIDO: 1}})
+    intentos = {}
+
+    def obtener(url, _recurso):
+        intentos[url] = intentos.get(url, 0) + 1
+        if url == 'removida':
+            raise ErrorCrawl('404', REMOVIDO)
+        if url == 'bloqueada' and intentos[url] == 1:
+            raise ErrorCrawl('challenge', BLOQUEADO)
+        if url == 'caida':
+            raise ErrorCrawl('invalid session id', DRIVER_CAIDO)
+        return url
+
+    def parsear(url, html):
+        if url == 'rota':
+            raise KeyError('props')
+        return {'url': url}
+
+    pipeline, persistidos, _ = _pipeline(obtener, parsear, cola_reintentos=cola)
+    stats = pipeline.procesar(['ok', 'removida', 'bloqueada', 'caida', 'rota'])
+    errores = {url: error.clase if error else None for url, _, error in persistidos}
+    assert errores == {'ok': None, 'bloqueada': None, 'removida': REMOVIDO, 'caida': DRIVER_CAIDO, 'rota': PARSEO}
+    assert intentos == {'ok': 1, 'removida': 1, 'bloqueada': 2, 'caida': 2, 'rota': 1}
+    assert stats['diferidas'] == 2
+    assert stats['fallos_por_clase'] == {REMOVIDO: 1, DRIVER_CAIDO: 1, PARSEO: 1}
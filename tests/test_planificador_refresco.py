@@ -0,0 +1,75 @@
+import json
+
+from planificador_refresco import CAMBIADA, ERROR, NUEVA, SIN_CAMBIOS, PlanificadorRefresco, parsear_listado
+
+BASE = 'https://www.fincaraiz.com.co/inmobiliarias/perfil/{}'
+AVISO = 'https://www.fincaraiz.com.co/casa-en-venta/{}'
+
+
+def _pagina(cods, total):
+    datos = {'props': {'pageProps': {'total': total, 'listings': [{'link': '/casa-en-venta/' + c} for c in cods]}}}
+    return f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(datos)}</script>'
+
+
+class _Respuesta:
+    def __init__(self, texto):
+        self.status_code = 200 if texto is not None else 404
+        self.text = texto
+
+    def raise_for_status(self):
+        pass
+
+
+class _HTTP:
+    """Listados por URL; registra las páginas pedidas"""
+
+    def __init__(self, paginas):
+        self.paginas = paginas
+        self.pedidas = []
+
+    def get(self, url, **_kw):
+        self.pedidas.append(url)
+        return _Respuesta(self.paginas.get(url))
+
+
+def _agencia(id_owner):
+    return {'id': id_owner, 'url_perfil': BASE.format(id_owner)}
+
+
+def test_parsear_listado():
+    avisos, cantidad = parsear_listado(_pagina(['190000001', '190000002'], 5))
+    assert avisos == {'190000001': AVISO.format(190000001), '190000002': AVISO.format(190000002)}
+    assert cantidad == 5
+
+
+def test_plan_incremental_entre_instantaneas():
+    http = _HTTP({
+        BASE.format('1'): _pagina(['190000001', '190000002'], 3),
+        BASE.format('1') + '?pagina=2': _pagina(['190000003'], 3),
+        BASE.format('2'): _pagina(['190000004'], 1),
+    })
+    primera = PlanificadorRefresco(http=http, config={'hilos': 1}).planificar([_agencia('1'), _agencia('2')])
+    assert set(primera['nuevos']) == {'190000001', '190000002', '190000003', '190000004'}
+    assert primera['agencias']['1']['estado'] == NUEVA and primera['agencias']['1']['completa']
+
+    # Agencia 1 sin cambios (una sola página pedida); agencia 2 retira 190000004 y publica 190000005;
+    # agencia 3 no responde
+    http = _HTTP({
+        BASE.format('1'): _pagina(['190000001', '190000002'], 3),
+        BASE.format('2'): _pagina(['190000005'], 1),
+    })
+    planificador = PlanificadorRefresco(anterior=primera, http=http, config={'hilos': 1, 'reintentos': 0})
+    segunda = planificador.planificar([_agencia('1'), _agencia('2'), _agencia('3')], crawleados={'190000009'})
+    assert http.pedidas.count(BASE.format('1')) == 1
+    assert segunda['nuevos'] == {'190000005': AVISO.format(190000005)}
+    assert segunda['retirados'] == [{'cod_fr': '190000004', 'id': '2'}]
+    assert segunda['cambiadas'] == ['2']
+    estados = {id_owner: entrada['estado'] for id_owner, entrada in segunda['agencias'].items()}
+    assert estados == {'1': SIN_CAMBIOS, '2': CAMBIADA, '3': ERROR}
+    assert planificador.stats['paginas'] == 3
+
+
+def test_crawleados_no_vuelven_a_la_cola():
+    http = _HTTP({BASE.format('1'): _pagina(['190000001', '190000002'], 2)})
+    plan = PlanificadorRefresco(http=http, config={'hilos': 1}).planificar([_agencia('1')], crawleados={'190000001'})
+    assert list(plan['nuevos']) == ['190000002']
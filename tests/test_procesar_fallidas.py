@@ -0,0 +1,58 @@
+import json
+
+import procesar_fallidas
+from conftest import CrawlerHTTP
+from errores_crawl import DRIVER_CAIDO, REMOVIDO, TIMEOUT
+
+
+class CrawlerConCaidas(CrawlerHTTP):
+    """Las URLs de `caidas` fallan siempre con driver caído (reintento sin espera)"""
+
+    def __init__(self, url_base, caidas):
+        super().__init__(url_base)
+        self.caidas = set(caidas)
+
+    def obtener_html(self, url, max_wait=30, reintentos=3, lanzar=False):
+        self.ultimo_error = None
+        if url in self.caidas:
+            self.pedidas.append(url)
+            self.ultimo_error = DRIVER_CAIDO
+            return None
+        return super().obtener_html(url, max_wait, reintentos, lanzar)
+
+
+def _escribir_jsonl(ruta, items):
+    ruta.write_text(''.join(json.dumps(i) + '\n' for i in items), encoding='utf-8')
+
+
+def test_reintento_exitoso_no_se_registra_como_fallo(en_tmp, servidor, urls_sitio):
+    ok, caida, removida, ya_hecha = urls_sitio(4)
+    lote_dir = en_tmp / 'resultados' / 'lotes' / 'lote_01'
+    lote_dir.mkdir(parents=True)
+    fallidas_file = lote_dir / 'fallidas_lote_01.jsonl'
+    _escribir_jsonl(fallidas_file, [
+        {'url': ok, 'clase': TIMEOUT},
+        {'url': caida, 'clase': TIMEOUT},
+        {'url': removida, 'clase': REMOVIDO},
+        {'url': ya_hecha, 'clase': TIMEOUT},
+    ])
+    _escribir_jsonl(lote_dir / 'checkpoint_lote_01.jsonl', [{'URL INMUEBLE': ya_hecha, 'COD FR': '1'}])
+
+    crawler = CrawlerConCaidas(servidor.url_base, [caida])
+    procesar_fallidas.procesar_fallidas(1, crawler=crawler)
+    crawler.close()
+
+    # Solo se piden las reintentables pendientes; la caída agota sus intentos
+    assert crawler.pedidas.count(ok) == 1
+    assert crawler.pedidas.count(caida) == 3
+    assert removida not in crawler.pedidas and ya_hecha not in crawler.pedidas
+    # Cada pedido pasó por la tasa global compartida con los lotes
+    assert (en_tmp / 'resultados' / 'lotes' / 'tasa_global.json').exists()
+
+    reprocesadas, = lote_dir.glob('fallidas_reprocessadas_*.json')
+    registros = json.loads(reprocesadas.read_text(encoding='utf-8'))
+    assert [r['URL INMUEBLE'] for r in registros] == [ok]
+    assert len(registros[0]) == 50
+
+    agregadas = [json.loads(l) for l in fallidas_file.read_text(encoding='utf-8').splitlines()[4:]]
+    assert [(a['url'], a['clase']) for a in agregadas] == [(caida, DRIVER_CAIDO)]
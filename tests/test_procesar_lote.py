@@ -0,0 +1,34 @@
+import json
+
+import procesar_lote
+
+
+def _preparar_lote(en_tmp, urls):
+    lotes = en_tmp / 'resultados' / 'lotes'
+    lotes.mkdir(parents=True)
+    (lotes / 'lote_01.json').write_text(json.dumps({'urls': urls}), encoding='utf-8')
+    return lotes / 'lote_01'
+
+
+def test_procesar_lote_genera_checkpoint_json_y_excel(en_tmp, crawler_http, urls_sitio):
+    urls = urls_sitio(4)
+    salida = _preparar_lote(en_tmp, urls + [urls[0] + '?utm_source=x'])
+
+    procesar_lote.procesar_lote(1, crawler=crawler_http)
+
+    checkpoint = [json.loads(l) for l in (salida / 'checkpoint_lote_01.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert sorted(r['URL INMUEBLE'] for r in checkpoint) == sorted(urls)
+    assert all(len(r) == 50 for r in checkpoint)
+    final, = salida.glob('lote_01_*.json')
+    assert len(json.loads(final.read_text(encoding='utf-8'))) == 4
+    assert list(salida.glob('lote_01_*.xlsx'))
+    # La URL con query string es la misma ficha: se pidió una sola vez
+    assert len(crawler_http.pedidas) == 4
+
+
+def test_procesar_lote_retoma_desde_el_checkpoint(en_tmp, crawler_http, urls_sitio):
+    urls = urls_sitio(3)
+    _preparar_lote(en_tmp, urls)
+    procesar_lote.procesar_lote(1, crawler=crawler_http)
+    procesar_lote.procesar_lote(1, crawler=crawler_http)
+    assert len(crawler_http.pedidas) == 3
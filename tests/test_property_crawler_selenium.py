@@ -0,0 +1,19 @@
+import pytest
+
+from property_crawler_selenium import PropertyCrawlerSelenium
+
+
+def test_estrategia_de_carga_por_defecto_es_normal():
+    crawler = PropertyCrawlerSelenium(iniciar_driver=False)
+    assert crawler.estrategia_carga == 'normal'
+    assert crawler.crear_opciones().page_load_strategy == 'normal'
+
+
+def test_estrategia_none_solo_si_se_pide():
+    crawler = PropertyCrawlerSelenium(iniciar_driver=False, estrategia_carga='none')
+    assert crawler.crear_opciones().page_load_strategy == 'none'
+
+
+def test_estrategia_de_carga_invalida():
+    with pytest.raises(ValueError):
+        PropertyCrawlerSelenium(iniciar_driver=False, estrategia_carga='rapida')
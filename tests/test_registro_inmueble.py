@@ -0,0 +1,42 @@
+import json
+
+from registro_inmueble import CAMPOS, LoteRegistros, RegistroInmueble, escribir_json_streaming
+
+CDN = 'https://cdn2.infocasas.com.uy/repo/img/'
+
+
+def _datos(cod_fr, **extra):
+    datos = {campo: None for campo in CAMPOS}
+    datos.update(cod_fr=cod_fr, titulo=f'Casa {cod_fr}', inmos='Inmobiliaria Uno', tipo_oferta='Venta',
+                 imagenes=[CDN + f'{cod_fr}_1.jpg', CDN + f'{cod_fr}_2.jpg', 'https://otro.cdn/x.png'], **extra)
+    return datos
+
+
+def test_registro_reproduce_el_dict_original():
+    datos = _datos('190000001', precio='450000000')
+    registro = RegistroInmueble.desde_dict(datos)
+    assert registro.a_dict() == datos
+    assert list(registro.a_dict()) == list(CAMPOS)
+    assert registro.get('cod_fr') == '190000001' and registro['imagenes'] == datos['imagenes']
+    assert registro.get('no_existe', 'x') == 'x'
+    assert not hasattr(registro, '__dict__')
+
+
+def test_categoricos_comparten_una_sola_copia():
+    uno = RegistroInmueble.desde_dict(_datos('1'))
+    dos = RegistroInmueble.desde_dict(json.loads(json.dumps(_datos('2'))))
+    assert uno.inmos is dos.inmos
+
+
+def test_json_streaming_igual_a_json_dump(tmp_path):
+    lote = LoteRegistros(_datos(str(190000000 + i)) for i in range(3))
+    ruta = tmp_path / 'lote.json'
+    assert lote.guardar_json(ruta) == 3
+    assert ruta.read_text(encoding='utf-8') == json.dumps(list(lote.dicts()), ensure_ascii=False, indent=2)
+
+    vacio = tmp_path / 'vacio.json'
+    assert escribir_json_streaming(vacio, []) == 0
+    assert json.loads(vacio.read_text(encoding='utf-8')) == []
+    compacto = tmp_path / 'compacto.json'
+    escribir_json_streaming(compacto, lote.dicts(), indent=None)
+    assert json.loads(compacto.read_text(encoding='utf-8')) == list(lote.dicts())
@@ -0,0 +1,54 @@
+import json
+
+from registro_inmueble import CAMPOS
+from staging_lotes import StagingLote
+
+
+def _registros(desde, hasta):
+    return [{**{c: None for c in CAMPOS}, 'cod_fr': str(190000000 + i), 'imagenes': []} for i in range(desde, hasta)]
+
+
+def _staging(tmp_path, **kw):
+    return StagingLote(1, tmp_path / 'OneDrive' / 'lote_01', staging_dir=str(tmp_path / 'local'),
+                       **{'cadencia': 3600, 'conservar': 2, **kw})
+
+
+def test_publica_compacto_con_cadencia_y_poda(tmp_path):
+    staging = _staging(tmp_path)
+    staging.agregar(_registros(0, 3), 3)
+    assert staging.sincronizar() is None  # No venció la cadencia
+    primera = staging.sincronizar(forzar=True)
+    assert primera.name.startswith('lote_01_backup_3_')
+    assert staging.sincronizar(forzar=True) is None  # Nada nuevo
+
+    for posicion in (6, 9):
+        staging.agregar(_registros(posicion - 3, posicion), posicion)
+        staging.sincronizar(forzar=True)
+    backups = staging.backups_publicados()
+    assert [b.name.split('_')[3] for b in backups] == ['9', '6']
+    texto = backups[0].read_text(encoding='utf-8')
+    assert len(texto.splitlines()) == 11  # Un registro por línea, sin indentar
+    assert [r['cod_fr'] for r in json.loads(texto)] == [str(190000000 + i) for i in range(9)]
+    assert not list(backups[0].parent.glob('.*.tmp'))
+
+
+def test_reanudar_desde_staging_local_ignora_linea_cortada(tmp_path):
+    staging = _staging(tmp_path)
+    staging.agregar(_registros(0, 2), 2)
+    staging.agregar(_registros(2, 4), 4)
+    with open(staging.jsonl, 'a', encoding='utf-8') as f:
+        f.write('{"posicion": 6, "registros": [{"cod_')
+
+    resultados, posicion = _staging(tmp_path).reanudar()
+    assert posicion == 4 and len(resultados) == 4
+
+
+def test_reanudar_desde_backup_mas_avanzado_de_otra_maquina(tmp_path):
+    otra = StagingLote(1, tmp_path / 'OneDrive' / 'lote_01', staging_dir=str(tmp_path / 'otra'), cadencia=0)
+    otra.agregar(_registros(0, 5), 5)
+    otra.sincronizar()
+
+    staging = _staging(tmp_path)
+    staging.agregar(_registros(0, 2), 2)
+    resultados, posicion = _staging(tmp_path).reanudar()
+    assert posicion == 5 and len(resultados) == 5
@@ -0,0 +1,48 @@
+import csv
+import json
+from collections import Counter
+
+from unir_contactos import COLUMNAS_CONTACTO, IndiceContactos, escribir, unir
+
+
+def _indice():
+    indice = IndiceContactos()
+    indice.agregar('100', 'viejo@inmo.co', '3001234567', 'a.json', fecha=1)
+    indice.agregar('100', None, '123', 'b.json', fecha=2)  # Más reciente pero inválido: no gana
+    indice.agregar('200', None, '123', 'a.json', fecha=1)
+    indice.agregar('200', 'nuevo@inmo.co', '3109876543', 'b.json', fecha=2)
+    indice.agregar(None, 'x@y.co', '3001234567', 'a.json')
+    return indice
+
+
+def test_indice_prefiere_telefono_valido_y_luego_el_mas_reciente():
+    indice = _indice()
+    assert len(indice) == 2 and indice.stats['sin_id'] == 1
+    assert indice.contactos['100']['telefono_inmos'] == '+573001234567'
+    assert indice.contactos['100']['fuente_contacto'] == 'a.json'
+    assert indice.contactos['200']['email_inmos'] == 'nuevo@inmo.co'
+
+
+def test_unir_deduplica_por_cod_fr_y_cuenta_sin_contacto(tmp_path):
+    lote = tmp_path / 'checkpoint_lote_01.jsonl'
+    filas = [
+        {'COD FR': '1', 'ID Inmos': 100},
+        {'COD FR': '1', 'ID Inmos': 100},
+        {'COD FR': '2', 'ID Inmos': 300},
+        {'COD FR': '3'},
+        {'ID Inmos': 200},
+    ]
+    lote.write_text(''.join(json.dumps(f) + '\n' for f in filas), encoding='utf-8')
+    stats = Counter()
+    unidos = list(unir([str(lote)], _indice(), stats))
+
+    assert [u['COD FR'] for u in unidos] == ['1', '2', '3']
+    assert unidos[0]['email_inmos'] == 'viejo@inmo.co' and unidos[0]['telefono_valido']
+    assert all(unidos[1][c] is None for c in COLUMNAS_CONTACTO)
+    assert stats == {'inmuebles': 3, 'duplicados': 1, 'sin_cod_fr': 1, 'con_contacto': 1,
+                     'telefono_valido': 1, 'sin_contacto': 1, 'sin_owner': 1}
+
+    salida = tmp_path / 'unidos.csv'
+    assert escribir(iter(unidos), str(salida), 'csv') == 3
+    with open(salida, encoding='utf-8-sig', newline='') as f:
+        assert [fila['email_inmos'] for fila in csv.DictReader(f)] == ['viejo@inmo.co', '', '']
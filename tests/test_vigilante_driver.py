@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from pipeline import ReintentarURL
+from vigilante_driver import URLVencida, VigilanteDriver, cerrar_driver
+
+
+def _driver_colgado():
+    """Proceso real que hace de chromedriver: solo termina si lo matan"""
+    proceso = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    return SimpleNamespace(service=SimpleNamespace(process=proceso), quit=lambda: time.sleep(60))
+
+
+def test_url_dentro_del_plazo():
+    vigilante = VigilanteDriver(plazo=5, intervalo=0.05)
+    assert vigilante.ejecutar('u1', lambda: None, lambda: '<html>') == '<html>'
+    assert vigilante.stats == {'urls': 1, 'atascos': 0, 'procesos_terminados': 0}
+
+
+def test_plazo_vencido_mata_el_navegador_y_pide_reintento():
+    vigilante = VigilanteDriver(plazo=0.2, intervalo=0.05)
+    driver = _driver_colgado()
+
+    def obtener_html():
+        driver.service.process.wait()  # Llamada bloqueada hasta que el vigilante mata el proceso
+        return None
+
+    inicio = time.time()
+    with pytest.raises(URLVencida) as error:
+        vigilante.ejecutar('u1', lambda: driver, obtener_html)
+    assert isinstance(error.value, ReintentarURL)
+    assert time.time() - inicio < 10
+    assert driver.service.process.poll() is not None
+    assert vigilante.stats['atascos'] == 1 and vigilante.atascadas == ['u1']
+
+
+def test_cerrar_driver_con_quit_colgado():
+    driver = _driver_colgado()
+    inicio = time.time()
+    cerrar_driver(driver, plazo=0.2)
+    driver.service.process.wait(timeout=10)
+    assert time.time() - inicio < 10
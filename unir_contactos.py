@@ -0,0 +1,253 @@
+"""
+unir_contactos.py - Join de los inmuebles con el contacto (email/teléfono) de su inmobiliaria
+
+No había un paso que pegara el email/teléfono de la inmobiliaria a las ~278k
+filas de inmuebles: había que cruzar a mano en Excel la salida de
+build_final_excel con los JSON de lote.
+
+Hash join en una pasada:
+- Lado chico (se indexa en memoria): contactos por id de owner, desde la caché
+  de cache_contactos.py y desde los extraction_emails_*.json /
+  extraction_emails_FINAL.json (id del perfil vía
+  merge_contacts_to_excel.extract_id_from_url). Si un owner aparece en varias
+  fuentes gana el teléfono válido (valid_phone) más reciente
+- Lado grande (en streaming): registros de inmuebles de checkpoints JSONL o
+  backups JSON de lote, leídos de a un registro; se deduplican por cod_fr
+- La salida se escribe a medida que avanza (JSONL, CSV o XLSX en modo
+  write_only): la memoria queda acotada por el índice de contactos y el set de
+  cod_fr vistos, no por el tamaño del dataset
+
+Uso:
+    python unir_contactos.py resultados/lotes --formato csv
+    python unir_contactos.py resultados/lotes/lote_01 resultados/lotes/lote_02 --formato xlsx --salida unidos.xlsx
+"""
+import os
+import csv
+import json
+import time
+import argparse
+from glob import glob
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from build_final_excel import FINAL_JSON, RESULTS_DIR, normalize_phone, valid_phone
+from merge_contacts_to_excel import extract_id_from_url
+from cache_contactos import CACHE_DEFAULT, CAMPOS_ID_OWNER, CacheContactos
+from frontera import _cod_fr_de_registro, _leer_registros
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # Solo para --formato xlsx
+    Workbook = None
+
+
+FORMATOS = ('jsonl', 'csv', 'xlsx')
+
+# Columnas agregadas a cada inmueble
+COLUMNAS_CONTACTO = ('email_inmos', 'telefono_inmos', 'telefono_valido', 'fuente_contacto')
+
+# Checkpoints primero: son la fuente completa de cada lote; los backups JSON solo suman lo que falte
+PATRONES_INMUEBLES = ('checkpoint_lote_*.jsonl', 'lote_*.json', 'properties_*.jsonl')
+
+
+class IndiceContactos:
+    """Lado chico del join: id de owner -> mejor contacto conocido"""
+
+    def __init__(self):
+        self.contactos: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'entradas': 0, 'sin_id': 0}
+
+    def __len__(self) -> int:
+        return len(self.contactos)
+
+    def agregar(self, id_owner, email: Optional[str], telefono: Optional[str], fuente: str, fecha: float = 0):
+        self.stats['entradas'] += 1
+        if id_owner is None:
+            self.stats['sin_id'] += 1
+            return
+        telefono = normalize_phone(telefono or '')
+        candidato = {
+            'email_inmos': email if email and '@' in email else None,
+            'telefono_inmos': telefono,
+            'telefono_valido': valid_phone(telefono),
+            'fuente_contacto': fuente,
+            '_fecha': fecha,
+        }
+        actual = self.contactos.get(str(id_owner))
+        if actual is not None:
+            # Teléfono válido antes que inválido; a igual validez, el más reciente
+            if (actual['telefono_valido'], actual['_fecha']) > (candidato['telefono_valido'], candidato['_fecha']):
+                if not actual['email_inmos']:
+                    actual['email_inmos'] = candidato['email_inmos']
+                return
+            candidato['email_inmos'] = candidato['email_inmos'] or actual['email_inmos']
+        self.contactos[str(id_owner)] = candidato
+
+    def cargar_cache(self, ruta: str = CACHE_DEFAULT) -> int:
+        antes = len(self)
+        if os.path.exists(ruta):
+            for id_owner, contacto in CacheContactos(ruta).contactos.items():
+                self.agregar(id_owner, contacto.get('email'), contacto.get('telefono'),
+                             'cache', contacto.get('revelado', 0))
+        return len(self) - antes
+
+    def cargar_extracciones(self, rutas: Iterable[str]) -> int:
+        """Resultados de extract_emails_fast / recheck / build_final_excel (url de perfil + email/teléfono)"""
+        antes = len(self)
+        for ruta in rutas:
+            fecha = os.path.getmtime(ruta)
+            for registro in _leer_registros(ruta):
+                url = registro.get('url') or registro.get('URL') or ''
+                self.agregar(extract_id_from_url(url), registro.get('email'),
+                             registro.get('telefono') or registro.get('phone'), os.path.basename(ruta), fecha)
+        return len(self) - antes
+
+    def buscar(self, registro: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        for campo in CAMPOS_ID_OWNER:
+            id_owner = registro.get(campo)
+            if id_owner:
+                return self.contactos.get(str(id_owner))
+        return None
+
+
+def _owner_de(registro: Dict[str, Any]):
+    return next((registro[c] for c in CAMPOS_ID_OWNER if registro.get(c)), None)
+
+
+def archivos_inmuebles(entradas: Iterable[str]) -> List[str]:
+    archivos: List[str] = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for patron in PATRONES_INMUEBLES:
+                archivos += sorted(glob(os.path.join(entrada, '**', patron), recursive=True))
+        else:
+            archivos += sorted(glob(entrada))
+    unicos = []
+    for archivo in archivos:
+        if archivo not in unicos:
+            unicos.append(archivo)
+    return unicos
+
+
+def unir(archivos: Iterable[str], indice: IndiceContactos, stats: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+    """Lado grande del join: cada inmueble (único por cod_fr) con las columnas de contacto"""
+    vistos = set()
+    vacio = {columna: None for columna in COLUMNAS_CONTACTO}
+    for ruta in archivos:
+        for registro in _leer_registros(ruta):
+            cod_fr = _cod_fr_de_registro(registro)
+            if cod_fr is None:
+                stats['sin_cod_fr'] += 1
+                continue
+            if cod_fr in vistos:
+                stats['duplicados'] += 1
+                continue
+            vistos.add(cod_fr)
+            stats['inmuebles'] += 1
+            contacto = indice.buscar(registro)
+            if contacto is None:
+                stats['sin_owner' if _owner_de(registro) is None else 'sin_contacto'] += 1
+                contacto = vacio
+            else:
+                stats['con_contacto'] += 1
+                stats['telefono_valido'] += bool(contacto['telefono_valido'])
+            unido = dict(registro)
+            for columna in COLUMNAS_CONTACTO:
+                unido[columna] = contacto[columna]
+            yield unido
+
+
+def _celda(valor):
+    """Listas/dicts (imagenes, comodidades) como JSON en CSV/XLSX"""
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def escribir(registros: Iterator[Dict[str, Any]], salida: str, formato: str) -> int:
+    """
+    Escribe en streaming. En CSV/XLSX las columnas salen del primer registro
+    (todos los archivos de un mismo formato comparten esquema)
+    """
+    temporal = salida + '.tmp'
+    cantidad = 0
+    if formato == 'jsonl':
+        with open(temporal, 'w', encoding='utf-8') as f:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                cantidad += 1
+    elif formato == 'csv':
+        with open(temporal, 'w', encoding='utf-8-sig', newline='') as f:
+            escritor = None
+            for registro in registros:
+                if escritor is None:
+                    escritor = csv.DictWriter(f, fieldnames=list(registro), extrasaction='ignore')
+                    escritor.writeheader()
+                escritor.writerow({k: _celda(v) for k, v in registro.items()})
+                cantidad += 1
+    else:
+        if Workbook is None:
+            raise RuntimeError('openpyxl no está instalado: usa --formato csv o jsonl')
+        libro = Workbook(write_only=True)  # Filas directo a disco, sin retener la hoja
+        hoja = libro.create_sheet('inmuebles')
+        columnas = None
+        for registro in registros:
+            if columnas is None:
+                columnas = list(registro)
+                hoja.append(columnas)
+            hoja.append([_celda(registro.get(c)) for c in columnas])
+            cantidad += 1
+        libro.save(temporal)
+    os.replace(temporal, salida)
+    return cantidad
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Une los inmuebles con el contacto de su inmobiliaria')
+    parser.add_argument('entradas', nargs='*', default=[os.path.join('resultados', 'lotes')],
+                        help='Directorios o archivos con registros de inmuebles (JSON/JSONL)')
+    parser.add_argument('--formato', choices=FORMATOS, default='csv')
+    parser.add_argument('--salida', help='Archivo de salida (default: resultados/inmuebles_con_contactos.<formato>)')
+    parser.add_argument('--cache', default=CACHE_DEFAULT, help='Caché de contactos (cache_contactos.py)')
+    parser.add_argument('--contactos', nargs='*',
+                        help='JSON de contactos (default: extraction_emails_*.json y extraction_emails_FINAL.json)')
+    args = parser.parse_args()
+
+    salida = args.salida or os.path.join('resultados', f'inmuebles_con_contactos.{args.formato}')
+    inicio = time.time()
+
+    print("="*80)
+    print("JOIN INMUEBLES + CONTACTOS DE INMOBILIARIAS")
+    print("="*80)
+
+    indice = IndiceContactos()
+    print(f"  Caché de contactos: {indice.cargar_cache(args.cache):,} owners")
+    contactos = args.contactos
+    if contactos is None:
+        contactos = sorted(glob(os.path.join(RESULTS_DIR, 'extraction_emails_*.json')))
+        if os.path.exists(FINAL_JSON) and FINAL_JSON not in contactos:
+            contactos.append(FINAL_JSON)
+    print(f"  Extracciones ({len(contactos)} archivos): {indice.cargar_extracciones(contactos):,} owners nuevos")
+    print(f"  Índice: {len(indice):,} owners ({indice.stats['sin_id']:,} contactos sin id descartados)")
+
+    archivos = archivos_inmuebles(args.entradas)
+    print(f"\nInmuebles: {len(archivos)} archivos")
+    stats = {'inmuebles': 0, 'duplicados': 0, 'sin_cod_fr': 0, 'con_contacto': 0,
+             'telefono_valido': 0, 'sin_contacto': 0, 'sin_owner': 0}
+    os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+    cantidad = escribir(unir(archivos, indice, stats), salida, args.formato)
+
+    print(f"\n{'='*80}")
+    print("RESUMEN")
+    print("="*80)
+    print(f"Inmuebles escritos:        {cantidad:,}")
+    print(f"  Con contacto:            {stats['con_contacto']:,} ({stats['telefono_valido']:,} con teléfono válido)")
+    print(f"  Owner sin contacto:      {stats['sin_contacto']:,}")
+    print(f"  Sin owner:               {stats['sin_owner']:,}")
+    print(f"Duplicados (cod_fr):       {stats['duplicados']:,}")
+    print(f"Sin cod_fr (descartados):  {stats['sin_cod_fr']:,}")
+    print(f"Tiempo: {time.time() - inicio:.1f}s")
+    print(f"\n✓ Salida: {salida}")
+
+
+if __name__ == '__main__':
+    main()
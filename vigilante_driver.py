@@ -0,0 +1,207 @@
+"""
+vigilante_driver.py - Watchdog de chromedriver con plazo duro por URL
+
+Una llamada de chromedriver colgada (carga de página, page_source o un
+driver.quit() que no retorna en el camino de reintentos) congelaba un lote
+entero por minutos mientras progreso.txt seguía viéndose normal. Los timeouts
+de Selenium no alcanzan: se aplican dentro del mismo thread bloqueado.
+
+VigilanteDriver corre en su propio thread:
+- Cada URL se ejecuta con un plazo duro (`ejecutar`)
+- Al vencer, mata el árbol de procesos del navegador (chromedriver + Chrome):
+  la llamada bloqueada falla de inmediato en el thread del worker
+- La URL se reporta con URLVencida (subclase de pipeline.ReintentarURL): el
+  pipeline le da al worker un driver nuevo y vuelve a encolar la URL
+- Lleva un contador de atascos (stats y métrica 'urls_atascadas')
+
+cerrar_driver() es un quit() con plazo: si no retorna, mata el árbol.
+
+Uso:
+    vigilante = VigilanteDriver(plazo=90)
+    html = vigilante.ejecutar(url, lambda: crawler.driver, lambda: crawler.obtener_html(url))
+    cerrar_driver(driver)
+"""
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from metricas import get_registro
+from pipeline import ReintentarURL
+
+try:
+    import psutil
+except ImportError:  # Opcional: sin psutil se usa taskkill (Windows) o kill al chromedriver
+    psutil = None
+
+
+T = TypeVar('T')
+
+
+class URLVencida(ReintentarURL):
+    """La URL superó su plazo duro y el navegador fue terminado"""
+
+
+def _pid_driver(driver) -> Optional[int]:
+    """PID del chromedriver (Chrome cuelga de él)"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def matar_arbol(pid: int) -> int:
+    """Termina un proceso y todos sus descendientes; retorna cuántos se mataron"""
+    if psutil is not None:
+        try:
+            raiz = psutil.Process(pid)
+            procesos = raiz.children(recursive=True) + [raiz]
+        except psutil.NoSuchProcess:
+            return 0
+        for proceso in procesos:
+            try:
+                proceso.kill()
+            except psutil.NoSuchProcess:
+                pass
+        psutil.wait_procs(procesos, timeout=5)
+        return len(procesos)
+    if sys.platform == 'win32':
+        resultado = subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)], capture_output=True)
+        return 1 if resultado.returncode == 0 else 0
+    try:
+        os.kill(pid, signal.SIGKILL)
+        return 1
+    except OSError:
+        return 0
+
+
+def matar_driver(driver) -> int:
+    pid = _pid_driver(driver)
+    return matar_arbol(pid) if pid else 0
+
+
+def cerrar_driver(driver, plazo: float = 15):
+    """driver.quit() con plazo: si no retorna a tiempo se mata el árbol de procesos"""
+    if driver is None:
+        return
+    hilo = threading.Thread(target=lambda: _quit_silencioso(driver), name='cerrar-driver', daemon=True)
+    hilo.start()
+    hilo.join(plazo)
+    if hilo.is_alive():
+        print(f"  ⚠ driver.quit() no retornó en {plazo:.0f}s, terminando el navegador")
+        get_registro().incrementar('quit_colgados')
+        matar_driver(driver)
+
+
+def _quit_silencioso(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class _Guardia:
+    __slots__ = ('url', 'obtener_driver', 'vence', 'vencimientos', 'hilo')
+
+    def __init__(self, url: str, obtener_driver: Callable[[], Any], vence: float):
+        self.url = url
+        self.obtener_driver = obtener_driver
+        self.vence = vence
+        self.vencimientos = 0
+        self.hilo = threading.current_thread().name
+
+
+class VigilanteDriver:
+    """Thread watchdog compartido por todos los workers de un proceso"""
+
+    def __init__(self, plazo: float = 90, intervalo: float = 1.0):
+        """
+        Args:
+            plazo: segundos máximos por URL (todas las llamadas al driver incluidas)
+            intervalo: cada cuánto revisa los plazos el thread vigilante
+        """
+        self.plazo = plazo
+        self.intervalo = intervalo
+        self.metricas = get_registro()
+        self.lock = threading.Lock()
+        self._activas: Dict[int, _Guardia] = {}
+        self._local = threading.local()
+        self._hilo: Optional[threading.Thread] = None
+        self.atascadas: List[str] = []
+        self.stats = {'urls': 0, 'atascos': 0, 'procesos_terminados': 0}
+
+    # ------------------------------------------------------------------
+    # API de los workers
+    # ------------------------------------------------------------------
+    def ejecutar(self, url: str, obtener_driver: Callable[[], Any], funcion: Callable[[], T],
+                 plazo: Optional[float] = None) -> T:
+        """
+        Ejecuta funcion() con plazo duro.
+
+        obtener_driver se evalúa al vencer (el worker puede haber reemplazado
+        el driver entre reintentos). Si el plazo venció y la función falló o
+        no obtuvo nada, lanza URLVencida.
+        """
+        self._asegurar_hilo()
+        guardia = _Guardia(url, obtener_driver, time.time() + (plazo or self.plazo))
+        with self.lock:
+            self._activas[id(guardia)] = guardia
+            self.stats['urls'] += 1
+        self._local.guardia = guardia
+        try:
+            resultado = funcion()
+        except Exception as e:
+            if guardia.vencimientos:
+                raise URLVencida(f"Plazo vencido para {url}") from e
+            raise
+        finally:
+            self._local.guardia = None
+            with self.lock:
+                self._activas.pop(id(guardia), None)
+        if guardia.vencimientos and resultado is None:
+            raise URLVencida(f"Plazo vencido para {url}")
+        return resultado
+
+    def vencida(self) -> bool:
+        """True si la URL en curso de este thread ya superó su plazo (cortar reintentos)"""
+        guardia = getattr(self._local, 'guardia', None)
+        return bool(guardia and guardia.vencimientos)
+
+    # ------------------------------------------------------------------
+    # Thread vigilante
+    # ------------------------------------------------------------------
+    def _asegurar_hilo(self):
+        with self.lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name='vigilante-driver', daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            ahora = time.time()
+            with self.lock:
+                vencidas = [g for g in self._activas.values() if g.vence <= ahora]
+                for guardia in vencidas:
+                    # Rearmar: si el worker sigue colgado con otro driver, se vuelve a cortar
+                    guardia.vencimientos += 1
+                    guardia.vence = ahora + self.plazo
+                    self.stats['atascos'] += 1
+                    self.atascadas.append(guardia.url)
+            for guardia in vencidas:
+                self._cortar(guardia)
+
+    def _cortar(self, guardia: _Guardia):
+        self.metricas.incrementar('urls_atascadas')
+        print(f"  ⚠ [{guardia.hilo}] URL atascada más de {self.plazo:.0f}s, terminando navegador: {guardia.url}")
+        try:
+            driver = guardia.obtener_driver()
+        except Exception:
+            driver = None
+        if driver is not None:
+            terminados = matar_driver(driver)
+            with self.lock:
+                self.stats['procesos_terminados'] += terminados